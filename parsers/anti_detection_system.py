@@ -31,6 +31,14 @@ import base64
 from dataclasses import dataclass
 from enum import Enum
 
+try:
+    from resource_policy import ResourceBlocker, get_policy
+    from rate_controller import rate_controller, parse_retry_after
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    from resource_policy import ResourceBlocker, get_policy
+    from rate_controller import rate_controller, parse_retry_after
+
 # Playwright для сложных случаев
 try:
     from playwright.async_api import async_playwright, Browser, BrowserContext, Page
@@ -93,6 +101,9 @@ class AntiDetectionSystem:
         self.blocked_ips = set()
         self.captcha_handlers = {}
         
+        # Общий для всех парсеров AIMD-контроллер частоты запросов по хостам
+        self.rate_controller = rate_controller
+        
         # Статистика
         self.stats = {
             "total_requests": 0,
@@ -422,22 +433,30 @@ class AntiDetectionSystem:
                 # Создание страницы
                 page = await context.new_page()
                 
-                # Настройка перехватчиков
-                await page.route("**/*", lambda route: route.continue_())
+                # Настройка перехватчиков: отсекаем картинки, шрифты, медиа и трекеры
+                blocker = ResourceBlocker(get_policy(kwargs.get('source'), url))
+                await page.route("**/*", blocker.handle_route_async)
+                page.on('response', blocker.on_response)
                 
                 # Выполнение запроса
+                blocker.start(url)
                 response = await page.goto(url, timeout=self.config['browser_automation']['timeout'])
                 
                 if response:
                     content = await page.content()
+                    load_report = blocker.finish()
                     status_code = response.status
+                    self.rate_controller.record(
+                        url, status_code, parse_retry_after(response.headers.get('retry-after'))
+                    )
                     
                     await browser.close()
                     
                     return True, content, {
                         'status_code': status_code,
                         'headers': dict(response.headers),
-                        'method': 'playwright'
+                        'method': 'playwright',
+                        'load_report': load_report.to_dict() if load_report else None
                     }
                 else:
                     await browser.close()
@@ -476,7 +495,9 @@ class AntiDetectionSystem:
             self.stats['total_requests'] += 1
             
             # Проверка на блокировку
-            if self.detect_blocking(response):
+            blocked = self.detect_blocking(response)
+            self.rate_controller.record_response(url, response, blocked=blocked)
+            if blocked:
                 logger.warning(f"🚫 Заблокирован запрос к {url}")
                 self.stats['blocked_requests'] += 1
                 
@@ -498,14 +519,18 @@ class AntiDetectionSystem:
                 'method': 'requests'
             }
             
+        except requests.RequestException as e:
+            self.rate_controller.record(url, None)
+            logger.error(f"❌ Ошибка requests: {e}")
+            return False, "", {}
         except Exception as e:
             logger.error(f"❌ Ошибка requests: {e}")
             return False, "", {}
     
     async def make_request(self, url: str, method: RequestMethod = RequestMethod.REQUESTS, **kwargs) -> Tuple[bool, str, Dict[str, Any]]:
         """Универсальный метод выполнения запроса"""
-        # Добавляем задержку
-        self.add_random_delay()
+        # Темп запросов к хосту задает контроллер частоты (вместо случайной задержки)
+        await self.rate_controller.acquire_async(url)
         
         # Выбор метода
         if method == RequestMethod.PLAYWRIGHT and PLAYWRIGHT_AVAILABLE:
@@ -515,8 +540,8 @@ class AntiDetectionSystem:
     
     def make_request_sync(self, url: str, method: RequestMethod = RequestMethod.REQUESTS, **kwargs) -> requests.Response:
         """Синхронная версия make_request для совместимости"""
-        # Добавляем задержку
-        self.add_random_delay('human')
+        # Темп запросов к хосту задает контроллер частоты (вместо случайной задержки)
+        self.rate_controller.acquire(url)
         
         # Для синхронной версии используем только requests с улучшенными заголовками
         try:
@@ -547,7 +572,9 @@ class AntiDetectionSystem:
             response = session.get(url, timeout=30, allow_redirects=True)
             
             # Проверяем на блокировку
-            if self.detect_blocking(response):
+            blocked = self.detect_blocking(response)
+            self.rate_controller.record_response(url, response, blocked=blocked)
+            if blocked:
                 logger.warning(f"🚫 Заблокирован запрос к {url}")
                 # Возвращаем None вместо создания фейкового Response
                 return None
@@ -555,6 +582,10 @@ class AntiDetectionSystem:
             logger.info(f"✅ Успешный запрос к {url}")
             return response
             
+        except requests.RequestException as e:
+            self.rate_controller.record(url, None)
+            logger.error(f"❌ Ошибка запроса к {url}: {e}")
+            return None
         except Exception as e:
             logger.error(f"❌ Ошибка запроса к {url}: {e}")
             return None
@@ -569,7 +600,8 @@ class AntiDetectionSystem:
             **self.stats,
             'success_rate': success_rate,
             'blocked_ips_count': len(self.blocked_ips),
-            'active_sessions': len(self.sessions)
+            'active_sessions': len(self.sessions),
+            'host_rates': self.rate_controller.get_stats()
         }
     
     def save_config(self):
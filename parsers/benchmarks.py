@@ -0,0 +1,648 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки конвейера обработки вакансий
+
+Микро-бенчмарки по стадиям:
+- extract_formatted_text (разбор HTML описания + извлечение текста)
+- formatter.<вариант> - только извлечение текста из готового дерева:
+  simple_text_formatter (итеративный и прежний рекурсивный), text_formatter,
+  text_formatter_v1/v2, smart_text_formatter (группа formatters)
+- html_parse.<бэкенд> - построение дерева страницы вакансии (html_backend)
+- detail_parse.full / detail_parse.subtree - блок описания со страницы
+  вакансии полным и частичным разбором (subtree_parser)
+- text_cleaner.clean_vacancy_data, text_normalizer.normalize_vacancy_text
+- VacancyFilter.is_vacancy_relevant
+- save_vacancy (unified_parser, simple_unified_parser, geekjob_simple)
+- экспортеры (JSON, HTML, текстовые)
+
+Макро-бенчмарк pipeline: N вакансий через весь путь - HTML описания,
+extract_formatted_text, save_all_vacancies (очистка, нормализация, фильтр,
+запись в БД) и экспорт в JSON.
+
+Корпус синтетический и детерминированный (seed), масштаб 10k / 100k / 1M.
+Вакансии генерируются пачками, время генерации в замер не входит.
+Результаты пишутся в JSON; с --baseline сравниваются с сохраненным
+прогоном, рост времени на вакансию больше порога считается регрессией
+(код выхода 1).
+
+Примеры:
+    python benchmarks.py --scale 10k
+    python benchmarks.py --scale 100k --stages vacancy_filter text_cleaner --save-baseline
+    python benchmarks.py --scale 10k --baseline data/benchmarks/baseline_10k.json --threshold 0.15
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.dirname(__file__))
+
+from simple_text_formatter import extract_formatted_text, clean_text
+from text_cleaner import clean_vacancy_data
+from text_normalizer import normalize_vacancy_text
+from vacancy_filter import vacancy_filter
+import html_backend
+import subtree_parser
+
+logger = logging.getLogger(__name__)
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+RESULTS_DIR = Path('data/benchmarks')
+# Размер пачки генерации; экспортеры получают корпус такими же пачками
+CHUNK_SIZE = 10_000
+DEFAULT_THRESHOLD = 0.15
+
+
+# ---------------------------------------------------------------------------
+# Синтетический корпус
+# ---------------------------------------------------------------------------
+
+RELEVANT_TITLES = [
+    'UI/UX дизайнер', 'Продуктовый дизайнер', 'Senior Product Designer', 'Веб-дизайнер',
+    'Графический дизайнер', 'Motion-дизайнер', 'Дизайнер интерфейсов', 'UX-исследователь',
+    'Lead UI designer', 'Дизайнер мобильных приложений', 'Арт-директор (digital)',
+]
+IRRELEVANT_TITLES = [
+    'Дизайнер интерьера', 'Дизайнер одежды', 'Менеджер по продажам', 'Python-разработчик',
+    'Дизайнер-конструктор мебели', 'Ландшафтный дизайнер', 'Оператор call-центра',
+]
+COMPANIES = [
+    'ООО «Яндекс»', 'ООО  "Ромашка"', 'Тинькофф', 'VK', 'АО «Лаборатория Касперского»',
+    'ИП Иванов И.И.', 'ООО «Студия Артемия Лебедева»', 'Авито', 'ПАО Сбербанк', 'Ozon',
+]
+LOCATIONS = ['Москва', 'Санкт-Петербург', 'Казань', 'Удаленно', 'Новосибирск', 'Екатеринбург']
+SOURCES = ['hh', 'habr', 'getmatch', 'geekjob', 'hirehi']
+DUTIES = [
+    'Проектировать интерфейсы веб- и мобильных приложений',
+    'Создавать прототипы в&nbsp;Figma и проводить юзабилити-тестирование',
+    'Развивать дизайн-систему продукта  и   библиотеку компонентов',
+    'Работать в команде с продакт-менеджерами и разработчиками',
+    'Готовить макеты для&nbsp;разработки и контролировать реализацию',
+    'Проводить UX-исследования, интервью с пользователями 🙂',
+    'Делать баннеры, иллюстрации и&nbsp;анимации для маркетинга',
+]
+REQUIREMENTS = [
+    'Опыт работы от&nbsp;2 лет',
+    'Уверенное владение Figma, Adobe Photoshop , Illustrator',
+    'Портфолио с&nbsp;кейсами  (обязательно)',
+    'Понимание принципов UX / UI и гайдлайнов iOS и Android',
+    'Английский язык - не&nbsp;ниже Intermediate',
+    'Знание HTML/CSS будет плюсом',
+]
+CONDITIONS = [
+    'Официальное трудоустройство по&nbsp;ТК РФ',
+    'Гибкий график, возможна удаленная работа',
+    'ДМС со&nbsp;стоматологией после испытательного срока',
+    'Компенсация обучения и конференций',
+    'Современный офис в&nbsp;центре города &amp; бесплатные обеды',
+]
+
+
+def _html_list(rng: random.Random, items: List[str]) -> str:
+    chosen = rng.sample(items, rng.randint(3, len(items)))
+    return '<ul>' + ''.join(f'<li> {item} </li>' for item in chosen) + '</ul>'
+
+
+def _description_html(rng: random.Random) -> str:
+    """HTML описания в духе страниц источников: абзацы, списки, сущности, пробелы"""
+    parts = [
+        f'<div class="vacancy-description"><p><strong>О компании</strong></p>'
+        f'<p>Мы&nbsp;делаем сервисы, которыми пользуются {rng.randint(1, 90)} млн человек.<br/>'
+        f'Ищем в команду  дизайнера,  который любит  продукт. </p>',
+        '<h3>Обязанности:</h3>', _html_list(rng, DUTIES),
+        '<h3>Требования:</h3>', _html_list(rng, REQUIREMENTS),
+        '<p><b>Условия</b></p>', _html_list(rng, CONDITIONS),
+    ]
+    if rng.random() < 0.3:
+        parts.append('<p><em>Откликайтесь&nbsp;— ждем ваше портфолио!</em>&nbsp;</p>')
+    parts.append('</div>')
+    return ''.join(parts)
+
+
+class SyntheticCorpus:
+    """
+    Детерминированный корпус вакансий.
+
+    Описания берутся из пула уникальных шаблонов; каждая вакансия получает
+    собственные external_id, заголовок и строку в описании, чтобы кэши по
+    содержимому не искажали замеры.
+    """
+
+    def __init__(self, size: int, seed: int = 42, pool_size: int = 2000):
+        self.size = size
+        self.seed = seed
+        rng = random.Random(seed)
+        self._pool = [_description_html(rng) for _ in range(min(size, pool_size))]
+
+    def make(self, index: int) -> Dict[str, Any]:
+        rng = random.Random(self.seed * 1_000_003 + index)
+        relevant = rng.random() < 0.7
+        title = rng.choice(RELEVANT_TITLES if relevant else IRRELEVANT_TITLES)
+        html = self._pool[index % len(self._pool)].replace(
+            '</div>', f'<p>Вакансия №{index}, код {rng.randint(1000, 9999)}</p></div>', 1
+        )
+        source = SOURCES[index % len(SOURCES)]
+        return {
+            'id': index + 1,
+            'external_id': f"bench-{index}",
+            'source': source,
+            'url': f"https://example.com/{source}/vacancy/{index}",
+            'title': f"  {title}  " if rng.random() < 0.2 else title,
+            'company': rng.choice(COMPANIES),
+            'salary': f"от {rng.randint(60, 350)} 000 ₽" if rng.random() < 0.6 else '',
+            'location': rng.choice(LOCATIONS),
+            'description': f"{title} в команду продукта. Удаленно или офис.",
+            'description_html': html,
+            'full_description': html,
+            'requirements': '',
+            'tasks': '',
+            'conditions': '',
+            'benefits': '',
+            'published_at': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00",
+        }
+
+    def chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        for start in range(0, self.size, chunk_size):
+            yield [self.make(i) for i in range(start, min(start + chunk_size, self.size))]
+
+
+# ---------------------------------------------------------------------------
+# Реестр бенчмарков
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Benchmark:
+    """
+    Стадия: setup(tmpdir) -> state; на каждую пачку prepare(chunk, state) без
+    замера и run(chunk, state) с замером; finish(state) в конце (с замером).
+    """
+    name: str
+    group: str
+    run: Callable[[List[Dict[str, Any]], Any], None]
+    setup: Optional[Callable[[Path], Any]] = None
+    finish: Optional[Callable[[Any], None]] = None
+    description: str = ''
+    prepare: Optional[Callable[[List[Dict[str, Any]], Any], None]] = None
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, group: str = 'micro', setup: Callable = None, finish: Callable = None):
+    def register(func):
+        BENCHMARKS[name] = Benchmark(name, group, func, setup, finish, (func.__doc__ or '').strip())
+        return func
+    return register
+
+
+@benchmark('extract_formatted_text')
+def _bench_extract(chunk, state):
+    """Разбор HTML описания (html.parser) и extract_formatted_text + clean_text"""
+    for vacancy in chunk:
+        soup = BeautifulSoup(vacancy['description_html'], 'html.parser')
+        clean_text(extract_formatted_text(soup))
+
+
+# Варианты форматтеров: имя стадии -> (модуль, функция)
+FORMATTERS = {
+    'formatter.simple': ('simple_text_formatter', 'extract_formatted_text'),
+    'formatter.simple_recursive': ('simple_text_formatter', 'extract_formatted_text_recursive'),
+    'formatter.text_formatter': ('text_formatter', 'extract_formatted_text'),
+    'formatter.text_formatter_v1': ('text_formatter_v1', 'extract_formatted_text'),
+    'formatter.text_formatter_v2': ('text_formatter_v2', 'extract_formatted_text'),
+    'formatter.smart': ('smart_text_formatter', 'extract_formatted_text'),
+    'formatter.smart_content': ('smart_content_parser', 'extract_smart_content'),
+    'formatter.simple_smart': ('simple_smart_parser', 'extract_smart_content'),
+}
+
+
+def _formatter_prepare(chunk, state):
+    state['soups'] = [BeautifulSoup(vacancy['description_html'], 'html.parser') for vacancy in chunk]
+
+
+def _register_formatters():
+    import importlib
+    for name, (module_name, function_name) in FORMATTERS.items():
+        formatter = getattr(importlib.import_module(module_name), function_name)
+
+        def run(chunk, state, formatter=formatter):
+            for soup in state['soups']:
+                formatter(soup)
+
+        BENCHMARKS[name] = Benchmark(
+            name, 'formatters', run, lambda tmpdir: {},
+            description=f"{module_name}.{function_name} по готовому дереву описания",
+            prepare=_formatter_prepare,
+        )
+
+
+_register_formatters()
+
+
+PAGE_SHELL = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>'
+    '<style>.vacancy{{margin:0}}</style><script>window.__analytics = [' + '"event",' * 300 + '];</script>'
+    '</head><body><header class="header"><nav><a href="/">Вакансии</a><a href="/companies">Компании</a></nav></header>'
+    '<main class="vacancy"><h1 class="vacancy-title">{title}</h1><div class="company"><a href="/c">{company}</a></div>'
+    '{description}</main><footer class="footer"><a href="/about">О сервисе</a></footer></body></html>'
+)
+
+
+def _register_html_backends():
+    for backend in html_backend.BACKENDS:
+        if not html_backend.is_available(backend):
+            continue
+
+        def run(chunk, state, backend=backend):
+            for vacancy in chunk:
+                page = PAGE_SHELL.format(title=vacancy['title'], company=vacancy['company'],
+                                         description=vacancy['description_html'])
+                html_backend.make_soup(page.encode('utf-8'), backend=backend)
+
+        name = f"html_parse.{backend}"
+        BENCHMARKS[name] = Benchmark(name, 'micro', run, description=f"Дерево страницы вакансии бэкендом {backend}")
+
+
+_register_html_backends()
+
+DETAIL_SELECTORS = ['div[data-qa="vacancy-description"]', '.vacancy-description', '.g-user-content']
+DETAIL_RECOMMENDATIONS = '<aside class="recommendations">' + ''.join(
+    f'<div class="vacancy-card"><a href="/vacancy/{i}">Дизайнер {i}</a><p>{"Текст карточки. " * 8}</p></div>'
+    for i in range(30)
+) + '</aside>'
+
+
+def _detail_pages(chunk):
+    for vacancy in chunk:
+        page = PAGE_SHELL.format(title=vacancy['title'], company=vacancy['company'],
+                                 description=vacancy['description_html'] + DETAIL_RECOMMENDATIONS)
+        yield page.encode('utf-8')
+
+
+def _description_block(soup):
+    return next((found for found in map(soup.select_one, DETAIL_SELECTORS) if found is not None), None)
+
+
+@benchmark('detail_parse.full')
+def _bench_detail_full(chunk, state):
+    """Блок описания страницы вакансии: дерево всей страницы"""
+    for page in _detail_pages(chunk):
+        soup = html_backend.make_soup(page)
+        _description_block(soup)
+
+
+@benchmark('detail_parse.subtree')
+def _bench_detail_subtree(chunk, state):
+    """Блок описания страницы вакансии: дерево только целевых поддеревьев"""
+    for page in _detail_pages(chunk):
+        soup = subtree_parser.parse_subtrees(page, DETAIL_SELECTORS, 'benchmark') or html_backend.make_soup(page)
+        _description_block(soup)
+
+
+@benchmark('text_cleaner')
+def _bench_clean(chunk, state):
+    """text_cleaner.clean_vacancy_data"""
+    for vacancy in chunk:
+        clean_vacancy_data(vacancy)
+
+
+@benchmark('text_normalizer')
+def _bench_normalize(chunk, state):
+    """text_normalizer.normalize_vacancy_text (включает clean_vacancy_data)"""
+    for vacancy in chunk:
+        normalize_vacancy_text(vacancy)
+
+
+@benchmark('vacancy_filter')
+def _bench_filter(chunk, state):
+    """VacancyFilter.is_vacancy_relevant"""
+    for vacancy in chunk:
+        vacancy_filter.is_vacancy_relevant(vacancy)
+
+
+def _unified_db(tmpdir: Path):
+    import simple_unified_parser
+    import unified_parser
+    path = str(tmpdir / 'unified.db')
+    # Полная схема приложения (колонки ai_*, salary_*, модерация), в которую пишет unified_parser
+    simple_unified_parser.VacancyDatabase(path)
+    return unified_parser.VacancyDatabase(path)
+
+
+@benchmark('save_vacancy.unified', setup=_unified_db)
+def _bench_save_unified(chunk, db):
+    """unified_parser.VacancyDatabase.save_vacancy (очистка, нормализация, фильтр, INSERT)"""
+    for vacancy in chunk:
+        db.save_vacancy(vacancy)
+
+
+def _simple_db(tmpdir: Path):
+    import simple_unified_parser
+    return simple_unified_parser.VacancyDatabase(str(tmpdir / 'simple.db'))
+
+
+@benchmark('save_vacancy.simple', setup=_simple_db)
+def _bench_save_simple(chunk, db):
+    """simple_unified_parser.VacancyDatabase.save_vacancy"""
+    for vacancy in chunk:
+        db.save_vacancy(vacancy)
+
+
+def _geekjob_db(tmpdir: Path):
+    import geekjob_simple
+    return geekjob_simple.VacancyDatabase(str(tmpdir / 'geekjob.db'))
+
+
+@benchmark('save_vacancy.geekjob', setup=_geekjob_db)
+def _bench_save_geekjob(chunk, db):
+    """geekjob_simple.VacancyDatabase.save_vacancy"""
+    for vacancy in chunk:
+        db.save_vacancy(vacancy)
+
+
+def _export_chunk(exporter_factory, method: str, suffix: str):
+    def setup(tmpdir: Path):
+        return exporter_factory(str(tmpdir / 'export_source.db')), str(tmpdir / f"export{suffix}")
+
+    def run(chunk, state):
+        exporter, output = state
+        with redirect_stdout(io.StringIO()):
+            getattr(exporter, method)(chunk, output)
+    return setup, run
+
+
+def _register_exporters():
+    from html_export import HTMLExporter
+    from simple_text_exporter import SimpleTextExporter
+    from ultra_clean_text_exporter import UltraCleanTextExporter
+
+    for name, factory, method, suffix in (
+        ('export.html', HTMLExporter, 'create_html_file', '.html'),
+        ('export.text', SimpleTextExporter, 'create_text_file', '.txt'),
+        ('export.ultra_clean_text', UltraCleanTextExporter, 'create_ultra_clean_text_file', '.txt'),
+    ):
+        setup, run = _export_chunk(factory, method, suffix)
+        BENCHMARKS[name] = Benchmark(name, 'micro', run, setup, None,
+                                     f"{factory.__name__}.{method} (пачками по {CHUNK_SIZE})")
+
+
+_register_exporters()
+
+
+def _json_export_setup(tmpdir: Path):
+    return _unified_db(tmpdir), str(tmpdir / 'export.json')
+
+
+def _json_export_prepare(chunk, state):
+    import unified_parser
+    db, _ = state
+    # Экспорт читает БД целиком: наполнение идет без замера, замеряется только export_to_json
+    with unified_parser.sqlite3.connect(db.db_path) as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO vacancies (external_id, source, url, title, company, location, "
+            "description, full_description, published_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(v['external_id'], v['source'], v['url'], v['title'], v['company'], v['location'],
+              v['description'], v['full_description'], v['published_at']) for v in chunk]
+        )
+
+
+def _json_export_finish(state):
+    import unified_parser
+    db, output = state
+    exporter = unified_parser.UnifiedParser.__new__(unified_parser.UnifiedParser)
+    exporter.db = db
+    exporter.export_to_json(output)
+
+
+BENCHMARKS['export.json'] = Benchmark(
+    'export.json', 'micro', lambda chunk, state: None, _json_export_setup, _json_export_finish,
+    'UnifiedParser.export_to_json по БД со всем корпусом', prepare=_json_export_prepare,
+)
+
+
+def _pipeline_setup(tmpdir: Path):
+    import unified_parser
+    # Сетевые парсеры для сохранения и экспорта не нужны
+    parser = unified_parser.UnifiedParser.__new__(unified_parser.UnifiedParser)
+    parser.db = _unified_db(tmpdir)
+    parser.delay = 0
+    parser.parsers = {}
+    parser._pending_watermarks = {}
+    parser._failed_details = set()
+    return parser, str(tmpdir / 'pipeline.json')
+
+
+def _pipeline_run(chunk, state):
+    parser, _ = state
+    by_source: Dict[str, List[Dict[str, Any]]] = {}
+    for vacancy in chunk:
+        soup = BeautifulSoup(vacancy['description_html'], 'html.parser')
+        vacancy['full_description'] = clean_text(extract_formatted_text(soup))
+        by_source.setdefault(vacancy['source'], []).append(vacancy)
+    parser.save_all_vacancies(by_source)
+
+
+def _pipeline_finish(state):
+    parser, output = state
+    parser.export_to_json(output)
+
+
+BENCHMARKS['pipeline'] = Benchmark(
+    'pipeline', 'macro', _pipeline_run, _pipeline_setup, _pipeline_finish,
+    'HTML -> extract_formatted_text -> save_all_vacancies -> export_to_json',
+)
+
+
+# ---------------------------------------------------------------------------
+# Запуск и сравнение
+# ---------------------------------------------------------------------------
+
+@dataclass
+class BenchResult:
+    name: str
+    group: str
+    items: int
+    seconds: float
+    items_per_sec: float
+    us_per_item: float
+    repeats: int
+
+
+def run_benchmark(bench: Benchmark, corpus: SyntheticCorpus, repeat: int = 1) -> BenchResult:
+    """Лучшее время из repeat прогонов; генерация пачек в замер не входит"""
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix='bench_') as tmp:
+            state = bench.setup(Path(tmp)) if bench.setup else None
+            elapsed = 0.0
+            for chunk in corpus.chunks():
+                if bench.prepare:
+                    bench.prepare(chunk, state)
+                started = time.perf_counter()
+                bench.run(chunk, state)
+                elapsed += time.perf_counter() - started
+            if bench.finish:
+                started = time.perf_counter()
+                bench.finish(state)
+                elapsed += time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    return BenchResult(
+        name=bench.name,
+        group=bench.group,
+        items=corpus.size,
+        seconds=round(best, 4),
+        items_per_sec=round(corpus.size / best, 1) if best else 0.0,
+        us_per_item=round(best / corpus.size * 1e6, 2) if corpus.size else 0.0,
+        repeats=repeat,
+    )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(size: int, stages: Optional[List[str]] = None, repeat: int = 1, seed: int = 42) -> Dict[str, Any]:
+    names = stages or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Неизвестные бенчмарки: {', '.join(unknown)}")
+
+    corpus = SyntheticCorpus(size, seed=seed)
+    results = {}
+    for name in names:
+        logger.warning(f"⏱️ {name}: {size} вакансий...")
+        result = run_benchmark(BENCHMARKS[name], corpus, repeat)
+        results[name] = asdict(result)
+        logger.warning(f"   {result.seconds:.2f}с, {result.us_per_item:.1f} мкс/вакансия, "
+                       f"{result.items_per_sec:.0f} вакансий/с")
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'size': size,
+            'seed': seed,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'commit': _git_commit(),
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Сравнение по мкс/вакансия; regression=True, если рост больше threshold"""
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base or not base.get('us_per_item'):
+            rows.append({'name': name, 'baseline': None, 'current': result['us_per_item'],
+                         'change': None, 'regression': False})
+            continue
+        change = result['us_per_item'] / base['us_per_item'] - 1
+        rows.append({'name': name, 'baseline': base['us_per_item'], 'current': result['us_per_item'],
+                     'change': round(change, 4), 'regression': change > threshold})
+    return rows
+
+
+def print_report(report: Dict[str, Any], comparison: Optional[List[Dict[str, Any]]] = None):
+    print(f"\nБенчмарки: {report['meta']['size']} вакансий, Python {report['meta']['python']}, "
+          f"commit {report['meta']['commit'] or '-'}")
+    print(f"{'стадия':<28}{'сек':>10}{'мкс/вак':>12}{'вак/с':>12}")
+    for result in report['results'].values():
+        print(f"{result['name']:<28}{result['seconds']:>10.2f}{result['us_per_item']:>12.1f}"
+              f"{result['items_per_sec']:>12.0f}")
+
+    if comparison:
+        print(f"\n{'стадия':<28}{'база':>12}{'сейчас':>12}{'изм.':>10}")
+        for row in comparison:
+            if row['baseline'] is None:
+                print(f"{row['name']:<28}{'-':>12}{row['current']:>12.1f}{'новая':>10}")
+                continue
+            mark = '  ❌' if row['regression'] else ''
+            print(f"{row['name']:<28}{row['baseline']:>12.1f}{row['current']:>12.1f}"
+                  f"{row['change'] * 100:>9.1f}%{mark}")
+
+
+def parse_scale(value: str) -> int:
+    return SCALES.get(value) or int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарки конвейера обработки вакансий')
+    parser.add_argument('--scale', default='10k', help='Размер корпуса: 10k, 100k, 1M или число')
+    parser.add_argument('--stages', nargs='+', help='Только указанные стадии (см. --list)')
+    parser.add_argument('--group', choices=sorted({b.group for b in BENCHMARKS.values()}),
+                        help='Только стадии группы (micro, macro, formatters)')
+    parser.add_argument('--repeat', type=int, default=1, help='Повторов на стадию (берется лучшее время)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed синтетического корпуса')
+    parser.add_argument('--output', help='Файл результатов (по умолчанию data/benchmarks/bench_<size>_<время>.json)')
+    parser.add_argument('--baseline', help='Базовый прогон для сравнения')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Сохранить результат как базу data/benchmarks/baseline_<scale>.json')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Допустимый рост мкс/вакансия относительно базы (0.15 = 15%%)')
+    parser.add_argument('--list', action='store_true', help='Список бенчмарков')
+    args = parser.parse_args()
+
+    if args.list:
+        for bench in BENCHMARKS.values():
+            print(f"{bench.name:<28}{bench.group:<7}{bench.description}")
+        return 0
+
+    # Стадии пишут INFO на каждую вакансию - в замер это не должно попадать
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+
+    size = parse_scale(args.scale)
+    stages = args.stages or ([b.name for b in BENCHMARKS.values() if b.group == args.group] if args.group else None)
+    report = run_suite(size, stages, args.repeat, args.seed)
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            comparison = compare(report, json.load(f), args.threshold)
+        report['comparison'] = {'baseline': args.baseline, 'threshold': args.threshold, 'rows': comparison}
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    output = args.output or RESULTS_DIR / f"bench_{size}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    paths = [Path(output)]
+    if args.save_baseline:
+        paths.append(RESULTS_DIR / f"baseline_{args.scale}.json")
+    for path in paths:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_report(report, comparison)
+    print(f"\nРезультаты: {', '.join(map(str, paths))}")
+
+    if comparison and any(row['regression'] for row in comparison):
+        print(f"Регрессия больше {args.threshold * 100:.0f}% относительно {args.baseline}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,11 +3,34 @@
 Утилиты для получения HTML через Playwright (headless Chromium) с антидетектом и ретраями.
 
 Основная функция: get_html(url, timeout_ms=20000, wait_selector=None, max_retries=3)
+Без сериализации DOM: get_structured(url, spec) - поля карточек одним evaluate в браузере.
+
+Браузеры держатся в долгоживущем пуле (BrowserPool): процесс Chromium и контекст
+создаются один раз и переиспользуются, поэтому повторный фолбэк стоит только навигации.
+Sync API Playwright привязан к потоку, поэтому пул у каждого потока свой (get_pool())
+и закрывается в этом же потоке, когда тот завершается.
 """
 
+import atexit
+import logging
 import random
+import threading
 import time
-from typing import Optional
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any, Callable
+try:
+    from resource_policy import ResourceBlocker, get_policy, source_for_url
+    from page_readiness import Readiness, get_readiness, wait_ready_sync
+    from page_extraction import ExtractionSpec, extract_sync, get_spec as get_extraction_spec
+    from rate_controller import rate_controller, parse_retry_after
+except ImportError:
+    import os
+    import sys
+    sys.path.append(os.path.dirname(__file__))
+    from resource_policy import ResourceBlocker, get_policy, source_for_url
+    from page_readiness import Readiness, get_readiness, wait_ready_sync
+    from page_extraction import ExtractionSpec, extract_sync, get_spec as get_extraction_spec
+    from rate_controller import rate_controller, parse_retry_after
 
 USER_AGENTS = [
     # Несколько актуальных UA строк
@@ -27,17 +50,19 @@ LOCALES = ['ru-RU', 'ru', 'ru-RU,en-US;q=0.9']
 TIMEZONES = ['Europe/Moscow', 'Europe/Samara', 'Europe/Kaliningrad']
 
 
-def _create_context(p, proxy: Optional[dict] = None):
+def _launch_browser(p):
+    return p.chromium.launch(headless=True, args=[
+        '--disable-blink-features=AutomationControlled',
+        '--no-sandbox',
+    ])
+
+
+def _new_context(browser, proxy: Optional[dict] = None):
     ua = random.choice(USER_AGENTS)
     vp = random.choice(VIEWPORTS)
     locale = random.choice(LOCALES)
     tz = random.choice(TIMEZONES)
 
-    browser = p.chromium.launch(headless=True, args=[
-        '--disable-blink-features=AutomationControlled',
-        '--no-sandbox',
-    ])
-
     context_kwargs = dict(
         locale=locale,
         user_agent=ua,
@@ -64,53 +89,348 @@ def _create_context(p, proxy: Optional[dict] = None):
         }
         """
     )
+    return context
+
 
+def _create_context(p, proxy: Optional[dict] = None):
+    browser = _launch_browser(p)
+    context = _new_context(browser, proxy)
     page = context.new_page()
     return browser, context, page
 
 
-def get_html(url: str, timeout_ms: int = 20000, wait_selector: Optional[str] = None, max_retries: int = 3) -> Optional[str]:
+class _BrowserSlot:
+    """Один браузерный процесс пула с текущим контекстом и страницей"""
+
+    def __init__(self, browser, context, page):
+        self.browser = browser
+        self.context = context
+        self.page = page
+        self.pages_served = 0
+        self.contexts_created = 1
+
+
+class BrowserPool:
+    """
+    Пул долгоживущих браузеров Chromium для sync API Playwright.
+
+    - браузеры запускаются лениво, не больше size штук;
+    - контекст пересоздается после max_pages_per_context навигаций (свежий отпечаток);
+    - перед выдачей страница проходит health check, сломанные слоты пересоздаются.
+
+    Объекты Playwright sync API нельзя передавать между потоками,
+    поэтому пул должен использоваться только из потока, который его создал.
+    """
+
+    def __init__(self, size: int = 2, max_pages_per_context: int = 50,
+                 proxy: Optional[dict] = None):
+        self.size = max(1, size)
+        self.max_pages_per_context = max(1, max_pages_per_context)
+        self.proxy = proxy
+        self.owner_thread = threading.get_ident()
+        self._playwright = None
+        self._idle: List[_BrowserSlot] = []
+        self._busy: Dict[int, _BrowserSlot] = {}
+        self.stats = {
+            'browsers_launched': 0,
+            'contexts_recycled': 0,
+            'pages_served': 0,
+            'health_check_failures': 0,
+        }
+
+    def _ensure_playwright(self):
+        if self._playwright is None:
+            from playwright.sync_api import sync_playwright
+            self._playwright = sync_playwright().start()
+        return self._playwright
+
+    def _launch_slot(self) -> _BrowserSlot:
+        p = self._ensure_playwright()
+        browser = _launch_browser(p)
+        context = _new_context(browser, self.proxy)
+        page = context.new_page()
+        self.stats['browsers_launched'] += 1
+        logging.debug(f"BrowserPool: запущен браузер #{self.stats['browsers_launched']}")
+        return _BrowserSlot(browser, context, page)
+
+    def _recycle_context(self, slot: _BrowserSlot):
+        """Закрывает текущий контекст слота и открывает новый в том же браузере"""
+        try:
+            slot.context.close()
+        except Exception:
+            pass
+        slot.context = _new_context(slot.browser, self.proxy)
+        slot.page = slot.context.new_page()
+        slot.pages_served = 0
+        slot.contexts_created += 1
+        self.stats['contexts_recycled'] += 1
+
+    def _is_healthy(self, slot: _BrowserSlot) -> bool:
+        try:
+            if not slot.browser.is_connected() or slot.page.is_closed():
+                return False
+            return slot.page.evaluate('1') == 1
+        except Exception:
+            return False
+
+    def _discard(self, slot: _BrowserSlot):
+        try:
+            slot.context.close()
+        except Exception:
+            pass
+        try:
+            slot.browser.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """Выдает страницу из пула (запускает браузер, если свободных нет)"""
+        if threading.get_ident() != self.owner_thread:
+            raise RuntimeError('BrowserPool используется не из потока-владельца')
+
+        slot = None
+        while self._idle:
+            candidate = self._idle.pop()
+            if self._is_healthy(candidate):
+                slot = candidate
+                break
+            self.stats['health_check_failures'] += 1
+            logging.debug('BrowserPool: слот не прошел health check, пересоздаем')
+            self._discard(candidate)
+
+        if slot is None:
+            if len(self._busy) >= self.size:
+                raise RuntimeError(f'BrowserPool исчерпан ({self.size} браузеров заняты)')
+            slot = self._launch_slot()
+        elif slot.pages_served >= self.max_pages_per_context:
+            self._recycle_context(slot)
+
+        slot.pages_served += 1
+        self.stats['pages_served'] += 1
+        self._busy[id(slot.page)] = slot
+        return slot.page
+
+    def release(self, page, broken: bool = False):
+        """Возвращает страницу в пул; broken=True закрывает браузер целиком"""
+        slot = self._busy.pop(id(page), None)
+        if slot is None:
+            return
+        if broken:
+            self._discard(slot)
+            return
+        try:
+            # Сбрасываем состояние страницы, чтобы следующий заемщик начинал с чистого листа
+            page.goto('about:blank')
+        except Exception:
+            self._discard(slot)
+            return
+        self._idle.append(slot)
+
+    @contextmanager
+    def borrow(self):
+        """Контекстный менеджер: with pool.borrow() as page: ...
+
+        Ошибка навигации не считается поломкой браузера: release() сам
+        выбросит слот, если страницу не удается сбросить на about:blank.
+        """
+        page = self.acquire()
+        try:
+            yield page
+        finally:
+            self.release(page)
+
+    def close(self):
+        """Закрывает все браузеры пула и останавливает Playwright"""
+        for slot in self._idle + list(self._busy.values()):
+            self._discard(slot)
+        self._idle = []
+        self._busy = {}
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'idle': len(self._idle),
+            'busy': len(self._busy),
+        }
+
+
+_local = threading.local()
+_pools: List[BrowserPool] = []
+_pools_lock = threading.Lock()
+
+
+class _ThreadPoolHandle:
+    """
+    Держатель пула в threading.local потока-владельца
+
+    Когда поток завершается (например, воркер ThreadPoolExecutor после
+    shutdown), CPython очищает его threading.local в этом же потоке, и
+    __del__ закрывает пул там, где Playwright разрешает его трогать.
+    """
+
+    def __init__(self, pool: BrowserPool):
+        self.pool = pool
+
+    def __del__(self):
+        if self.pool.owner_thread == threading.get_ident() and self.pool in _pools:
+            _close_pool(self.pool)
+
+
+def _close_pool(pool: BrowserPool):
+    try:
+        pool.close()
+    except Exception as e:
+        logging.debug(f"BrowserPool: ошибка при закрытии пула: {e}")
+    with _pools_lock:
+        if pool in _pools:
+            _pools.remove(pool)
+
+
+def get_pool(size: int = 2, max_pages_per_context: int = 50) -> BrowserPool:
+    """Пул браузеров текущего потока (создается при первом обращении, закрывается с потоком)"""
+    handle = getattr(_local, 'handle', None)
+    if handle is None:
+        pool = BrowserPool(size=size, max_pages_per_context=max_pages_per_context)
+        handle = _ThreadPoolHandle(pool)
+        _local.handle = handle
+        with _pools_lock:
+            _pools.append(pool)
+    return handle.pool
+
+
+def close_pools():
+    """
+    Закрывает пул текущего потока
+
+    Пулы других потоков закрываются при завершении своих потоков; если к
+    выходу интерпретатора какой-то поток еще жив, об этом пишется в лог.
+    """
+    handle = getattr(_local, 'handle', None)
+    if handle is not None:
+        _local.handle = None
+        _close_pool(handle.pool)
+    with _pools_lock:
+        alive = [pool for pool in _pools if pool.owner_thread != threading.get_ident()]
+    if alive:
+        logging.warning(f"BrowserPool: {len(alive)} пул(ов) других потоков еще не закрыты")
+
+
+atexit.register(close_pools)
+
+
+@contextmanager
+def _blocking(page, blocker: ResourceBlocker):
+    """Вешает перехват запросов на страницу пула и снимает его после навигации"""
+    page.route('**/*', blocker.handle_route_sync)
+    page.on('response', blocker.on_response)
+    try:
+        yield
+    finally:
+        try:
+            page.unroute('**/*', blocker.handle_route_sync)
+            page.remove_listener('response', blocker.on_response)
+        except Exception:
+            pass
+
+
+def _fetch(url: str, extract: Callable[[Any], Any], accept: Callable[[Any], bool],
+           timeout_ms: int, max_retries: int, source: Optional[str],
+           readiness: Optional[Readiness]):
+    """Навигация на странице из пула с ретраями; extract(page) получает результат"""
     try:
-        from playwright.sync_api import sync_playwright
+        import playwright.sync_api  # noqa: F401
     except Exception:
         return None
 
+    # Картинки, шрифты, медиа и трекеры не нужны для извлечения вакансий
+    blocker = ResourceBlocker(get_policy(source, url))
+
     attempt = 0
     last_error = None
     while attempt < max_retries:
         attempt += 1
         try:
-            with sync_playwright() as p:
-                browser, context, page = _create_context(p)
+            with get_pool().borrow() as page, _blocking(page, blocker):
                 page.set_default_timeout(timeout_ms)
-                # случайная человеческая задержка перед навигацией
-                time.sleep(random.uniform(0.2, 1.0))
-                page.goto(url, wait_until='domcontentloaded')
+                # темп навигаций к хосту задает общий контроллер частоты
+                rate_controller.acquire(url)
+                blocker.start(url)
+                response = page.goto(url, wait_until='domcontentloaded')
+                if response is not None:
+                    rate_controller.record(url, response.status,
+                                           parse_retry_after(response.headers.get('retry-after')))
                 # имитация небольшого скролла
                 try:
                     page.mouse.wheel(0, random.randint(100, 600))
                 except Exception:
                     pass
-                # ждем сеть
-                try:
-                    page.wait_for_load_state('networkidle', timeout=timeout_ms)
-                except Exception:
-                    pass
-                if wait_selector:
+                # ждем готовности содержимого (возвращается сразу, как условие выполнено)
+                if readiness:
+                    wait_ready_sync(page, readiness, timeout_ms)
+                else:
                     try:
-                        page.wait_for_selector(wait_selector, timeout=timeout_ms)
+                        page.wait_for_load_state('load', timeout=timeout_ms)
                     except Exception:
                         pass
-                html = page.content()
-                context.close()
-                browser.close()
-                if html and len(html) > 5000:
-                    return html
+                result = extract(page)
+                blocker.finish()
+            if accept(result):
+                return result
         except Exception as e:
             last_error = e
-        # джиттер между попытками
+            logging.debug(f"browser_fetch: попытка {attempt} для {url} не удалась: {e}")
+        # джиттер между попытками (пауза после 429/503 - на стороне контроллера)
         time.sleep(random.uniform(0.8, 2.0))
 
     return None
 
 
+def get_html(url: str, timeout_ms: int = 20000, wait_selector: Optional[str] = None, max_retries: int = 3,
+             source: Optional[str] = None, readiness: Optional[Readiness] = None) -> Optional[str]:
+    # Ждем содержимое, а не тишину в сети: явное условие, селектор вызывающего
+    # или определение готовности выдачи для источника
+    if readiness is None:
+        readiness = Readiness(wait_selector) if wait_selector else get_readiness(source, 'list', url)
+
+    return _fetch(
+        url,
+        extract=lambda page: page.content(),
+        accept=lambda html: bool(html) and len(html) > 5000,
+        timeout_ms=timeout_ms,
+        max_retries=max_retries,
+        source=source,
+        readiness=readiness,
+    )
+
+
+def get_structured(url: str, spec: Optional[ExtractionSpec] = None, kind: str = 'list',
+                   timeout_ms: int = 20000, max_retries: int = 3,
+                   source: Optional[str] = None,
+                   readiness: Optional[Readiness] = None) -> Optional[List[Dict[str, Optional[str]]]]:
+    """
+    Как get_html, но вместо сериализации DOM выполняет спецификацию извлечения
+    источника одним evaluate и возвращает список карточек (kind='list')
+    или список из одного словаря полей (kind='detail').
+    """
+    if spec is None:
+        spec = get_extraction_spec(source or source_for_url(url), kind)
+    if spec is None:
+        return None
+    if readiness is None:
+        readiness = get_readiness(source, kind, url)
+
+    return _fetch(
+        url,
+        extract=lambda page: extract_sync(page, spec),
+        accept=lambda rows: bool(rows) and any(any(v for v in row.values()) for row in rows),
+        timeout_ms=timeout_ms,
+        max_retries=max_retries,
+        source=source,
+        readiness=readiness,
+    )
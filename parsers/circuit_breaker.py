@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker по источникам
+
+Если источник лежит или стабильно отказывает, парсер не должен проходить
+все страницы с полной цепочкой ретраев и фолбэков. Состояние источника
+вычисляется из уже собираемых метрик:
+- MonitoringSystem: source_health.consecutive_failures и last_failure
+- BlockingMonitor: get_blocking_rate и время последней блокировки
+
+Пустая выдача сама по себе не отказ (узкий запрос может ничего не найти):
+неудачей считаются исключения и блокировки, отмеченные BlockingMonitor
+во время прогона.
+
+closed    - источник работает, парсим как обычно
+open      - источник недоступен, пропускаем сразу
+half_open - прошло open_timeout с последней неудачи, пропускаем один пробный запрос
+
+Состояние хранится в тех же БД/файлах, поэтому переживает перезапуски.
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+try:
+    from monitoring_system import monitoring_system
+    from blocking_monitor import blocking_monitor
+    from crawl_watermarks import probe_run
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(__file__))
+    from monitoring_system import monitoring_system
+    from blocking_monitor import blocking_monitor
+    from crawl_watermarks import probe_run
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class SourceCircuitBreaker:
+    """
+    Circuit breaker для источников вакансий.
+
+    Источник считается отказывающим, если подряд набралось failure_threshold
+    неудач или процент блокировок выше blocking_rate_threshold и последняя
+    блокировка новее последнего успеха. Пока с последней неудачи не прошло
+    open_timeout, источник открыт; затем один поток получает право на
+    пробный запрос (half_open), остальные продолжают пропускать источник.
+    """
+
+    def __init__(self, monitor=None, blocking=None, failure_threshold: int = 3,
+                 blocking_rate_threshold: float = 50.0,
+                 open_timeout: timedelta = timedelta(minutes=30)):
+        self.monitor = monitor if monitor is not None else monitoring_system
+        self.blocking = blocking if blocking is not None else blocking_monitor
+        self.failure_threshold = failure_threshold
+        self.blocking_rate_threshold = blocking_rate_threshold
+        self.open_timeout = open_timeout
+        self._probes: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _last_failure(self, source: str) -> Optional[datetime]:
+        """Время последней неудачи, если источник сейчас считается отказывающим"""
+        failures = []
+
+        health = self.monitor.get_source_health(source) if self.monitor else None
+        if health and health['consecutive_failures'] >= self.failure_threshold:
+            failures.append(_parse_ts(health['last_failure']))
+
+        stat = self.blocking.stats.get(source) if self.blocking else None
+        if stat and self.blocking.get_blocking_rate(source) > self.blocking_rate_threshold:
+            last_block = _parse_ts(stat.last_failure)
+            last_success = _parse_ts(stat.last_success)
+            if last_block and (last_success is None or last_block > last_success):
+                failures.append(last_block)
+
+        failures = [f for f in failures if f is not None]
+        return max(failures) if failures else None
+
+    def state(self, source: str) -> CircuitState:
+        """Текущее состояние источника (без захвата пробного запроса)"""
+        last_failure = self._last_failure(source)
+        if last_failure is None:
+            return CircuitState.CLOSED
+        if datetime.now() - last_failure < self.open_timeout:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN
+
+    def allow(self, source: str) -> CircuitState:
+        """
+        Решение перед запуском источника.
+
+        HALF_OPEN возвращается только одному вызывающему - он выполняет пробный
+        запрос и обязан сообщить результат через record_success/record_failure.
+        """
+        state = self.state(source)
+        if state != CircuitState.HALF_OPEN:
+            return state
+
+        with self._lock:
+            if source in self._probes:
+                return CircuitState.OPEN
+            self._probes.add(source)
+        logger.info(f"🔌 {source}: half-open, пробный запрос")
+        return CircuitState.HALF_OPEN
+
+    def _release(self, source: str):
+        with self._lock:
+            self._probes.discard(source)
+
+    def record_success(self, source: str, items_found: int = 0, response_time: float = 0,
+                       update_monitor: bool = True):
+        """Успешный запуск источника закрывает цепь"""
+        if update_monitor and self.monitor:
+            self.monitor.record_request(source=source, success=True, response_time=response_time,
+                                        items_found=items_found)
+        if self.blocking:
+            self.blocking.log_success(source, response_time)
+            self.blocking.save_history()
+        self._release(source)
+
+    def record_failure(self, source: str, error_message: str = '', update_monitor: bool = True):
+        """Неудачный запуск источника (при достижении порога цепь откроется)"""
+        if update_monitor and self.monitor:
+            self.monitor.record_request(source=source, success=False, error_message=error_message)
+        self._release(source)
+        if self.state(source) == CircuitState.OPEN:
+            logger.warning(f"🔌 {source}: цепь открыта на {self.open_timeout}, источник будет пропускаться")
+
+    def record_empty(self, source: str):
+        """Пустой результат без признаков блокировки: ни успех, ни неудача"""
+        self._release(source)
+
+    def blocked_since(self, source: str, started: datetime) -> bool:
+        """Отметил ли BlockingMonitor блокировку источника после started"""
+        if not self.blocking:
+            return False
+        for event in self.blocking.events:
+            timestamp = _parse_ts(event.timestamp) if event.source == source else None
+            if timestamp is not None and timestamp >= started:
+                return True
+        return False
+
+    def get_status(self, sources: List[str]) -> Dict[str, str]:
+        return {source: self.state(source).value for source in sources}
+
+
+# Общий экземпляр для всех раннеров
+circuit_breaker = SourceCircuitBreaker()
+
+
+def _finish(breaker: SourceCircuitBreaker, source: str, vacancies: List[Dict[str, Any]],
+            started: datetime, update_monitor: bool) -> List[Dict[str, Any]]:
+    elapsed = (datetime.now() - started).total_seconds()
+    # Инкрементальный проход без новых вакансий - источник ответил, это не отказ
+    if vacancies or getattr(vacancies, 'up_to_date', False):
+        breaker.record_success(source, len(vacancies), elapsed, update_monitor=update_monitor)
+    elif breaker.blocked_since(source, started):
+        breaker.record_failure(source, 'blocked, no vacancies returned', update_monitor=update_monitor)
+    else:
+        # Пустая выдача по запросу - не повод открывать цепь для всего источника
+        logger.info(f"🔌 {source}: пустой результат без признаков блокировки")
+        breaker.record_empty(source)
+    return vacancies
+
+
+def _probe_failed(breaker: SourceCircuitBreaker, source: str, probe: List[Dict[str, Any]],
+                  started: datetime, update_monitor: bool) -> bool:
+    """Проба не прошла; пустая первая страница значит, что полный прогон тоже пуст"""
+    if probe or getattr(probe, 'up_to_date', False):
+        logger.info(f"🔌 {source}: пробный запрос успешен, запускаем полный парсинг")
+        return False
+    if breaker.blocked_since(source, started):
+        breaker.record_failure(source, 'half-open probe blocked', update_monitor=update_monitor)
+    else:
+        logger.info(f"🔌 {source}: пробный запрос без вакансий и без признаков блокировки")
+        breaker.record_empty(source)
+    return True
+
+
+async def guarded_parse(source: str, run: Callable[[int, bool], Awaitable[List[Dict[str, Any]]]],
+                        pages: int, extract_details: bool,
+                        breaker: Optional[SourceCircuitBreaker] = None,
+                        update_monitor: bool = True) -> List[Dict[str, Any]]:
+    """
+    Запуск парсинга источника через circuit breaker.
+
+    run(pages, extract_details) выполняет парсинг. Открытый источник
+    пропускается сразу; в half-open сначала выполняется одна страница без
+    деталей, и только при успехе - полный прогон. Проба идет без
+    инкрементального режима (probe_run): ее водяные знаки не сохраняются,
+    и полный прогон не пропускает найденные ею вакансии. Парсеры возвращают
+    [] и при блокировке, и при пустой выдаче: пустой результат считается
+    неудачей, только если BlockingMonitor отметил блокировку за время прогона.
+    update_monitor=False - если run сам пишет метрики в MonitoringSystem.
+    """
+    breaker = breaker or circuit_breaker
+    state = breaker.allow(source)
+
+    if state == CircuitState.OPEN:
+        logger.warning(f"🔌 {source}: источник недоступен (circuit open), пропускаем")
+        return []
+
+    started = datetime.now()
+    try:
+        # Прогон из одной страницы без деталей сам и есть проба
+        if state == CircuitState.HALF_OPEN and (pages > 1 or extract_details):
+            with probe_run():
+                probe = await run(1, False)
+            if _probe_failed(breaker, source, probe, started, update_monitor):
+                return []
+        vacancies = await run(pages, extract_details)
+    except Exception as e:
+        breaker.record_failure(source, str(e), update_monitor=update_monitor)
+        raise
+
+    return _finish(breaker, source, vacancies, started, update_monitor)
+
+
+def guarded_parse_sync(source: str, run: Callable[[int, bool], List[Dict[str, Any]]],
+                       pages: int, extract_details: bool,
+                       breaker: Optional[SourceCircuitBreaker] = None,
+                       update_monitor: bool = True) -> List[Dict[str, Any]]:
+    """Синхронный вариант guarded_parse для раннеров на потоках"""
+    breaker = breaker or circuit_breaker
+    state = breaker.allow(source)
+
+    if state == CircuitState.OPEN:
+        logger.warning(f"🔌 {source}: источник недоступен (circuit open), пропускаем")
+        return []
+
+    started = datetime.now()
+    try:
+        # Прогон из одной страницы без деталей сам и есть проба
+        if state == CircuitState.HALF_OPEN and (pages > 1 or extract_details):
+            with probe_run():
+                probe = run(1, False)
+            if _probe_failed(breaker, source, probe, started, update_monitor):
+                return []
+        vacancies = run(pages, extract_details)
+    except Exception as e:
+        breaker.record_failure(source, str(e), update_monitor=update_monitor)
+        raise
+
+    return _finish(breaker, source, vacancies, started, update_monitor)
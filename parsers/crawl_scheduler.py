@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Планировщик непрерывного обхода источников по свежести
+
+Вместо разовых запусков с фиксированными настройками демон держит для
+каждой пары (source, query) свой интервал опроса и подстраивает его под
+наблюдаемую скорость появления новых вакансий:
+- начальная оценка - из vacancies.created_at и parsing_metrics.items_found
+- после каждого прогона оценка обновляется (EWMA новых вакансий в час)
+- интервал = target_new / скорость, в пределах [min_interval, max_interval]
+
+Активные источники опрашиваются часто, тихие - редко. Прогоны идут через
+UnifiedParser.parse_source в инкрементальном режиме (только новые
+вакансии), а бюджет запросов в час на источник ограничивает частоту.
+
+Запуск:
+    python crawl_scheduler.py --queries дизайнер "ui/ux" --budget hh=200 habr=60
+    python crawl_scheduler.py --status
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import sys
+import time
+import asyncio
+import sqlite3
+import logging
+import argparse
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ScheduleEntry:
+    """Расписание пары (source, query)"""
+    source: str
+    query: str
+    interval: float
+    next_run: float
+    rate: float = 0.0
+    last_run: Optional[float] = None
+    last_new: int = 0
+    runs: int = 0
+
+
+class CrawlScheduler:
+    """
+    Адаптивный планировщик обхода.
+
+    rate - оценка новых вакансий в час для пары (source, query). Интервал
+    выбирается так, чтобы за прогон приходило около target_new вакансий.
+    Бюджет - запросов в час на источник; стоимость прогона оценивается как
+    pages + число новых вакансий (детали запрашиваются только для них).
+    """
+
+    def __init__(self, unified, queries: List[str], sources: Optional[List[str]] = None,
+                 pages: int = 3, extract_details: bool = True,
+                 budgets: Optional[Dict[str, int]] = None,
+                 state_path: str = "data/crawl_state.db",
+                 monitoring_path: str = "data/monitoring.db",
+                 target_new: float = 3.0, min_interval: float = 15 * 60,
+                 max_interval: float = 24 * 3600, alpha: float = 0.3):
+        self.unified = unified
+        self.queries = queries
+        self.sources = sources or list(unified.parsers.keys())
+        self.pages = pages
+        self.extract_details = extract_details
+        self.budgets = budgets or {}
+        self.state_path = state_path
+        self.monitoring_path = monitoring_path
+        self.target_new = target_new
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.alpha = alpha
+        self._spent: Dict[str, Deque[Tuple[float, int]]] = {}
+
+        Path(state_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+        self.entries = self._load_entries()
+
+    def _init_db(self):
+        with sqlite3.connect(self.state_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_schedule (
+                    source TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    interval REAL NOT NULL,
+                    next_run REAL NOT NULL,
+                    rate REAL DEFAULT 0,
+                    last_run REAL,
+                    last_new INTEGER DEFAULT 0,
+                    runs INTEGER DEFAULT 0,
+                    PRIMARY KEY (source, query)
+                )
+            """)
+
+    def _save_entry(self, entry: ScheduleEntry):
+        with sqlite3.connect(self.state_path) as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO crawl_schedule
+                    (source, query, interval, next_run, rate, last_run, last_new, runs)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (entry.source, entry.query, entry.interval, entry.next_run, entry.rate,
+                  entry.last_run, entry.last_new, entry.runs))
+
+    def _historical_rate(self, source: str) -> float:
+        """Новых вакансий в час за последнюю неделю: vacancies.created_at, иначе parsing_metrics"""
+        week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            with sqlite3.connect(self.unified.db.db_path) as conn:
+                created = conn.execute(
+                    "SELECT COUNT(*) FROM vacancies WHERE source = ? AND created_at > ?",
+                    (source, week_ago)
+                ).fetchone()[0]
+            if created:
+                return created / (7 * 24)
+        except sqlite3.Error as e:
+            logger.debug(f"vacancies недоступна для оценки {source}: {e}")
+
+        try:
+            with sqlite3.connect(self.monitoring_path) as conn:
+                found = conn.execute(
+                    "SELECT COALESCE(SUM(items_found), 0) FROM parsing_metrics WHERE source = ? AND timestamp > ?",
+                    (source, week_ago)
+                ).fetchone()[0]
+            return found / (7 * 24)
+        except sqlite3.Error as e:
+            logger.debug(f"parsing_metrics недоступна для оценки {source}: {e}")
+            return 0.0
+
+    def _interval_for(self, rate: float) -> float:
+        if rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target_new / rate * 3600))
+
+    def _load_entries(self) -> Dict[Tuple[str, str], ScheduleEntry]:
+        entries = {}
+        with sqlite3.connect(self.state_path) as conn:
+            for row in conn.execute("SELECT source, query, interval, next_run, rate, last_run, last_new, runs "
+                                    "FROM crawl_schedule"):
+                entries[(row[0], row[1])] = ScheduleEntry(*row)
+
+        now = time.time()
+        for source in self.sources:
+            source_rate = None
+            for query in self.queries:
+                key = (source, query)
+                if key in entries:
+                    continue
+                if source_rate is None:
+                    # Историю по запросам не ведем - делим скорость источника поровну
+                    source_rate = self._historical_rate(source) / len(self.queries)
+                # Новая пара запускается сразу: интервал уточнится после первых прогонов
+                entries[key] = ScheduleEntry(source, query, self._interval_for(source_rate), now, source_rate)
+                self._save_entry(entries[key])
+
+        return {key: entry for key, entry in entries.items()
+                if key[0] in self.sources and key[1] in self.queries}
+
+    def _budget_left(self, source: str, now: float) -> Optional[int]:
+        budget = self.budgets.get(source)
+        if budget is None:
+            return None
+        spent = self._spent.setdefault(source, deque())
+        while spent and spent[0][0] < now - 3600:
+            spent.popleft()
+        return budget - sum(cost for _, cost in spent)
+
+    def _estimated_cost(self, entry: ScheduleEntry) -> int:
+        return self.pages + max(1, round(entry.rate * entry.interval / 3600))
+
+    def due_entries(self, now: Optional[float] = None) -> List[ScheduleEntry]:
+        """Пары, которые пора опросить и на которые хватает бюджета"""
+        now = now or time.time()
+        due = []
+        for entry in sorted(self.entries.values(), key=lambda e: e.next_run):
+            if entry.next_run > now:
+                continue
+            left = self._budget_left(entry.source, now)
+            if left is not None and left < self._estimated_cost(entry):
+                logger.info(f"💰 {entry.source} '{entry.query}': бюджет исчерпан, прогон отложен")
+                continue
+            due.append(entry)
+        return due
+
+    def update_entry(self, entry: ScheduleEntry, new_items: int, requests_spent: int,
+                     now: Optional[float] = None):
+        """Пересчет скорости и интервала по результату прогона"""
+        now = now or time.time()
+        if entry.last_run:
+            hours = max((now - entry.last_run) / 3600, 1e-3)
+            observed = new_items / hours
+            entry.rate = self.alpha * observed + (1 - self.alpha) * entry.rate
+        elif new_items:
+            # Первый прогон собирает накопившееся - это не скорость, но сигнал активности
+            entry.rate = max(entry.rate, self.target_new / (self.min_interval / 3600) * 0.5)
+
+        entry.interval = self._interval_for(entry.rate)
+        entry.last_run = now
+        entry.last_new = new_items
+        entry.runs += 1
+        entry.next_run = now + entry.interval
+        self._spent.setdefault(entry.source, deque()).append((now, requests_spent))
+        self._save_entry(entry)
+
+        logger.info(f"🗓️ {entry.source} '{entry.query}': новых {new_items}, "
+                    f"{entry.rate:.2f}/ч, следующий прогон через {entry.interval / 60:.0f} мин")
+
+    async def run_entry(self, entry: ScheduleEntry) -> int:
+        """Прогон пары через UnifiedParser в инкрементальном режиме"""
+        parser = self.unified.parsers[entry.source]
+        vacancies = await self.unified.parse_source(
+            entry.source, parser, entry.query, self.pages, self.extract_details, incremental=True
+        )
+        for vacancy in vacancies:
+            vacancy.setdefault('matched_queries', [entry.query])
+        stats = self.unified.save_all_vacancies({entry.source: vacancies})
+        new_items = stats.get(entry.source, {}).get('saved', 0)
+        self.update_entry(entry, new_items, self.pages + len(vacancies))
+        return new_items
+
+    async def run_forever(self, once: bool = False, tick: float = 60.0):
+        """Основной цикл демона; once=True - один проход по готовым парам"""
+        logger.info(f"Планировщик запущен: {len(self.entries)} пар источник/запрос")
+        while True:
+            for entry in self.due_entries():
+                try:
+                    await self.run_entry(entry)
+                except Exception as e:
+                    logger.error(f"Ошибка прогона {entry.source} '{entry.query}': {e}")
+                    # Ошибка - повтор не раньше минимального интервала
+                    entry.next_run = time.time() + self.min_interval
+                    self._save_entry(entry)
+            if once:
+                return
+            next_run = min((e.next_run for e in self.entries.values()), default=time.time() + tick)
+            await asyncio.sleep(min(tick, max(1.0, next_run - time.time())))
+
+    def get_status(self) -> List[Dict[str, object]]:
+        now = time.time()
+        return [
+            {
+                'source': e.source,
+                'query': e.query,
+                'rate_per_hour': round(e.rate, 3),
+                'interval_min': round(e.interval / 60, 1),
+                'next_run_in_min': round(max(0.0, e.next_run - now) / 60, 1),
+                'last_new': e.last_new,
+                'runs': e.runs,
+                'budget_left': self._budget_left(e.source, now),
+            }
+            for e in sorted(self.entries.values(), key=lambda e: e.next_run)
+        ]
+
+
+def _parse_budgets(values: List[str]) -> Dict[str, int]:
+    budgets = {}
+    for value in values or []:
+        source, _, limit = value.partition('=')
+        budgets[source] = int(limit)
+    return budgets
+
+
+def main():
+    """Запуск демона"""
+    parser = argparse.ArgumentParser(description='Планировщик непрерывного обхода по свежести')
+    parser.add_argument('--db', default='data/vacancies.db', help='Путь к базе данных')
+    parser.add_argument('--queries', nargs='+', default=['дизайнер'], help='Поисковые запросы')
+    parser.add_argument('--sources', nargs='+',
+                       choices=['hh', 'hirehi', 'habr', 'getmatch', 'geekjob'],
+                       help='Источники для парсинга')
+    parser.add_argument('--pages', type=int, default=3, help='Максимум страниц за прогон')
+    parser.add_argument('--delay', type=float, default=1.0, help='Задержка между запросами')
+    parser.add_argument('--budget', nargs='+', help='Бюджет запросов в час: source=N')
+    parser.add_argument('--target-new', type=float, default=3.0, help='Желаемое число новых вакансий за прогон')
+    parser.add_argument('--min-interval', type=float, default=15, help='Минимальный интервал, мин')
+    parser.add_argument('--max-interval', type=float, default=24 * 60, help='Максимальный интервал, мин')
+    parser.add_argument('--no-details', action='store_true', help='Не извлекать полные детали')
+    parser.add_argument('--once', action='store_true', help='Один проход по готовым парам')
+    parser.add_argument('--status', action='store_true', help='Показать расписание и выйти')
+    parser.add_argument('--verbose', action='store_true', help='Подробный вывод')
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler('crawl_scheduler.log', encoding='utf-8')
+        ]
+    )
+
+    try:
+        from unified_parser import UnifiedParser
+    except ImportError:
+        import os
+        sys.path.append(os.path.dirname(__file__))
+        from unified_parser import UnifiedParser
+
+    scheduler = CrawlScheduler(
+        UnifiedParser(db_path=args.db, delay=args.delay),
+        queries=args.queries,
+        sources=args.sources,
+        pages=args.pages,
+        extract_details=not args.no_details,
+        budgets=_parse_budgets(args.budget),
+        target_new=args.target_new,
+        min_interval=args.min_interval * 60,
+        max_interval=args.max_interval * 60,
+    )
+
+    if args.status:
+        for row in scheduler.get_status():
+            print(row)
+        return 0
+
+    try:
+        asyncio.run(scheduler.run_forever(once=args.once))
+    except KeyboardInterrupt:
+        logger.info("Планировщик остановлен")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Инкрементальный обход выдачи по водяным знакам (source, query)
+
+Для каждой пары источник/запрос хранится:
+- самый новый увиденный external_id и published_at
+- отпечаток ID первой страницы выдачи
+- множество уже увиденных external_id
+
+При инкрементальном запуске:
+- если отпечаток первой страницы не изменился, источник пропускается
+- пагинация останавливается на странице, где нет ни одной новой вакансии
+- детали запрашиваются только для новых вакансий
+
+Водяные знаки сохраняются только после завершения прохода, поэтому
+упавший запуск не теряет вакансии. Внутри deferred_watermarks() проход
+фиксирует вызывающий (IncrementalCrawl.commit) и только для вакансий,
+чьи детали получены и сохранены. Неудачные попытки получить детали
+считаются по (source, external_id): после max_detail_attempts вакансия
+сохраняется без деталей и считается увиденной, иначе отпечаток первой
+страницы не сохранится никогда и детали будут запрашиваться в каждом прогоне.
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Пробный прогон (half-open в circuit_breaker): IncrementalCrawl работает как
+# при enabled=False - не фильтрует и не сохраняет водяные знаки, иначе
+# следующий полный прогон увидел бы неизменную первую страницу и пропустил
+# найденные пробой вакансии
+_probe_run: ContextVar[bool] = ContextVar('crawl_probe_run', default=False)
+
+
+# Отложенная фиксация: finish() кладет проход сюда, а вызывающий делает
+# commit() после получения деталей и сохранения (пакетный режим UnifiedParser)
+_deferred: ContextVar[Optional[List['IncrementalCrawl']]] = ContextVar('crawl_deferred', default=None)
+
+
+@contextmanager
+def deferred_watermarks():
+    """Собирает завершенные проходы вместо сохранения: with deferred_watermarks() as crawls: ..."""
+    crawls: List['IncrementalCrawl'] = []
+    token = _deferred.set(crawls)
+    try:
+        yield crawls
+    finally:
+        _deferred.reset(token)
+
+
+@contextmanager
+def probe_run():
+    """Контекст пробного прогона: инкрементальный режим в нем отключен"""
+    token = _probe_run.set(True)
+    try:
+        yield
+    finally:
+        _probe_run.reset(token)
+
+
+def page_fingerprint(vacancies: Iterable[Dict[str, Any]]) -> str:
+    """Отпечаток страницы выдачи: хэш отсортированных external_id"""
+    ids = sorted(str(v.get('external_id', '')) for v in vacancies)
+    return hashlib.sha1('\n'.join(ids).encode('utf-8')).hexdigest()
+
+
+@dataclass
+class Watermark:
+    """Водяной знак пары (source, query)"""
+    source: str
+    query: str
+    newest_external_id: Optional[str]
+    newest_published_at: Optional[str]
+    page1_fingerprint: Optional[str]
+    updated_at: Optional[str]
+
+
+class WatermarkStore:
+    """SQLite-хранилище водяных знаков, увиденных вакансий и неудач с деталями"""
+
+    def __init__(self, db_path: str = "data/crawl_state.db", seen_ttl: timedelta = timedelta(days=90),
+                 max_detail_attempts: int = 3):
+        self.db_path = db_path
+        self.seen_ttl = seen_ttl
+        self.max_detail_attempts = max_detail_attempts
+        self._lock = threading.Lock()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _init_db(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_watermarks (
+                    source TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    newest_external_id TEXT,
+                    newest_published_at TEXT,
+                    page1_fingerprint TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (source, query)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_seen (
+                    source TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    external_id TEXT NOT NULL,
+                    last_seen TEXT NOT NULL,
+                    PRIMARY KEY (source, query, external_id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_detail_failures (
+                    source TEXT NOT NULL,
+                    external_id TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    last_attempt TEXT NOT NULL,
+                    PRIMARY KEY (source, external_id)
+                )
+            """)
+
+    def get(self, source: str, query: str) -> Optional[Watermark]:
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("""
+                SELECT newest_external_id, newest_published_at, page1_fingerprint, updated_at
+                FROM crawl_watermarks WHERE source = ? AND query = ?
+            """, (source, query)).fetchone()
+        return Watermark(source, query, *row) if row else None
+
+    def known_ids(self, source: str, query: str, external_ids: Iterable[str]) -> Set[str]:
+        """Какие из external_id уже встречались для (source, query)"""
+        ids = list(external_ids)
+        if not ids:
+            return set()
+        placeholders = ','.join('?' * len(ids))
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(f"""
+                SELECT external_id FROM crawl_seen
+                WHERE source = ? AND query = ? AND external_id IN ({placeholders})
+            """, (source, query, *ids)).fetchall()
+        return {row[0] for row in rows}
+
+    def save(self, source: str, query: str, seen_ids: Iterable[str],
+             newest_external_id: Optional[str] = None,
+             newest_published_at: Optional[str] = None,
+             page1_fingerprint: Optional[str] = None):
+        """Обновление водяного знака и множества увиденных вакансий"""
+        now = datetime.now()
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            conn.executemany("""
+                INSERT INTO crawl_seen (source, query, external_id, last_seen) VALUES (?, ?, ?, ?)
+                ON CONFLICT(source, query, external_id) DO UPDATE SET last_seen = excluded.last_seen
+            """, [(source, query, external_id, now.isoformat()) for external_id in seen_ids])
+
+            # Пустые значения не затирают сохраненные ранее
+            conn.execute("""
+                INSERT INTO crawl_watermarks
+                    (source, query, newest_external_id, newest_published_at, page1_fingerprint, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(source, query) DO UPDATE SET
+                    newest_external_id = COALESCE(excluded.newest_external_id, newest_external_id),
+                    newest_published_at = NULLIF(MAX(COALESCE(excluded.newest_published_at, ''),
+                                                     COALESCE(newest_published_at, '')), ''),
+                    page1_fingerprint = COALESCE(excluded.page1_fingerprint, page1_fingerprint),
+                    updated_at = excluded.updated_at
+            """, (source, query, newest_external_id, newest_published_at, page1_fingerprint, now.isoformat()))
+
+            conn.execute("DELETE FROM crawl_seen WHERE last_seen < ?", ((now - self.seen_ttl).isoformat(),))
+
+    def record_detail_failures(self, source: str, external_ids: Iterable[str]) -> Set[str]:
+        """
+        Учет неудачных попыток получить детали
+
+        Возвращает external_id, исчерпавшие max_detail_attempts: их больше не
+        откладывают, а сохраняют без деталей
+        """
+        ids = sorted(set(external_ids))
+        if not ids:
+            return set()
+        now = datetime.now()
+        placeholders = ','.join('?' * len(ids))
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            conn.execute("DELETE FROM crawl_detail_failures WHERE last_attempt < ?",
+                         ((now - self.seen_ttl).isoformat(),))
+            conn.executemany("""
+                INSERT INTO crawl_detail_failures (source, external_id, attempts, last_attempt)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT(source, external_id) DO UPDATE SET
+                    attempts = attempts + 1, last_attempt = excluded.last_attempt
+            """, [(source, external_id, now.isoformat()) for external_id in ids])
+            rows = conn.execute(f"""
+                SELECT external_id FROM crawl_detail_failures
+                WHERE source = ? AND attempts >= ? AND external_id IN ({placeholders})
+            """, (source, self.max_detail_attempts, *ids)).fetchall()
+        return {row[0] for row in rows}
+
+    def clear_detail_failures(self, source: str, external_ids: Iterable[str]):
+        """Сброс счетчика неудач для обработанных вакансий"""
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            conn.executemany("DELETE FROM crawl_detail_failures WHERE source = ? AND external_id = ?",
+                             [(source, external_id) for external_id in set(external_ids)])
+
+    def reset(self, source: Optional[str] = None, query: Optional[str] = None):
+        """Сброс водяных знаков (следующий запуск пройдет выдачу целиком)"""
+        conditions, params = [], []
+        if source:
+            conditions.append("source = ?")
+            params.append(source)
+        if query:
+            conditions.append("query = ?")
+            params.append(query)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            conn.execute(f"DELETE FROM crawl_watermarks {where}", params)
+            conn.execute(f"DELETE FROM crawl_seen {where}", params)
+            if not query:
+                conn.execute(f"DELETE FROM crawl_detail_failures {where}", params)
+
+
+_default_store: Optional[WatermarkStore] = None
+_default_store_lock = threading.Lock()
+
+
+def default_store() -> WatermarkStore:
+    """Общее хранилище (БД создается при первом инкрементальном запуске)"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = WatermarkStore()
+        return _default_store
+
+
+class IncrementalResult(list):
+    """
+    Результат parse_vacancies в инкрементальном режиме.
+
+    up_to_date=True - выдача проверена и новых вакансий нет; пустой список
+    в этом случае не является признаком блокировки источника.
+    """
+    up_to_date: bool = False
+
+
+class IncrementalCrawl:
+    """
+    Состояние одного прохода parse_vacancies.
+
+    Использование в цикле пагинации:
+        crawl = IncrementalCrawl('habr', query, enabled=incremental)
+        for page in ...:
+            page_vacancies = crawl.check_page(page_vacancies)
+            ... детали только для page_vacancies ...
+            if crawl.stop:
+                break
+        return crawl.finish(all_vacancies)
+
+    При enabled=False и внутри probe_run() ничего не фильтрует и не пишет в БД.
+    """
+
+    def __init__(self, source: str, query: str, enabled: bool = True,
+                 store: Optional[WatermarkStore] = None):
+        self.source = source
+        self.query = query.strip().lower()
+        enabled = enabled and not _probe_run.get()
+        self.enabled = enabled
+        self.store = (store or default_store()) if enabled else None
+        self.watermark = self.store.get(source, self.query) if enabled else None
+        self.stop = False
+        self.pages_checked = 0
+        self.skipped_known = 0
+        self._page1: List[Dict[str, Any]] = []
+        self._seen: Set[str] = set()
+        self._returned: List[Dict[str, Any]] = []
+
+    def check_page(self, vacancies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Только новые вакансии страницы; выставляет stop, если дальше идти не нужно"""
+        if not self.enabled or not vacancies:
+            return vacancies
+
+        self.pages_checked += 1
+        ids = [str(v['external_id']) for v in vacancies if v.get('external_id')]
+
+        if self.pages_checked == 1:
+            self._page1 = vacancies
+            if self.watermark and self.watermark.page1_fingerprint == page_fingerprint(vacancies):
+                logger.info(f"⏭️ {self.source} '{self.query}': первая страница не изменилась, источник пропущен")
+                self.stop = True
+                return []
+
+        known = self.store.known_ids(self.source, self.query, ids)
+        self._seen.update(known)
+        new = [v for v in vacancies if str(v.get('external_id')) not in known]
+        self.skipped_known += len(vacancies) - len(new)
+
+        if not new:
+            logger.info(f"⏭️ {self.source} '{self.query}': страница {self.pages_checked} "
+                        f"содержит только известные вакансии, пагинация остановлена")
+            self.stop = True
+        return new
+
+    def finish(self, vacancies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Конец прохода: водяной знак сохраняется сразу или, внутри
+        deferred_watermarks(), откладывается до commit() вызывающим
+        """
+        if not self.enabled:
+            return vacancies
+
+        result = IncrementalResult(vacancies)
+        result.up_to_date = bool(self._page1) and not vacancies
+        self._returned = list(vacancies)
+
+        pending = _deferred.get()
+        if pending is not None:
+            pending.append(self)
+        else:
+            self.commit()
+
+        logger.info(f"📌 {self.source} '{self.query}': новых {len(vacancies)}, "
+                    f"известных пропущено {self.skipped_known}, страниц {self.pages_checked}")
+        return result
+
+    def commit(self, processed: Optional[Iterable[str]] = None):
+        """
+        Сохранение водяного знака
+
+        processed - external_id вакансий, которые действительно обработаны
+        (детали получены, вакансия сохранена); None - все возвращенные.
+        Необработанные остаются новыми и придут в следующем прогоне.
+        """
+        returned = {str(v['external_id']) for v in self._returned if v.get('external_id')}
+        if processed is not None:
+            returned &= {str(external_id) for external_id in processed}
+        seen = self._seen | returned
+
+        # Отпечаток сохраняется, только если все новые вакансии первой страницы обработаны
+        page1_ids = {str(v.get('external_id')) for v in self._page1}
+        fingerprint = page_fingerprint(self._page1) if self._page1 and page1_ids <= seen else None
+
+        published = [v['published_at'] for v in self._returned
+                     if v.get('published_at') and str(v.get('external_id')) in returned]
+        self.store.save(
+            self.source, self.query, seen,
+            newest_external_id=str(self._page1[0]['external_id']) if self._page1 else None,
+            newest_published_at=max(published) if published else None,
+            page1_fingerprint=fingerprint,
+        )
+
+
+def main():
+    """Проверка инкрементального обхода на временной БД"""
+    import os
+    import tempfile
+    logging.basicConfig(level=logging.INFO)
+
+    store = WatermarkStore(os.path.join(tempfile.mkdtemp(), 'crawl_state.db'))
+    site = [[{'external_id': f"test-{p}{i}"} for i in range(3)] for p in range(3)]
+
+    def run(pages):
+        crawl = IncrementalCrawl('test', 'дизайнер', store=store)
+        fetched, result = 0, []
+        for page in pages:
+            fetched += 1
+            result.extend(crawl.check_page(list(page)))
+            if crawl.stop:
+                break
+        return fetched, crawl.finish(result)
+
+    fetched, result = run(site)
+    assert fetched == 3 and len(result) == 9
+
+    fetched, result = run(site)
+    assert fetched == 1 and result == [] and result.up_to_date
+
+    # Две новые вакансии сверху: новые только на первой странице, вторая - известная
+    site = [[{'external_id': 'test-new1'}, {'external_id': 'test-new2'}, site[0][0]]] + site
+    fetched, result = run(site)
+    assert fetched == 2 and [v['external_id'] for v in result] == ['test-new1', 'test-new2']
+
+    # Детали не получаются: вакансия откладывается, после трех попыток сдаемся
+    assert [store.record_detail_failures('test', ['test-new1']) for _ in range(3)] == [set(), set(), {'test-new1'}]
+    store.clear_detail_failures('test', ['test-new1'])
+    assert store.record_detail_failures('test', ['test-new1']) == set()
+
+    print(f"OK: {store.get('test', 'дизайнер')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Извлечение вакансий из встроенного в страницу состояния (SSR JSON)
+
+Многие сайты кладут данные страницы в JSON прямо в HTML:
+- <script id="__NEXT_DATA__" type="application/json"> (Next.js)
+- <script type="application/json" data-ssr-state="true"> (Habr Career)
+- window.__INITIAL_STATE__ = {...} / window.__NUXT__ = {...}
+- <script type="application/ld+json"> с JobPosting (schema.org)
+
+Блобы находятся поиском подстроки по сырому ответу (bytes или str) -
+без построения дерева BeautifulSoup. Поля вакансии берутся по описанию
+источника (SourceMapping). Если состояние не найдено или не подходит,
+парсер идет по обычному каскаду селекторов.
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import re
+import json
+import logging
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+Content = Union[str, bytes]
+
+# Маркеры <script> с JSON внутри: содержимое тега целиком - JSON
+SCRIPT_MARKERS = (
+    '__NEXT_DATA__',
+    'data-ssr-state',
+    'application/ld+json',
+)
+
+# Маркеры присваивания в inline-скрипте: после '=' идет объект
+ASSIGNMENT_MARKERS = (
+    'window.__INITIAL_STATE__',
+    'window.__PRELOADED_STATE__',
+    'window.__NUXT__',
+)
+
+# Минимальная длина описания из состояния, чтобы не принять сниппет за полный текст
+MIN_DESCRIPTION_LENGTH = 100
+
+_decoder = json.JSONDecoder()
+
+# Счетчики попаданий: сколько страниц разобрано из состояния, а сколько ушло в фолбэк
+stats: Counter = Counter()
+
+
+@dataclass
+class SourceMapping:
+    """
+    Описание источника: где в JSON лежат поля вакансии.
+
+    Каждое поле - кортеж путей-кандидатов через точку; берется первый
+    непустой. Пути проверяются на элементах списков вакансий, найденных
+    в любом месте состояния.
+    """
+    source: str
+    base_url: str
+    url_template: str
+    id_pattern: str
+    fields: Dict[str, Tuple[str, ...]]
+    detail_paths: Tuple[str, ...] = ()
+
+
+SOURCE_MAPPINGS: Dict[str, SourceMapping] = {
+    'habr': SourceMapping(
+        source='habr',
+        base_url='https://career.habr.com',
+        url_template='/vacancies/{id}',
+        id_pattern=r'/vacancies/(\d+)',
+        fields={
+            'id': ('id',),
+            'url': ('href', 'url'),
+            'title': ('title', 'name'),
+            'company': ('company.title', 'company.name', 'companyName'),
+            'salary': ('salary.formatted', 'salary.title', 'salary'),
+            'location': ('locations', 'location', 'city'),
+            'description': ('snippet', 'shortDescription', 'description'),
+        },
+        detail_paths=('vacancy.description', 'vacancy.descriptionHtml', 'description'),
+    ),
+    'getmatch': SourceMapping(
+        source='getmatch',
+        base_url='https://getmatch.ru',
+        url_template='/vacancies/{id}',
+        id_pattern=r'/(?:vacancies|job)/([^/?#]+)',
+        fields={
+            'id': ('id', 'slug'),
+            'url': ('url', 'path', 'href'),
+            'title': ('position', 'title', 'name'),
+            'company': ('company.name', 'company.title', 'company_name', 'companyName'),
+            'salary': ('salary_display', 'salary.formatted', 'salary'),
+            'location': ('location', 'cities', 'city'),
+            'description': ('short_description', 'snippet', 'description'),
+        },
+        detail_paths=('offer.description', 'vacancy.description', 'description'),
+    ),
+    'geekjob': SourceMapping(
+        source='geekjob',
+        base_url='https://geekjob.ru',
+        url_template='/vacancy/{id}',
+        id_pattern=r'/vacancy/([^/?#]+)',
+        fields={
+            'id': ('id', '_id'),
+            'url': ('url', 'href'),
+            'title': ('title', 'position', 'name'),
+            'company': ('company.name', 'company.title', 'companyName'),
+            'salary': ('salary.formatted', 'salary'),
+            'location': ('city', 'location', 'locations'),
+            'description': ('snippet', 'description'),
+        },
+        detail_paths=('vacancy.description', 'description'),
+    ),
+}
+
+# Поля schema.org JobPosting (ld+json) - одинаковы для всех источников
+JOB_POSTING_FIELDS: Dict[str, Tuple[str, ...]] = {
+    'id': ('identifier.value', 'identifier'),
+    'url': ('url',),
+    'title': ('title', 'name'),
+    'company': ('hiringOrganization.name', 'hiringOrganization'),
+    'salary': ('baseSalary',),
+    'location': ('jobLocation.address.addressLocality', 'jobLocation', 'applicantLocationRequirements'),
+    'description': ('description',),
+}
+
+CURRENCY_SYMBOLS = {'RUB': '₽', 'RUR': '₽', 'USD': '$', 'EUR': '€', 'KZT': '₸'}
+
+
+def _decode(chunk: Content) -> str:
+    if isinstance(chunk, bytes):
+        return chunk.decode('utf-8', errors='replace')
+    return chunk
+
+
+def _marker(content: Content, marker: str):
+    return marker.encode('ascii') if isinstance(content, bytes) else marker
+
+
+def _script_bodies(content: Content, marker: str) -> Iterator[Content]:
+    """Содержимое всех <script>, в открывающем теге которых есть marker"""
+    needle = _marker(content, marker)
+    tag_end = _marker(content, '>')
+    close = _marker(content, '</script')
+    pos = content.find(needle)
+    while pos != -1:
+        start = content.find(tag_end, pos)
+        if start == -1:
+            return
+        end = content.find(close, start)
+        if end == -1:
+            return
+        yield content[start + 1:end]
+        pos = content.find(needle, end)
+
+
+def _assignment_values(content: Content, marker: str) -> Iterator[Any]:
+    """Значения window.X = {...} и window.X = JSON.parse("...")"""
+    needle = _marker(content, marker)
+    close = _marker(content, '</script')
+    pos = content.find(needle)
+    while pos != -1:
+        end = content.find(close, pos)
+        text = _decode(content[pos + len(needle):end if end != -1 else None]).lstrip()
+        if text.startswith('='):
+            text = text[1:].lstrip()
+            try:
+                if text.startswith('JSON.parse('):
+                    raw, _ = _decoder.raw_decode(text[len('JSON.parse('):])
+                    yield json.loads(raw)
+                else:
+                    value, _ = _decoder.raw_decode(text)
+                    yield value
+            except (ValueError, TypeError) as e:
+                logger.debug(f"Не удалось разобрать {marker}: {e}")
+        if end == -1:
+            return
+        pos = content.find(needle, end)
+
+
+def find_state_blobs(content: Optional[Content]) -> List[Tuple[str, Any]]:
+    """Все встроенные JSON-блобы страницы: [(маркер, объект)]"""
+    if not content:
+        return []
+
+    blobs = []
+    for marker in SCRIPT_MARKERS:
+        for body in _script_bodies(content, marker):
+            try:
+                blobs.append((marker, json.loads(_decode(body))))
+            except ValueError as e:
+                logger.debug(f"Не удалось разобрать {marker}: {e}")
+
+    for marker in ASSIGNMENT_MARKERS:
+        for value in _assignment_values(content, marker):
+            blobs.append((marker, value))
+
+    return blobs
+
+
+def resolve_path(obj: Any, path: str) -> Any:
+    """Значение по пути 'company.title'; для списков берется первый элемент"""
+    for key in path.split('.'):
+        if isinstance(obj, list):
+            obj = obj[0] if obj else None
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+    return obj
+
+
+def _first(obj: Dict[str, Any], paths: Tuple[str, ...]) -> Any:
+    for path in paths:
+        value = resolve_path(obj, path)
+        if value not in (None, '', [], {}):
+            return value
+    return None
+
+
+def _format_amount(value: Any) -> str:
+    """Сумма из JSON: число с разрядами или исходная строка ("150k"), иначе пусто"""
+    if isinstance(value, (dict, list, bool)):
+        return ''
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value).strip()
+    if not math.isfinite(number):
+        return ''
+    return f"{int(number):,}".replace(',', ' ')
+
+
+def _format_salary(value: Any) -> str:
+    """Зарплата из JSON: готовая строка, {from, to, currency} или MonetaryAmount"""
+    if isinstance(value, str):
+        return value.strip()
+    if not isinstance(value, dict):
+        return ''
+
+    for key in ('formatted', 'title', 'text'):
+        if isinstance(value.get(key), str) and value[key].strip():
+            return value[key].strip()
+
+    # schema.org MonetaryAmount: {currency, value: {minValue, maxValue, value}}
+    amount = value.get('value') if isinstance(value.get('value'), dict) else value
+    low = amount.get('from', amount.get('minValue'))
+    high = amount.get('to', amount.get('maxValue'))
+    if low is None and high is None:
+        low = amount.get('value') if not isinstance(amount.get('value'), dict) else None
+    if low is None and high is None:
+        return ''
+
+    parts = []
+    for prefix, bound in (('от', low), ('до', high)):
+        text = _format_amount(bound) if bound is not None else ''
+        if text:
+            parts.append(f"{prefix} {text}")
+    if not parts:
+        return ''
+    currency = str(value.get('currency') or amount.get('currency') or 'RUB').upper()
+    return f"{' '.join(parts)} {CURRENCY_SYMBOLS.get(currency, currency)}"
+
+
+def _to_text(value: Any) -> str:
+    """Строка из значения JSON: dict -> title/name, list -> через запятую"""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        text = value.strip()
+        if '<' in text and '>' in text:
+            text = BeautifulSoup(text, 'html.parser').get_text(' ', strip=True)
+        return text
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, dict):
+        for key in ('title', 'name', 'addressLocality', 'text', 'value'):
+            if value.get(key):
+                return _to_text(value[key])
+        if isinstance(value.get('address'), dict):
+            return _to_text(value['address'])
+        return ''
+    if isinstance(value, list):
+        parts = [_to_text(item) for item in value]
+        return ', '.join(p for p in parts if p)
+    return ''
+
+
+def _is_job_posting(obj: Any) -> bool:
+    if not isinstance(obj, dict):
+        return False
+    kind = obj.get('@type')
+    return kind == 'JobPosting' or (isinstance(kind, list) and 'JobPosting' in kind)
+
+
+def _iter_job_postings(obj: Any) -> Iterator[Dict[str, Any]]:
+    """JobPosting из ld+json: одиночный объект, массив, @graph или ItemList"""
+    if isinstance(obj, list):
+        for item in obj:
+            yield from _iter_job_postings(item)
+    elif isinstance(obj, dict):
+        if _is_job_posting(obj):
+            yield obj
+        for key in ('@graph', 'itemListElement', 'item'):
+            if key in obj:
+                yield from _iter_job_postings(obj[key])
+
+
+def _vacancy_evidence(item: Dict[str, Any], fields: Dict[str, Tuple[str, ...]], mapping: SourceMapping) -> int:
+    """
+    Сколько признаков именно вакансии у элемента: ссылка вида id_pattern,
+    компания, зарплата. id и title есть и у справочников (специализации,
+    города в фильтрах), поэтому сами по себе ничего не доказывают.
+    """
+    evidence = 0
+    url = _first(item, fields['url'])
+    if isinstance(url, str) and re.search(mapping.id_pattern, urljoin(mapping.base_url, url)):
+        evidence += 1
+    if _to_text(_first(item, fields['company'])):
+        evidence += 1
+    if _first(item, fields['salary']) is not None:
+        evidence += 1
+    return evidence
+
+
+def _looks_like_vacancy(item: Any, fields: Dict[str, Tuple[str, ...]], mapping: SourceMapping) -> bool:
+    if not isinstance(item, dict):
+        return False
+    title = _first(item, fields['title'])
+    return isinstance(title, str) and bool(title.strip()) and _vacancy_evidence(item, fields, mapping) > 0
+
+
+def _vacancy_lists(obj: Any, fields: Dict[str, Tuple[str, ...]], mapping: SourceMapping,
+                   depth: int = 0) -> Iterator[List[Dict[str, Any]]]:
+    """Списки в состоянии, большинство элементов которых похожи на вакансии"""
+    if depth > 12:
+        return
+    if isinstance(obj, list):
+        dicts = [item for item in obj if isinstance(item, dict)]
+        if dicts:
+            matching = [item for item in dicts if _looks_like_vacancy(item, fields, mapping)]
+            if matching and len(matching) * 2 >= len(dicts):
+                yield matching
+                return
+        for item in obj:
+            yield from _vacancy_lists(item, fields, mapping, depth + 1)
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            if isinstance(value, (dict, list)):
+                yield from _vacancy_lists(value, fields, mapping, depth + 1)
+
+
+def _build_vacancy(item: Dict[str, Any], fields: Dict[str, Tuple[str, ...]],
+                   mapping: SourceMapping) -> Optional[Dict[str, Any]]:
+    url = _first(item, fields['url'])
+    vacancy_id = _first(item, fields['id'])
+    if isinstance(vacancy_id, dict):
+        vacancy_id = vacancy_id.get('value')
+
+    if isinstance(url, str) and url:
+        url = urljoin(mapping.base_url, url)
+        match = re.search(mapping.id_pattern, url)
+        if match:
+            vacancy_id = match.group(1)
+    elif vacancy_id is not None:
+        url = urljoin(mapping.base_url, mapping.url_template.format(id=vacancy_id))
+
+    if vacancy_id in (None, '') or not url:
+        return None
+
+    return {
+        'external_id': f"{mapping.source}-{vacancy_id}",
+        'url': url,
+        'title': _to_text(_first(item, fields['title'])),
+        'company': _to_text(_first(item, fields['company'])),
+        'salary': _format_salary(_first(item, fields['salary'])) or 'Не указана',
+        'location': _to_text(_first(item, fields['location'])),
+        'description': _to_text(_first(item, fields['description'])),
+        'source': mapping.source,
+    }
+
+
+def extract_vacancies(content: Optional[Content], source: str) -> List[Dict[str, Any]]:
+    """
+    Карточки вакансий со страницы списка из встроенного состояния.
+
+    Возвращает словари в формате парсеров (external_id, url, title, company,
+    salary, location, description, source) без фильтра релевантности.
+    Пустой список - состояние не найдено, нужен фолбэк на селекторы.
+    """
+    mapping = SOURCE_MAPPINGS[source]
+    best: List[Dict[str, Any]] = []
+    best_rank = (0.0, 0)
+
+    for marker, blob in find_state_blobs(content):
+        if marker == 'application/ld+json':
+            candidates = [list(_iter_job_postings(blob))]
+            fields = JOB_POSTING_FIELDS
+        else:
+            candidates = list(_vacancy_lists(blob, mapping.fields, mapping))
+            fields = mapping.fields
+
+        for items in candidates:
+            built = []
+            for item in items:
+                # Одна битая карточка не должна обрывать разбор всей страницы
+                try:
+                    vacancy = _build_vacancy(item, fields, mapping)
+                except Exception as e:
+                    logger.debug(f"{source}: пропуск элемента состояния: {e}")
+                    continue
+                if vacancy:
+                    built.append((item, vacancy))
+            if not built:
+                continue
+            # Список выбирается по признакам вакансий на элемент, длина - только при равенстве
+            evidence = sum(_vacancy_evidence(item, fields, mapping) for item, _ in built) / len(built)
+            rank = (evidence, len(built))
+            if rank > best_rank:
+                best, best_rank = [vacancy for _, vacancy in built], rank
+
+    # Один и тот же список часто встречается в состоянии дважды
+    unique = list({v['external_id']: v for v in best}.values())
+    stats[f"{source}_list_{'state' if unique else 'fallback'}"] += 1
+    return unique
+
+
+def _first_in_tree(obj: Any, paths: Tuple[str, ...], depth: int = 0) -> Iterator[Any]:
+    """Значения путей на любом уровне вложенности (state -> props -> pageProps -> ...)"""
+    if depth > 8 or not isinstance(obj, (dict, list)):
+        return
+    if isinstance(obj, dict):
+        value = _first(obj, paths)
+        if value is not None:
+            yield value
+        children = obj.values()
+    else:
+        children = obj
+    for child in children:
+        yield from _first_in_tree(child, paths, depth + 1)
+
+
+def extract_description_html(content: Optional[Content], source: str) -> Optional[str]:
+    """
+    Полное описание вакансии (HTML или текст) со страницы вакансии.
+
+    Сначала ld+json JobPosting, затем пути detail_paths источника.
+    None - описание не найдено, нужен фолбэк на селекторы.
+    """
+    mapping = SOURCE_MAPPINGS[source]
+    blobs = find_state_blobs(content)
+
+    candidates = []
+    for marker, blob in blobs:
+        if marker == 'application/ld+json':
+            candidates.extend(p.get('description') for p in _iter_job_postings(blob))
+    for marker, blob in blobs:
+        if marker != 'application/ld+json':
+            candidates.extend(_first_in_tree(blob, mapping.detail_paths))
+
+    for description in candidates:
+        if isinstance(description, str) and len(description.strip()) >= MIN_DESCRIPTION_LENGTH:
+            stats[f"{source}_detail_state"] += 1
+            return description
+
+    stats[f"{source}_detail_fallback"] += 1
+    return None
+
+
+def get_stats() -> Dict[str, int]:
+    return dict(stats)
+
+
+def main():
+    """Проверка извлечения на синтетических страницах"""
+    logging.basicConfig(level=logging.INFO)
+
+    state = {'vacancies': {'list': [
+        {'id': 1000123, 'href': '/vacancies/1000123', 'title': 'Продуктовый дизайнер',
+         'company': {'title': 'Хабр'}, 'salary': {'from': 150000, 'to': None, 'currency': 'rur'},
+         'locations': [{'title': 'Москва'}, {'title': 'Удаленно'}]},
+        {'id': 1000124, 'href': '/vacancies/1000124', 'title': 'UX-дизайнер',
+         'company': {'title': 'Компания'}, 'salary': {'formatted': 'до 200 000 ₽'}},
+    ]}}
+    html = (
+        '<html><head><script type="application/json" data-ssr-state="true">'
+        f'{json.dumps(state, ensure_ascii=False)}</script></head><body></body></html>'
+    ).encode('utf-8')
+
+    vacancies = extract_vacancies(html, 'habr')
+    assert len(vacancies) == 2, vacancies
+    assert vacancies[0]['external_id'] == 'habr-1000123'
+    assert vacancies[0]['url'] == 'https://career.habr.com/vacancies/1000123'
+    assert vacancies[0]['company'] == 'Хабр'
+    assert vacancies[0]['salary'] == 'от 150 000 ₽', vacancies[0]['salary']
+    assert vacancies[0]['location'] == 'Москва, Удаленно'
+    assert vacancies[1]['salary'] == 'до 200 000 ₽'
+
+    posting = {
+        '@context': 'https://schema.org', '@type': 'JobPosting',
+        'title': 'UI/UX дизайнер', 'url': 'https://geekjob.ru/vacancy/abc123',
+        'hiringOrganization': {'@type': 'Organization', 'name': 'Geek'},
+        'description': '<p>Проектирование интерфейсов мобильного приложения, '
+                       'исследования пользователей, работа с дизайн-системой.</p>',
+    }
+    detail = ('<html><script type="application/ld+json">'
+              f'{json.dumps(posting, ensure_ascii=False)}</script></html>')
+    assert extract_description_html(detail, 'geekjob').startswith('<p>Проектирование')
+    assert extract_vacancies(detail, 'geekjob')[0]['external_id'] == 'geekjob-abc123'
+
+    # Справочник фильтров с id и title рядом с настоящей вакансией - не вакансии
+    filters = {'filters': {'specializations': [{'id': i, 'title': f'Дизайнер {i}'} for i in range(30)]},
+               'vacancies': [{'id': 1000125, 'href': '/vacancies/1000125', 'title': 'Дизайнер интерфейсов'}]}
+    html = ('<script type="application/json" data-ssr-state="true">'
+            f'{json.dumps(filters, ensure_ascii=False)}</script>')
+    assert [v['external_id'] for v in extract_vacancies(html, 'habr')] == ['habr-1000125']
+
+    nuxt = 'window.__INITIAL_STATE__ = {"jobs": [{"id": 7, "position": "Designer", "company": {"name": "M"}}]};'
+    assert extract_vacancies(f'<script>{nuxt}</script>', 'getmatch')[0]['url'] == 'https://getmatch.ru/vacancies/7'
+    assert extract_vacancies('<html><body>нет состояния</body></html>', 'habr') == []
+
+    # Нечисловые суммы в состоянии: строка как есть, бесконечность - без падения
+    odd = {'vacancies': [
+        {'id': 501, 'href': '/vacancies/501', 'title': 'Дизайнер', 'salary': {'from': '150k'}},
+        {'id': 502, 'href': '/vacancies/502', 'title': 'Продуктовый дизайнер',
+         'salary': {'from': 100000, 'to': float('inf'), 'currency': 'usd'}},
+    ]}
+    html = ('<script type="application/json" data-ssr-state="true">'
+            f'{json.dumps(odd, ensure_ascii=False)}</script>')
+    salaries = {v['external_id']: v['salary'] for v in extract_vacancies(html, 'habr')}
+    assert salaries == {'habr-501': 'от 150k ₽', 'habr-502': 'от 100 000 $'}, salaries
+
+    print(f"OK: {get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
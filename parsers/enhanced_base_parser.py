@@ -9,6 +9,16 @@ from abc import ABC, abstractmethod
 from datetime import datetime
 import hashlib
 
+try:
+    from rate_controller import RateLimitedSession, rate_controller
+    from selector_cascade import get_cascade
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(__file__))
+    from rate_controller import RateLimitedSession, rate_controller
+    from selector_cascade import get_cascade
+
 class EnhancedBaseParser(ABC):
     """
     Базовый класс для всех парсеров с улучшенными возможностями:
@@ -20,7 +30,8 @@ class EnhancedBaseParser(ABC):
     """
     
     def __init__(self, delay_range: tuple = (1.0, 3.0), max_retries: int = 3):
-        self.session = requests.Session()
+        # Сессия выдерживает общий для всех парсеров темп запросов к хосту
+        self.session = RateLimitedSession()
         self.delay_range = delay_range
         self.max_retries = max_retries
         self.timeout = 15
@@ -71,11 +82,15 @@ class EnhancedBaseParser(ABC):
             'DNT': '1'
         }
     
-    def _apply_rate_limiting(self):
-        """Применяет rate limiting между запросами"""
-        delay = random.uniform(*self.delay_range)
-        self.logger.debug(f"Rate limiting: waiting {delay:.2f} seconds")
-        time.sleep(delay)
+    def _apply_rate_limiting(self, url: str):
+        """
+        Rate limiting между запросами.
+        
+        delay_range задает только начальную частоту хоста; дальше ее подбирает
+        rate_controller (растет на успешных ответах, падает на 429/503),
+        а ожидание выполняет RateLimitedSession.
+        """
+        rate_controller.configure_host(url, 2.0 / sum(self.delay_range))
     
     def _make_request_with_retry(self, url: str, **kwargs) -> Optional[requests.Response]:
         """
@@ -92,7 +107,7 @@ class EnhancedBaseParser(ABC):
                     self.logger.warning(f"Retry attempt {attempt + 1}/{self.max_retries} after {backoff_delay:.2f}s")
                     time.sleep(backoff_delay)
                 else:
-                    self._apply_rate_limiting()
+                    self._apply_rate_limiting(url)
                 
                 # Генерируем новые headers для каждой попытки
                 headers = self._get_random_headers()
@@ -127,63 +142,62 @@ class EnhancedBaseParser(ABC):
         
         return None
     
-    def extract_with_fallback(self, soup, selectors_list: List[str], attribute: Optional[str] = None) -> Optional[str]:
+    def _cascade(self, selectors_list: List[str], field: Optional[str] = None):
+        """Предкомпилированный каскад селекторов парсера для поля"""
+        return get_cascade(self.__class__.__name__, field or ' | '.join(selectors_list), selectors_list)
+    
+    def select_with_fallback(self, soup, selectors_list: List[str], field: Optional[str] = None):
+        """Первый элемент, найденный каскадом селекторов"""
+        return self._cascade(selectors_list, field).select_one(soup)
+    
+    def select_all_with_fallback(self, soup, selectors_list: List[str], field: Optional[str] = None) -> List:
+        """Все элементы первого сработавшего селектора каскада"""
+        return self._cascade(selectors_list, field).select(soup)
+    
+    def extract_with_fallback(self, soup, selectors_list: List[str], attribute: Optional[str] = None,
+                              field: Optional[str] = None) -> Optional[str]:
         """
         Пробует несколько селекторов по очереди для надежного извлечения данных
         
+        Селекторы компилируются один раз и пробуются в порядке приоритета
+        (selector_cascade).
+        
         Args:
             soup: BeautifulSoup объект
             selectors_list: Список CSS селекторов для попытки
             attribute: Атрибут для извлечения (если None, извлекает текст)
+            field: Имя поля для статистики (по умолчанию - сам список селекторов)
         
         Returns:
             Извлеченное значение или None
         """
-        for i, selector in enumerate(selectors_list):
-            try:
-                elements = soup.select(selector)
-                
-                if elements:
-                    element = elements[0]
-                    
-                    if attribute:
-                        value = element.get(attribute)
-                    else:
-                        value = element.get_text(strip=True)
-                    
-                    if value:
-                        self.logger.debug(f"Successful extraction with selector #{i+1}: {selector}")
-                        return value
-                        
-            except Exception as e:
-                self.logger.debug(f"Selector '{selector}' failed: {str(e)}")
-                continue
+        def value_of(element):
+            return element.get(attribute) if attribute else element.get_text(strip=True)
+        
+        cascade = self._cascade(selectors_list, field)
+        element = cascade.select_one(soup, accept=lambda found: bool(value_of(found)))
+        if element is not None:
+            self.logger.debug(f"Successful extraction with selector: {cascade.last_selector}")
+            return value_of(element)
         
         self.logger.warning(f"All {len(selectors_list)} selectors failed")
         return None
     
-    def extract_multiple_with_fallback(self, soup, selectors_list: List[str], limit: Optional[int] = None) -> List[str]:
+    def extract_multiple_with_fallback(self, soup, selectors_list: List[str], limit: Optional[int] = None,
+                                       field: Optional[str] = None) -> List[str]:
         """
         Извлекает множественные элементы с fallback логикой
         """
-        for i, selector in enumerate(selectors_list):
-            try:
-                elements = soup.select(selector)
-                
-                if elements:
-                    results = []
-                    for element in elements[:limit] if limit else elements:
-                        text = element.get_text(strip=True)
-                        if text:
-                            results.append(text)
-                    
-                    if results:
-                        self.logger.debug(f"Extracted {len(results)} elements with selector #{i+1}: {selector}")
-                        return results
-                        
-            except Exception as e:
-                self.logger.debug(f"Multiple selector '{selector}' failed: {str(e)}")
-                continue
+        def texts_of(elements):
+            texts = (element.get_text(strip=True) for element in (elements[:limit] if limit else elements))
+            return [text for text in texts if text]
+        
+        cascade = self._cascade(selectors_list, field)
+        elements = cascade.select(soup, accept=lambda found: bool(texts_of(found)))
+        if elements:
+            results = texts_of(elements)
+            self.logger.debug(f"Extracted {len(results)} elements with selector: {cascade.last_selector}")
+            return results
         
         self.logger.warning(f"All {len(selectors_list)} multiple selectors failed")
         return []
@@ -207,6 +221,7 @@ class EnhancedBaseParser(ABC):
             'failed_requests': self.stats['failed_requests'],
             'success_rate': round(success_rate * 100, 2),
             'avg_response_time': round(avg_response_time, 2),
+            'host_rates': rate_controller.get_stats(),
             'requests_per_minute': round(self.stats['requests_made'] / (runtime / 60), 2) if runtime > 0 else 0
         }
     
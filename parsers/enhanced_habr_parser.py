@@ -3,18 +3,21 @@
 import logging
 from typing import List, Dict, Optional, Any
 from urllib.parse import quote_plus, urljoin
-from bs4 import BeautifulSoup
 import re
 
 try:
     from enhanced_base_parser import EnhancedBaseParser
+    from html_backend import make_soup
     from simple_text_formatter import extract_formatted_text, clean_text
+    from salary_grammar import parse_salary
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.dirname(__file__))
     from enhanced_base_parser import EnhancedBaseParser
+    from html_backend import make_soup
     from simple_text_formatter import extract_formatted_text, clean_text
+    from salary_grammar import parse_salary
 
 class EnhancedHabrParser(EnhancedBaseParser):
     """
@@ -89,15 +92,13 @@ class EnhancedHabrParser(EnhancedBaseParser):
             self.logger.error(f"Failed to fetch search page {page}")
             return []
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = make_soup(response.content, 'habr')
         
         # Ищем карточки вакансий
-        vacancy_cards = []
-        for selector in self.selectors['vacancy_cards']:
-            vacancy_cards = soup.select(selector)
-            if vacancy_cards:
-                self.logger.info(f"Found {len(vacancy_cards)} vacancies with selector: {selector}")
-                break
+        vacancy_cards = self.select_all_with_fallback(soup, self.selectors['vacancy_cards'], field='vacancy_cards')
+        if vacancy_cards:
+            self.logger.info(f"Found {len(vacancy_cards)} vacancies with selector: "
+                             f"{self._cascade(self.selectors['vacancy_cards'], 'vacancy_cards').last_selector}")
         
         if not vacancy_cards:
             self.logger.warning("No vacancy cards found on the page")
@@ -122,11 +123,7 @@ class EnhancedHabrParser(EnhancedBaseParser):
         """Извлечение данных вакансии из карточки Habr Career"""
         
         # Извлекаем название и ссылку
-        title_element = None
-        for selector in self.selectors['vacancy_title']:
-            title_element = card.select_one(selector)
-            if title_element:
-                break
+        title_element = self.select_with_fallback(card, self.selectors['vacancy_title'], field='vacancy_title')
         
         if not title_element:
             self.logger.warning(f"Card {card_number}: No title element found")
@@ -143,25 +140,25 @@ class EnhancedHabrParser(EnhancedBaseParser):
             return None
         
         # Извлекаем название компании
-        company = self.extract_with_fallback(card, self.selectors['company_name']) or 'Не указано'
+        company = self.extract_with_fallback(card, self.selectors['company_name'], field='company_name') or 'Не указано'
         
         # Извлекаем зарплату
-        salary_text = self.extract_with_fallback(card, self.selectors['salary']) or ''
+        salary_text = self.extract_with_fallback(card, self.selectors['salary'], field='salary') or ''
         salary_min, salary_max, salary_currency = self._parse_salary(salary_text)
         
         # Извлекаем местоположение и дополнительную информацию
-        location_info = self.extract_multiple_with_fallback(card, self.selectors['location'])
+        location_info = self.extract_multiple_with_fallback(card, self.selectors['location'], field='location')
         location = ', '.join(location_info) if location_info else 'Не указано'
         
         # Извлекаем технологии/навыки
-        tech_stack = self.extract_multiple_with_fallback(card, self.selectors['tags'], limit=10)
+        tech_stack = self.extract_multiple_with_fallback(card, self.selectors['tags'], limit=10, field='tags')
         
         # Извлекаем краткое описание
         description = self.extract_with_fallback(card, [
             '.vacancy-card__description',
             '.vacancy-snippet',
             '.job-snippet'
-        ]) or ''
+        ], field='description') or ''
         
         vacancy_data = {
             'external_id': self._extract_vacancy_id(vacancy_url),
@@ -194,7 +191,7 @@ class EnhancedHabrParser(EnhancedBaseParser):
                 self.logger.error(f"Failed to fetch vacancy details: {vacancy_url}")
                 return self._empty_details()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = make_soup(response.content, 'habr')
             
             # Ищем основной блок с описанием
             full_description = ''
@@ -269,35 +266,9 @@ class EnhancedHabrParser(EnhancedBaseParser):
         return ''
     
     def _parse_salary(self, salary_text: str) -> tuple:
-        """Парсинг зарплаты из текста"""
-        if not salary_text:
-            return None, None, None
-        
-        # Удаляем лишние символы
-        salary_clean = re.sub(r'[^\d\s\-–—руб$€₽]', '', salary_text.lower())
-        
-        # Извлекаем валюту
-        currency = None
-        if 'руб' in salary_text.lower() or '₽' in salary_text:
-            currency = 'RUB'
-        elif '$' in salary_text:
-            currency = 'USD'
-        elif '€' in salary_text:
-            currency = 'EUR'
-        
-        # Извлекаем числа
-        numbers = re.findall(r'\d+', salary_clean.replace(' ', ''))
-        
-        if len(numbers) >= 2:
-            return int(numbers[0]), int(numbers[1]), currency
-        elif len(numbers) == 1:
-            number = int(numbers[0])
-            # Если число очень маленькое, возможно это зарплата в тысячах
-            if number < 1000:
-                number *= 1000
-            return number, None, currency
-        
-        return None, None, currency
+        """Парсинг зарплаты из текста (общая грамматика salary_grammar)"""
+        salary = parse_salary(salary_text)
+        return salary.min, salary.max, salary.currency
     
     def _detect_remote_type(self, location: str) -> Optional[str]:
         """Определение типа удаленной работы"""
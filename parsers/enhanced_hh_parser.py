@@ -3,17 +3,20 @@
 import logging
 from typing import List, Dict, Optional, Any
 from urllib.parse import quote_plus, urljoin
-from bs4 import BeautifulSoup
 
 try:
     from enhanced_base_parser import EnhancedBaseParser
+    from html_backend import make_soup
     from text_formatter import extract_formatted_text, extract_structured_sections, clean_text
+    from salary_grammar import parse_salary
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.dirname(__file__))
     from enhanced_base_parser import EnhancedBaseParser
+    from html_backend import make_soup
     from text_formatter import extract_formatted_text, extract_structured_sections, clean_text
+    from salary_grammar import parse_salary
 
 class EnhancedHHParser(EnhancedBaseParser):
     """
@@ -97,15 +100,13 @@ class EnhancedHHParser(EnhancedBaseParser):
             self.logger.error(f"Failed to fetch search page {page}")
             return []
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = make_soup(response.content, 'hh')
         
         # Ищем карточки вакансий с fallback логикой
-        vacancy_cards = []
-        for selector in self.selectors['vacancy_cards']:
-            vacancy_cards = soup.select(selector)
-            if vacancy_cards:
-                self.logger.info(f"Found {len(vacancy_cards)} vacancies with selector: {selector}")
-                break
+        vacancy_cards = self.select_all_with_fallback(soup, self.selectors['vacancy_cards'], field='vacancy_cards')
+        if vacancy_cards:
+            self.logger.info(f"Found {len(vacancy_cards)} vacancies with selector: "
+                             f"{self._cascade(self.selectors['vacancy_cards'], 'vacancy_cards').last_selector}")
         
         if not vacancy_cards:
             self.logger.warning("No vacancy cards found on the page")
@@ -130,11 +131,7 @@ class EnhancedHHParser(EnhancedBaseParser):
         """Извлечение данных вакансии из карточки с fallback селекторами"""
         
         # Извлекаем название и ссылку
-        title_element = None
-        for selector in self.selectors['vacancy_title']:
-            title_element = card.select_one(selector)
-            if title_element:
-                break
+        title_element = self.select_with_fallback(card, self.selectors['vacancy_title'], field='vacancy_title')
         
         if not title_element:
             self.logger.warning(f"Card {card_number}: No title element found")
@@ -151,14 +148,14 @@ class EnhancedHHParser(EnhancedBaseParser):
             return None
         
         # Извлекаем название компании
-        company = self.extract_with_fallback(card, self.selectors['company_name']) or 'Не указано'
+        company = self.extract_with_fallback(card, self.selectors['company_name'], field='company_name') or 'Не указано'
         
         # Извлекаем зарплату
-        salary_text = self.extract_with_fallback(card, self.selectors['salary']) or ''
+        salary_text = self.extract_with_fallback(card, self.selectors['salary'], field='salary') or ''
         salary_min, salary_max, salary_currency = self._parse_salary(salary_text)
         
         # Извлекаем местоположение
-        location = self.extract_with_fallback(card, self.selectors['location']) or 'Не указано'
+        location = self.extract_with_fallback(card, self.selectors['location'], field='location') or 'Не указано'
         
         # Извлекаем краткое описание (если есть)
         description = self.extract_with_fallback(card, [
@@ -166,7 +163,7 @@ class EnhancedHHParser(EnhancedBaseParser):
             '.serp-item__snippet',
             '.snippet',
             '.vacancy-snippet'
-        ]) or ''
+        ], field='description') or ''
         
         vacancy_data = {
             'external_id': self._extract_vacancy_id(vacancy_url),
@@ -198,7 +195,7 @@ class EnhancedHHParser(EnhancedBaseParser):
                 self.logger.error(f"Failed to fetch vacancy details: {vacancy_url}")
                 return self._empty_details()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = make_soup(response.content, 'hh')
             
             # Ищем основной блок с описанием с сохранением форматирования
             full_description = ''
@@ -234,30 +231,9 @@ class EnhancedHHParser(EnhancedBaseParser):
             return self._empty_details()
     
     def _parse_salary(self, salary_text: str) -> tuple:
-        """Парсинг зарплаты из текста"""
-        if not salary_text:
-            return None, None, None
-        
-        # Удаляем лишние пробелы и приводим к нижнему регистру
-        salary_clean = salary_text.replace('\xa0', ' ').replace(' ', ' ').strip()
-        
-        # Извлекаем валюту
-        currency = None
-        for curr in ['руб', 'rub', '₽', 'usd', '$', 'eur', '€']:
-            if curr in salary_clean.lower():
-                currency = curr
-                break
-        
-        # Извлекаем числа
-        import re
-        numbers = re.findall(r'\d+', salary_clean.replace(' ', ''))
-        
-        if len(numbers) >= 2:
-            return int(numbers[0]), int(numbers[1]), currency
-        elif len(numbers) == 1:
-            return int(numbers[0]), None, currency
-        
-        return None, None, currency
+        """Парсинг зарплаты из текста (общая грамматика salary_grammar)"""
+        salary = parse_salary(salary_text)
+        return salary.min, salary.max, salary.currency
     
     def _extract_vacancy_id(self, url: str) -> str:
         """Извлечение ID вакансии из URL"""
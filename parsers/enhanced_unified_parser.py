@@ -5,7 +5,6 @@ import sqlite3
 import argparse
 import json
 from datetime import datetime
-from pathlib import Path
 from typing import List, Dict, Any, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -13,6 +12,8 @@ try:
     from enhanced_hh_parser import EnhancedHHParser
     from enhanced_habr_parser import EnhancedHabrParser
     from vacancy_filter import VacancyFilter
+    from circuit_breaker import guarded_parse_sync
+    from vacancy_schema import ensure_schema
 except ImportError:
     import sys
     import os
@@ -20,6 +21,8 @@ except ImportError:
     from enhanced_hh_parser import EnhancedHHParser
     from enhanced_habr_parser import EnhancedHabrParser
     from vacancy_filter import VacancyFilter
+    from circuit_breaker import guarded_parse_sync
+    from vacancy_schema import ensure_schema
 
 class EnhancedUnifiedParser:
     """
@@ -60,67 +63,9 @@ class EnhancedUnifiedParser:
         self.init_database()
     
     def init_database(self):
-        """Инициализация базы данных SQLite"""
+        """Инициализация базы данных SQLite: миграции до канонической схемы"""
         try:
-            # Создаем директорию, если не существует
-            db_dir = Path(self.db_path).parent
-            db_dir.mkdir(parents=True, exist_ok=True)
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Создаем таблицу с полной схемой
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS vacancies (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    external_id TEXT,
-                    source TEXT NOT NULL,
-                    url TEXT UNIQUE NOT NULL,
-                    title TEXT NOT NULL,
-                    company TEXT,
-                    location TEXT,
-                    description TEXT,
-                    salary_min INTEGER,
-                    salary_max INTEGER,
-                    salary_currency TEXT,
-                    published_at DATETIME,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    ai_specialization TEXT,
-                    ai_employment TEXT,
-                    ai_experience TEXT,
-                    ai_technologies TEXT,
-                    ai_salary_min INTEGER,
-                    ai_salary_max INTEGER,
-                    ai_remote TEXT,
-                    ai_relevance_score REAL,
-                    ai_summary TEXT,
-                    is_approved BOOLEAN DEFAULT 0,
-                    is_rejected BOOLEAN DEFAULT 0,
-                    moderation_notes TEXT,
-                    moderated_at DATETIME,
-                    moderated_by TEXT,
-                    full_description TEXT,
-                    requirements TEXT,
-                    tasks TEXT,
-                    benefits TEXT,
-                    conditions TEXT,
-                    company_logo TEXT,
-                    company_url TEXT,
-                    employment_type TEXT,
-                    experience_level TEXT,
-                    remote_type TEXT
-                )
-            """)
-            
-            # Создаем индексы для производительности
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_source ON vacancies(source)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_external_id ON vacancies(external_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON vacancies(created_at)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_url ON vacancies(url)")
-            
-            conn.commit()
-            conn.close()
+            ensure_schema(self.db_path)
             
             self.logger.info(f"Database initialized: {self.db_path}")
             
@@ -138,7 +83,13 @@ class EnhancedUnifiedParser:
         
         try:
             self.logger.info(f"Starting {source} parsing...")
-            vacancies = parser.parse_vacancies(query, pages, extract_details)
+            # Открытые (недоступные) источники пропускаются сразу
+            vacancies = guarded_parse_sync(
+                source,
+                lambda pages, extract_details: parser.parse_vacancies(query, pages, extract_details),
+                pages,
+                extract_details
+            )
             
             self.logger.info(f"{source}: found {len(vacancies)} vacancies")
             return vacancies
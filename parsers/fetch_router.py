@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Маршрутизатор уровней загрузки страниц
+
+Уровни (tiers) упорядочены по стоимости: обычный HTTP-запрос дешевле
+модуля обхода, а тот - дешевле браузера. Роутер начинает с самого
+дешевого уровня, который исторически срабатывает для данного источника
+и шаблона URL, и переходит к более дорогим только при неудаче.
+
+Успешность и задержка каждого уровня хранятся в БД мониторинга
+(таблица fetch_tier_stats), поэтому знание переживает перезапуски.
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Any
+from urllib.parse import urlparse
+
+try:
+    from monitoring_system import monitoring_system
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(__file__))
+    try:
+        from monitoring_system import monitoring_system
+    except ImportError:
+        monitoring_system = None
+
+logger = logging.getLogger(__name__)
+
+_NUMBER_RE = re.compile(r'\d+')
+
+
+def url_pattern(url: str) -> str:
+    """
+    Шаблон URL для статистики: хост + путь без query, числа заменены на {id}.
+
+    https://hh.ru/vacancy/123?from=serp -> hh.ru/vacancy/{id}
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = _NUMBER_RE.sub('{id}', parsed.path.rstrip('/')) or '/'
+    return f"{host}{path}"
+
+
+@dataclass
+class FetchTier:
+    """Уровень загрузки: fetch(url) возвращает HTML или None"""
+    name: str
+    cost: float
+    fetch: Callable[[str], Optional[str]]
+
+
+@dataclass
+class FetchResult:
+    """Результат загрузки через роутер"""
+    html: Optional[str]
+    tier: Optional[str]
+    elapsed: float
+    attempts: List[str]
+
+    @property
+    def ok(self) -> bool:
+        return self.html is not None
+
+
+class FetchRouter:
+    """
+    Выбор уровня загрузки по истории успешности.
+
+    Уровень считается неработающим, если по нему набрано не меньше
+    min_samples попыток и (затухающая) доля успехов ниже min_success_rate.
+    Такие уровни пробуются последними, но с вероятностью explore_rate
+    дешевый неработающий уровень проверяется первым - чтобы роутер
+    вернулся на HTTP, когда сайт перестанет его блокировать.
+    """
+
+    def __init__(self, source: str, tiers: List[FetchTier], monitor=None,
+                 min_success_rate: float = 0.5, min_samples: float = 3,
+                 explore_rate: float = 0.05):
+        self.source = source
+        self.tiers = sorted(tiers, key=lambda t: t.cost)
+        self.monitor = monitor if monitor is not None else monitoring_system
+        self.min_success_rate = min_success_rate
+        self.min_samples = min_samples
+        self.explore_rate = explore_rate
+        self.stats = {
+            'requests': 0,
+            'failed': 0,
+            'escalations': 0,
+            'by_tier': {t.name: 0 for t in self.tiers},
+        }
+
+    def _history(self, pattern: str) -> Dict[str, Dict[str, Any]]:
+        if not self.monitor:
+            return {}
+        rows = self.monitor.get_fetch_tier_stats(self.source, pattern)
+        return {row['tier']: row for row in rows}
+
+    def _is_failing(self, history: Dict[str, Dict[str, Any]], tier: FetchTier) -> bool:
+        row = history.get(tier.name)
+        if not row or row['attempts'] < self.min_samples:
+            # Истории нет - уровень считается рабочим, пока не доказано обратное
+            return False
+        return row['success_rate'] < self.min_success_rate
+
+    def plan(self, url: str) -> List[FetchTier]:
+        """Порядок уровней для URL: сначала самые дешевые из работающих"""
+        history = self._history(url_pattern(url))
+        working = [t for t in self.tiers if not self._is_failing(history, t)]
+        failing = [t for t in self.tiers if self._is_failing(history, t)]
+
+        if failing and random.random() < self.explore_rate:
+            # Пробный запрос через дешевый неработающий уровень
+            probe = failing[0]
+            return [probe] + working + failing[1:]
+
+        return working + failing
+
+    def _record(self, pattern: str, tier: FetchTier, success: bool, latency: float):
+        if self.monitor:
+            self.monitor.record_fetch_tier(self.source, pattern, tier.name, success, latency)
+
+    def fetch(self, url: str, accept: Optional[Callable[[str], bool]] = None) -> FetchResult:
+        """
+        Загрузка URL с эскалацией по уровням.
+
+        accept(html) - проверка, что ответ содержит нужные данные (например,
+        карточки вакансий); ответ без них считается неудачей уровня.
+        """
+        pattern = url_pattern(url)
+        started = time.time()
+        attempted = []
+        self.stats['requests'] += 1
+
+        for tier in self.plan(url):
+            attempted.append(tier.name)
+            tier_started = time.time()
+            try:
+                html = tier.fetch(url)
+            except Exception as e:
+                logger.debug(f"[{self.source}] {tier.name}: ошибка загрузки {url}: {e}")
+                html = None
+
+            latency = time.time() - tier_started
+            success = bool(html) and (accept is None or accept(html))
+            self._record(pattern, tier, success, latency)
+
+            if success:
+                self.stats['by_tier'][tier.name] += 1
+                if len(attempted) > 1:
+                    self.stats['escalations'] += 1
+                logger.info(f"[{self.source}] {pattern}: загружено через {tier.name} за {latency:.2f}s")
+                return FetchResult(html, tier.name, time.time() - started, attempted)
+
+            logger.info(f"[{self.source}] {pattern}: уровень {tier.name} не сработал, переходим к следующему")
+
+        self.stats['failed'] += 1
+        return FetchResult(None, None, time.time() - started, attempted)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'history': self.monitor.get_fetch_tier_stats(self.source) if self.monitor else [],
+        }
+
+
+def main():
+    """Тестирование роутера на фиктивных уровнях"""
+    logging.basicConfig(level=logging.INFO)
+
+    def http_fetch(url: str) -> Optional[str]:
+        return None  # сайт блокирует обычные запросы
+
+    def browser_fetch(url: str) -> Optional[str]:
+        return '<div class="job-card">ok</div>'
+
+    router = FetchRouter('router_test', [
+        FetchTier('http', 1, http_fetch),
+        FetchTier('browser', 10, browser_fetch),
+    ])
+
+    for i in range(5):
+        result = router.fetch(f"https://example.com/jobs?page={i}")
+        print(f"Запрос {i + 1}: уровень {result.tier}, попытки {result.attempts}")
+
+    print(router.get_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,11 @@ from typing import List, Dict, Optional, Any
 try:
     from simple_text_formatter import extract_formatted_text, clean_text
     from text_cleaner import clean_vacancy_data
+    from rate_controller import RateLimitedSession, rate_controller
+    from crawl_watermarks import IncrementalCrawl
+    from html_backend import make_soup
+    from embedded_state import extract_vacancies, extract_description_html
+    from vacancy_schema import ensure_schema
 except ImportError:
     # Fallback для случая, когда модуль запускается напрямую
     import sys
@@ -32,6 +37,11 @@ except ImportError:
     sys.path.append(os.path.dirname(__file__))
     from simple_text_formatter import extract_formatted_text, clean_text
     from text_cleaner import clean_vacancy_data
+    from rate_controller import RateLimitedSession, rate_controller
+    from crawl_watermarks import IncrementalCrawl
+    from html_backend import make_soup
+    from embedded_state import extract_vacancies, extract_description_html
+    from vacancy_schema import ensure_schema
 
 
 # Настройка логирования
@@ -79,49 +89,11 @@ class VacancyDatabase:
         self.init_database()
     
     def init_database(self):
-        """Инициализация базы данных и создание таблиц"""
+        """Инициализация базы данных: миграции до канонической схемы"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Создаём таблицу вакансий
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS vacancies (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        external_id TEXT UNIQUE NOT NULL,
-                        source TEXT NOT NULL DEFAULT 'geekjob',
-                        url TEXT NOT NULL,
-                        title TEXT NOT NULL,
-                        company TEXT,
-                        salary TEXT,
-                        location TEXT,
-                        description TEXT,
-                        full_description TEXT,
-                        requirements TEXT,
-                        tasks TEXT,
-                        benefits TEXT,
-                        conditions TEXT,
-                        employment_type TEXT,
-                        experience_level TEXT,
-                        remote_type TEXT,
-                        company_logo TEXT,
-                        company_url TEXT,
-                        published_at DATETIME,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        status TEXT DEFAULT 'pending'
-                    )
-                """)
-                
-                # Создаём индексы для оптимизации
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_external_id ON vacancies(external_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_source ON vacancies(source)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON vacancies(created_at)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_status ON vacancies(status)")
-                
-                conn.commit()
-                logging.info(f"✅ База данных инициализирована: {self.db_path}")
-                
+            ensure_schema(self.db_path)
+            logging.info(f"✅ База данных инициализирована: {self.db_path}")
+            
         except sqlite3.Error as e:
             logging.error(f"❌ Ошибка инициализации базы данных: {e}")
             raise
@@ -339,12 +311,15 @@ class GeekjobParser:
     def __init__(self, db_path: str = "geekjob_vacancies.db", delay: float = 1.0, timeout: int = 30):
         self.db = VacancyDatabase(db_path)
         self.delay = delay
+        # delay задает начальную частоту хоста; дальше ее подбирает rate_controller
+        if delay > 0:
+            rate_controller.configure_host('https://geekjob.ru', 1 / delay)
         self.timeout = timeout
         self.session = self._create_session()
         
     def _create_session(self) -> requests.Session:
         """Создание HTTP сессии с настройками"""
-        session = requests.Session()
+        session = RateLimitedSession()
         session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -374,6 +349,17 @@ class GeekjobParser:
             return url.split('/vacancy/')[-1].split('?')[0].split('/')[0]
         return url.split('/')[-1].split('?')[0]
     
+    def _relevant_state_vacancies(self, vacancies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Фильтр релевантности для карточек из встроенного состояния"""
+        relevant = []
+        for vacancy in vacancies:
+            if vacancy['title'] and self.is_relevant_vacancy(vacancy['title'], vacancy['description']):
+                relevant.append(vacancy)
+                logging.info(f"✅ Релевантная вакансия: {vacancy['title']}")
+            else:
+                logging.debug(f"❌ Не релевантная вакансия: {vacancy['title']}")
+        return relevant
+    
     def parse_vacancy_list_page(self, query: str, page: int = 1) -> List[Dict[str, Any]]:
         """Парсинг страницы со списком вакансий"""
         url = f"https://geekjob.ru/vacancies?q={quote(query)}&page={page}"
@@ -384,7 +370,13 @@ class GeekjobParser:
             response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Быстрый путь: карточки из встроенного состояния страницы
+            state_vacancies = extract_vacancies(response.content, 'geekjob')
+            if state_vacancies:
+                logging.info(f"✅ Найдено {len(state_vacancies)} вакансий во встроенном состоянии страницы")
+                return self._relevant_state_vacancies(state_vacancies)
+            
+            soup = make_soup(response.content, 'geekjob')
             
             # Ищем ссылки на вакансии
             vacancy_links = soup.find_all('a', href=lambda x: x and '/vacancy/' in x)
@@ -469,7 +461,19 @@ class GeekjobParser:
             response = self.session.get(vacancy_url, timeout=self.timeout)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Быстрый путь: описание из встроенного состояния, разбираем только его фрагмент
+            description_html = extract_description_html(response.content, 'geekjob')
+            if description_html:
+                fragment = BeautifulSoup(description_html, 'html.parser')
+                return {
+                    'full_description': clean_text(extract_formatted_text(fragment)) or 'Описание не найдено',
+                    'requirements': '',
+                    'tasks': '',
+                    'benefits': '',
+                    'conditions': ''
+                }
+            
+            soup = make_soup(response.content, 'geekjob')
             
             # Ищем основной блок с описанием
             description_selectors = [
@@ -572,12 +576,14 @@ class GeekjobParser:
                 'conditions': ''
             }
     
-    def parse_vacancies(self, query: str = 'дизайнер', pages: int = 10, extract_details: bool = True) -> List[Dict[str, Any]]:
+    def parse_vacancies(self, query: str = 'дизайнер', pages: int = 10, extract_details: bool = True, incremental: bool = False) -> List[Dict[str, Any]]:
         """Основной метод парсинга вакансий"""
         logging.info(f"🚀 Начинаем парсинг Geekjob.ru")
         logging.info(f"🔍 Запрос: '{query}', страниц: {pages}, детали: {extract_details}")
         
         all_vacancies = []
+        # Инкрементальный режим: только новые вакансии, остановка на известных
+        crawl = IncrementalCrawl('geekjob', query, enabled=incremental)
         
         for page in range(1, pages + 1):
             try:
@@ -588,6 +594,8 @@ class GeekjobParser:
                     logging.warning(f"⚠️ На странице {page} не найдено релевантных вакансий")
                     continue
                 
+                page_vacancies = crawl.check_page(page_vacancies)
+                
                 # Извлекаем детали для каждой вакансии
                 for vacancy in page_vacancies:
                     try:
@@ -608,25 +616,21 @@ class GeekjobParser:
                         # Сохраняем в базу данных
                         self.db.save_vacancy(vacancy)
                         
-                        # Задержка между запросами
-                        if extract_details:
-                            time.sleep(self.delay)
-                        
                     except Exception as e:
                         logging.error(f"❌ Ошибка обработки вакансии: {e}")
                         continue
                 
                 logging.info(f"📊 Страница {page}: найдено {len(page_vacancies)} вакансий")
                 
-                # Задержка между страницами
-                time.sleep(self.delay)
+                if crawl.stop:
+                    break
                 
             except Exception as e:
                 logging.error(f"❌ Ошибка парсинга страницы {page}: {e}")
                 continue
         
         logging.info(f"🎯 Парсинг завершён. Всего обработано: {len(all_vacancies)} вакансий")
-        return all_vacancies
+        return crawl.finish(all_vacancies)
     
     def export_to_json(self, filename: str = 'geekjob_vacancies.json'):
         """Экспорт вакансий в JSON"""
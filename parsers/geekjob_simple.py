@@ -15,13 +15,26 @@ import argparse
 import requests
 from datetime import datetime
 from urllib.parse import urljoin, quote
-from bs4 import BeautifulSoup
 from typing import List, Dict, Optional, Any
 try:
     from browser_fetch import get_html
 except Exception:
     get_html = None
 
+try:
+    from rate_controller import RateLimitedSession
+    from crawl_watermarks import IncrementalCrawl
+    from html_backend import make_soup
+    from embedded_state import extract_vacancies
+    from vacancy_schema import ensure_schema
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    from rate_controller import RateLimitedSession
+    from crawl_watermarks import IncrementalCrawl
+    from html_backend import make_soup
+    from embedded_state import extract_vacancies
+    from vacancy_schema import ensure_schema
+
 
 def setup_logging(verbose: bool = False, log_file: str = "geekjob_parser.log"):
     """Настройка системы логирования"""
@@ -62,47 +75,11 @@ class VacancyDatabase:
         self.init_database()
     
     def init_database(self):
-        """Инициализация базы данных и создание таблиц"""
+        """Инициализация базы данных: миграции до канонической схемы"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS vacancies (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        external_id TEXT UNIQUE NOT NULL,
-                        source TEXT NOT NULL DEFAULT 'geekjob',
-                        url TEXT NOT NULL,
-                        title TEXT NOT NULL,
-                        company TEXT,
-                        salary TEXT,
-                        location TEXT,
-                        description TEXT,
-                        full_description TEXT,
-                        requirements TEXT,
-                        tasks TEXT,
-                        benefits TEXT,
-                        conditions TEXT,
-                        employment_type TEXT,
-                        experience_level TEXT,
-                        remote_type TEXT,
-                        company_logo TEXT,
-                        company_url TEXT,
-                        published_at DATETIME,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        status TEXT DEFAULT 'pending'
-                    )
-                """)
-                
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_external_id ON vacancies(external_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_source ON vacancies(source)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON vacancies(created_at)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_status ON vacancies(status)")
-                
-                conn.commit()
-                logging.info(f"База данных инициализирована: {self.db_path}")
-                
+            ensure_schema(self.db_path)
+            logging.info(f"База данных инициализирована: {self.db_path}")
+            
         except sqlite3.Error as e:
             logging.error(f"Ошибка инициализации базы данных: {e}")
             raise
@@ -179,7 +156,7 @@ class GeekjobParser:
         
     def _create_session(self) -> requests.Session:
         """Создание HTTP сессии с настройками"""
-        session = requests.Session()
+        session = RateLimitedSession()
         session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -199,6 +176,17 @@ class GeekjobParser:
             return url.split('/vacancy/')[-1].split('?')[0].split('/')[0]
         return url.split('/')[-1].split('?')[0]
     
+    def _relevant_state_vacancies(self, vacancies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Фильтр релевантности для карточек из встроенного состояния"""
+        relevant = []
+        for vacancy in vacancies:
+            if vacancy['title'] and self.is_relevant_vacancy(vacancy['title'], vacancy['description']):
+                relevant.append(vacancy)
+                logging.info(f"Релевантная вакансия: {vacancy['title']}")
+            else:
+                logging.debug(f"Не релевантная вакансия: {vacancy['title']}")
+        return relevant
+    
     def parse_vacancy_list_page(self, query: str, page: int = 1) -> List[Dict[str, Any]]:
         """Парсинг страницы со списком вакансий"""
         url = f"https://geekjob.ru/vacancies?q={quote(query)}&page={page}"
@@ -209,15 +197,21 @@ class GeekjobParser:
             response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Быстрый путь: карточки из встроенного состояния страницы
+            state_vacancies = extract_vacancies(response.content, 'geekjob')
+            if state_vacancies:
+                logging.info(f"Найдено {len(state_vacancies)} вакансий во встроенном состоянии страницы")
+                return self._relevant_state_vacancies(state_vacancies)
+            
+            soup = make_soup(response.content, 'geekjob')
             
             # Ищем ссылки на вакансии
             vacancy_links = soup.find_all('a', href=lambda x: x and '/vacancy/' in x)
             
             if not vacancy_links and get_html:
-                html2 = get_html(url, timeout_ms=self.timeout * 1000, wait_selector='a[href*="/vacancy/"]')
+                html2 = get_html(url, timeout_ms=self.timeout * 1000, wait_selector='a[href*="/vacancy/"]', source='geekjob')
                 if html2:
-                    soup = BeautifulSoup(html2, 'html.parser')
+                    soup = make_soup(html2, 'geekjob')
                     vacancy_links = soup.find_all('a', href=lambda x: x and '/vacancy/' in x)
             if not vacancy_links:
                 logging.warning(f"На странице {page} не найдено ссылок на вакансии")
@@ -291,12 +285,14 @@ class GeekjobParser:
             logging.error(f"Ошибка парсинга страницы {page}: {e}")
             return []
     
-    def parse_vacancies(self, query: str = 'дизайнер', pages: int = 10, extract_details: bool = False) -> List[Dict[str, Any]]:
+    def parse_vacancies(self, query: str = 'дизайнер', pages: int = 10, extract_details: bool = False, incremental: bool = False) -> List[Dict[str, Any]]:
         """Основной метод парсинга вакансий"""
         logging.info(f"Начинаем парсинг Geekjob.ru")
         logging.info(f"Запрос: '{query}', страниц: {pages}")
         
         all_vacancies = []
+        # Инкрементальный режим: только новые вакансии, остановка на известных
+        crawl = IncrementalCrawl('geekjob', query, enabled=incremental)
         
         for page in range(1, pages + 1):
             try:
@@ -306,6 +302,8 @@ class GeekjobParser:
                     logging.warning(f"На странице {page} не найдено релевантных вакансий")
                     continue
                 
+                page_vacancies = crawl.check_page(page_vacancies)
+                
                 for vacancy in page_vacancies:
                     try:
                         vacancy['source'] = 'geekjob'
@@ -320,14 +318,16 @@ class GeekjobParser:
                         continue
                 
                 logging.info(f"Страница {page}: найдено {len(page_vacancies)} вакансий")
-                time.sleep(self.delay)
+                
+                if crawl.stop:
+                    break
                 
             except Exception as e:
                 logging.error(f"Ошибка парсинга страницы {page}: {e}")
                 continue
         
         logging.info(f"Парсинг завершён. Всего обработано: {len(all_vacancies)} вакансий")
-        return all_vacancies
+        return crawl.finish(all_vacancies)
 
 
 def main():
@@ -20,6 +20,12 @@ from typing import List, Dict, Optional, Any
 try:
     from simple_text_formatter import extract_formatted_text, clean_text
     from text_cleaner import clean_vacancy_data
+    from rate_controller import RateLimitedSession, rate_controller
+    from crawl_watermarks import IncrementalCrawl
+    from html_backend import make_soup
+    from subtree_parser import parse_subtrees
+    from selector_cascade import get_cascade
+    from embedded_state import extract_vacancies, extract_description_html
 except ImportError:
     # Fallback для случая, когда модуль запускается напрямую
     import sys
@@ -27,6 +33,64 @@ except ImportError:
     sys.path.append(os.path.dirname(__file__))
     from simple_text_formatter import extract_formatted_text, clean_text
     from text_cleaner import clean_vacancy_data
+    from rate_controller import RateLimitedSession, rate_controller
+    from crawl_watermarks import IncrementalCrawl
+    from html_backend import make_soup
+    from subtree_parser import parse_subtrees
+    from selector_cascade import get_cascade
+    from embedded_state import extract_vacancies, extract_description_html
+
+
+# Каскады селекторов выдачи: компилируются один раз, пробуются в порядке приоритета
+GETMATCH_CARD = get_cascade('getmatch', 'card', [
+    'div.vacancy-card',
+    'div.job-card',
+    'article.vacancy-item',
+    'div[data-testid="vacancy-card"]',
+    'div.card'
+])
+GETMATCH_TITLE = get_cascade('getmatch', 'title', [
+    'a.vacancy-title',
+    'h3 a[href*="/vacancies/"]',
+    'h2 a[href*="/vacancies/"]',
+    'a[href*="/vacancies/"]',
+    'a[href*="/job/"]'
+])
+GETMATCH_COMPANY = get_cascade('getmatch', 'company', [
+    '.company-name',
+    '.vacancy-company',
+    '.job-company',
+    'a[href*="/companies/"]',
+    '.employer'
+])
+GETMATCH_SALARY = get_cascade('getmatch', 'salary', [
+    '.salary',
+    '.vacancy-salary',
+    '.job-salary',
+    '[data-testid="salary"]'
+])
+GETMATCH_SNIPPET = get_cascade('getmatch', 'snippet', [
+    '.vacancy-description',
+    '.job-description',
+    '.description',
+    '.snippet',
+    '.vacancy-snippet'
+])
+GETMATCH_DESCRIPTION = get_cascade('getmatch', 'description', [
+    '.vacancy-description',
+    '.job-description',
+    '.description',
+    '.vacancy-content',
+    '.job-content',
+    '.content',
+    '.main-content'
+])
+GETMATCH_LOCATION = get_cascade('getmatch', 'location', [
+    '.location',
+    '.vacancy-location',
+    '.job-location',
+    '[data-testid="location"]'
+])
 
 
 class GetMatchParser:
@@ -138,12 +202,15 @@ class GetMatchParser:
     
     def __init__(self, delay: float = 1.0, timeout: int = 30):
         self.delay = delay
+        # delay задает начальную частоту хоста; дальше ее подбирает rate_controller
+        if delay > 0:
+            rate_controller.configure_host('https://getmatch.ru', 1 / delay)
         self.timeout = timeout
         self.session = self._create_session()
         
     def _create_session(self) -> requests.Session:
         """Создание HTTP сессии с настройками"""
-        session = requests.Session()
+        session = RateLimitedSession()
         session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -175,6 +242,17 @@ class GetMatchParser:
             return url.split('/job/')[-1].split('?')[0].split('/')[0]
         return url.split('/')[-1].split('?')[0]
     
+    def _relevant_state_vacancies(self, vacancies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Фильтр релевантности для карточек из встроенного состояния"""
+        relevant = []
+        for vacancy in vacancies:
+            if vacancy['title'] and self.is_relevant_vacancy(vacancy['title']):
+                relevant.append(vacancy)
+                logging.info(f"Найдена релевантная вакансия: {vacancy['title']} - {vacancy['company']}")
+            else:
+                logging.debug(f"Не релевантная вакансия: {vacancy['title']}")
+        return relevant
+    
     def parse_vacancy_list_page(self, query: str, page: int = 1) -> List[Dict[str, Any]]:
         """Парсинг страницы со списком вакансий GetMatch"""
         # GetMatch использует параметры для фильтрации по дизайну
@@ -186,23 +264,18 @@ class GetMatchParser:
             response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Быстрый путь: карточки из встроенного состояния страницы
+            state_vacancies = extract_vacancies(response.content, 'getmatch')
+            if state_vacancies:
+                logging.info(f"Найдено {len(state_vacancies)} вакансий во встроенном состоянии страницы")
+                return self._relevant_state_vacancies(state_vacancies)
             
-            # Ищем вакансии по различным селекторам
-            vacancy_selectors = [
-                'div.vacancy-card',
-                'div.job-card',
-                'article.vacancy-item',
-                'div[data-testid="vacancy-card"]',
-                'div.card'
-            ]
+            soup = make_soup(response.content, 'getmatch')
             
-            vacancies_found = []
-            for selector in vacancy_selectors:
-                vacancies_found = soup.select(selector)
-                if vacancies_found:
-                    logging.info(f"Найдено {len(vacancies_found)} вакансий через селектор: {selector}")
-                    break
+            # Ищем вакансии по различным селекторам
+            vacancies_found = GETMATCH_CARD.select(soup)
+            if vacancies_found:
+                logging.info(f"Найдено {len(vacancies_found)} вакансий через селектор: {GETMATCH_CARD.last_selector}")
             
             if not vacancies_found:
                 # Попробуем найти ссылки на вакансии
@@ -226,19 +299,7 @@ class GetMatchParser:
             for vacancy_elem in vacancies_found:
                 try:
                     # Ищем ссылку на вакансию
-                    title_selectors = [
-                        'a.vacancy-title',
-                        'h3 a[href*="/vacancies/"]',
-                        'h2 a[href*="/vacancies/"]',
-                        'a[href*="/vacancies/"]',
-                        'a[href*="/job/"]'
-                    ]
-                    
-                    title_elem = None
-                    for title_selector in title_selectors:
-                        title_elem = vacancy_elem.select_one(title_selector)
-                        if title_elem:
-                            break
+                    title_elem = GETMATCH_TITLE.select_one(vacancy_elem)
                     
                     if not title_elem:
                         # Ищем любую ссылку с текстом
@@ -274,20 +335,7 @@ class GetMatchParser:
                     vacancy_id = self.extract_vacancy_id(full_url)
                     
                     # Извлекаем компанию
-                    company_selectors = [
-                        '.company-name',
-                        '.vacancy-company',
-                        '.job-company',
-                        'a[href*="/companies/"]',
-                        '.employer'
-                    ]
-                    
-                    company = 'Компания не указана'
-                    for company_selector in company_selectors:
-                        company_elem = vacancy_elem.select_one(company_selector)
-                        if company_elem:
-                            company = company_elem.get_text(strip=True)
-                            break
+                    company = GETMATCH_COMPANY.text(vacancy_elem, 'Компания не указана')
                     
                     # Если не нашли через селекторы, ищем в тексте
                     if company == 'Компания не указана':
@@ -305,19 +353,7 @@ class GetMatchParser:
                                 break
                     
                     # Извлекаем зарплату
-                    salary_selectors = [
-                        '.salary',
-                        '.vacancy-salary',
-                        '.job-salary',
-                        '[data-testid="salary"]'
-                    ]
-                    
-                    salary = 'Не указана'
-                    for salary_selector in salary_selectors:
-                        salary_elem = vacancy_elem.select_one(salary_selector)
-                        if salary_elem:
-                            salary = salary_elem.get_text(strip=True)
-                            break
+                    salary = GETMATCH_SALARY.text(vacancy_elem, 'Не указана')
                     
                     # Если не нашли через селекторы, ищем в тексте
                     if salary == 'Не указана':
@@ -329,20 +365,7 @@ class GetMatchParser:
                                 salary = salary_match.group(0).strip()
                     
                     # Извлекаем краткое описание
-                    description_selectors = [
-                        '.vacancy-description',
-                        '.job-description',
-                        '.description',
-                        '.snippet',
-                        '.vacancy-snippet'
-                    ]
-                    
-                    description = ''
-                    for desc_selector in description_selectors:
-                        desc_elem = vacancy_elem.select_one(desc_selector)
-                        if desc_elem:
-                            description = desc_elem.get_text(strip=True)
-                            break
+                    description = GETMATCH_SNIPPET.text(vacancy_elem)
                     
                     # Если не нашли описание, берём длинный текст из элемента
                     if not description:
@@ -359,19 +382,7 @@ class GetMatchParser:
                                 break
                     
                     # Извлекаем локацию
-                    location_selectors = [
-                        '.location',
-                        '.vacancy-location',
-                        '.job-location',
-                        '[data-testid="location"]'
-                    ]
-                    
-                    location = ''
-                    for location_selector in location_selectors:
-                        location_elem = vacancy_elem.select_one(location_selector)
-                        if location_elem:
-                            location = location_elem.get_text(strip=True)
-                            break
+                    location = GETMATCH_LOCATION.text(vacancy_elem)
                     
                     # Если не нашли локацию, ищем в тексте
                     if not location:
@@ -417,27 +428,26 @@ class GetMatchParser:
             response = self.session.get(vacancy_url, timeout=self.timeout)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Ищем основной блок с описанием
-            description_selectors = [
-                '.vacancy-description',
-                '.job-description',
-                '.description',
-                '.vacancy-content',
-                '.job-content',
-                '.content',
-                '.main-content'
-            ]
+            # Быстрый путь: описание из встроенного состояния, разбираем только его фрагмент
+            description_html = extract_description_html(response.content, 'getmatch')
+            if description_html:
+                fragment = BeautifulSoup(description_html, 'html.parser')
+                return {
+                    'full_description': clean_text(extract_formatted_text(fragment)) or 'Описание не найдено',
+                    'requirements': '',
+                    'tasks': '',
+                    'benefits': '',
+                    'conditions': ''
+                }
             
-            description_element = None
+            # Дерево строится только из блоков описания; без них - вся страница
+            soup = parse_subtrees(response.content, GETMATCH_DESCRIPTION.selectors, 'getmatch') \
+                or make_soup(response.content, 'getmatch')
             
-            for selector in description_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    description_element = element
-                    logging.debug(f"Найден блок описания через селектор {selector}")
-                    break
+            # Ищем основной блок с описанием
+            description_element = GETMATCH_DESCRIPTION.select_one(soup)
+            if description_element:
+                logging.debug(f"Найден блок описания через селектор {GETMATCH_DESCRIPTION.last_selector}")
             
             # Если не нашли через селекторы, берём основной контент страницы
             if not description_element:
@@ -484,12 +494,14 @@ class GetMatchParser:
                 'conditions': 'Условия не указаны'
             }
     
-    def parse_vacancies(self, query: str = 'дизайнер', pages: int = 3, extract_details: bool = True) -> List[Dict[str, Any]]:
+    def parse_vacancies(self, query: str = 'дизайнер', pages: int = 3, extract_details: bool = True, incremental: bool = False) -> List[Dict[str, Any]]:
         """Основной метод парсинга вакансий GetMatch"""
         logging.info(f"Начинаем парсинг GetMatch")
         logging.info(f"Запрос: '{query}', страниц: {pages}, детали: {extract_details}")
         
         all_vacancies = []
+        # Инкрементальный режим: только новые вакансии, остановка на известных
+        crawl = IncrementalCrawl('getmatch', query, enabled=incremental)
         
         for page in range(1, pages + 1):
             try:
@@ -500,6 +512,8 @@ class GetMatchParser:
                     logging.warning(f"На странице {page} не найдено релевантных вакансий")
                     continue
                 
+                page_vacancies = crawl.check_page(page_vacancies)
+                
                 # Извлекаем детали для каждой вакансии
                 for vacancy in page_vacancies:
                     try:
@@ -513,25 +527,21 @@ class GetMatchParser:
                         
                         all_vacancies.append(vacancy)
                         
-                        # Задержка между запросами деталей
-                        if extract_details:
-                            time.sleep(self.delay)
-                        
                     except Exception as e:
                         logging.error(f"Ошибка обработки вакансии: {e}")
                         continue
                 
                 logging.info(f"Страница {page}: найдено {len(page_vacancies)} вакансий")
                 
-                # Задержка между страницами
-                time.sleep(self.delay)
+                if crawl.stop:
+                    break
                 
             except Exception as e:
                 logging.error(f"Ошибка парсинга страницы {page}: {e}")
                 continue
         
         logging.info(f"GetMatch парсинг завершён. Всего обработано: {len(all_vacancies)} вакансий")
-        return all_vacancies
+        return crawl.finish(all_vacancies)
 
 
 def main():
@@ -21,6 +21,12 @@ try:
     from simple_text_formatter import extract_formatted_text, clean_text
     from anti_detection_system import AntiDetectionSystem, RequestMethod
     from text_cleaner import clean_vacancy_data, clean_text as clean_text_spacing
+    from rate_controller import RateLimitedSession, rate_controller
+    from crawl_watermarks import IncrementalCrawl
+    from html_backend import make_soup
+    from subtree_parser import parse_subtrees
+    from selector_cascade import get_cascade
+    from embedded_state import extract_vacancies, extract_description_html
 except ImportError:
     # Fallback для случая, когда модуль запускается напрямую
     import sys
@@ -29,6 +35,59 @@ except ImportError:
     from simple_text_formatter import extract_formatted_text, clean_text
     from anti_detection_system import AntiDetectionSystem, RequestMethod
     from text_cleaner import clean_vacancy_data, clean_text as clean_text_spacing
+    from rate_controller import RateLimitedSession, rate_controller
+    from crawl_watermarks import IncrementalCrawl
+    from html_backend import make_soup
+    from subtree_parser import parse_subtrees
+    from selector_cascade import get_cascade
+    from embedded_state import extract_vacancies, extract_description_html
+
+
+# Каскады селекторов выдачи: компилируются один раз, пробуются в порядке приоритета
+HABR_CARD = get_cascade('habr', 'card', [
+    'div.vacancy-card',
+    'article.vacancy-card',
+    'div.job-card',
+    'div[data-testid="vacancy-card"]',
+    'div.vacancy-item'
+])
+HABR_TITLE = get_cascade('habr', 'title', [
+    'a.vacancy-card__title-link',
+    'h3 a[href*="/vacancies/"]',
+    'h2 a[href*="/vacancies/"]',
+    'a[href*="/vacancies/"]'
+])
+HABR_COMPANY = get_cascade('habr', 'company', [
+    'a.vacancy-card__company-title',
+    '.company-name',
+    '.vacancy-company',
+    'a[href*="/companies/"]'
+])
+HABR_SALARY = get_cascade('habr', 'salary', [
+    '.vacancy-card__salary',
+    '.salary',
+    '.vacancy-salary',
+    '[data-testid="salary"]'
+])
+HABR_SNIPPET = get_cascade('habr', 'snippet', [
+    '.vacancy-card__description',
+    '.vacancy-card__snippet',
+    '.description',
+    '.snippet'
+])
+HABR_DESCRIPTION = get_cascade('habr', 'description', [
+    '.basic-section--appearance-vacancy-description',
+    '.vacancy-description',
+    '.job-description',
+    '.basic-section',
+    '.content'
+])
+HABR_LOCATION = get_cascade('habr', 'location', [
+    '.vacancy-card__meta',
+    '.location',
+    '.vacancy-location',
+    '[data-testid="location"]'
+])
 
 
 class HabrParser:
@@ -60,6 +119,9 @@ class HabrParser:
     
     def __init__(self, delay: float = 1.0, timeout: int = 30, use_anti_detection: bool = True):
         self.delay = delay
+        # delay задает начальную частоту хоста; дальше ее подбирает rate_controller
+        if delay > 0:
+            rate_controller.configure_host('https://career.habr.com', 1 / delay)
         self.timeout = timeout
         self.use_anti_detection = use_anti_detection
         
@@ -72,7 +134,7 @@ class HabrParser:
         
     def _create_session(self) -> requests.Session:
         """Создание HTTP сессии с настройками"""
-        session = requests.Session()
+        session = RateLimitedSession()
         session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -83,8 +145,8 @@ class HabrParser:
         })
         return session
     
-    async def _make_request(self, url: str, method: str = 'requests') -> Optional[BeautifulSoup]:
-        """Универсальный метод выполнения запроса с обходом блокировок"""
+    async def _fetch_content(self, url: str, method: str = 'requests') -> Optional[Any]:
+        """Универсальный метод выполнения запроса с обходом блокировок (сырой ответ)"""
         if self.use_anti_detection and self.anti_detection:
             # Используем систему обхода блокировок
             request_method = RequestMethod.PLAYWRIGHT if method == 'playwright' else RequestMethod.REQUESTS
@@ -93,7 +155,7 @@ class HabrParser:
             
             if success:
                 logging.debug(f"✅ Успешный запрос к {url} через {info.get('method', 'unknown')}")
-                return BeautifulSoup(content, 'html.parser')
+                return content
             else:
                 logging.warning(f"❌ Не удалось выполнить запрос к {url}")
                 return None
@@ -103,11 +165,16 @@ class HabrParser:
                 response = self.session.get(url, timeout=self.timeout)
                 response.raise_for_status()
                 logging.debug(f"✅ Успешный запрос к {url} через requests")
-                return BeautifulSoup(response.content, 'html.parser')
+                return response.content
             except Exception as e:
                 logging.error(f"❌ Ошибка запроса к {url}: {e}")
                 return None
     
+    async def _make_request(self, url: str, method: str = 'requests') -> Optional[BeautifulSoup]:
+        """Запрос с разбором страницы в BeautifulSoup"""
+        content = await self._fetch_content(url, method)
+        return make_soup(content, 'habr') if content else None
+    
     def is_relevant_vacancy(self, title: str, description: str = '') -> bool:
         """Проверка релевантности вакансии для дизайнеров"""
         text = f"{title} {description}".lower()
@@ -127,6 +194,43 @@ class HabrParser:
             return url.split('/vacancies/')[-1].split('?')[0].split('/')[0]
         return url.split('/')[-1].split('?')[0]
     
+    def _relevant_state_vacancies(self, vacancies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Фильтр релевантности для карточек из встроенного состояния"""
+        relevant = []
+        for vacancy in vacancies:
+            if vacancy['title'] and self.is_relevant_vacancy(vacancy['title'], vacancy['description']):
+                relevant.append(vacancy)
+                logging.info(f"Найдена релевантная вакансия: {vacancy['title']} - {vacancy['company']}")
+            else:
+                logging.debug(f"Не релевантная вакансия: {vacancy['title']}")
+        return relevant
+    
+    def _structured_vacancies(self, rows: List[Dict[str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """Карточки из browser_fetch.get_structured -> словари вакансий, как у селекторного пути"""
+        vacancies = []
+        processed_urls = set()
+        for row in rows:
+            if not row.get('title') or not row.get('url'):
+                continue
+            full_url = urljoin('https://career.habr.com', row['url'])
+            if full_url in processed_urls:
+                continue
+            processed_urls.add(full_url)
+            location = row.get('location') or ''
+            if not any(city in location.lower() for city in ['москва', 'спб', 'санкт-петербург', 'удаленно', 'remote']):
+                location = ''
+            vacancies.append({
+                'external_id': f"habr-{self.extract_vacancy_id(full_url)}",
+                'url': full_url,
+                'title': row['title'],
+                'company': row.get('company') or 'Компания не указана',
+                'salary': row.get('salary') or 'Не указана',
+                'location': location,
+                'description': row.get('description') or '',
+                'source': 'habr'
+            })
+        return vacancies
+    
     async def parse_vacancy_list_page(self, query: str, page: int = 1) -> List[Dict[str, Any]]:
         """Парсинг страницы со списком вакансий Habr Career"""
         url = f"https://career.habr.com/vacancies?q={quote(query)}&page={page}&type=all"
@@ -134,42 +238,35 @@ class HabrParser:
         try:
             logging.info(f"Парсинг Habr Career страницы {page}: {url}")
             
-            soup = await self._make_request(url)
-            if not soup:
+            content = await self._fetch_content(url)
+            if not content:
                 logging.error(f"❌ Не удалось получить страницу {url}")
                 return []
             
-            # Ищем вакансии по различным селекторам
-            vacancy_selectors = [
-                'div.vacancy-card',
-                'article.vacancy-card',
-                'div.job-card',
-                'div[data-testid="vacancy-card"]',
-                'div.vacancy-item'
-            ]
+            # Быстрый путь: карточки из встроенного состояния страницы
+            state_vacancies = extract_vacancies(content, 'habr')
+            if state_vacancies:
+                logging.info(f"Найдено {len(state_vacancies)} вакансий во встроенном состоянии страницы")
+                return self._relevant_state_vacancies(state_vacancies)
             
-            vacancies_found = []
-            for selector in vacancy_selectors:
-                vacancies_found = soup.select(selector)
-                if vacancies_found:
-                    logging.info(f"Найдено {len(vacancies_found)} вакансий через селектор: {selector}")
-                    break
+            soup = make_soup(content, 'habr')
+            
+            # Ищем вакансии по различным селекторам
+            vacancies_found = HABR_CARD.select(soup)
+            if vacancies_found:
+                logging.info(f"Найдено {len(vacancies_found)} вакансий через селектор: {HABR_CARD.last_selector}")
             
             if not vacancies_found:
-                # Fallback на Playwright напрямую, если стандартный способ не помог
+                # Fallback на Playwright: карточки извлекаются в браузере одним evaluate
+                # (HABR_LIST_SPEC), без сериализации DOM и повторного разбора в Python
                 try:
-                    from browser_fetch import get_html
-                    html2 = get_html(url, timeout_ms=self.timeout * 1000, wait_selector='div.vacancy-card, article.vacancy-card, a[href*="/vacancies/"]')
-                    if html2:
-                        from bs4 import BeautifulSoup as _BS
-                        soup = _BS(html2, 'html.parser')
-                        for selector in vacancy_selectors:
-                            vacancies_found = soup.select(selector)
-                            if vacancies_found:
-                                logging.info(f"(PW) Найдено {len(vacancies_found)} вакансий через селектор: {selector}")
-                                break
-                except Exception:
-                    pass
+                    from browser_fetch import get_structured
+                    rows = get_structured(url, kind='list', timeout_ms=self.timeout * 1000, source='habr')
+                    if rows:
+                        logging.info(f"(PW) Найдено {len(rows)} карточек вакансий")
+                        return self._relevant_state_vacancies(self._structured_vacancies(rows))
+                except Exception as e:
+                    logging.debug(f"Playwright fallback для {url} не удался: {e}")
             
             if not vacancies_found:
                 # Попробуем найти ссылки на вакансии
@@ -193,18 +290,7 @@ class HabrParser:
             for vacancy_elem in vacancies_found:
                 try:
                     # Ищем ссылку на вакансию
-                    title_selectors = [
-                        'a.vacancy-card__title-link',
-                        'h3 a[href*="/vacancies/"]',
-                        'h2 a[href*="/vacancies/"]',
-                        'a[href*="/vacancies/"]'
-                    ]
-                    
-                    title_elem = None
-                    for title_selector in title_selectors:
-                        title_elem = vacancy_elem.select_one(title_selector)
-                        if title_elem:
-                            break
+                    title_elem = HABR_TITLE.select_one(vacancy_elem)
                     
                     if not title_elem:
                         continue
@@ -231,67 +317,22 @@ class HabrParser:
                     vacancy_id = self.extract_vacancy_id(full_url)
                     
                     # Извлекаем компанию
-                    company_selectors = [
-                        'a.vacancy-card__company-title',
-                        '.company-name',
-                        '.vacancy-company',
-                        'a[href*="/companies/"]'
-                    ]
-                    
-                    company = 'Компания не указана'
-                    for company_selector in company_selectors:
-                        company_elem = vacancy_elem.select_one(company_selector)
-                        if company_elem:
-                            company = company_elem.get_text(strip=True)
-                            break
+                    company = HABR_COMPANY.text(vacancy_elem, 'Компания не указана')
                     
                     # Извлекаем зарплату
-                    salary_selectors = [
-                        '.vacancy-card__salary',
-                        '.salary',
-                        '.vacancy-salary',
-                        '[data-testid="salary"]'
-                    ]
-                    
-                    salary = 'Не указана'
-                    for salary_selector in salary_selectors:
-                        salary_elem = vacancy_elem.select_one(salary_selector)
-                        if salary_elem:
-                            salary = salary_elem.get_text(strip=True)
-                            break
+                    salary = HABR_SALARY.text(vacancy_elem, 'Не указана')
                     
                     # Извлекаем краткое описание
-                    description_selectors = [
-                        '.vacancy-card__description',
-                        '.vacancy-card__snippet',
-                        '.description',
-                        '.snippet'
-                    ]
-                    
-                    description = ''
-                    for desc_selector in description_selectors:
-                        desc_elem = vacancy_elem.select_one(desc_selector)
-                        if desc_elem:
-                            description = desc_elem.get_text(strip=True)
-                            break
+                    description = HABR_SNIPPET.text(vacancy_elem)
                     
                     # Извлекаем локацию
-                    location_selectors = [
-                        '.vacancy-card__meta',
-                        '.location',
-                        '.vacancy-location',
-                        '[data-testid="location"]'
-                    ]
-                    
                     location = ''
-                    for location_selector in location_selectors:
-                        location_elem = vacancy_elem.select_one(location_selector)
-                        if location_elem:
-                            location_text = location_elem.get_text(strip=True)
-                            # Извлекаем только информацию о локации
-                            if any(city in location_text.lower() for city in ['москва', 'спб', 'санкт-петербург', 'удаленно', 'remote']):
-                                location = location_text
-                            break
+                    location_elem = HABR_LOCATION.select_one(vacancy_elem)
+                    if location_elem:
+                        location_text = location_elem.get_text(strip=True)
+                        # Извлекаем только информацию о локации
+                        if any(city in location_text.lower() for city in ['москва', 'спб', 'санкт-петербург', 'удаленно', 'remote']):
+                            location = location_text
                     
                     vacancy_data = {
                         'external_id': f"habr-{vacancy_id}",
@@ -320,13 +361,27 @@ class HabrParser:
             logging.error(f"Ошибка парсинга страницы {page}: {e}")
             return []
     
+    def _structured_description(self, vacancy_url: str) -> Optional[BeautifulSoup]:
+        """Блок описания через browser_fetch.get_structured (Playwright), None - если не вышло"""
+        try:
+            from browser_fetch import get_structured
+            rows = get_structured(vacancy_url, kind='detail', timeout_ms=self.timeout * 1000, source='habr')
+        except Exception as e:
+            logging.debug(f"Playwright fallback для {vacancy_url} не удался: {e}")
+            return None
+        description_html = rows[0].get('description_html') if rows else None
+        if not description_html:
+            return None
+        logging.debug(f"Блок описания получен через Playwright для {vacancy_url}")
+        return BeautifulSoup(description_html, 'html.parser')
+    
     async def extract_full_vacancy_details(self, vacancy_url: str) -> Dict[str, str]:
         """Извлечение полного описания вакансии со страницы Habr Career"""
         try:
             logging.debug(f"Извлекаем детали вакансии: {vacancy_url}")
             
-            soup = await self._make_request(vacancy_url)
-            if not soup:
+            content = await self._fetch_content(vacancy_url)
+            if not content:
                 logging.error(f"❌ Не удалось получить страницу вакансии {vacancy_url}")
                 return {
                     'full_description': 'Описание не найдено',
@@ -336,23 +391,30 @@ class HabrParser:
                     'conditions': ''
                 }
             
-            # Ищем основной блок с описанием
-            description_selectors = [
-                '.basic-section--appearance-vacancy-description',
-                '.vacancy-description',
-                '.job-description',
-                '.basic-section',
-                '.content'
-            ]
+            # Быстрый путь: описание из встроенного состояния, разбираем только его фрагмент
+            description_html = extract_description_html(content, 'habr')
+            if description_html:
+                fragment = BeautifulSoup(description_html, 'html.parser')
+                return {
+                    'full_description': clean_text(extract_formatted_text(fragment)) or 'Описание не найдено',
+                    'requirements': '',
+                    'tasks': '',
+                    'benefits': '',
+                    'conditions': ''
+                }
             
-            description_element = None
+            # Дерево строится только из блоков описания; без них - вся страница
+            soup = parse_subtrees(content, HABR_DESCRIPTION.selectors, 'habr') or make_soup(content, 'habr')
             
-            for selector in description_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    description_element = element
-                    logging.debug(f"Найден блок описания через селектор {selector}")
-                    break
+            # Ищем основной блок с описанием
+            description_element = HABR_DESCRIPTION.select_one(soup)
+            if description_element:
+                logging.debug(f"Найден блок описания через селектор {HABR_DESCRIPTION.last_selector}")
+            
+            if not description_element:
+                # Описание могло отрисоваться скриптом: HABR_DETAIL_SPEC в браузере
+                # возвращает HTML только блока описания
+                description_element = self._structured_description(vacancy_url)
             
             if not description_element:
                 logging.warning(f"Не найден блок описания для {vacancy_url}")
@@ -392,12 +454,14 @@ class HabrParser:
                 'conditions': 'Условия не указаны'
             }
     
-    async def parse_vacancies(self, query: str = 'дизайнер', pages: int = 3, extract_details: bool = True) -> List[Dict[str, Any]]:
+    async def parse_vacancies(self, query: str = 'дизайнер', pages: int = 3, extract_details: bool = True, incremental: bool = False) -> List[Dict[str, Any]]:
         """Основной метод парсинга вакансий Habr Career"""
         logging.info(f"Начинаем парсинг Habr Career")
         logging.info(f"Запрос: '{query}', страниц: {pages}, детали: {extract_details}")
         
         all_vacancies = []
+        # Инкрементальный режим: только новые вакансии, остановка на известных
+        crawl = IncrementalCrawl('habr', query, enabled=incremental)
         
         for page in range(1, pages + 1):
             try:
@@ -408,6 +472,8 @@ class HabrParser:
                     logging.warning(f"На странице {page} не найдено релевантных вакансий")
                     continue
                 
+                page_vacancies = crawl.check_page(page_vacancies)
+                
                 # Извлекаем детали для каждой вакансии
                 for vacancy in page_vacancies:
                     try:
@@ -424,25 +490,21 @@ class HabrParser:
                         
                         all_vacancies.append(vacancy)
                         
-                        # Задержка между запросами деталей
-                        if extract_details:
-                            time.sleep(self.delay)
-                        
                     except Exception as e:
                         logging.error(f"Ошибка обработки вакансии: {e}")
                         continue
                 
                 logging.info(f"Страница {page}: найдено {len(page_vacancies)} вакансий")
                 
-                # Задержка между страницами
-                time.sleep(self.delay)
+                if crawl.stop:
+                    break
                 
             except Exception as e:
                 logging.error(f"Ошибка парсинга страницы {page}: {e}")
                 continue
         
         logging.info(f"Habr Career парсинг завершён. Всего обработано: {len(all_vacancies)} вакансий")
-        return all_vacancies
+        return crawl.finish(all_vacancies)
 
 
 def main():
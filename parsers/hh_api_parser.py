@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+HH.ru парсер на публичном JSON API (api.hh.ru)
+
+Вместо HTML выдачи hh.ru/search/vacancy с каскадом CSS-селекторов и
+браузерным фолбэком используется API вакансий: пагинация на стороне
+сервера, поля карточки в JSON, полное описание - в /vacancies/{id}.
+Контракт parse_vacancies тот же, что у HHParser.
+
+Версия: 1.0.0
+Автор: AI Assistant
+"""
+
+import sys
+import logging
+import argparse
+from datetime import datetime
+from typing import List, Dict, Optional, Any
+
+import requests
+from bs4 import BeautifulSoup
+
+try:
+    from hh_parser import HHParser
+    from simple_text_formatter import extract_formatted_text, clean_text
+    from text_cleaner import clean_vacancy_data
+    from rate_controller import RateLimitedSession
+    from crawl_watermarks import IncrementalCrawl
+except ImportError:
+    # Fallback для случая, когда модуль запускается напрямую
+    import os
+    sys.path.append(os.path.dirname(__file__))
+    from hh_parser import HHParser
+    from simple_text_formatter import extract_formatted_text, clean_text
+    from text_cleaner import clean_vacancy_data
+    from rate_controller import RateLimitedSession
+    from crawl_watermarks import IncrementalCrawl
+
+HH_API_URL = 'https://api.hh.ru'
+
+# API отдает не больше 2000 вакансий на запрос (page * per_page < 2000)
+MAX_API_RESULTS = 2000
+
+CURRENCY_SYMBOLS = {
+    'RUR': '₽',
+    'RUB': '₽',
+    'USD': '$',
+    'EUR': '€',
+    'KZT': '₸',
+    'BYR': 'Br',
+    'UAH': '₴',
+}
+
+
+def format_salary(salary: Optional[Dict[str, Any]]) -> str:
+    """Зарплата из API в том же виде, что на сайте: 'от 100 000 до 150 000 ₽ на руки'"""
+    if not salary or (salary.get('from') is None and salary.get('to') is None):
+        return 'Не указана'
+
+    def amount(value: int) -> str:
+        return f"{value:,}".replace(',', ' ')
+
+    parts = []
+    if salary.get('from') is not None:
+        parts.append(f"от {amount(salary['from'])}")
+    if salary.get('to') is not None:
+        parts.append(f"до {amount(salary['to'])}")
+
+    currency = salary.get('currency') or 'RUR'
+    text = f"{' '.join(parts)} {CURRENCY_SYMBOLS.get(currency, currency)}"
+
+    if salary.get('gross') is True:
+        text += ' до вычета налогов'
+    elif salary.get('gross') is False:
+        text += ' на руки'
+    return text
+
+
+def _strip_highlight(text: Optional[str]) -> str:
+    """Сниппеты API содержат разметку <highlighttext>"""
+    if not text:
+        return ''
+    return BeautifulSoup(text, 'html.parser').get_text(' ', strip=True)
+
+
+def _parse_published_at(value: Optional[str]) -> str:
+    if value:
+        try:
+            return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S%z').isoformat()
+        except ValueError:
+            pass
+    return datetime.now().isoformat()
+
+
+class HHApiParser(HHParser):
+    """Парсер HH.ru через JSON API с тем же контрактом, что у HHParser"""
+
+    def __init__(self, delay: float = 1.0, timeout: int = 30, base_url: str = HH_API_URL,
+                 area: Optional[int] = 1, per_page: int = 50,
+                 user_agent: str = 'JobFilter/1.0 (vacancy-aggregator)'):
+        self.base_url = base_url.rstrip('/')
+        self.area = area
+        self.per_page = per_page
+        self.user_agent = user_agent
+        super().__init__(delay=delay, timeout=timeout)
+
+    def _create_session(self) -> requests.Session:
+        """API требует осмысленный User-Agent приложения (HH-User-Agent)"""
+        session = RateLimitedSession()
+        session.headers.update({
+            'User-Agent': self.user_agent,
+            'HH-User-Agent': self.user_agent,
+            'Accept': 'application/json',
+        })
+        return session
+
+    def _get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            logging.error(f"Ошибка запроса к HH API {path}: {e}")
+            return None
+
+    def fetch_search_page(self, query: str, page: int = 0) -> Optional[Dict[str, Any]]:
+        """Сырой ответ /vacancies для страницы (page с 0)"""
+        params = {
+            'text': query,
+            'page': page,
+            'per_page': self.per_page,
+        }
+        if self.area is not None:
+            params['area'] = self.area
+        return self._get_json('/vacancies', params)
+
+    def _vacancy_from_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        snippet = item.get('snippet') or {}
+        description = _strip_highlight(snippet.get('responsibility')) or _strip_highlight(snippet.get('requirement'))
+        address = item.get('address') or {}
+        area = item.get('area') or {}
+        employer = item.get('employer') or {}
+
+        return {
+            'external_id': f"hh-{item['id']}",
+            'url': item.get('alternate_url') or f"https://hh.ru/vacancy/{item['id']}",
+            'title': item.get('name', '').strip(),
+            'company': employer.get('name') or 'Компания не указана',
+            'salary': format_salary(item.get('salary')),
+            'location': address.get('raw') or area.get('name', ''),
+            'description': description,
+            'source': 'hh',
+            'published_at': _parse_published_at(item.get('published_at')),
+        }
+
+    def _relevant_vacancies(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Релевантные вакансии из ответа /vacancies"""
+        vacancies = []
+        for item in data.get('items', []):
+            try:
+                vacancy = self._vacancy_from_item(item)
+            except (KeyError, TypeError) as e:
+                logging.error(f"Ошибка разбора вакансии из API: {e}")
+                continue
+
+            if not vacancy['title'] or not self.is_relevant_vacancy(vacancy['title']):
+                logging.debug(f"Не релевантная вакансия: {vacancy['title']}")
+                continue
+
+            vacancies.append(vacancy)
+            logging.info(f"Найдена релевантная вакансия: {vacancy['title']} - {vacancy['company']}")
+
+        return vacancies
+
+    def parse_vacancy_list_page(self, query: str, page: int = 0) -> List[Dict[str, Any]]:
+        """Страница выдачи из API (только релевантные вакансии)"""
+        logging.info(f"HH API: запрос '{query}', страница {page + 1}")
+        data = self.fetch_search_page(query, page)
+        return self._relevant_vacancies(data) if data else []
+
+    def extract_full_vacancy_details(self, vacancy_url: str) -> Dict[str, str]:
+        """Полное описание из /vacancies/{id}; vacancy_url - ссылка на hh.ru или ID"""
+        vacancy_id = self.extract_vacancy_id(vacancy_url)
+        data = self._get_json(f"/vacancies/{vacancy_id}")
+
+        empty = {
+            'full_description': 'Описание не найдено',
+            'requirements': '',
+            'tasks': '',
+            'benefits': '',
+            'conditions': ''
+        }
+        if not data or not data.get('description'):
+            return empty
+
+        fragment = BeautifulSoup(data['description'], 'html.parser')
+        full_description = clean_text(extract_formatted_text(fragment))
+
+        skills = [s.get('name') for s in data.get('key_skills') or [] if s.get('name')]
+        if skills:
+            full_description = f"{full_description}\n\nКлючевые навыки: {', '.join(skills)}"
+
+        details = dict(empty)
+        details['full_description'] = full_description or empty['full_description']
+        return details
+
+    def parse_vacancies(self, query: str = 'дизайнер', pages: int = 3, extract_details: bool = True, incremental: bool = False) -> List[Dict[str, Any]]:
+        """Основной метод: пагинация по API, детали - отдельным запросом на вакансию"""
+        logging.info(f"Начинаем парсинг HH.ru через API")
+        logging.info(f"Запрос: '{query}', страниц: {pages}, детали: {extract_details}")
+
+        all_vacancies = []
+        # Инкрементальный режим: только новые вакансии, остановка на известных
+        crawl = IncrementalCrawl('hh', query, enabled=incremental)
+        max_pages = MAX_API_RESULTS // self.per_page
+
+        for page in range(min(pages, max_pages)):
+            data = self.fetch_search_page(query, page)
+            if not data:
+                break
+
+            page_vacancies = crawl.check_page(self._relevant_vacancies(data))
+
+            for vacancy in page_vacancies:
+                try:
+                    if extract_details:
+                        vacancy.update(self.extract_full_vacancy_details(vacancy['url']))
+
+                    # Очищаем и форматируем данные вакансии
+                    vacancy = clean_vacancy_data(vacancy)
+                    vacancy['status'] = 'pending'
+                    all_vacancies.append(vacancy)
+
+                except Exception as e:
+                    logging.error(f"Ошибка обработки вакансии: {e}")
+                    continue
+
+            logging.info(f"Страница {page + 1}: найдено {len(page_vacancies)} вакансий")
+
+            if crawl.stop:
+                break
+
+            # Сервер сообщает число страниц - дальше не идем
+            if page + 1 >= data.get('pages', 0):
+                break
+
+        logging.info(f"HH.ru (API) парсинг завершён. Всего обработано: {len(all_vacancies)} вакансий")
+        return crawl.finish(all_vacancies)
+
+
+def main():
+    """Тестовая функция"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='HH.ru парсер (JSON API) для дизайнерских вакансий')
+    parser.add_argument('--query', default='дизайнер', help='Поисковый запрос')
+    parser.add_argument('--pages', type=int, default=3, help='Количество страниц')
+    parser.add_argument('--no-details', action='store_true', help='Не извлекать полные детали')
+    parser.add_argument('--base-url', default=HH_API_URL, help='Адрес API (например, локальная заглушка)')
+
+    args = parser.parse_args()
+
+    hh_parser = HHApiParser(base_url=args.base_url)
+    vacancies = hh_parser.parse_vacancies(
+        query=args.query,
+        pages=args.pages,
+        extract_details=not args.no_details
+    )
+
+    print(f"\nНайдено {len(vacancies)} дизайнерских вакансий на HH.ru:")
+    for i, vacancy in enumerate(vacancies, 1):
+        print(f"{i}. {vacancy['title']}")
+        print(f"   Компания: {vacancy['company']}")
+        print(f"   Зарплата: {vacancy['salary']}")
+        print(f"   URL: {vacancy['url']}")
+        print()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Локальная заглушка HH API для тестов HHApiParser
+
+Отдает /vacancies (с пагинацией page/per_page/pages) и /vacancies/{id}
+из фикстур в памяти, без обращения к api.hh.ru.
+
+Запуск проверки: python hh_api_stub.py
+
+Версия: 1.0.0
+Автор: AI Assistant
+"""
+
+import json
+import sys
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Tuple
+from urllib.parse import urlparse, parse_qs
+
+
+def build_fixture_vacancies(count: int = 7) -> List[Dict[str, Any]]:
+    """Фикстуры в формате api.hh.ru: дизайнерские вакансии и одна нерелевантная"""
+    vacancies = []
+    for i in range(1, count + 1):
+        vacancy_id = str(100000 + i)
+        vacancies.append({
+            'id': vacancy_id,
+            'name': f"Продуктовый дизайнер {i}",
+            'alternate_url': f"https://hh.ru/vacancy/{vacancy_id}",
+            'employer': {'name': f"Компания {i}"},
+            'salary': {'from': 100000 * i, 'to': None, 'currency': 'RUR', 'gross': False},
+            'area': {'name': 'Москва'},
+            'address': None,
+            'published_at': '2025-01-02T10:00:00+0300',
+            'snippet': {
+                'responsibility': 'Проектирование <highlighttext>интерфейсов</highlighttext>',
+                'requirement': 'Опыт в Figma',
+            },
+            'description': (
+                '<p><strong>Задачи:</strong></p>'
+                '<ul><li>Проектировать интерфейсы</li><li>Проводить исследования</li></ul>'
+                '<p><strong>Требования:</strong></p><ul><li>Figma</li></ul>'
+            ),
+            'key_skills': [{'name': 'Figma'}, {'name': 'UX'}],
+        })
+
+    vacancies.append({
+        'id': '199999',
+        'name': 'Водитель-экспедитор',
+        'alternate_url': 'https://hh.ru/vacancy/199999',
+        'employer': {'name': 'Логистика'},
+        'salary': None,
+        'area': {'name': 'Москва'},
+        'address': None,
+        'published_at': '2025-01-02T10:00:00+0300',
+        'snippet': {'responsibility': 'Доставка', 'requirement': None},
+        'description': '<p>Доставка грузов</p>',
+        'key_skills': [],
+    })
+    return vacancies
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    vacancies: List[Dict[str, Any]] = []
+    requests_log: List[str] = []
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        self.requests_log.append(parsed.path)
+        path = parsed.path.rstrip('/')
+
+        if path == '/vacancies':
+            params = parse_qs(parsed.query)
+            page = int(params.get('page', ['0'])[0])
+            per_page = int(params.get('per_page', ['20'])[0])
+            items = [
+                {k: v for k, v in vacancy.items() if k not in ('description', 'key_skills')}
+                for vacancy in self.vacancies
+            ]
+            pages = (len(items) + per_page - 1) // per_page
+            self._send_json(200, {
+                'items': items[page * per_page:(page + 1) * per_page],
+                'found': len(items),
+                'page': page,
+                'pages': pages,
+                'per_page': per_page,
+            })
+            return
+
+        if path.startswith('/vacancies/'):
+            vacancy_id = path.split('/')[-1]
+            for vacancy in self.vacancies:
+                if vacancy['id'] == vacancy_id:
+                    self._send_json(200, vacancy)
+                    return
+
+        self._send_json(404, {'errors': [{'type': 'not_found'}]})
+
+    def log_message(self, format, *args):
+        logging.debug(f"hh_api_stub: {format % args}")
+
+
+def start_stub_server(vacancies: List[Dict[str, Any]] = None,
+                      port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Запуск заглушки в фоновом потоке; возвращает (server, base_url)"""
+    handler = type('StubHandler', (_StubHandler,), {
+        'vacancies': vacancies if vacancies is not None else build_fixture_vacancies(),
+        'requests_log': [],
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    """Проверка HHApiParser против заглушки"""
+    logging.basicConfig(level=logging.WARNING)
+
+    try:
+        from hh_api_parser import HHApiParser
+    except ImportError:
+        import os
+        sys.path.append(os.path.dirname(__file__))
+        from hh_api_parser import HHApiParser
+
+    server, base_url = start_stub_server()
+    try:
+        parser = HHApiParser(base_url=base_url, per_page=3)
+        vacancies = parser.parse_vacancies('дизайнер', pages=5, extract_details=True)
+
+        # 7 дизайнерских вакансий на 3 страницах, водитель отфильтрован
+        assert len(vacancies) == 7, len(vacancies)
+        assert server.RequestHandlerClass.requests_log.count('/vacancies') == 3
+
+        first = vacancies[0]
+        assert first['external_id'] == 'hh-100001', first['external_id']
+        assert first['url'] == 'https://hh.ru/vacancy/100001'
+        assert first['company'] == 'Компания 1'
+        assert first['salary'] == 'от 100 000 ₽ на руки', first['salary']
+        assert 'интерфейсов' in first['description'] and '<' not in first['description']
+        assert 'Проектировать интерфейсы' in first['full_description']
+        assert 'Ключевые навыки: Figma, UX' in first['full_description']
+        assert first['published_at'].startswith('2025-01-02T10:00:00')
+
+        no_details = parser.parse_vacancies('дизайнер', pages=1, extract_details=False)
+        assert len(no_details) == 3 and 'full_description' not in no_details[0]
+
+        print(f"OK: {len(vacancies)} вакансий через заглушку {base_url}")
+    finally:
+        server.shutdown()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,11 +17,16 @@ import requests
 import random
 from datetime import datetime
 from urllib.parse import urljoin, quote
-from bs4 import BeautifulSoup
 from typing import List, Dict, Optional, Any
 try:
     from simple_text_formatter import extract_formatted_text, clean_text
     from text_cleaner import clean_vacancy_data
+    from fetch_router import FetchRouter, FetchTier
+    from rate_controller import RateLimitedSession, rate_controller
+    from crawl_watermarks import IncrementalCrawl
+    from html_backend import make_soup
+    from subtree_parser import parse_subtrees
+    from selector_cascade import get_cascade
 except ImportError:
     # Fallback для случая, когда модуль запускается напрямую
     import sys
@@ -29,6 +34,56 @@ except ImportError:
     sys.path.append(os.path.dirname(__file__))
     from simple_text_formatter import extract_formatted_text, clean_text
     from text_cleaner import clean_vacancy_data
+    from fetch_router import FetchRouter, FetchTier
+    from rate_controller import RateLimitedSession, rate_controller
+    from crawl_watermarks import IncrementalCrawl
+    from html_backend import make_soup
+    from subtree_parser import parse_subtrees
+    from selector_cascade import get_cascade
+
+
+# Каскады селекторов HH: компилируются один раз, пробуются в порядке приоритета
+HH_CARD = get_cascade('hh', 'card', [
+    'div[data-qa="vacancy-serp__vacancy"]',
+    'div.vacancy-serp-item',
+    'div.serp-item',
+    'article.vacancy-card'
+])
+HH_TITLE = get_cascade('hh', 'title', [
+    'a[data-qa="serp-item__title"]',
+    'a.bloko-link[data-qa="vacancy-serp__vacancy-title"]',
+    'h3 a',
+    'a.vacancy-serp-item__title'
+])
+HH_COMPANY = get_cascade('hh', 'company', [
+    'a[data-qa="vacancy-serp__vacancy-employer"]',
+    'div[data-qa="vacancy-serp__vacancy-employer"]',
+    '.vacancy-serp-item__meta-info-company',
+    '.company-name'
+])
+HH_SALARY = get_cascade('hh', 'salary', [
+    'span[data-qa="vacancy-serp__vacancy-compensation"]',
+    '.vacancy-serp-item__compensation',
+    '.salary'
+])
+# Обязанности и требования есть в одной карточке - сначала обязанности
+HH_SNIPPET = get_cascade('hh', 'snippet', [
+    'div[data-qa="vacancy-serp__vacancy_snippet_responsibility"]',
+    'div[data-qa="vacancy-serp__vacancy_snippet_requirement"]',
+    '.vacancy-serp-item__snippet',
+    '.snippet'
+])
+HH_LOCATION = get_cascade('hh', 'location', [
+    'div[data-qa="vacancy-serp__vacancy-address"]',
+    '.vacancy-serp-item__meta-info',
+    '.location'
+])
+HH_DESCRIPTION = get_cascade('hh', 'description', [
+    'div[data-qa="vacancy-description"]',
+    '.vacancy-description',
+    '.g-user-content',
+    '.vacancy-section'
+])
 
 
 class HHParser:
@@ -61,12 +116,39 @@ class HHParser:
     
     def __init__(self, delay: float = 1.0, timeout: int = 30):
         self.delay = delay
+        # delay задает начальную частоту хоста; дальше ее подбирает rate_controller
+        if delay > 0:
+            rate_controller.configure_host('https://hh.ru', 1 / delay)
         self.timeout = timeout
         self.session = self._create_session()
+        self.fetch_router = FetchRouter('hh', [
+            FetchTier('http', 1, self._fetch_http),
+            FetchTier('browser', 10, self._fetch_browser),
+        ])
+    
+    def _fetch_http(self, url: str) -> Optional[str]:
+        # Переинициализируем сессию и заголовки на каждой попытке
+        self.session = self._create_session()
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+    
+    def _fetch_browser(self, url: str) -> Optional[str]:
+        try:
+            from browser_fetch import get_html
+        except Exception:
+            return None
+        return get_html(url, timeout_ms=self.timeout * 1000,
+                        wait_selector='[data-qa="vacancy-serp__vacancy"], article, .serp-item', source='hh')
+    
+    @staticmethod
+    def _has_vacancy_cards(html: str) -> bool:
+        """Выдача считается загруженной, если в ней есть карточки вакансий"""
+        return 'vacancy-serp__vacancy' in html or 'serp-item' in html or 'vacancy-card' in html
         
     def _create_session(self) -> requests.Session:
         """Создание HTTP сессии с настройками"""
-        session = requests.Session()
+        session = RateLimitedSession()
         session.headers.update({
             'User-Agent': random.choice([
                 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
@@ -109,49 +191,19 @@ class HHParser:
             logging.info(f"Парсинг HH.ru страницы {page + 1}: {url}")
             
             attempts = 3
-            last_exc = None
+            last_tiers = []
             vacancies_found = []
             for attempt in range(1, attempts + 1):
-                try:
-                    # Переинициализируем сессию и заголовки на каждой попытке
-                    self.session = self._create_session()
-                    response = self.session.get(url, timeout=self.timeout)
-                    response.raise_for_status()
-                    html = response.content
-                    soup = BeautifulSoup(html, 'html.parser')
-                except Exception as e:
-                    last_exc = e
-                    soup = None
+                # Роутер начинает с уровня, который исторически срабатывает для
+                # выдачи HH (обычный HTTP или браузер), и эскалирует при неудаче
+                result = self.fetch_router.fetch(url, accept=self._has_vacancy_cards)
+                last_tiers = result.attempts
                 
-                vacancy_selectors = [
-                    'div[data-qa="vacancy-serp__vacancy"]',
-                    'div.vacancy-serp-item',
-                    'div.serp-item',
-                    'article.vacancy-card'
-                ]
-                
-                if soup:
-                    for selector in vacancy_selectors:
-                        vacancies_found = soup.select(selector)
-                        if vacancies_found:
-                            logging.info(f"Найдено {len(vacancies_found)} вакансий через селектор: {selector}")
-                            break
-                
-                if not vacancies_found:
-                    # Пытаемся через браузерный рендеринг
-                    try:
-                        from browser_fetch import get_html
-                    except Exception:
-                        get_html = None
-                    if get_html:
-                        html2 = get_html(url, timeout_ms=self.timeout * 1000, wait_selector='[data-qa="vacancy-serp__vacancy"], article, .serp-item')
-                        if html2:
-                            soup = BeautifulSoup(html2, 'html.parser')
-                            for selector in vacancy_selectors:
-                                vacancies_found = soup.select(selector)
-                                if vacancies_found:
-                                    logging.info(f"(PW) Найдено {len(vacancies_found)} вакансий через селектор: {selector}")
-                                    break
+                if result.ok:
+                    soup = make_soup(result.html, 'hh')
+                    vacancies_found = HH_CARD.select(soup)
+                    if vacancies_found:
+                        logging.info(f"({result.tier}) Найдено {len(vacancies_found)} вакансий через селектор: {HH_CARD.last_selector}")
                 
                 if vacancies_found:
                     break
@@ -160,8 +212,8 @@ class HHParser:
             
             if not vacancies_found:
                 logging.warning(f"На странице {page + 1} не найдено вакансий")
-                if last_exc:
-                    logging.debug(f"Последняя ошибка: {last_exc}")
+                if last_tiers:
+                    logging.debug(f"Последние опробованные уровни: {', '.join(last_tiers)}")
                 return []
             
             parsed_vacancies = []
@@ -169,19 +221,7 @@ class HHParser:
             for vacancy_elem in vacancies_found:
                 try:
                     # Извлекаем заголовок и ссылку
-                    title_selectors = [
-                        'a[data-qa="serp-item__title"]',
-                        'a.bloko-link[data-qa="vacancy-serp__vacancy-title"]',
-                        'h3 a',
-                        'a.vacancy-serp-item__title'
-                    ]
-                    
-                    title_elem = None
-                    for title_selector in title_selectors:
-                        title_elem = vacancy_elem.select_one(title_selector)
-                        if title_elem:
-                            break
-                    
+                    title_elem = HH_TITLE.select_one(vacancy_elem)
                     if not title_elem:
                         continue
                     
@@ -200,63 +240,10 @@ class HHParser:
                     full_url = urljoin('https://hh.ru', url)
                     vacancy_id = self.extract_vacancy_id(full_url)
                     
-                    # Извлекаем компанию
-                    company_selectors = [
-                        'a[data-qa="vacancy-serp__vacancy-employer"]',
-                        'div[data-qa="vacancy-serp__vacancy-employer"]',
-                        '.vacancy-serp-item__meta-info-company',
-                        '.company-name'
-                    ]
-                    
-                    company = 'Компания не указана'
-                    for company_selector in company_selectors:
-                        company_elem = vacancy_elem.select_one(company_selector)
-                        if company_elem:
-                            company = company_elem.get_text(strip=True)
-                            break
-                    
-                    # Извлекаем зарплату
-                    salary_selectors = [
-                        'span[data-qa="vacancy-serp__vacancy-compensation"]',
-                        '.vacancy-serp-item__compensation',
-                        '.salary'
-                    ]
-                    
-                    salary = 'Не указана'
-                    for salary_selector in salary_selectors:
-                        salary_elem = vacancy_elem.select_one(salary_selector)
-                        if salary_elem:
-                            salary = salary_elem.get_text(strip=True)
-                            break
-                    
-                    # Извлекаем краткое описание
-                    description_selectors = [
-                        'div[data-qa="vacancy-serp__vacancy_snippet_responsibility"]',
-                        'div[data-qa="vacancy-serp__vacancy_snippet_requirement"]',
-                        '.vacancy-serp-item__snippet',
-                        '.snippet'
-                    ]
-                    
-                    description = ''
-                    for desc_selector in description_selectors:
-                        desc_elem = vacancy_elem.select_one(desc_selector)
-                        if desc_elem:
-                            description = desc_elem.get_text(strip=True)
-                            break
-                    
-                    # Извлекаем локацию
-                    location_selectors = [
-                        'div[data-qa="vacancy-serp__vacancy-address"]',
-                        '.vacancy-serp-item__meta-info',
-                        '.location'
-                    ]
-                    
-                    location = ''
-                    for location_selector in location_selectors:
-                        location_elem = vacancy_elem.select_one(location_selector)
-                        if location_elem:
-                            location = location_elem.get_text(strip=True)
-                            break
+                    company = HH_COMPANY.text(vacancy_elem, 'Компания не указана')
+                    salary = HH_SALARY.text(vacancy_elem, 'Не указана')
+                    description = HH_SNIPPET.text(vacancy_elem)
+                    location = HH_LOCATION.text(vacancy_elem)
                     
                     vacancy_data = {
                         'external_id': f"hh-{vacancy_id}",
@@ -293,24 +280,14 @@ class HHParser:
             response = self.session.get(vacancy_url, timeout=self.timeout)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Дерево строится только из блоков описания; без них - вся страница
+            soup = parse_subtrees(response.content, HH_DESCRIPTION.selectors, 'hh') \
+                or make_soup(response.content, 'hh')
             
             # Ищем основной блок с описанием
-            description_selectors = [
-                'div[data-qa="vacancy-description"]',
-                '.vacancy-description',
-                '.g-user-content',
-                '.vacancy-section'
-            ]
-            
-            description_element = None
-            
-            for selector in description_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    description_element = element
-                    logging.debug(f"Найден блок описания через селектор {selector}")
-                    break
+            description_element = HH_DESCRIPTION.select_one(soup)
+            if description_element:
+                logging.debug(f"Найден блок описания через селектор {HH_DESCRIPTION.last_selector}")
             
             if not description_element:
                 logging.warning(f"Не найден блок описания для {vacancy_url}")
@@ -350,12 +327,14 @@ class HHParser:
                 'conditions': 'Условия не указаны'
             }
     
-    def parse_vacancies(self, query: str = 'дизайнер', pages: int = 3, extract_details: bool = True) -> List[Dict[str, Any]]:
+    def parse_vacancies(self, query: str = 'дизайнер', pages: int = 3, extract_details: bool = True, incremental: bool = False) -> List[Dict[str, Any]]:
         """Основной метод парсинга вакансий HH.ru"""
         logging.info(f"Начинаем парсинг HH.ru")
         logging.info(f"Запрос: '{query}', страниц: {pages}, детали: {extract_details}")
         
         all_vacancies = []
+        # Инкрементальный режим: только новые вакансии, остановка на известных
+        crawl = IncrementalCrawl('hh', query, enabled=incremental)
         
         for page in range(pages):
             try:
@@ -366,6 +345,8 @@ class HHParser:
                     logging.warning(f"На странице {page + 1} не найдено релевантных вакансий")
                     continue
                 
+                page_vacancies = crawl.check_page(page_vacancies)
+                
                 # Извлекаем детали для каждой вакансии
                 for vacancy in page_vacancies:
                     try:
@@ -382,25 +363,21 @@ class HHParser:
                         
                         all_vacancies.append(vacancy)
                         
-                        # Задержка между запросами деталей
-                        if extract_details:
-                            time.sleep(self.delay)
-                        
                     except Exception as e:
                         logging.error(f"Ошибка обработки вакансии: {e}")
                         continue
                 
                 logging.info(f"Страница {page + 1}: найдено {len(page_vacancies)} вакансий")
                 
-                # Задержка между страницами
-                time.sleep(self.delay)
+                if crawl.stop:
+                    break
                 
             except Exception as e:
                 logging.error(f"Ошибка парсинга страницы {page + 1}: {e}")
                 continue
         
         logging.info(f"HH.ru парсинг завершён. Всего обработано: {len(all_vacancies)} вакансий")
-        return all_vacancies
+        return crawl.finish(all_vacancies)
 
 
 def main():
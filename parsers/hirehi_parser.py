@@ -15,11 +15,16 @@ import logging
 import requests
 from datetime import datetime
 from urllib.parse import urljoin, quote
-from bs4 import BeautifulSoup
 from typing import List, Dict, Optional, Any
 try:
     from simple_text_formatter import extract_formatted_text, clean_text
     from text_cleaner import clean_vacancy_data
+    from fetch_router import FetchRouter, FetchTier
+    from rate_controller import RateLimitedSession, rate_controller
+    from crawl_watermarks import IncrementalCrawl
+    from html_backend import make_soup
+    from subtree_parser import parse_subtrees
+    from selector_cascade import get_cascade
     from anti_detection_system import AntiDetectionSystem, RequestMethod
     from blocking_monitor import log_blocking_event, log_success_event
     from hirehi_bypass import get_hirehi_page, test_hirehi_access
@@ -31,6 +36,12 @@ except ImportError:
     sys.path.append(os.path.dirname(__file__))
     from simple_text_formatter import extract_formatted_text, clean_text
     from text_cleaner import clean_vacancy_data
+    from fetch_router import FetchRouter, FetchTier
+    from rate_controller import RateLimitedSession, rate_controller
+    from crawl_watermarks import IncrementalCrawl
+    from html_backend import make_soup
+    from subtree_parser import parse_subtrees
+    from selector_cascade import get_cascade
     try:
         from anti_detection_system import AntiDetectionSystem, RequestMethod
         from blocking_monitor import log_blocking_event, log_success_event
@@ -46,6 +57,50 @@ except ImportError:
         get_page_with_playwright_sync = None
 
 
+# Каскады селекторов выдачи: компилируются один раз, пробуются в порядке приоритета
+HIREHI_CARD = get_cascade('hirehi', 'card', [
+    'div.job-card',
+    'div.vacancy-card',
+    'article.job-item',
+    'div[data-testid="job-card"]',
+    'a[href*="/job/"]',
+    'a[href*="/vacancy/"]'
+])
+HIREHI_COMPANY = get_cascade('hirehi', 'company', [
+    '.company-name',
+    '.job-company',
+    '.vacancy-company',
+    '[data-testid="company-name"]'
+])
+HIREHI_SALARY = get_cascade('hirehi', 'salary', [
+    '.salary',
+    '.job-salary',
+    '.vacancy-salary',
+    '[data-testid="salary"]'
+])
+HIREHI_SNIPPET = get_cascade('hirehi', 'snippet', [
+    '.job-description',
+    '.vacancy-description',
+    '.description',
+    '.snippet'
+])
+HIREHI_DESCRIPTION = get_cascade('hirehi', 'description', [
+    '.job-description',
+    '.vacancy-description',
+    '.description',
+    '.job-content',
+    '.vacancy-content',
+    '[data-testid="job-description"]',
+    '.content'
+])
+HIREHI_LOCATION = get_cascade('hirehi', 'location', [
+    '.location',
+    '.job-location',
+    '.vacancy-location',
+    '[data-testid="location"]'
+])
+
+
 class HireHiParser:
     """Парсер для HireHi.com"""
     
@@ -154,6 +209,9 @@ class HireHiParser:
     
     def __init__(self, delay: float = 1.0, timeout: int = 30):
         self.delay = delay
+        # delay задает начальную частоту хоста; дальше ее подбирает rate_controller
+        if delay > 0:
+            rate_controller.configure_host('https://hirehi.com', 1 / delay)
         self.timeout = timeout
         self.session = self._create_session()
         
@@ -165,9 +223,33 @@ class HireHiParser:
             self.anti_detection = None
             logging.warning("⚠️ Антидетект система недоступна для HireHi")
         
+        self.fetch_router = self._create_fetch_router()
+    
+    def _create_fetch_router(self) -> FetchRouter:
+        """Уровни загрузки от дешевого к дорогому: HTTP, модуль обхода, браузер"""
+        tiers = [FetchTier('http', 1, self._fetch_http)]
+        if get_hirehi_page:
+            tiers.append(FetchTier('bypass', 2, self._fetch_bypass))
+        if get_page_with_playwright_sync:
+            tiers.append(FetchTier('browser', 10, get_page_with_playwright_sync))
+        return FetchRouter('hirehi', tiers)
+    
+    def _fetch_http(self, url: str) -> Optional[str]:
+        response = self.session.get(url, timeout=self.timeout)
+        return response.text if response.status_code == 200 else None
+    
+    def _fetch_bypass(self, url: str) -> Optional[str]:
+        response = get_hirehi_page(url)
+        return response.text if response is not None and response.status_code == 200 else None
+    
+    @staticmethod
+    def _has_job_cards(html: str) -> bool:
+        """Страница считается загруженной, если в ней есть ссылки на вакансии"""
+        return '/job/' in html or '/vacancy/' in html or 'job-card' in html
+        
     def _create_session(self) -> requests.Session:
         """Создание HTTP сессии с настройками"""
-        session = requests.Session()
+        session = RateLimitedSession()
         session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -215,107 +297,29 @@ class HireHiParser:
         try:
             logging.info(f"Парсинг HireHi страницы {page}: {url}")
             
-            # Используем Playwright как основной метод (самый эффективный)
-            if get_page_with_playwright_sync:
-                logging.info("🎭 Используем Playwright с полной эмуляцией браузера")
-                html = get_page_with_playwright_sync(url)
-                
-                if html:
-                    soup = BeautifulSoup(html, 'html.parser')
-                    logging.info("✅ Успешный запрос через Playwright")
-                    
-                    # Логируем успех
-                    if log_success_event:
-                        log_success_event('hirehi', 3.0)  # Примерное время для Playwright
-                else:
-                    logging.warning("⚠️ Playwright не смог получить страницу, пробуем специальный модуль")
-                    # Fallback на специальный модуль обхода
-                    if get_hirehi_page:
-                        response = get_hirehi_page(url)
-                        
-                        if response and response.status_code == 200:
-                            soup = BeautifulSoup(response.content, 'html.parser')
-                            logging.info("✅ Успешный запрос через специальный модуль обхода")
-                            
-                            # Логируем успех
-                            if log_success_event:
-                                log_success_event('hirehi', response.elapsed.total_seconds())
-                        else:
-                            logging.warning("⚠️ Специальный модуль обхода тоже не смог получить страницу")
-                            # Fallback на обычный запрос
-                            try:
-                                response = self.session.get(url, timeout=self.timeout)
-                                if response.status_code == 200:
-                                    soup = BeautifulSoup(response.content, 'html.parser')
-                                    logging.info("✅ Успешный fallback запрос")
-                                    
-                                    # Логируем успех
-                                    if log_success_event:
-                                        log_success_event('hirehi', response.elapsed.total_seconds())
-                                else:
-                                    raise requests.RequestException(f"HTTP {response.status_code}")
-                            except requests.RequestException as e:
-                                logging.error(f"❌ Все методы запроса не удались: {e}")
-                                # Логируем блокировку
-                                if log_blocking_event:
-                                    log_blocking_event('hirehi', url, getattr(e.response, 'status_code', 0) if hasattr(e, 'response') else 0, 
-                                                     str(e), self.session.headers.get('User-Agent', 'Unknown'))
-                                return []
-                    else:
-                        logging.error("❌ Все модули обхода недоступны")
-                        return []
-            else:
-                # Playwright недоступен, используем специальный модуль
-                logging.warning("⚠️ Playwright недоступен, используем специальный модуль обхода")
-                if get_hirehi_page:
-                    response = get_hirehi_page(url)
-                    
-                    if response and response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        logging.info("✅ Успешный запрос через специальный модуль обхода")
-                        
-                        # Логируем успех
-                        if log_success_event:
-                            log_success_event('hirehi', response.elapsed.total_seconds())
-                    else:
-                        logging.warning("⚠️ Специальный модуль обхода не смог получить страницу")
-                        # Fallback на обычный запрос
-                        try:
-                            response = self.session.get(url, timeout=self.timeout)
-                            response.raise_for_status()
-                            soup = BeautifulSoup(response.content, 'html.parser')
-                            
-                            # Логируем успех
-                            if log_success_event:
-                                log_success_event('hirehi', response.elapsed.total_seconds())
-                                
-                        except requests.RequestException as e:
-                            logging.warning(f"Обычный запрос не удался: {e}")
-                            # Логируем блокировку
-                            if log_blocking_event:
-                                log_blocking_event('hirehi', url, getattr(e.response, 'status_code', 0) if hasattr(e, 'response') else 0, 
-                                                 str(e), self.session.headers.get('User-Agent', 'Unknown'))
-                            return []
-                else:
-                    logging.error("❌ Все модули обхода недоступны")
-                    return []
+            # Роутер начинает с самого дешевого уровня, который исторически
+            # срабатывает для HireHi, и переходит к браузеру только при неудаче
+            result = self.fetch_router.fetch(url, accept=self._has_job_cards)
             
-            # Ищем вакансии по различным селекторам
-            vacancy_selectors = [
-                'div.job-card',
-                'div.vacancy-card',
-                'article.job-item',
-                'div[data-testid="job-card"]',
-                'a[href*="/job/"]',
-                'a[href*="/vacancy/"]'
-            ]
+            if not result.ok:
+                logging.error(f"❌ Все методы запроса не удались ({', '.join(result.attempts)})")
+                # Логируем блокировку
+                if log_blocking_event:
+                    log_blocking_event('hirehi', url, 0, f"all fetch tiers failed: {', '.join(result.attempts)}",
+                                       self.session.headers.get('User-Agent', 'Unknown'))
+                return []
             
-            vacancies_found = []
-            for selector in vacancy_selectors:
-                vacancies_found = soup.select(selector)
-                if vacancies_found:
-                    logging.info(f"Найдено {len(vacancies_found)} элементов через селектор: {selector}")
-                    break
+            soup = make_soup(result.html, 'hirehi')
+            logging.info(f"✅ Успешный запрос через {result.tier}")
+            
+            # Логируем успех
+            if log_success_event:
+                log_success_event('hirehi', result.elapsed)
+            
+            # Ищем вакансии по различным селекторам
+            vacancies_found = HIREHI_CARD.select(soup)
+            if vacancies_found:
+                logging.info(f"Найдено {len(vacancies_found)} элементов через селектор: {HIREHI_CARD.last_selector}")
             
             if not vacancies_found:
                 # Попробуем найти любые ссылки на вакансии
@@ -386,64 +390,16 @@ class HireHiParser:
                             continue
                         
                         # Извлекаем компанию
-                        company_selectors = [
-                            '.company-name',
-                            '.job-company',
-                            '.vacancy-company',
-                            '[data-testid="company-name"]'
-                        ]
-                        
-                        company = 'Компания не указана'
-                        for company_selector in company_selectors:
-                            company_elem = vacancy_elem.select_one(company_selector)
-                            if company_elem:
-                                company = company_elem.get_text(strip=True)
-                                break
+                        company = HIREHI_COMPANY.text(vacancy_elem, 'Компания не указана')
                         
                         # Извлекаем зарплату
-                        salary_selectors = [
-                            '.salary',
-                            '.job-salary',
-                            '.vacancy-salary',
-                            '[data-testid="salary"]'
-                        ]
-                        
-                        salary = 'Не указана'
-                        for salary_selector in salary_selectors:
-                            salary_elem = vacancy_elem.select_one(salary_selector)
-                            if salary_elem:
-                                salary = salary_elem.get_text(strip=True)
-                                break
+                        salary = HIREHI_SALARY.text(vacancy_elem, 'Не указана')
                         
                         # Извлекаем описание
-                        description_selectors = [
-                            '.job-description',
-                            '.vacancy-description',
-                            '.description',
-                            '.snippet'
-                        ]
-                        
-                        description = ''
-                        for desc_selector in description_selectors:
-                            desc_elem = vacancy_elem.select_one(desc_selector)
-                            if desc_elem:
-                                description = desc_elem.get_text(strip=True)
-                                break
+                        description = HIREHI_SNIPPET.text(vacancy_elem)
                         
                         # Извлекаем локацию
-                        location_selectors = [
-                            '.location',
-                            '.job-location',
-                            '.vacancy-location',
-                            '[data-testid="location"]'
-                        ]
-                        
-                        location = ''
-                        for location_selector in location_selectors:
-                            location_elem = vacancy_elem.select_one(location_selector)
-                            if location_elem:
-                                location = location_elem.get_text(strip=True)
-                                break
+                        location = HIREHI_LOCATION.text(vacancy_elem)
                     
                     # Проверяем релевантность
                     if not self.is_relevant_vacancy(title, description):
@@ -495,27 +451,14 @@ class HireHiParser:
             response = self.session.get(vacancy_url, timeout=self.timeout)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Дерево строится только из блоков описания; без них - вся страница
+            soup = parse_subtrees(response.content, HIREHI_DESCRIPTION.selectors, 'hirehi') \
+                or make_soup(response.content, 'hirehi')
             
             # Ищем основной блок с описанием
-            description_selectors = [
-                '.job-description',
-                '.vacancy-description',
-                '.description',
-                '.job-content',
-                '.vacancy-content',
-                '[data-testid="job-description"]',
-                '.content'
-            ]
-            
-            description_element = None
-            
-            for selector in description_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    description_element = element
-                    logging.debug(f"Найден блок описания через селектор {selector}")
-                    break
+            description_element = HIREHI_DESCRIPTION.select_one(soup)
+            if description_element:
+                logging.debug(f"Найден блок описания через селектор {HIREHI_DESCRIPTION.last_selector}")
             
             # Если не нашли через селекторы, берём весь текст страницы
             if not description_element:
@@ -562,12 +505,14 @@ class HireHiParser:
                 'conditions': 'Условия не указаны'
             }
     
-    def parse_vacancies(self, query: str = 'дизайнер', pages: int = 3, extract_details: bool = True) -> List[Dict[str, Any]]:
+    def parse_vacancies(self, query: str = 'дизайнер', pages: int = 3, extract_details: bool = True, incremental: bool = False) -> List[Dict[str, Any]]:
         """Основной метод парсинга вакансий HireHi"""
         logging.info(f"Начинаем парсинг HireHi")
         logging.info(f"Запрос: '{query}', страниц: {pages}, детали: {extract_details}")
         
         all_vacancies = []
+        # Инкрементальный режим: только новые вакансии, остановка на известных
+        crawl = IncrementalCrawl('hirehi', query, enabled=incremental)
         
         for page in range(1, pages + 1):
             try:
@@ -578,6 +523,8 @@ class HireHiParser:
                     logging.warning(f"На странице {page} не найдено релевантных вакансий")
                     continue
                 
+                page_vacancies = crawl.check_page(page_vacancies)
+                
                 # Извлекаем детали для каждой вакансии
                 for vacancy in page_vacancies:
                     try:
@@ -591,25 +538,21 @@ class HireHiParser:
                         
                         all_vacancies.append(vacancy)
                         
-                        # Задержка между запросами деталей
-                        if extract_details:
-                            time.sleep(self.delay)
-                        
                     except Exception as e:
                         logging.error(f"Ошибка обработки вакансии: {e}")
                         continue
                 
                 logging.info(f"Страница {page}: найдено {len(page_vacancies)} вакансий")
                 
-                # Задержка между страницами
-                time.sleep(self.delay)
+                if crawl.stop:
+                    break
                 
             except Exception as e:
                 logging.error(f"Ошибка парсинга страницы {page}: {e}")
                 continue
         
         logging.info(f"HireHi парсинг завершён. Всего обработано: {len(all_vacancies)} вакансий")
-        return all_vacancies
+        return crawl.finish(all_vacancies)
 
 
 def main():
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Выбор HTML-бэкенда для разбора страниц источников
+
+Все парсеры работают с деревом BeautifulSoup (select, get_text,
+extract_formatted_text), поэтому бэкенд определяет, как это дерево строится:
+- html.parser  - встроенный парсер Python (самый медленный, прежнее поведение)
+- lxml         - C-парсер libxml2 как tree builder BeautifulSoup
+
+Бэкенда на lexbor (selectolax) нет: парсерам нужно дерево BeautifulSoup,
+и проход lexbor перед построением дерева lxml - второй разбор документа,
+на замерах медленнее чистого lxml.
+
+Бэкенд задается по источнику (SOURCE_BACKENDS, configure_backend) или
+переменными окружения PARSER_HTML_BACKEND / PARSER_HTML_BACKEND_<SOURCE>.
+Недоступный lxml заменяется html.parser с предупреждением.
+
+По умолчанию используется html.parser: lxml иначе чинит невалидную
+разметку (блоки внутри <p>), и extract_formatted_text дает другой текст
+описания. Источник переводится на быстрый бэкенд только после того, как
+проверка ниже не находит расхождений на его записанных страницах. Сравнивается
+то, что парсеры сохраняют: extract_formatted_text документа и блоков описания,
+поля карточек выдачи по каскадам селекторов источников.
+
+Проверка эквивалентности и скорости на записанных страницах (http_fixtures):
+    python html_backend.py --fixtures fixtures/http
+    python html_backend.py                  # синтетические страницы
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import os
+import sys
+import time
+import gzip
+import json
+import base64
+import logging
+import argparse
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Union
+
+from bs4 import BeautifulSoup, Comment
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('html.parser', 'lxml')
+
+# Узлы, которые не участвуют в извлечении вакансий (встроенное состояние
+# страниц разбирает embedded_state по исходным байтам, до построения дерева)
+STRIPPED_TAGS = ('script', 'style', 'noscript', 'svg', 'template', 'iframe')
+
+DEFAULT_BACKEND = 'html.parser'
+
+# Бэкенды по источникам; отсутствующий источник использует DEFAULT_BACKEND
+SOURCE_BACKENDS: Dict[str, str] = {
+    'hh': DEFAULT_BACKEND,
+    'habr': DEFAULT_BACKEND,
+    'getmatch': DEFAULT_BACKEND,
+    'geekjob': DEFAULT_BACKEND,
+    'hirehi': DEFAULT_BACKEND,
+}
+
+
+def is_available(backend: str) -> bool:
+    if backend == 'lxml':
+        return LXML_AVAILABLE
+    return backend == 'html.parser'
+
+
+_warned = set()
+
+
+def _resolve(backend: str) -> str:
+    """Замена недоступного бэкенда: lxml -> html.parser"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный HTML-бэкенд: {backend}")
+    for candidate in BACKENDS[BACKENDS.index(backend)::-1]:
+        if is_available(candidate):
+            if candidate != backend and backend not in _warned:
+                _warned.add(backend)
+                logger.warning(f"⚠️ HTML-бэкенд {backend} недоступен, используется {candidate}")
+            return candidate
+    return 'html.parser'
+
+
+def get_backend(source: Optional[str] = None) -> str:
+    """Бэкенд источника с учетом переменных окружения"""
+    name = (os.environ.get(f"PARSER_HTML_BACKEND_{source.upper()}") if source else None) \
+        or os.environ.get('PARSER_HTML_BACKEND') \
+        or SOURCE_BACKENDS.get(source or '', DEFAULT_BACKEND)
+    return _resolve(name)
+
+
+def configure_backend(backend: str, source: Optional[str] = None):
+    """Бэкенд для источника или для всех источников сразу"""
+    _resolve(backend)
+    if source:
+        SOURCE_BACKENDS[source] = backend
+    else:
+        for known in list(SOURCE_BACKENDS):
+            SOURCE_BACKENDS[known] = backend
+
+
+class _Stats:
+    """Время построения дерева по бэкендам"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def add(self, backend: str, size: int, seconds: float):
+        with self._lock:
+            self.pages[backend] += 1
+            self.bytes[backend] += size
+            self.seconds[backend] += seconds
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                backend: {
+                    'pages': self.pages[backend],
+                    'bytes': self.bytes[backend],
+                    'seconds': round(self.seconds[backend], 4),
+                    'ms_per_page': round(self.seconds[backend] / self.pages[backend] * 1000, 3),
+                }
+                for backend in self.pages
+            }
+
+
+stats = _Stats()
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    return stats.report()
+
+
+def make_soup(content: Union[str, bytes, None], source: Optional[str] = None,
+              backend: Optional[str] = None) -> BeautifulSoup:
+    """Дерево BeautifulSoup страницы выбранным для источника бэкендом"""
+    backend = _resolve(backend) if backend else get_backend(source)
+    content = content or b''
+    started = time.perf_counter()
+    soup = BeautifulSoup(content, backend)
+    stats.add(backend, len(content), time.perf_counter() - started)
+    return soup
+
+
+# ---------------------------------------------------------------------------
+# Проверка эквивалентности бэкендов
+# ---------------------------------------------------------------------------
+
+def _skipped(node) -> bool:
+    return any(parent.name in STRIPPED_TAGS for parent in node.parents)
+
+
+def _source_cascades() -> Dict[str, Dict[str, Any]]:
+    """Каскады карточек и описаний парсеров, разбирающих HTML"""
+    try:
+        import hh_parser
+        import habr_parser
+        import getmatch_parser
+        import hirehi_parser
+    except ImportError:
+        sys.path.append(os.path.dirname(__file__))
+        import hh_parser
+        import habr_parser
+        import getmatch_parser
+        import hirehi_parser
+    return {
+        'hh': {'card': hh_parser.HH_CARD, 'title': hh_parser.HH_TITLE, 'company': hh_parser.HH_COMPANY,
+               'salary': hh_parser.HH_SALARY, 'snippet': hh_parser.HH_SNIPPET,
+               'location': hh_parser.HH_LOCATION, 'description': hh_parser.HH_DESCRIPTION},
+        'habr': {'card': habr_parser.HABR_CARD, 'title': habr_parser.HABR_TITLE,
+                 'company': habr_parser.HABR_COMPANY, 'salary': habr_parser.HABR_SALARY,
+                 'snippet': habr_parser.HABR_SNIPPET, 'location': habr_parser.HABR_LOCATION,
+                 'description': habr_parser.HABR_DESCRIPTION},
+        'getmatch': {'card': getmatch_parser.GETMATCH_CARD, 'title': getmatch_parser.GETMATCH_TITLE,
+                     'company': getmatch_parser.GETMATCH_COMPANY, 'salary': getmatch_parser.GETMATCH_SALARY,
+                     'snippet': getmatch_parser.GETMATCH_SNIPPET, 'location': getmatch_parser.GETMATCH_LOCATION,
+                     'description': getmatch_parser.GETMATCH_DESCRIPTION},
+        'hirehi': {'card': hirehi_parser.HIREHI_CARD, 'company': hirehi_parser.HIREHI_COMPANY,
+                   'salary': hirehi_parser.HIREHI_SALARY, 'snippet': hirehi_parser.HIREHI_SNIPPET,
+                   'location': hirehi_parser.HIREHI_LOCATION, 'description': hirehi_parser.HIREHI_DESCRIPTION},
+    }
+
+
+def _fixed(cascade):
+    """Копия каскада - проверка не меняет статистику парсеров"""
+    from selector_cascade import SelectorCascade
+    return SelectorCascade(cascade.source, cascade.field, cascade.selectors)
+
+
+def parser_outputs(soup: BeautifulSoup, cascades: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Результаты парсеров по дереву: карточки выдачи (поля, как их сохраняют
+    парсеры) и extract_formatted_text описания каждого источника.
+    """
+    from simple_text_formatter import extract_formatted_text
+
+    outputs = {}
+    for source, fields in (cascades or _source_cascades()).items():
+        fields = {name: _fixed(cascade) for name, cascade in fields.items()}
+        cards = []
+        for card in fields['card'].select(soup):
+            title = fields['title'].select_one(card) if 'title' in fields else card
+            item = {
+                'title': title.get_text(strip=True) if title is not None else None,
+                'url': title.get('href') if title is not None else None,
+            }
+            for name in ('company', 'salary', 'snippet', 'location'):
+                item[name] = fields[name].text(card)
+            cards.append(item)
+        outputs[f"cards.{source}"] = cards
+        outputs[f"description.{source}"] = extract_formatted_text(fields['description'].select_one(soup))
+    return outputs
+
+
+def formatted_document(soup: BeautifulSoup) -> str:
+    """
+    extract_formatted_text всего документа без служебных узлов.
+    Удаляет script/style/комментарии прямо в переданном дереве.
+    """
+    from simple_text_formatter import extract_formatted_text
+
+    for tag in soup.find_all(STRIPPED_TAGS):
+        tag.decompose()
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    return extract_formatted_text(soup.body or soup)
+
+
+def soup_signature(soup: BeautifulSoup, cascades: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    То, от чего зависят селекторы и сохраняемые данные парсеров: элементы с
+    class/data-qa (по порядку), ссылки, видимый текст, поля карточек и
+    описания источников, форматированный текст документа (чувствителен к
+    структуре дерева). Дерево после вызова не пригодно для разбора.
+    """
+    elements, links = [], []
+    for tag in soup.find_all(True):
+        if tag.name in STRIPPED_TAGS or _skipped(tag):
+            continue
+        if tag.get('class') or tag.get('data-qa'):
+            elements.append((tag.name, ' '.join(sorted(tag.get('class') or [])), tag.get('data-qa')))
+        if tag.name == 'a' and tag.get('href'):
+            links.append(tag['href'])
+    words = []
+    for text in soup.find_all(string=True):
+        if isinstance(text, Comment) or _skipped(text) or text.parent.name in STRIPPED_TAGS:
+            continue
+        words.extend(text.split())
+    signature = {'elements': elements, 'links': links, 'text': words}
+    signature.update(parser_outputs(soup, cascades))
+    signature['formatted'] = formatted_document(soup)
+    return signature
+
+
+def compare_backends(content: Union[str, bytes], backends: Optional[List[str]] = None,
+                     reference: str = 'html.parser') -> Dict[str, Dict[str, Any]]:
+    """Расхождения результатов разбора бэкендов с эталонным и время построения дерева"""
+    backends = [b for b in (backends or BACKENDS) if is_available(b)]
+    cascades = _source_cascades()
+    signatures, timings = {}, {}
+    for backend in [reference] + [b for b in backends if b != reference]:
+        started = time.perf_counter()
+        soup = make_soup(content, backend=backend)
+        timings[backend] = time.perf_counter() - started
+        signatures[backend] = soup_signature(soup, cascades)
+
+    result = {}
+    base = signatures[reference]
+    for backend, signature in signatures.items():
+        mismatched = [part for part in base if signature[part] != base[part]]
+        result[backend] = {'seconds': timings[backend], 'mismatched': mismatched}
+    return result
+
+
+# Невалидная вложенность из описаний вакансий: html.parser оставляет блоки
+# внутри <p>, lxml закрывает <p> перед ними - описание сохраняется по-разному
+STRUCTURE_SAMPLE = (
+    '<html><body><div class="vacancy-description">'
+    '<p><strong>Обязанности:</strong><ul><li>Проектировать интерфейсы</li></ul></p>'
+    '<p>text<div>block</div>tail</p></div></body></html>'
+)
+
+
+def _fixture_pages(root: str):
+    """HTML-документы из корпуса http_fixtures: (url, content)"""
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if not filename.endswith('.json.gz'):
+                continue
+            with gzip.open(os.path.join(dirpath, filename), 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+            headers = {k.lower(): v for k, v in entry['response']['headers'].items()}
+            if 'html' in headers.get('content-type', ''):
+                yield entry['request']['url'], base64.b64decode(entry['response']['body'])
+
+
+def _synthetic_pages(count: int = 20):
+    """Страницы в духе источников: шапка, скрипты, карточки, описание"""
+    for index in range(count):
+        cards = ''.join(
+            f'<div class="vacancy-card" data-qa="vacancy-serp__vacancy">'
+            f'<a class="vacancy-card__title-link" href="/vacancies/{index * 100 + i}">UI/UX дизайнер {i}</a>'
+            f'<div class="vacancy-card__company"><a href="/companies/{i}">ООО «Ромашка»</a></div>'
+            f'<div class="basic-salary">от 150&nbsp;000 ₽</div><p>Figma, <b>дизайн-система</b><br>удаленно</p></div>'
+            for i in range(25)
+        )
+        page = (
+            '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Вакансии</title>'
+            '<style>.a{color:red}</style>'
+            + '<script>window.dataLayer=[];' + 'var x = "<div>не разметка</div>";' * 200 + '</script>'
+            + '</head><body><header class="header"><nav><a href="/">Главная</a></nav></header>'
+            f'<main class="section-group">{cards}</main>'
+            '<!-- комментарий --><svg><path d="M0 0"/></svg><footer class="footer">© 2025</footer></body></html>'
+        )
+        yield f"https://example.com/page/{index}", page.encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Проверка эквивалентности и скорости HTML-бэкендов')
+    parser.add_argument('--fixtures', help='Каталог корпуса http_fixtures (по умолчанию синтетические страницы)')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, help='Сравниваемые бэкенды')
+    parser.add_argument('--verbose', action='store_true', help='Расхождения по каждой странице')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Проверка должна видеть различия структуры дерева, а не только текста
+    sample = compare_backends(STRUCTURE_SAMPLE, ['lxml'])
+    if 'lxml' in sample:
+        assert 'formatted' in sample['lxml']['mismatched'], sample
+        assert 'description.hh' in sample['lxml']['mismatched'], sample
+
+    pages = _fixture_pages(args.fixtures) if args.fixtures else _synthetic_pages()
+
+    totals = defaultdict(float)
+    mismatches = defaultdict(int)
+    count = 0
+    for url, content in pages:
+        count += 1
+        for backend, result in compare_backends(content, args.backends).items():
+            totals[backend] += result['seconds']
+            if result['mismatched']:
+                mismatches[backend] += 1
+                if args.verbose:
+                    print(f"≠ {backend}: {url} ({', '.join(result['mismatched'])})")
+
+    if not count:
+        print("Нет HTML-страниц для проверки")
+        return 1
+
+    reference = totals['html.parser']
+    print(f"\nСтраниц: {count}")
+    print(f"{'бэкенд':<14}{'мс/стр':>10}{'ускорение':>12}{'расхождений':>14}")
+    for backend, seconds in totals.items():
+        print(f"{backend:<14}{seconds / count * 1000:>10.2f}{reference / seconds:>11.1f}x{mismatches[backend]:>14}")
+    return 1 if any(mismatches.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Запись и воспроизведение HTTP-ответов (корпус фикстур)
+
+record - все запросы requests и загрузки Playwright (через ResourceBlocker)
+         выполняются как обычно, ответы сохраняются в корпус
+replay - ответы отдаются из корпуса без сети; отсутствующие в корпусе
+         запросы завершаются ошибкой соединения
+
+Корпус - каталог <host>/<sha1>.json.gz, по файлу на запрос (метод + URL с
+отсортированными параметрами + хэш тела). Задержку ответа при replay можно
+задать фиксированной или взять записанную (с множителем).
+
+Включение для любых парсеров и раннеров - переменными окружения:
+    PARSER_HTTP_FIXTURES=record:fixtures/http python unified_parser.py ...
+    PARSER_HTTP_FIXTURES=replay:fixtures/http PARSER_HTTP_LATENCY=0.05 python unified_parser.py ...
+    PARSER_HTTP_LATENCY=recorded*0.5 - половина записанной задержки
+или опциями --fixtures/--fixtures-latency unified_parser и simple_unified_parser.
+
+В режиме replay RateController не выдерживает паузы между запросами.
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+logger = logging.getLogger(__name__)
+
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+# Тело хранится уже раскодированным, эти заголовки ему больше не соответствуют
+_DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+
+def normalize_url(url: str) -> str:
+    """URL без фрагмента и с отсортированными параметрами запроса"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+def _body_bytes(body: Union[str, bytes, None]) -> bytes:
+    if body is None:
+        return b''
+    return body.encode('utf-8') if isinstance(body, str) else bytes(body)
+
+
+class FixtureStore:
+    """Корпус ответов на диске"""
+
+    def __init__(self, root: str, mode: str, latency: float = 0.0,
+                 latency_factor: Optional[float] = None):
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Неизвестный режим фикстур: {mode}")
+        self.root = Path(root)
+        self.mode = mode
+        self.latency = latency
+        self.latency_factor = latency_factor
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, method: str, url: str, body: Union[str, bytes, None]) -> Path:
+        normalized = normalize_url(url)
+        digest = hashlib.sha1(
+            f"{method.upper()} {normalized}\n".encode('utf-8') + hashlib.sha1(_body_bytes(body)).digest()
+        ).hexdigest()
+        host = urlsplit(normalized).netloc.replace(':', '_') or '_'
+        return self.root / host / f"{digest}.json.gz"
+
+    def save(self, method: str, url: str, body: Union[str, bytes, None], status: int,
+             headers: Dict[str, str], content: bytes, elapsed: float, reason: str = ''):
+        path = self._path(method, url, body)
+        entry = {
+            'request': {'method': method.upper(), 'url': url},
+            'response': {
+                'status': status,
+                'reason': reason,
+                'headers': {k: v for k, v in headers.items() if k.lower() not in _DROPPED_HEADERS},
+                'body': base64.b64encode(content or b'').decode('ascii'),
+                'elapsed': round(elapsed, 4),
+            },
+            'recorded_at': time.time(),
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Запись через временный файл: корпус могут писать несколько потоков и процессов
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        with self._lock:
+            self.stats['recorded'] += 1
+
+    def load(self, method: str, url: str, body: Union[str, bytes, None] = None) -> Optional[Dict[str, Any]]:
+        path = self._path(method, url, body)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                response = json.load(f)['response']
+        except FileNotFoundError:
+            with self._lock:
+                self.stats['missed'] += 1
+            logger.warning(f"📼 Нет записи в корпусе: {method} {url}")
+            return None
+        response['content'] = base64.b64decode(response.pop('body'))
+        with self._lock:
+            self.stats['replayed'] += 1
+        return response
+
+    def delay_for(self, response: Dict[str, Any]) -> float:
+        """Задержка воспроизведения: записанная * factor или фиксированная"""
+        if self.latency_factor is not None:
+            return response.get('elapsed', 0.0) * self.latency_factor
+        return self.latency
+
+
+_store: Optional[FixtureStore] = None
+_original_send = HTTPAdapter.send
+
+
+def active() -> Optional[FixtureStore]:
+    return _store
+
+
+def replaying() -> bool:
+    return _store is not None and _store.mode == MODE_REPLAY
+
+
+def _adapter_send(adapter, request, **kwargs):
+    store = _store
+    if store is None:
+        return _original_send(adapter, request, **kwargs)
+
+    if store.mode == MODE_RECORD:
+        started = time.time()
+        response = _original_send(adapter, request, **kwargs)
+        content = response.content
+        store.save(request.method, request.url, request.body, response.status_code,
+                   dict(response.headers), content, time.time() - started, response.reason or '')
+        return response
+
+    entry = store.load(request.method, request.url, request.body)
+    if entry is None:
+        raise requests.ConnectionError(f"Нет записи в корпусе: {request.method} {request.url}", request=request)
+
+    delay = store.delay_for(entry)
+    if delay > 0:
+        time.sleep(delay)
+
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.reason = entry.get('reason', '')
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = entry['content']
+    response._content_consumed = True
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    return response
+
+
+def activate(mode: str, root: str, latency: float = 0.0,
+             latency_factor: Optional[float] = None) -> FixtureStore:
+    """Включение записи/воспроизведения для всех requests-сессий процесса"""
+    global _store
+    _store = FixtureStore(root, mode, latency, latency_factor)
+    HTTPAdapter.send = _adapter_send
+    logger.info(f"📼 HTTP фикстуры: {mode} ({root})")
+    return _store
+
+
+def deactivate():
+    global _store
+    _store = None
+    HTTPAdapter.send = _original_send
+
+
+def _parse_latency(value: str):
+    """'0.05' -> (0.05, None); 'recorded' -> (0, 1.0); 'recorded*0.5' -> (0, 0.5)"""
+    value = (value or '').strip()
+    if not value:
+        return 0.0, None
+    if value.startswith('recorded'):
+        _, _, factor = value.partition('*')
+        return 0.0, float(factor) if factor else 1.0
+    return float(value), None
+
+
+def activate_spec(spec: str, latency: str = '') -> FixtureStore:
+    """Включение по строке вида 'record:<dir>' / 'replay:<dir>' (CLI раннеров)"""
+    mode, _, root = spec.partition(':')
+    latency_value, factor = _parse_latency(latency)
+    return activate(mode, root or 'fixtures/http', latency_value, factor)
+
+
+def activate_from_env() -> Optional[FixtureStore]:
+    """PARSER_HTTP_FIXTURES=record:<dir> | replay:<dir>, PARSER_HTTP_LATENCY"""
+    spec = os.environ.get('PARSER_HTTP_FIXTURES')
+    if not spec or _store is not None:
+        return _store
+    return activate_spec(spec, os.environ.get('PARSER_HTTP_LATENCY', ''))
+
+
+def handle_route_sync(route):
+    """Обработчик маршрута Playwright (sync API) для запросов, пропущенных ResourceBlocker"""
+    store = _store
+    request = route.request
+    if store.mode == MODE_RECORD:
+        started = time.time()
+        response = route.fetch()
+        body = response.body()
+        store.save(request.method, request.url, request.post_data_buffer, response.status,
+                   response.headers, body, time.time() - started, response.status_text)
+        route.fulfill(response=response, body=body)
+        return
+
+    entry = store.load(request.method, request.url, request.post_data_buffer)
+    if entry is None:
+        route.abort()
+        return
+    delay = store.delay_for(entry)
+    if delay > 0:
+        time.sleep(delay)
+    route.fulfill(status=entry['status'], headers=entry['headers'], body=entry['content'])
+
+
+async def handle_route_async(route):
+    """Обработчик маршрута Playwright (async API)"""
+    store = _store
+    request = route.request
+    if store.mode == MODE_RECORD:
+        started = time.time()
+        response = await route.fetch()
+        body = await response.body()
+        store.save(request.method, request.url, request.post_data_buffer, response.status,
+                   response.headers, body, time.time() - started, response.status_text)
+        await route.fulfill(response=response, body=body)
+        return
+
+    entry = store.load(request.method, request.url, request.post_data_buffer)
+    if entry is None:
+        await route.abort()
+        return
+    delay = store.delay_for(entry)
+    if delay > 0:
+        await asyncio.sleep(delay)
+    await route.fulfill(status=entry['status'], headers=entry['headers'], body=entry['content'])
+
+
+def main():
+    """Проверка: запись ответов локального сервера и воспроизведение без него"""
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    logging.basicConfig(level=logging.INFO)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = f"<html><body>{self.path}</body></html>".encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    root = tempfile.mkdtemp()
+
+    activate(MODE_RECORD, root)
+    recorded = requests.get(f"{base}/vacancies?b=2&a=1").text
+    server.shutdown()
+    server.server_close()
+
+    store = activate(MODE_REPLAY, root, latency=0.01)
+    started = time.time()
+    replayed = requests.get(f"{base}/vacancies?a=1&b=2").text
+    assert replayed == recorded, (replayed, recorded)
+    assert time.time() - started >= 0.01
+    try:
+        requests.get(f"{base}/missing")
+        raise AssertionError("запрос вне корпуса должен завершиться ошибкой")
+    except requests.ConnectionError:
+        pass
+    deactivate()
+
+    print(f"OK: {dict(store.stats)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
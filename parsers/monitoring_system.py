@@ -114,6 +114,24 @@ class MonitoringSystem:
                 )
             """)
             
+            # Статистика уровней загрузки (HTTP / браузер) по источнику и шаблону URL.
+            # attempts/successes/latency - экспоненциально затухающие значения,
+            # чтобы роутер быстро замечал, что уровень перестал работать
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS fetch_tier_stats (
+                    source TEXT NOT NULL,
+                    url_pattern TEXT NOT NULL,
+                    tier TEXT NOT NULL,
+                    attempts REAL DEFAULT 0,
+                    successes REAL DEFAULT 0,
+                    avg_latency REAL DEFAULT 0,
+                    total_attempts INTEGER DEFAULT 0,
+                    last_success TIMESTAMP,
+                    last_failure TIMESTAMP,
+                    PRIMARY KEY (source, url_pattern, tier)
+                )
+            """)
+            
             # Создаем индексы
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_parsing_timestamp ON parsing_metrics(timestamp)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_parsing_source ON parsing_metrics(source)")
@@ -145,25 +163,28 @@ class MonitoringSystem:
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (source, query, page, success, response_time, items_found, error_message, user_agent, http_status))
             
-            # Обновляем состояние источника
+            # Обновляем состояние источника (UPDATE, а не REPLACE, чтобы не
+            # затирать last_success/last_failure противоположного исхода)
+            cursor.execute("INSERT OR IGNORE INTO source_health (source) VALUES (?)", (source,))
             if success:
                 cursor.execute("""
-                    INSERT OR REPLACE INTO source_health 
-                    (source, last_success, consecutive_failures, total_requests, successful_requests, status)
-                    VALUES (?, ?, 0, 
-                        COALESCE((SELECT total_requests FROM source_health WHERE source = ?), 0) + 1,
-                        COALESCE((SELECT successful_requests FROM source_health WHERE source = ?), 0) + 1,
-                        'healthy')
-                """, (source, datetime.now().isoformat(), source, source))
+                    UPDATE source_health SET
+                        last_success = ?,
+                        consecutive_failures = 0,
+                        total_requests = total_requests + 1,
+                        successful_requests = successful_requests + 1,
+                        status = 'healthy'
+                    WHERE source = ?
+                """, (datetime.now().isoformat(), source))
             else:
                 cursor.execute("""
-                    INSERT OR REPLACE INTO source_health 
-                    (source, last_failure, consecutive_failures, total_requests, status)
-                    VALUES (?, ?, 
-                        COALESCE((SELECT consecutive_failures FROM source_health WHERE source = ?), 0) + 1,
-                        COALESCE((SELECT total_requests FROM source_health WHERE source = ?), 0) + 1,
-                        'degraded')
-                """, (source, datetime.now().isoformat(), source, source))
+                    UPDATE source_health SET
+                        last_failure = ?,
+                        consecutive_failures = consecutive_failures + 1,
+                        total_requests = total_requests + 1,
+                        status = 'degraded'
+                    WHERE source = ?
+                """, (datetime.now().isoformat(), source))
             
             conn.commit()
             conn.close()
@@ -196,6 +217,82 @@ class MonitoringSystem:
         except Exception as e:
             self.logger.error(f"Error recording request metric: {str(e)}")
     
+    def record_fetch_tier(self, source: str, url_pattern: str, tier: str,
+                          success: bool, latency: float = 0, decay: float = 0.9):
+        """Запись попытки загрузки страницы через уровень tier (http, browser, ...)
+        
+        Задержка усредняется только по успешным попыткам.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            now = datetime.now().isoformat()
+            cursor.execute("""
+                INSERT OR IGNORE INTO fetch_tier_stats (source, url_pattern, tier)
+                VALUES (?, ?, ?)
+            """, (source, url_pattern, tier))
+            cursor.execute("""
+                UPDATE fetch_tier_stats SET
+                    attempts = attempts * ? + 1,
+                    successes = successes * ? + ?,
+                    avg_latency = CASE WHEN ? = 0 THEN avg_latency
+                                       WHEN avg_latency = 0 THEN ?
+                                       ELSE avg_latency * ? + ? * (1 - ?) END,
+                    total_attempts = total_attempts + 1,
+                    last_success = CASE WHEN ? THEN ? ELSE last_success END,
+                    last_failure = CASE WHEN ? THEN last_failure ELSE ? END
+                WHERE source = ? AND url_pattern = ? AND tier = ?
+            """, (decay, decay, 1 if success else 0,
+                  1 if success else 0, latency, decay, latency, decay,
+                  success, now, success, now,
+                  source, url_pattern, tier))
+            
+            conn.commit()
+            conn.close()
+            
+        except Exception as e:
+            self.logger.error(f"Error recording fetch tier metric: {str(e)}")
+    
+    def get_fetch_tier_stats(self, source: str, url_pattern: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Статистика уровней загрузки для источника (и шаблона URL)"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            query = """
+                SELECT url_pattern, tier, attempts, successes, avg_latency, total_attempts,
+                       last_success, last_failure
+                FROM fetch_tier_stats WHERE source = ?
+            """
+            params = [source]
+            if url_pattern is not None:
+                query += " AND url_pattern = ?"
+                params.append(url_pattern)
+            
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            conn.close()
+            
+            return [
+                {
+                    'url_pattern': row[0],
+                    'tier': row[1],
+                    'attempts': row[2],
+                    'successes': row[3],
+                    'success_rate': row[3] / row[2] if row[2] else 0.0,
+                    'avg_latency': round(row[4] or 0, 3),
+                    'total_attempts': row[5],
+                    'last_success': row[6],
+                    'last_failure': row[7]
+                }
+                for row in rows
+            ]
+            
+        except Exception as e:
+            self.logger.error(f"Error getting fetch tier stats: {str(e)}")
+            return []
+    
     def _check_alert_conditions(self, source: str):
         """Проверка условий для отправки алертов"""
         try:
@@ -442,6 +539,36 @@ class MonitoringSystem:
             self.logger.error(f"Error getting health status: {str(e)}")
             return {'error': str(e)}
     
+    def get_source_health(self, source: str) -> Optional[Dict[str, Any]]:
+        """Состояние одного источника из source_health (None, если записей нет)"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT last_success, last_failure, consecutive_failures,
+                       total_requests, successful_requests, status
+                FROM source_health WHERE source = ?
+            """, (source,))
+            row = cursor.fetchone()
+            conn.close()
+            
+            if not row:
+                return None
+            
+            return {
+                'source': source,
+                'last_success': row[0],
+                'last_failure': row[1],
+                'consecutive_failures': row[2] or 0,
+                'total_requests': row[3] or 0,
+                'successful_requests': row[4] or 0,
+                'status': row[5]
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Error getting source health: {str(e)}")
+            return None
+    
     def resolve_alerts(self, alert_type: str = '', source: str = ''):
         """Разрешение алертов"""
         try:
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Структурированное извлечение данных прямо в браузере (Playwright)
+
+Вместо page.content() + BeautifulSoup и запроса на каждое поле
+выполняется один page.evaluate на страницу: спецификация источника
+(селекторы карточек и полей) применяется в браузере, а в Python
+возвращается компактный JSON - список карточек или поля детальной страницы.
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Для каждого корня (карточки или document) и каждого поля пробуем
+# селекторы по порядку и берем первое непустое значение.
+# attr: null - textContent, 'html' - innerHTML, иначе - значение атрибута.
+_EXTRACT_JS = """
+(spec) => {
+    const pick = (root, field) => {
+        for (const sel of field.selectors) {
+            const el = sel ? root.querySelector(sel) : root;
+            if (!el) continue;
+            let value;
+            if (field.attr === 'html') value = el.innerHTML;
+            else if (field.attr) value = el.getAttribute(field.attr);
+            else value = el.textContent;
+            if (value && value.trim()) return value.trim();
+        }
+        return null;
+    };
+    let roots = [document];
+    if (spec.cards.length) {
+        roots = [];
+        for (const sel of spec.cards) {
+            const found = document.querySelectorAll(sel);
+            if (found.length) { roots = Array.from(found); break; }
+        }
+    }
+    return roots.map((root) => {
+        const out = {};
+        for (const [name, field] of Object.entries(spec.fields)) out[name] = pick(root, field);
+        return out;
+    });
+}
+"""
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """Поле: каскад селекторов и что извлекать (текст, innerHTML или атрибут)"""
+    selectors: tuple
+    attr: Optional[str] = None
+
+
+@dataclass
+class ExtractionSpec:
+    """Спецификация извлечения: cards - селекторы карточек (пусто - вся страница)"""
+    fields: Dict[str, FieldSpec]
+    cards: List[str] = field(default_factory=list)
+
+    def to_js_arg(self) -> Dict[str, Any]:
+        return {
+            'cards': list(self.cards),
+            'fields': {
+                name: {'selectors': list(f.selectors), 'attr': f.attr}
+                for name, f in self.fields.items()
+            },
+        }
+
+
+def _title_link_selectors(title_selectors: List[str]) -> tuple:
+    """Ссылка берется из <a> внутри заголовка или из самого заголовка"""
+    return tuple([f"{s} a" for s in title_selectors] + title_selectors)
+
+
+_HH_TITLE = [
+    '[data-qa="vacancy-serp__vacancy-title"]',
+    '[data-qa="serp-item__title"]',
+    '.serp-item__title',
+    '.vacancy-serp-item__title',
+]
+
+HH_LIST_SPEC = ExtractionSpec(
+    cards=['[data-qa="vacancy-serp__vacancy"]', '.vacancy-serp-item', '.serp-item'],
+    fields={
+        'title': FieldSpec(tuple(_HH_TITLE)),
+        'url': FieldSpec(_title_link_selectors(_HH_TITLE), attr='href'),
+        'company': FieldSpec((
+            '[data-qa="vacancy-serp__vacancy-employer"]',
+            '.serp-item__meta-info a',
+            '.vacancy-serp-item__meta-info a',
+        )),
+        'salary': FieldSpec((
+            '[data-qa="vacancy-serp__vacancy-compensation"]',
+            '.serp-item__compensation',
+            '.vacancy-serp-item__compensation',
+        )),
+        'location': FieldSpec((
+            '[data-qa="vacancy-serp__vacancy-address"]',
+            '.serp-item__meta-info',
+            '.vacancy-serp-item__meta-info',
+        )),
+        'description': FieldSpec((
+            '[data-qa="vacancy-serp__vacancy_snippet_responsibility"]',
+            '.serp-item__snippet',
+            '.vacancy-serp-item__snippet',
+            '.snippet',
+        )),
+    },
+)
+
+HH_DETAIL_SPEC = ExtractionSpec(
+    fields={
+        # HTML только блока описания - форматирование остается на стороне Python
+        'description_html': FieldSpec((
+            '[data-qa="vacancy-description"]',
+            '.vacancy-description',
+            '.g-user-content',
+        ), attr='html'),
+        'title': FieldSpec(('[data-qa="vacancy-title"]', 'h1')),
+        'company': FieldSpec(('[data-qa="vacancy-company-name"]',)),
+        'experience': FieldSpec(('[data-qa="vacancy-experience"]',)),
+        'employment': FieldSpec(('[data-qa="vacancy-view-employment-mode"]',)),
+    },
+)
+
+_HABR_TITLE = ['a.vacancy-card__title-link', '.vacancy-card__title a']
+
+HABR_LIST_SPEC = ExtractionSpec(
+    cards=['div.vacancy-card', 'article.vacancy-card'],
+    fields={
+        'title': FieldSpec(tuple(_HABR_TITLE)),
+        'url': FieldSpec(tuple(_HABR_TITLE), attr='href'),
+        'company': FieldSpec(('a.vacancy-card__company-title', '.vacancy-card__company-title')),
+        'salary': FieldSpec(('.vacancy-card__salary',)),
+        'location': FieldSpec(('.vacancy-card__meta',)),
+        'description': FieldSpec(('.vacancy-card__skills', '.vacancy-card__description')),
+    },
+)
+
+HABR_DETAIL_SPEC = ExtractionSpec(
+    fields={
+        'description_html': FieldSpec((
+            '.basic-section--appearance-vacancy-description',
+            '.vacancy-description',
+            '.job-description',
+        ), attr='html'),
+    },
+)
+
+# Спецификации по источникам: list - выдача, detail - страница вакансии
+SOURCE_SPECS: Dict[str, Dict[str, ExtractionSpec]] = {
+    'hh': {'list': HH_LIST_SPEC, 'detail': HH_DETAIL_SPEC},
+    'habr': {'list': HABR_LIST_SPEC, 'detail': HABR_DETAIL_SPEC},
+}
+
+
+def get_spec(source: Optional[str], kind: str = 'list') -> Optional[ExtractionSpec]:
+    return SOURCE_SPECS.get(source or '', {}).get(kind)
+
+
+def extract_sync(page, spec: ExtractionSpec) -> List[Dict[str, Optional[str]]]:
+    """Один evaluate для playwright.sync_api"""
+    try:
+        return page.evaluate(_EXTRACT_JS, spec.to_js_arg()) or []
+    except Exception as e:
+        logger.debug(f"Структурированное извлечение не удалось: {e}")
+        return []
+
+
+async def extract_async(page, spec: ExtractionSpec) -> List[Dict[str, Optional[str]]]:
+    """Один evaluate для playwright.async_api"""
+    try:
+        return await page.evaluate(_EXTRACT_JS, spec.to_js_arg()) or []
+    except Exception as e:
+        logger.debug(f"Структурированное извлечение не удалось: {e}")
+        return []
+
+
+def first_or_empty(rows: List[Dict[str, Optional[str]]]) -> Dict[str, Optional[str]]:
+    """Для детальных страниц (без cards) результат - список из одного словаря"""
+    return rows[0] if rows else {}
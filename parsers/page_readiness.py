@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Готовность страницы по содержимому для браузерных путей (Playwright)
+
+Вместо networkidle и фиксированных sleep ждем конкретное условие
+("на странице есть N карточек", "блок описания есть и не пустой"),
+которое проверяется в браузере через page.wait_for_function и
+возвращает управление сразу после выполнения.
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+try:
+    from resource_policy import source_for_url
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(__file__))
+    from resource_policy import source_for_url
+
+logger = logging.getLogger(__name__)
+
+# Условие проверяется в браузере. Страница готова, если:
+# - найдено не меньше min_count элементов, или
+# - документ полностью загружен и есть хотя бы один элемент (последняя страница выдачи);
+# и при этом текст первого элемента не короче min_text_length.
+_READY_JS = """
+([selector, minCount, minText]) => {
+    const els = document.querySelectorAll(selector);
+    if (!els.length) return false;
+    if (els.length < minCount && document.readyState !== 'complete') return false;
+    if (minText > 0) {
+        const text = (els[0].textContent || '').trim();
+        if (text.length < minText) return false;
+    }
+    return true;
+}
+"""
+
+_COUNT_JS = "(selector) => document.querySelectorAll(selector).length"
+
+_GREW_JS = "([selector, previous]) => document.querySelectorAll(selector).length > previous"
+
+
+@dataclass(frozen=True)
+class Readiness:
+    """Условие готовности страницы"""
+    selector: str
+    min_count: int = 1
+    min_text_length: int = 0
+
+    @property
+    def args(self) -> list:
+        return [self.selector, self.min_count, self.min_text_length]
+
+
+# Определения готовности по источникам: list - выдача, detail - страница вакансии
+SOURCE_READINESS: Dict[str, Dict[str, Readiness]] = {
+    'hh': {
+        'list': Readiness('[data-qa="vacancy-serp__vacancy"], .serp-item, .vacancy-serp-item', min_count=20),
+        'detail': Readiness('[data-qa="vacancy-description"], .vacancy-description, .g-user-content', min_text_length=100),
+    },
+    'habr': {
+        'list': Readiness('div.vacancy-card, article.vacancy-card', min_count=10),
+        'detail': Readiness('.basic-section--appearance-vacancy-description, .vacancy-description, .job-description', min_text_length=100),
+    },
+    'geekjob': {
+        'list': Readiness('a[href*="/vacancy/"]', min_count=10),
+        'detail': Readiness('.vacancy-description, .job-description, .description', min_text_length=100),
+    },
+    'getmatch': {
+        'list': Readiness('div.vacancy-card, div.job-card, a[href*="/vacancies/"]', min_count=10),
+        'detail': Readiness('.vacancy-description, .job-description, .description', min_text_length=100),
+    },
+    'hirehi': {
+        'list': Readiness('div.job-card, div.vacancy-card, a[href*="/job/"], a[href*="/vacancy/"]', min_count=5),
+        'detail': Readiness('.job-description, .vacancy-description, .description', min_text_length=100),
+    },
+}
+
+
+def get_readiness(source: Optional[str] = None, kind: str = 'list',
+                  url: Optional[str] = None) -> Optional[Readiness]:
+    """Условие готовности для источника (или URL) и типа страницы"""
+    if not source and url:
+        source = source_for_url(url)
+    return SOURCE_READINESS.get(source or '', {}).get(kind)
+
+
+def wait_ready_sync(page, readiness: Readiness, timeout_ms: int = 15000) -> bool:
+    """Ожидание готовности для playwright.sync_api"""
+    try:
+        page.wait_for_function(_READY_JS, arg=readiness.args, timeout=timeout_ms)
+        return True
+    except Exception as e:
+        logger.debug(f"Страница не готова за {timeout_ms}ms ({readiness.selector}): {e}")
+        return False
+
+
+async def wait_ready_async(page, readiness: Readiness, timeout_ms: int = 15000) -> bool:
+    """Ожидание готовности для playwright.async_api"""
+    try:
+        await page.wait_for_function(_READY_JS, arg=readiness.args, timeout=timeout_ms)
+        return True
+    except Exception as e:
+        logger.debug(f"Страница не готова за {timeout_ms}ms ({readiness.selector}): {e}")
+        return False
+
+
+async def scroll_until_stable(page, selector: str, max_scrolls: int = 10,
+                              growth_timeout_ms: int = 2000) -> int:
+    """
+    Бесконечный скролл, пока растет число карточек.
+
+    После каждого скролла ждем появления новых карточек не дольше growth_timeout_ms;
+    если число не выросло - контент закончился и цикл останавливается.
+    """
+    count = await page.evaluate(_COUNT_JS, selector)
+    scrolls = 0
+
+    for i in range(max_scrolls):
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        try:
+            await page.wait_for_function(_GREW_JS, arg=[selector, count], timeout=growth_timeout_ms)
+        except Exception:
+            logger.debug(f"Карточки перестали добавляться после {i + 1} скроллов ({count} шт.)")
+            break
+        count = await page.evaluate(_COUNT_JS, selector)
+        scrolls += 1
+        logger.debug(f"Scroll {i + 1}/{max_scrolls}: {count} карточек")
+
+    return scrolls
@@ -4,24 +4,58 @@ import asyncio
 import logging
 import random
 import time
-from typing import List, Dict, Optional, Any
+from contextlib import asynccontextmanager
+from typing import List, Dict, Optional, Any, Callable, Awaitable
 from abc import ABC, abstractmethod
 from datetime import datetime
+from urllib.parse import urlparse
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 
+try:
+    from resource_policy import ResourceBlocker, get_policy
+    from page_readiness import Readiness, SOURCE_READINESS, wait_ready_async, scroll_until_stable
+    from page_extraction import ExtractionSpec, extract_async
+    from rate_controller import rate_controller, parse_retry_after
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(__file__))
+    from resource_policy import ResourceBlocker, get_policy
+    from page_readiness import Readiness, SOURCE_READINESS, wait_ready_async, scroll_until_stable
+    from page_extraction import ExtractionSpec, extract_async
+    from rate_controller import rate_controller, parse_retry_after
+
 class PlaywrightBaseParser(ABC):
     """
     Базовый класс для парсеров с использованием Playwright
     Для сайтов с JavaScript и защитой от ботов
     """
     
-    def __init__(self, headless: bool = True, slow_mo: int = 100):
+    def __init__(self, headless: bool = True, slow_mo: int = 100, source: Optional[str] = None,
+                 max_pages: int = 4, per_host_limit: int = 3):
         self.headless = headless
         self.slow_mo = slow_mo
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
         
+        # Пул вкладок одного браузера для параллельной загрузки деталей:
+        # не больше max_pages вкладок и per_host_limit одновременных запросов к хосту
+        self.max_pages = max(1, max_pages)
+        self.per_host_limit = max(1, per_host_limit)
+        self._idle_pages: Optional[asyncio.Queue] = None
+        self._extra_pages: List[Page] = []
+        self._pages_opened = 1
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._blockers: Dict[int, ResourceBlocker] = {}
+        
+        # Перехват запросов: картинки, шрифты, медиа и трекеры не загружаются
+        self.source = source
+        self.resource_blocker = ResourceBlocker(get_policy(source))
+        
+        # Условия готовности страниц источника ('list', 'detail')
+        self.readiness: Dict[str, Readiness] = SOURCE_READINESS.get(source or '', {})
+        
         # Настройка логирования
         self.logger = logging.getLogger(self.__class__.__name__)
         
@@ -31,6 +65,9 @@ class PlaywrightBaseParser(ABC):
             'successful_requests': 0,
             'failed_requests': 0,
             'total_response_time': 0,
+            'requests_blocked': 0,
+            'bytes_loaded': 0,
+            'bytes_saved_estimate': 0,
             'start_time': datetime.now()
         }
         
@@ -82,11 +119,9 @@ class PlaywrightBaseParser(ABC):
                 'Cache-Control': 'max-age=0'
             })
             
-            # Создаем страницу
-            self.page = await self.context.new_page()
-            
-            # Удаляем webdriver property для обхода детекции
-            await self.page.add_init_script("""
+            # Удаляем webdriver property для обхода детекции (на уровне контекста,
+            # чтобы скрипт действовал во всех вкладках пула)
+            await self.context.add_init_script("""
                 Object.defineProperty(navigator, 'webdriver', {
                     get: () => undefined,
                 });
@@ -107,15 +142,90 @@ class PlaywrightBaseParser(ABC):
                 };
             """)
             
+            # Создаем страницу и отсекаем лишние ресурсы до первой навигации
+            self.page = await self.context.new_page()
+            await self._prepare_page(self.page)
+            
             self.logger.info("Browser initialized successfully")
             
         except Exception as e:
             self.logger.error(f"Failed to initialize browser: {str(e)}")
             raise
     
-    async def safe_navigate(self, url: str, timeout: int = 30000) -> bool:
-        """Безопасная навигация с retry логикой"""
+    async def _prepare_page(self, page: Page) -> ResourceBlocker:
+        """Вешает перехват запросов на вкладку (у каждой вкладки свой счетчик)"""
+        if page is self.page:
+            blocker = self.resource_blocker
+        else:
+            blocker = ResourceBlocker(self.resource_blocker.policy)
+        await page.route('**/*', blocker.handle_route_async)
+        page.on('response', blocker.on_response)
+        self._blockers[id(page)] = blocker
+        return blocker
+    
+    async def acquire_page(self) -> Page:
+        """Выдает свободную вкладку; новые открываются, пока не достигнут max_pages"""
+        if self._idle_pages is None:
+            self._idle_pages = asyncio.Queue()
+            self._idle_pages.put_nowait(self.page)
+        
+        if self._idle_pages.empty() and self._pages_opened < self.max_pages:
+            # Счетчик увеличиваем до await, чтобы параллельные задачи не открыли лишних вкладок
+            self._pages_opened += 1
+            page = await self.context.new_page()
+            await self._prepare_page(page)
+            self._extra_pages.append(page)
+            self.logger.debug(f"Opened tab {self._pages_opened}/{self.max_pages}")
+            return page
+        
+        return await self._idle_pages.get()
+    
+    def release_page(self, page: Page):
+        """Возвращает вкладку в пул"""
+        self._idle_pages.put_nowait(page)
+    
+    @asynccontextmanager
+    async def borrow_page(self):
+        """async with self.borrow_page() as page: ..."""
+        page = await self.acquire_page()
+        try:
+            yield page
+        finally:
+            self.release_page(page)
+    
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).hostname or ''
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
+    
+    async def map_pages_concurrently(self, urls: List[str],
+                                     worker: Callable[[str, Page], Awaitable[Any]]) -> List[Any]:
+        """
+        Параллельная обработка URL во вкладках общего браузера.
+        
+        worker(url, page) вызывается с отдельной вкладкой; одновременно к одному
+        хосту идет не больше per_host_limit запросов. Ошибки возвращаются
+        на месте результата (как asyncio.gather(return_exceptions=True)).
+        """
+        async def run(url: str):
+            async with self._host_semaphore(url):
+                async with self.borrow_page() as page:
+                    return await worker(url, page)
+        
+        return await asyncio.gather(*(run(url) for url in urls), return_exceptions=True)
+    
+    async def safe_navigate(self, url: str, timeout: int = 30000, readiness: Optional[Readiness] = None,
+                            page: Optional[Page] = None) -> bool:
+        """Безопасная навигация с retry логикой
+        
+        readiness - условие готовности содержимого; навигация завершается,
+        как только оно выполнено, без фиксированных пауз под AJAX.
+        page - вкладка из пула (по умолчанию основная self.page).
+        """
         max_retries = 3
+        page = page or self.page
+        blocker = self._blockers.get(id(page), self.resource_blocker)
         
         for attempt in range(max_retries):
             try:
@@ -129,23 +239,40 @@ class PlaywrightBaseParser(ABC):
                     self.logger.debug(f"Retry delay: {delay:.2f}s")
                     await asyncio.sleep(delay)
                 
-                response = await self.page.goto(
+                # Темп навигаций к хосту общий для всех вкладок и парсеров
+                await rate_controller.acquire_async(url)
+                blocker.start(url)
+                response = await page.goto(
                     url, 
                     wait_until='domcontentloaded',
                     timeout=timeout
                 )
+                rate_controller.record(url, response.status,
+                                       parse_retry_after(response.headers.get('retry-after')))
                 
                 if response.status >= 400:
                     raise Exception(f"HTTP {response.status}: {response.status_text}")
                 
-                # Дополнительное ожидание для AJAX запросов
-                await asyncio.sleep(random.uniform(1, 3))
+                # Ждем готовности содержимого вместо фиксированной паузы под AJAX
+                if readiness:
+                    await wait_ready_async(page, readiness, timeout)
+                else:
+                    try:
+                        await page.wait_for_load_state('load', timeout=timeout)
+                    except Exception:
+                        pass
                 
                 response_time = time.time() - start_time
                 self.stats['successful_requests'] += 1
                 self.stats['total_response_time'] += response_time
                 self.stats['pages_loaded'] += 1
                 
+                load_report = blocker.finish()
+                if load_report:
+                    self.stats['requests_blocked'] += load_report.requests_blocked
+                    self.stats['bytes_loaded'] += load_report.bytes_loaded
+                    self.stats['bytes_saved_estimate'] += load_report.bytes_saved_estimate
+                
                 self.logger.info(f"Successfully loaded {url} in {response_time:.2f}s")
                 return True
                 
@@ -193,10 +320,10 @@ class PlaywrightBaseParser(ABC):
             self.logger.warning(f"Failed to click '{selector}': {str(e)}")
             return False
     
-    async def extract_text_safe(self, selector: str, default: str = '') -> str:
+    async def extract_text_safe(self, selector: str, default: str = '', page: Optional[Page] = None) -> str:
         """Безопасное извлечение текста"""
         try:
-            element = await self.page.query_selector(selector)
+            element = await (page or self.page).query_selector(selector)
             if element:
                 text = await element.text_content()
                 return text.strip() if text else default
@@ -239,8 +366,30 @@ class PlaywrightBaseParser(ABC):
             self.logger.debug(f"Failed to extract multiple from '{selector}': {str(e)}")
             return []
     
-    async def handle_infinite_scroll(self, max_scrolls: int = 10, delay: float = 2.0) -> int:
-        """Обработка бесконечного скролла"""
+    async def extract_structured(self, spec: ExtractionSpec, page: Optional[Page] = None) -> List[Dict[str, Optional[str]]]:
+        """Извлечение всех карточек (или полей страницы) одним evaluate в браузере"""
+        rows = await extract_async(page or self.page, spec)
+        self.logger.debug(f"Structured extraction: {len(rows)} rows")
+        return rows
+    
+    async def handle_infinite_scroll(self, max_scrolls: int = 10, delay: float = 2.0,
+                                     card_selector: Optional[str] = None) -> int:
+        """Обработка бесконечного скролла
+        
+        Скролл останавливается, как только перестает расти число карточек
+        (card_selector или селектор выдачи источника). delay - верхняя граница
+        ожидания новых карточек после одного скролла, а не фиксированная пауза.
+        """
+        if card_selector is None and 'list' in self.readiness:
+            card_selector = self.readiness['list'].selector
+        
+        if card_selector:
+            return await scroll_until_stable(
+                self.page, card_selector, max_scrolls=max_scrolls,
+                growth_timeout_ms=int(delay * 1000)
+            )
+        
+        # Без селектора карточек ориентируемся на рост высоты страницы
         scroll_count = 0
         last_height = await self.page.evaluate("document.body.scrollHeight")
         
@@ -248,16 +397,18 @@ class PlaywrightBaseParser(ABC):
             # Скроллим вниз
             await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
             
-            # Ждем загрузки контента
-            await asyncio.sleep(delay)
-            
-            # Проверяем, изменилась ли высота страницы
-            new_height = await self.page.evaluate("document.body.scrollHeight")
-            
-            if new_height == last_height:
+            # Ждем подгрузки контента, но не дольше delay
+            try:
+                await self.page.wait_for_function(
+                    "(h) => document.body.scrollHeight > h",
+                    arg=last_height,
+                    timeout=int(delay * 1000)
+                )
+            except Exception:
                 self.logger.debug(f"No more content to load after {i + 1} scrolls")
                 break
             
+            new_height = await self.page.evaluate("document.body.scrollHeight")
             last_height = new_height
             scroll_count += 1
             
@@ -265,8 +416,9 @@ class PlaywrightBaseParser(ABC):
         
         return scroll_count
     
-    async def bypass_captcha_check(self) -> bool:
+    async def bypass_captcha_check(self, page: Optional[Page] = None) -> bool:
         """Проверка и попытка обхода капчи"""
+        page = page or self.page
         captcha_selectors = [
             '[data-qa="captcha"]',
             '.captcha',
@@ -276,14 +428,14 @@ class PlaywrightBaseParser(ABC):
         ]
         
         for selector in captcha_selectors:
-            if await self.page.query_selector(selector):
+            if await page.query_selector(selector):
                 self.logger.warning(f"Captcha detected: {selector}")
                 
                 # Пауза для ручного решения или автоматического обхода
                 await asyncio.sleep(random.uniform(5, 10))
                 
                 # Проверяем, исчезла ли капча
-                if not await self.page.query_selector(selector):
+                if not await page.query_selector(selector):
                     self.logger.info("Captcha bypassed")
                     return True
                 
@@ -308,12 +460,21 @@ class PlaywrightBaseParser(ABC):
             'failed_requests': self.stats['failed_requests'],
             'success_rate': round(success_rate, 2),
             'avg_response_time': round(avg_response_time, 2),
+            'requests_blocked': self.stats['requests_blocked'],
+            'bytes_loaded': self.stats['bytes_loaded'],
+            'bytes_saved_estimate': self.stats['bytes_saved_estimate'],
+            'host_rates': rate_controller.get_stats(),
             'pages_per_minute': round(self.stats['pages_loaded'] / (runtime / 60), 2) if runtime > 0 else 0
         }
     
     async def close(self):
         """Закрытие браузера и освобождение ресурсов"""
         try:
+            for page in self._extra_pages:
+                await page.close()
+            self._extra_pages = []
+            self._pages_opened = 1
+            self._idle_pages = None
             if self.page:
                 await self.page.close()
             if self.context:
@@ -332,8 +493,8 @@ class PlaywrightBaseParser(ABC):
         pass
     
     @abstractmethod
-    async def extract_full_vacancy_details(self, vacancy_url: str) -> Dict[str, str]:
-        """Абстрактный метод для извлечения полных деталей вакансии"""
+    async def extract_full_vacancy_details(self, vacancy_url: str, page: Optional[Page] = None) -> Dict[str, str]:
+        """Абстрактный метод для извлечения полных деталей вакансии (page - вкладка из пула)"""
         pass
 
 
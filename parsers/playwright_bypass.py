@@ -20,6 +20,16 @@ from typing import Optional, Dict, Any
 import logging
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 
+try:
+    from resource_policy import ResourceBlocker, get_policy
+    from page_readiness import Readiness, get_readiness, wait_ready_async
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(__file__))
+    from resource_policy import ResourceBlocker, get_policy
+    from page_readiness import Readiness, get_readiness, wait_ready_async
+
 logger = logging.getLogger(__name__)
 
 class PlaywrightBypass:
@@ -100,25 +110,39 @@ class PlaywrightBypass:
         
         return context
     
-    async def human_like_behavior(self, page: Page):
-        """Имитация человеческого поведения"""
+    async def human_like_behavior(self, page: Page, readiness: Optional[Readiness] = None):
+        """Имитация человеческого поведения
+        
+        Если задано условие готовности, вместо фиксированных пауз ждем
+        содержимое страницы: движения мыши и скролл идут, пока оно догружается.
+        """
         # Случайные движения мыши
         await page.mouse.move(
             random.randint(100, 800), 
             random.randint(100, 600)
         )
         
-        # Случайная задержка
-        await asyncio.sleep(random.uniform(0.5, 2.0))
-        
         # Случайный скролл
-        if random.random() < 0.3:  # 30% шанс
+        scrolled = random.random() < 0.3  # 30% шанс
+        if scrolled:
             await page.mouse.wheel(0, random.randint(100, 500))
+        
+        if readiness:
+            await wait_ready_async(page, readiness, timeout_ms=10000)
+            return
+        
+        # Случайная задержка
+        await asyncio.sleep(random.uniform(0.5, 2.0))
+        if scrolled:
             await asyncio.sleep(random.uniform(0.5, 1.5))
     
-    async def make_request(self, url: str, max_retries: int = 3) -> Optional[str]:
+    async def make_request(self, url: str, max_retries: int = 3, source: Optional[str] = None) -> Optional[str]:
         """Выполнение запроса с полной эмуляцией браузера"""
         
+        # Политика перехвата: картинки, шрифты, медиа и трекеры отменяются
+        blocker = ResourceBlocker(get_policy(source, url))
+        readiness = get_readiness(source, 'list', url)
+        
         async with async_playwright() as p:
             # Запускаем браузер с антидетект настройками
             browser = await p.chromium.launch(
@@ -152,6 +176,8 @@ class PlaywrightBypass:
                     # Создаем новый контекст для каждой попытки
                     context = await self.create_stealth_context(browser)
                     page = await context.new_page()
+                    await page.route('**/*', blocker.handle_route_async)
+                    page.on('response', blocker.on_response)
                     
                     # Случайная задержка перед запросом
                     await asyncio.sleep(random.uniform(1.0, 3.0))
@@ -159,6 +185,7 @@ class PlaywrightBypass:
                     logger.info(f"🔄 Playwright попытка {attempt + 1}/{max_retries} для {url}")
                     
                     # Выполняем запрос с более коротким timeout
+                    blocker.start(url)
                     response = await page.goto(
                         url, 
                         wait_until='domcontentloaded',  # Ждем только загрузки DOM
@@ -167,10 +194,11 @@ class PlaywrightBypass:
                     
                     if response and response.status == 200:
                         # Имитируем человеческое поведение
-                        await self.human_like_behavior(page)
+                        await self.human_like_behavior(page, readiness)
                         
                         # Получаем HTML
                         html = await page.content()
+                        blocker.finish()
                         
                         logger.info(f"✅ Playwright успешный запрос на попытке {attempt + 1}")
                         
@@ -6,16 +6,25 @@ import random
 from typing import List, Dict, Optional, Any
 from urllib.parse import quote_plus, urljoin
 import re
+from bs4 import BeautifulSoup
 
 try:
+    from playwright.async_api import Page
     from playwright_base_parser import PlaywrightBaseParser
+    from page_readiness import Readiness, wait_ready_async
+    from page_extraction import HH_LIST_SPEC, HH_DETAIL_SPEC, first_or_empty
     from text_formatter import extract_formatted_text, extract_structured_sections, clean_text
+    from salary_grammar import parse_salary
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.dirname(__file__))
+    from playwright.async_api import Page
     from playwright_base_parser import PlaywrightBaseParser
+    from page_readiness import Readiness, wait_ready_async
+    from page_extraction import HH_LIST_SPEC, HH_DETAIL_SPEC, first_or_empty
     from text_formatter import extract_formatted_text, extract_structured_sections, clean_text
+    from salary_grammar import parse_salary
 
 class PlaywrightHHParser(PlaywrightBaseParser):
     """
@@ -23,8 +32,13 @@ class PlaywrightHHParser(PlaywrightBaseParser):
     Обходит блокировки и JavaScript защиту
     """
     
-    def __init__(self, headless: bool = True):
-        super().__init__(headless=headless, slow_mo=200)
+    def __init__(self, headless: bool = True, structured: bool = True,
+                 max_pages: int = 4, per_host_limit: int = 3):
+        super().__init__(headless=headless, slow_mo=200, source='hh',
+                         max_pages=max_pages, per_host_limit=per_host_limit)
+        # structured=True: карточки и описание извлекаются одним evaluate в браузере
+        # (без page.content(), повторного парсинга и запроса на каждое поле)
+        self.structured = structured
         self.base_url = 'https://hh.ru'
         self.search_url = 'https://hh.ru/search/vacancy'
         
@@ -77,8 +91,8 @@ class PlaywrightHHParser(PlaywrightBaseParser):
         
         self.logger.info(f"Parsing HH.ru page {page}: {url}")
         
-        # Навигируем на страницу
-        if not await self.safe_navigate(url):
+        # Навигируем на страницу (возврат, как только появились карточки)
+        if not await self.safe_navigate(url, readiness=self.readiness.get('list')):
             self.logger.error(f"Failed to navigate to {url}")
             return []
         
@@ -87,12 +101,19 @@ class PlaywrightHHParser(PlaywrightBaseParser):
             self.logger.error("Captcha blocking access")
             return []
         
-        # Ждем загрузки контента
-        await asyncio.sleep(random.uniform(2, 4))
-        
         # Ищем вакансии
         vacancies = []
         
+        if self.structured:
+            rows = await self.extract_structured(HH_LIST_SPEC)
+            for i, row in enumerate(rows):
+                vacancy_data = self._vacancy_from_row(row, i + 1)
+                if vacancy_data:
+                    vacancies.append(vacancy_data)
+            if vacancies:
+                self.logger.info(f"Successfully extracted {len(vacancies)} vacancies from page {page} (structured)")
+                return vacancies
+        
         for selector in self.selectors['vacancy_cards']:
             vacancy_elements = await self.page.query_selector_all(selector)
             
@@ -116,6 +137,34 @@ class PlaywrightHHParser(PlaywrightBaseParser):
         self.logger.info(f"Successfully extracted {len(vacancies)} vacancies from page {page}")
         return vacancies
     
+    def _vacancy_from_row(self, row: Dict[str, Optional[str]], card_number: int) -> Optional[Dict[str, Any]]:
+        """Сборка вакансии из JSON-строки структурированного извлечения"""
+        title = (row.get('title') or '').strip()
+        href = row.get('url') or ''
+        if not title or not href:
+            self.logger.warning(f"Card {card_number}: Missing title or URL")
+            return None
+        
+        vacancy_url = urljoin(self.base_url, href)
+        salary_min, salary_max, salary_currency = self._parse_salary(row.get('salary') or '')
+        
+        return {
+            'external_id': self._extract_vacancy_id(vacancy_url),
+            'source': 'hh',
+            'url': vacancy_url,
+            'title': title,
+            'company': row.get('company') or 'Не указано',
+            'location': row.get('location') or 'Не указано',
+            'description': row.get('description') or '',
+            'salary_min': salary_min,
+            'salary_max': salary_max,
+            'salary_currency': salary_currency,
+            'published_at': None,
+            'employment_type': None,
+            'experience_level': None,
+            'remote_type': None
+        }
+    
     async def _extract_vacancy_from_element(self, card_element, card_number: int) -> Optional[Dict[str, Any]]:
         """Извлечение данных вакансии из элемента карточки"""
         
@@ -221,27 +270,28 @@ class PlaywrightHHParser(PlaywrightBaseParser):
         self.logger.debug(f"Card {card_number}: Extracted '{title}' at {company}")
         return vacancy_data
     
-    async def extract_full_vacancy_details(self, vacancy_url: str) -> Dict[str, str]:
-        """Извлечение полного описания вакансии с HH.ru"""
+    async def extract_full_vacancy_details(self, vacancy_url: str, page: Optional[Page] = None) -> Dict[str, str]:
+        """Извлечение полного описания вакансии с HH.ru (page - вкладка из пула)"""
+        page = page or self.page
         try:
             self.logger.debug(f"Extracting details for: {vacancy_url}")
             
-            # Навигируем на страницу вакансии
-            if not await self.safe_navigate(vacancy_url):
+            detail_readiness = self.readiness.get('detail') or Readiness(
+                ', '.join(self.selectors['description_detail']), min_text_length=100
+            )
+            
+            # Навигируем на страницу вакансии (возврат, как только заполнено описание)
+            if not await self.safe_navigate(vacancy_url, readiness=detail_readiness, page=page):
                 self.logger.error(f"Failed to navigate to vacancy: {vacancy_url}")
                 return self._empty_details()
             
             # Проверяем капчу
-            if not await self.bypass_captcha_check():
+            if not await self.bypass_captcha_check(page):
                 self.logger.error("Captcha blocking vacancy page")
                 return self._empty_details()
             
-            # Ждем загрузки описания
-            description_loaded = False
-            for selector in self.selectors['description_detail']:
-                if await self.wait_for_element(selector, timeout=10000):
-                    description_loaded = True
-                    break
+            # Проверяем, что блок описания появился и заполнился (одно условие на все селекторы)
+            description_loaded = await wait_ready_async(page, detail_readiness, timeout_ms=2000)
             
             if not description_loaded:
                 self.logger.warning(f"Description not loaded for {vacancy_url}")
@@ -249,24 +299,33 @@ class PlaywrightHHParser(PlaywrightBaseParser):
             
             # Извлекаем полное описание
             full_description = ''
-            for selector in self.selectors['description_detail']:
-                element = await self.page.query_selector(selector)
-                if element:
-                    # Получаем HTML содержимое для лучшего форматирования
-                    html_content = await element.inner_html()
-                    if html_content and len(html_content) > 100:
-                        # Используем text_formatter для обработки HTML
-                        from bs4 import BeautifulSoup
-                        soup = BeautifulSoup(html_content, 'html.parser')
-                        full_description = extract_formatted_text(element)
-                        
-                        self.logger.debug(f"Found description: {len(full_description)} chars")
-                        break
+            
+            if self.structured:
+                fields = first_or_empty(await self.extract_structured(HH_DETAIL_SPEC, page))
+                description_html = fields.get('description_html') or ''
+                if len(description_html) > 100:
+                    # Парсим только фрагмент описания, а не весь документ
+                    fragment = BeautifulSoup(description_html, 'html.parser')
+                    full_description = extract_formatted_text(fragment)
+            
+            if not full_description:
+                for selector in self.selectors['description_detail']:
+                    element = await page.query_selector(selector)
+                    if element:
+                        # Получаем HTML содержимое для лучшего форматирования
+                        html_content = await element.inner_html()
+                        if html_content and len(html_content) > 100:
+                            # Используем text_formatter для обработки HTML
+                            soup = BeautifulSoup(html_content, 'html.parser')
+                            full_description = extract_formatted_text(element)
+                            
+                            self.logger.debug(f"Found description: {len(full_description)} chars")
+                            break
             
             # Если не нашли через HTML, пробуем через текст
             if not full_description:
                 for selector in self.selectors['description_detail']:
-                    full_description = await self.extract_text_safe(selector)
+                    full_description = await self.extract_text_safe(selector, page=page)
                     if full_description and len(full_description) > 50:
                         break
             
@@ -295,29 +354,9 @@ class PlaywrightHHParser(PlaywrightBaseParser):
             return self._empty_details()
     
     def _parse_salary(self, salary_text: str) -> tuple:
-        """Парсинг зарплаты из текста"""
-        if not salary_text:
-            return None, None, None
-        
-        # Очищаем текст
-        salary_clean = salary_text.replace('\xa0', ' ').replace(' ', ' ').strip()
-        
-        # Извлекаем валюту
-        currency = None
-        for curr in ['руб', 'rub', '₽', 'usd', '$', 'eur', '€']:
-            if curr in salary_clean.lower():
-                currency = curr
-                break
-        
-        # Извлекаем числа
-        numbers = re.findall(r'\d+', salary_clean.replace(' ', ''))
-        
-        if len(numbers) >= 2:
-            return int(numbers[0]), int(numbers[1]), currency
-        elif len(numbers) == 1:
-            return int(numbers[0]), None, currency
-        
-        return None, None, currency
+        """Парсинг зарплаты из текста (общая грамматика salary_grammar)"""
+        salary = parse_salary(salary_text)
+        return salary.min, salary.max, salary.currency
     
     def _extract_vacancy_id(self, url: str) -> str:
         """Извлечение ID вакансии из URL"""
@@ -350,14 +389,23 @@ class PlaywrightHHParser(PlaywrightBaseParser):
                     page_vacancies = await self.parse_search_page(query, page)
                     
                     if extract_details and page_vacancies:
-                        self.logger.info(f"Extracting details for {len(page_vacancies)} vacancies from page {page}")
+                        self.logger.info(f"Extracting details for {len(page_vacancies)} vacancies from page {page} "
+                                         f"({self.max_pages} tabs, {self.per_host_limit} per host)")
+                        
+                        async def fetch_details(url: str, tab: Page) -> Dict[str, str]:
+                            # Небольшая пауза перед запросом, чтобы вкладки не стартовали одновременно
+                            await asyncio.sleep(random.uniform(0.2, 1.0))
+                            return await self.extract_full_vacancy_details(url, page=tab)
                         
-                        for vacancy in page_vacancies:
-                            details = await self.extract_full_vacancy_details(vacancy['url'])
+                        details_list = await self.map_pages_concurrently(
+                            [vacancy['url'] for vacancy in page_vacancies], fetch_details
+                        )
+                        
+                        for vacancy, details in zip(page_vacancies, details_list):
+                            if isinstance(details, Exception):
+                                self.logger.error(f"Error extracting details for {vacancy['url']}: {details}")
+                                details = self._empty_details()
                             vacancy.update(details)
-                            
-                            # Небольшая пауза между запросами деталей
-                            await asyncio.sleep(random.uniform(1, 3))
                     
                     all_vacancies.extend(page_vacancies)
                     
@@ -381,6 +429,7 @@ class PlaywrightHHParser(PlaywrightBaseParser):
         self.logger.info(f"Runtime: {stats['runtime_seconds']}s")
         self.logger.info(f"Pages loaded: {stats['pages_loaded']} (Success: {stats['success_rate']}%)")
         self.logger.info(f"Avg Response Time: {stats['avg_response_time']}s")
+        self.logger.info(f"Blocked requests: {stats['requests_blocked']} (~{stats['bytes_saved_estimate'] // 1024} KB saved)")
         
         self.logger.info(f"HH.ru Playwright parsing completed. Total: {len(all_vacancies)} vacancies")
         return all_vacancies
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Адаптивный контроль частоты запросов по хостам (AIMD)
+
+Вместо фиксированных задержек между запросами:
+- пока хост отвечает нормально, частота растет на постоянный шаг
+- на 429/503 (и другие признаки блокировки) частота делится пополам
+- заголовок Retry-After выдерживается полностью
+
+Один экземпляр (rate_controller) общий для всех парсеров и потоков
+процесса; RateLimitedSession подключает его к requests.
+При воспроизведении HTTP-фикстур (http_fixtures) паузы не выдерживаются.
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Any
+from urllib.parse import urlparse
+
+import requests
+
+try:
+    import http_fixtures
+except ImportError:
+    import os
+    import sys
+    sys.path.append(os.path.dirname(__file__))
+    import http_fixtures
+
+logger = logging.getLogger(__name__)
+
+# Коды ответа, при которых частоту нужно снизить
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+@dataclass
+class HostState:
+    """Состояние одного хоста"""
+    rate: float
+    next_slot: float = 0.0
+    blocked_until: float = 0.0
+    last_decrease: float = 0.0
+    requests: int = 0
+    throttled: int = 0
+    total_wait: float = 0.0
+
+
+def _host(url_or_host: str) -> str:
+    if '://' in url_or_host:
+        return (urlparse(url_or_host).hostname or '').lower()
+    return url_or_host.lower()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After: число секунд или HTTP-дата"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateController:
+    """
+    AIMD-контроллер частоты запросов по хостам.
+
+    rate - запросов в секунду; между запросами к одному хосту выдерживается
+    интервал 1/rate (с небольшим джиттером). Слоты резервируются под
+    блокировкой, а ожидание идет вне ее, поэтому потоки не мешают друг другу.
+    """
+
+    def __init__(self, initial_rate: float = 1.0, min_rate: float = 0.05,
+                 max_rate: float = 5.0, increase_step: float = 0.05,
+                 decrease_factor: float = 0.5, jitter: float = 0.1,
+                 max_retry_after: float = 600.0):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.jitter = jitter
+        self.max_retry_after = max_retry_after
+        self._hosts: Dict[str, HostState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = HostState(rate=self.initial_rate)
+            self._hosts[host] = state
+        return state
+
+    def configure_host(self, url_or_host: str, rate: Optional[float] = None):
+        """Начальная частота для хоста (например, из параметра delay парсера)"""
+        with self._lock:
+            state = self._state(_host(url_or_host))
+            if rate is not None and state.requests == 0:
+                state.rate = min(self.max_rate, max(self.min_rate, rate))
+
+    def _reserve(self, url: str) -> float:
+        """Резервирует слот и возвращает, сколько нужно подождать"""
+        now = time.time()
+        with self._lock:
+            state = self._state(_host(url))
+            interval = 1.0 / state.rate
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+            slot = max(now, state.next_slot, state.blocked_until)
+            state.next_slot = slot + interval
+            state.requests += 1
+            wait = slot - now
+            state.total_wait += wait
+        return wait
+
+    def acquire(self, url: str) -> float:
+        """Ожидание слота для запроса (потоки)"""
+        if http_fixtures.replaying():
+            return 0.0
+        wait = self._reserve(url)
+        if wait > 0:
+            logger.debug(f"⏱️ {_host(url)}: ожидание {wait:.2f}с")
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url: str) -> float:
+        """Ожидание слота для запроса (asyncio)"""
+        if http_fixtures.replaying():
+            return 0.0
+        wait = self._reserve(url)
+        if wait > 0:
+            logger.debug(f"⏱️ {_host(url)}: ожидание {wait:.2f}с")
+            await asyncio.sleep(wait)
+        return wait
+
+    def record(self, url: str, status_code: Optional[int] = None,
+               retry_after: Optional[float] = None, blocked: bool = False):
+        """
+        Учет ответа: рост частоты на успехе, снижение на 429/503/блокировке.
+
+        status_code=None - сетевая ошибка (таймаут, обрыв), тоже снижает частоту.
+        """
+        host = _host(url)
+        now = time.time()
+        throttled = blocked or status_code is None or status_code in THROTTLE_STATUSES
+
+        with self._lock:
+            state = self._state(host)
+
+            if not throttled:
+                state.rate = min(self.max_rate, state.rate + self.increase_step)
+                return
+
+            state.throttled += 1
+            if retry_after is not None:
+                hold = min(retry_after, self.max_retry_after)
+                state.blocked_until = max(state.blocked_until, now + hold)
+                logger.warning(f"🚦 {host}: Retry-After {hold:.0f}с")
+
+            # Ответы на запросы, отправленные до снижения, не снижают частоту повторно
+            if now - state.last_decrease < 1.0 / state.rate:
+                return
+            state.rate = max(self.min_rate, state.rate * self.decrease_factor)
+            state.last_decrease = now
+            logger.warning(f"🚦 {host}: статус {status_code}, частота снижена до {state.rate:.2f} req/s")
+
+    def record_response(self, url: str, response: requests.Response, blocked: bool = False):
+        """Учет ответа requests (статус и Retry-After)"""
+        self.record(
+            url,
+            response.status_code,
+            parse_retry_after(response.headers.get('Retry-After')),
+            blocked=blocked,
+        )
+
+    def get_rate(self, url_or_host: str) -> float:
+        with self._lock:
+            return self._state(_host(url_or_host)).rate
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Текущая частота и счетчики по хостам"""
+        now = time.time()
+        with self._lock:
+            return {
+                host: {
+                    'rate': round(state.rate, 3),
+                    'interval': round(1.0 / state.rate, 3),
+                    'requests': state.requests,
+                    'throttled': state.throttled,
+                    'total_wait': round(state.total_wait, 2),
+                    'blocked_for': round(max(0.0, state.blocked_until - now), 1),
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+# Общий контроллер для всех парсеров процесса
+rate_controller = RateController()
+
+# Запись/воспроизведение HTTP по PARSER_HTTP_FIXTURES (все парсеры импортируют этот модуль)
+http_fixtures.activate_from_env()
+
+
+class RateLimitedSession(requests.Session):
+    """requests.Session, который выдерживает частоту хоста и учитывает ответы"""
+
+    def __init__(self, controller: Optional[RateController] = None):
+        super().__init__()
+        self.controller = controller or rate_controller
+
+    def request(self, method, url, *args, **kwargs):
+        self.controller.acquire(url)
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self.controller.record(url, None)
+            raise
+        self.controller.record_response(url, response)
+        return response
+
+
+def main():
+    """Демонстрация поведения контроллера"""
+    logging.basicConfig(level=logging.INFO)
+
+    controller = RateController(initial_rate=2.0)
+    url = 'https://example.com/jobs'
+
+    for i in range(10):
+        controller.acquire(url)
+        controller.record(url, 200)
+    print(f"После 10 успешных ответов: {controller.get_rate(url):.2f} req/s")
+
+    controller.record(url, 429, retry_after=1)
+    print(f"После 429: {controller.get_rate(url):.2f} req/s")
+    print(controller.get_stats())
+
+
+if __name__ == "__main__":
+    main()
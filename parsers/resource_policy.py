@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Политика перехвата запросов для браузерных путей (Playwright)
+
+Отсекает ресурсы, которые не нужны для извлечения вакансий:
+- картинки, шрифты, медиа
+- аналитика и трекеры (Яндекс.Метрика, GA, VK/MyTarget и т.д.)
+
+Политика задается по источнику (hh, habr, hirehi, ...), ResourceBlocker
+считает заблокированные запросы, загруженные байты и время загрузки страницы.
+Пропущенные запросы при включенных HTTP-фикстурах пишутся в корпус или
+отдаются из него (http_fixtures).
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field, replace
+from typing import Dict, Optional, Any, FrozenSet, Tuple
+from urllib.parse import urlparse
+
+try:
+    import http_fixtures
+except ImportError:
+    import os
+    import sys
+    sys.path.append(os.path.dirname(__file__))
+    import http_fixtures
+
+logger = logging.getLogger(__name__)
+
+# Типы ресурсов Playwright, без которых DOM с вакансиями строится корректно
+DEFAULT_BLOCKED_TYPES = frozenset({'image', 'media', 'font'})
+
+# Домены аналитики и рекламы (сравнение по суффиксу хоста)
+TRACKER_DOMAINS = (
+    'mc.yandex.ru',
+    'mc.yandex.com',
+    'an.yandex.ru',
+    'yandex.ru/ads',
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googleadservices.com',
+    'doubleclick.net',
+    'googlesyndication.com',
+    'facebook.net',
+    'connect.facebook.net',
+    'top-fwz1.mail.ru',
+    'ad.mail.ru',
+    'vk.com/rtrg',
+    'hotjar.com',
+    'criteo.com',
+    'adriver.ru',
+    'tns-counter.ru',
+    'mediator.media',
+    'sentry.io',
+    'amplitude.com',
+    'segment.io',
+)
+
+# Оценка среднего размера заблокированного ресурса (байт) - тело
+# отмененного запроса неизвестно, поэтому экономия считается приблизительно
+AVERAGE_RESOURCE_BYTES = {
+    'image': 45_000,
+    'media': 400_000,
+    'font': 35_000,
+    'stylesheet': 30_000,
+    'script': 60_000,
+    'xhr': 5_000,
+    'fetch': 5_000,
+    'other': 10_000,
+}
+
+
+@dataclass(frozen=True)
+class ResourcePolicy:
+    """Правила блокировки ресурсов для одного источника"""
+    blocked_types: FrozenSet[str] = DEFAULT_BLOCKED_TYPES
+    blocked_domains: Tuple[str, ...] = TRACKER_DOMAINS
+    # Домены, которые нельзя блокировать ни при каких условиях (CDN с данными и т.п.)
+    allowed_domains: Tuple[str, ...] = ()
+    enabled: bool = True
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        """Нужно ли отменить запрос"""
+        if not self.enabled:
+            return False
+
+        parsed = urlparse(url)
+        host = (parsed.hostname or '').lower()
+
+        if any(_host_matches(host, d) for d in self.allowed_domains):
+            return False
+
+        if resource_type in self.blocked_types:
+            return True
+
+        for domain in self.blocked_domains:
+            # Запись вида "vk.com/rtrg" - домен плюс префикс пути
+            domain_host, _, path_prefix = domain.partition('/')
+            if _host_matches(host, domain_host) and parsed.path.startswith('/' + path_prefix):
+                return True
+
+        return False
+
+
+def _host_matches(host: str, domain: str) -> bool:
+    return host == domain or host.endswith('.' + domain)
+
+
+DEFAULT_POLICY = ResourcePolicy()
+
+# Политики по источникам. HH и Habr рендерят списки на сервере, поэтому
+# для них безопасно отключить еще и CSS; HireHi - SPA, стили оставляем.
+SOURCE_POLICIES: Dict[str, ResourcePolicy] = {
+    'default': DEFAULT_POLICY,
+    'hh': replace(DEFAULT_POLICY, blocked_types=DEFAULT_BLOCKED_TYPES | {'stylesheet'}),
+    'habr': replace(DEFAULT_POLICY, blocked_types=DEFAULT_BLOCKED_TYPES | {'stylesheet'}),
+    'getmatch': DEFAULT_POLICY,
+    'geekjob': replace(DEFAULT_POLICY, blocked_types=DEFAULT_BLOCKED_TYPES | {'stylesheet'}),
+    'hirehi': DEFAULT_POLICY,
+}
+
+# Соответствие хостов источникам для вызовов, где известен только URL
+SOURCE_HOSTS = {
+    'hh.ru': 'hh',
+    'career.habr.com': 'habr',
+    'getmatch.ru': 'getmatch',
+    'geekjob.ru': 'geekjob',
+    'hirehi.ru': 'hirehi',
+}
+
+
+def source_for_url(url: str) -> Optional[str]:
+    """Определение источника по хосту URL"""
+    host = (urlparse(url).hostname or '').lower()
+    for known_host, source in SOURCE_HOSTS.items():
+        if host == known_host or host.endswith('.' + known_host):
+            return source
+    return None
+
+
+def get_policy(source: Optional[str] = None, url: Optional[str] = None) -> ResourcePolicy:
+    """Политика для источника (или для URL, если источник не указан)"""
+    if not source and url:
+        source = source_for_url(url)
+    return SOURCE_POLICIES.get(source or 'default', DEFAULT_POLICY)
+
+
+def configure_policy(source: str, **overrides) -> ResourcePolicy:
+    """Переопределение политики источника, например configure_policy('hirehi', enabled=False)"""
+    if 'blocked_types' in overrides:
+        overrides['blocked_types'] = frozenset(overrides['blocked_types'])
+    for key in ('blocked_domains', 'allowed_domains'):
+        if key in overrides:
+            overrides[key] = tuple(overrides[key])
+    policy = replace(get_policy(source), **overrides)
+    SOURCE_POLICIES[source] = policy
+    return policy
+
+
+@dataclass
+class PageLoadReport:
+    """Итоги загрузки одной страницы"""
+    url: str
+    load_time: float = 0.0
+    requests_allowed: int = 0
+    requests_blocked: int = 0
+    bytes_loaded: int = 0
+    bytes_saved_estimate: int = 0
+    blocked_by_type: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'load_time': round(self.load_time, 3),
+            'requests_allowed': self.requests_allowed,
+            'requests_blocked': self.requests_blocked,
+            'bytes_loaded': self.bytes_loaded,
+            'bytes_saved_estimate': self.bytes_saved_estimate,
+            'blocked_by_type': dict(self.blocked_by_type),
+        }
+
+
+class ResourceBlocker:
+    """
+    Обработчик page.route для sync и async API Playwright.
+
+    Один экземпляр вешается на страницу; start()/finish() оборачивают
+    каждую навигацию и возвращают PageLoadReport.
+    """
+
+    def __init__(self, policy: ResourcePolicy):
+        self.policy = policy
+        self._report: Optional[PageLoadReport] = None
+        self._started_at = 0.0
+        self.totals = {
+            'pages': 0,
+            'requests_blocked': 0,
+            'bytes_loaded': 0,
+            'bytes_saved_estimate': 0,
+            'load_time': 0.0,
+        }
+
+    def start(self, url: str):
+        self._report = PageLoadReport(url=url)
+        self._started_at = time.time()
+
+    def finish(self) -> Optional[PageLoadReport]:
+        report = self._report
+        if report is None:
+            return None
+        report.load_time = time.time() - self._started_at
+        self._report = None
+
+        self.totals['pages'] += 1
+        self.totals['requests_blocked'] += report.requests_blocked
+        self.totals['bytes_loaded'] += report.bytes_loaded
+        self.totals['bytes_saved_estimate'] += report.bytes_saved_estimate
+        self.totals['load_time'] += report.load_time
+
+        logger.info(
+            f"Загрузка {report.url}: {report.load_time:.2f}s, "
+            f"загружено {report.bytes_loaded // 1024} KB, "
+            f"заблокировано {report.requests_blocked} запросов "
+            f"(~{report.bytes_saved_estimate // 1024} KB сэкономлено)"
+        )
+        return report
+
+    def _decide(self, request) -> bool:
+        resource_type = request.resource_type
+        blocked = self.policy.should_block(resource_type, request.url)
+        report = self._report
+        if report is not None:
+            if blocked:
+                report.requests_blocked += 1
+                report.blocked_by_type[resource_type] = report.blocked_by_type.get(resource_type, 0) + 1
+                report.bytes_saved_estimate += AVERAGE_RESOURCE_BYTES.get(resource_type, AVERAGE_RESOURCE_BYTES['other'])
+            else:
+                report.requests_allowed += 1
+        return blocked
+
+    def handle_route_sync(self, route):
+        """Обработчик для playwright.sync_api: page.route('**/*', blocker.handle_route_sync)"""
+        if self._decide(route.request):
+            route.abort()
+        elif http_fixtures.active():
+            http_fixtures.handle_route_sync(route)
+        else:
+            route.continue_()
+
+    async def handle_route_async(self, route):
+        """Обработчик для playwright.async_api: await page.route('**/*', blocker.handle_route_async)"""
+        if self._decide(route.request):
+            await route.abort()
+        elif http_fixtures.active():
+            await http_fixtures.handle_route_async(route)
+        else:
+            await route.continue_()
+
+    def on_response(self, response):
+        """Подсчет загруженных байт по заголовку Content-Length (page.on('response', ...))"""
+        report = self._report
+        if report is None:
+            return
+        try:
+            length = response.headers.get('content-length')
+            if length:
+                report.bytes_loaded += int(length)
+        except Exception:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        pages = max(self.totals['pages'], 1)
+        return {
+            **self.totals,
+            'avg_load_time': round(self.totals['load_time'] / pages, 3),
+        }
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Общая грамматика зарплат вакансий
+
+Один заранее скомпилированный токенизатор разбирает строку зарплаты любого
+источника ("от 100 000 до 150 000 ₽ за месяц, на руки", "2 500 – 3 500 $",
+"120–180 тыс. руб.", "от 3000 € до вычета налогов") в
+Salary(min, max, currency, tax, period):
+- min / max   - целые суммы (None, если границы нет); одиночная сумма без
+                "от"/"до" - фиксированная зарплата (min == max). Учитываются
+                только суммы, привязанные к валюте, множителю ("тыс.", "k"),
+                "от"/"до"/"+" или тире с такой суммой, а также пара сумм
+                через тире без слова после ("120000-150000"): числа из
+                соседнего текста ("2 года опыта", "3-5 лет", "24/7")
+                пропускаются. Диапазон с min > max отбрасывается
+                (границы None)
+- currency    - код валюты (RUB, USD, EUR, ...) или None, если не указана
+- tax         - 'gross' (до вычета налогов), 'net' (на руки) или None
+- period      - 'month', 'year', 'day', 'hour', 'shift' или None
+
+Результаты разбора кэшируются: строки зарплат сильно повторяются
+("Не указана", "от 100 000 ₽").
+
+Заполнение числовых колонок по уже сохраненным вакансиям (фильтры по
+диапазону зарплат в UI работают по индексу salary_min/salary_max):
+    python salary_grammar.py backfill --db ../database.db
+    python salary_grammar.py parse "от 100 000 до 150 000 ₽ на руки"
+    python salary_grammar.py check
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import re
+import sys
+import sqlite3
+import logging
+import argparse
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from vacancy_schema import migrate
+
+logger = logging.getLogger(__name__)
+
+
+class Salary(NamedTuple):
+    """Разобранная зарплата"""
+    min: Optional[int] = None
+    max: Optional[int] = None
+    currency: Optional[str] = None
+    tax: Optional[str] = None
+    period: Optional[str] = None
+
+
+EMPTY_SALARY = Salary()
+
+# Границы слова только по буквам: "от100 000", "100руб" и "5000р." тоже разбираются
+_L = r'(?<![^\W\d_])'
+_R = r'(?![^\W\d_])'
+
+_CURRENCIES = [
+    # HH API отдает белорусский рубль как BYR (символ Br)
+    ('BYN', r'byn|byr|br' + _R + r'|бел\.?\s*руб\w*'),
+    ('RUB', r'₽|руб\w*|р\.|rub|rur'),
+    ('USD', r'us\$|\$|usd|долл\w*'),
+    ('EUR', r'€|eur\w*|евро'),
+    ('GBP', r'£|gbp'),
+    ('KZT', r'₸|kzt|тенге'),
+    ('UAH', r'₴|uah|грн'),
+    ('UZS', r'uzs|сум' + _R),
+    ('KGS', r'kgs|сом' + _R),
+    ('AZN', r'₼|azn|манат\w*'),
+    ('GEL', r'₾|gel' + _R + r'|лари' + _R),
+]
+
+_PERIODS = [
+    ('month', r'мес(?:яц\w*|\.)?|month\w*|mo' + _R),
+    ('year', r'год(?:а|овых)?' + _R + r'|year\w*|annual\w*|yr' + _R),
+    ('hour', r'час(?:а|ов)?' + _R + r'|hour\w*|hr' + _R + r'|h' + _R),
+    ('day', r'(?:день|дня|дней|сутки|day|daily)' + _R),
+    ('shift', r'смен(?:а|у|ы)' + _R + r'|shift\w*'),
+]
+
+# Токенизатор: сумма (с множителем и "+"), налог, "от", "до", тире, валюта, период.
+# Налог стоит раньше "до": "до вычета налогов" - признак gross, а не верхняя граница
+_TOKEN_RE = re.compile(
+    r'(?P<amount>'
+    # Разряды через пробел (в т.ч. неразрывный и узкий), точку или запятую
+    r'(?:(?P<grouped>\d{1,3}(?:[    .,]\d{3})+(?!\d))(?:[.,](?P<fraction>\d{1,2})(?!\d))?'
+    r'|(?P<plain>\d+(?:[.,]\d+)?))'
+    r'(?:\s*(?P<multiplier>тыс(?:\.|яч\w*)?|т\.?\s?р\.?|k|к|млн\.?|mln|m)(?![a-zа-яё]))?'
+    r'(?P<plus>\s*\+)?'
+    r')'
+    r'|' + _L + r'(?P<gross>до\s+(?:вычета|уплаты|налог\w*)|gross|брутто)'
+    r'|' + _L + r'(?P<net>на\s+руки|после\s+вычета|net|нетто|чистыми)' + _R +
+    r'|' + _L + r'(?P<start>от|from|starting\s+(?:at|from))' + _R +
+    r'|' + _L + r'(?P<end>до|to|up\s+to)' + _R +
+    r'|(?P<dash>[-–—−]|\.\.\.?)'
+    r'|' + _L + r'(?P<currency>' + '|'.join(f'(?P<currency_{code}>{pattern})' for code, pattern in _CURRENCIES) + r')'
+    r'|' + _L + r'(?P<period>' + '|'.join(f'(?P<period_{name}>{pattern})' for name, pattern in _PERIODS) + r')',
+    re.IGNORECASE,
+)
+
+_WORD_AFTER_RE = re.compile(r'\s*[^\W\d_]')
+
+_CURRENCY_GROUPS = [(f'currency_{code}', code) for code, _ in _CURRENCIES]
+_PERIOD_GROUPS = [(f'period_{name}', name) for name, _ in _PERIODS]
+
+
+def _first_group(match: 're.Match', groups) -> Optional[str]:
+    for group, value in groups:
+        if match.group(group) is not None:
+            return value
+    return None
+
+
+def _bare_range(text: str, tokens: list, index: int) -> bool:
+    """Две суммы без валюты через тире вплотную, без слова после второй суммы"""
+    if not (tokens[index + 1][1] and tokens[index + 2][1]):
+        return False
+    end = tokens[index + 2][0].end()
+    following = tokens[index + 3][0] if index + 3 < len(tokens) else None
+    if following is not None and following.lastgroup == 'period' and tokens[index + 3][1]:
+        return False
+    rest = text[end:following.start() if following is not None else len(text)]
+    return not _WORD_AFTER_RE.match(rest)
+
+
+@lru_cache(maxsize=8192)
+def parse_salary(text: Optional[str]) -> Salary:
+    """
+    Разбор строки зарплаты в Salary(min, max, currency, tax, period)
+
+    Строки без сумм ("Не указана", "по договоренности") дают пустые границы
+    """
+    if not text:
+        return EMPTY_SALARY
+
+    # Первый проход: токены и признак "вплотную" (между токенами только пробелы)
+    tokens = []
+    position = 0
+    for match in _TOKEN_RE.finditer(text):
+        tokens.append((match, not text[position:match.start()].strip()))
+        position = match.end()
+
+    def kind_at(index: int) -> Optional[str]:
+        return tokens[index][0].lastgroup if 0 <= index < len(tokens) else None
+
+    # Привязка сумм: валюта вплотную после суммы (или перед ней, если валюта
+    # не занята предыдущей суммой), множитель, "+", "от"/"до" перед суммой
+    attached = {}
+    for index, (match, tight) in enumerate(tokens):
+        if match.lastgroup != 'amount':
+            continue
+        keyword = kind_at(index - 1) in ('start', 'end') and tight
+        suffix = kind_at(index + 1) == 'currency' and tokens[index + 1][1]
+        prefix = (kind_at(index - 1) == 'currency' and tight
+                  and not (kind_at(index - 2) == 'amount' and tokens[index - 1][1]))
+        attached[index] = bool(keyword or suffix or prefix or match.group('multiplier') or match.group('plus'))
+    # Тире связывает две суммы: диапазон привязан, если привязана хотя бы одна,
+    # а "50 000 - 70 000" без валюты - если за ним не идет слово ("2-3 года опыта")
+    for index in attached:
+        if kind_at(index + 1) == 'dash' and index + 2 in attached:
+            if attached[index] or attached[index + 2] or _bare_range(text, tokens, index):
+                attached[index] = attached[index + 2] = True
+
+    amounts = []        # (сумма с множителем, множитель, роль: 'min' / 'max' / None)
+    role = None         # роль следующей суммы после "от", "до" или тире
+    currency = tax = period = None
+
+    for index, (match, _) in enumerate(tokens):
+        kind = match.lastgroup
+        if kind == 'amount':
+            if not attached[index]:
+                role = None
+                continue
+            grouped = match.group('grouped')
+            if grouped is not None:
+                value = float(''.join(ch for ch in grouped if ch.isdigit()))
+                if match.group('fraction'):
+                    value += float('0.' + match.group('fraction'))
+            else:
+                value = float(match.group('plain').replace(',', '.'))
+            factor = 1
+            multiplier = match.group('multiplier')
+            if multiplier:
+                multiplier = multiplier.lower()
+                factor = 1000000 if multiplier[0] in 'mм' else 1000
+                if multiplier[0] == 'т' and 'р' in multiplier and currency is None:
+                    currency = 'RUB'    # "т.р." - тысяч рублей
+            if match.group('plus'):
+                role = 'min'
+            amounts.append((value * factor, factor, role))
+            role = None
+        elif kind == 'start':
+            role = 'min'
+        elif kind == 'end':
+            role = 'max'
+        elif kind == 'dash':
+            if kind_at(index - 1) == 'amount' and attached[index - 1]:
+                role = 'max'
+        elif kind == 'gross':
+            tax = tax or 'gross'
+        elif kind == 'net':
+            tax = tax or 'net'
+        elif kind == 'currency':
+            currency = currency or _first_group(match, _CURRENCY_GROUPS)
+        elif kind == 'period':
+            # "2 года опыта" - период пропущенного числа, а не зарплаты
+            if not (kind_at(index - 1) == 'amount' and not attached[index - 1]):
+                period = period or _first_group(match, _PERIOD_GROUPS)
+
+    if not amounts:
+        return Salary(None, None, currency, tax, period) if currency or tax or period else EMPTY_SALARY
+
+    low = next((amount for amount in amounts if amount[2] == 'min'), None)
+    high = next((amount for amount in amounts if amount[2] == 'max'), None)
+    bare = [amount for amount in amounts if amount[2] is None]
+    if low is None and high is None:
+        # "100 000 ₽" - фиксированная сумма, "100 000 150 000 ₽" - диапазон без тире
+        low = bare[0]
+        high = bare[1] if len(bare) > 1 else bare[0]
+    elif low is None and bare:
+        low = bare[0]       # "100 000 до 150 000"
+    elif high is None and bare:
+        high = bare[0]      # "от 100 000 150 000"
+
+    # "100–150 тыс." - множитель одной границы относится и к другой
+    if low is not None and high is not None and low is not high:
+        if low[1] == 1 and high[1] > 1 and low[0] < 1000:
+            low = (low[0] * high[1], high[1], low[2])
+        elif high[1] == 1 and low[1] > 1 and high[0] < 1000:
+            high = (high[0] * low[1], low[1], high[2])
+
+    salary_min = int(round(low[0])) if low is not None else None
+    salary_max = int(round(high[0])) if high is not None else None
+    if salary_min is not None and salary_max is not None and salary_min > salary_max:
+        # Границы перепутаны или одна из них - не зарплата: в индексные колонки не пишем
+        return Salary(None, None, currency, tax, period)
+    return Salary(salary_min, salary_max, currency, tax, period)
+
+
+def parse_salaries(texts: Iterable[Optional[str]]) -> List[Salary]:
+    """Разбор пачки строк (повторы берутся из кэша)"""
+    return [parse_salary(text) for text in texts]
+
+
+# ---------------------------------------------------------------------------
+# Заполнение salary_min / salary_max в таблице vacancies
+# ---------------------------------------------------------------------------
+
+def backfill_salaries(db_path: str, chunk_size: int = 1000, source_column: str = 'salary',
+                      overwrite: bool = False, busy_timeout: float = 30.0) -> Dict[str, int]:
+    """
+    Заполняет salary_min / salary_max / salary_currency из текстовой колонки зарплаты
+
+    Строки обходятся по id порциями, каждая порция - отдельная транзакция, так
+    что парсеры могут писать в БД во время заполнения. Без overwrite трогаются
+    только строки, где обе границы еще пусты. Перед заполнением БД доводится
+    до канонической схемы (колонки salary_*, индекс idx_salary_range).
+    """
+    stats = {'scanned': 0, 'updated': 0, 'unparsed': 0, 'chunks': 0}
+    conn = sqlite3.connect(db_path, timeout=busy_timeout, isolation_level=None)
+    try:
+        if not conn.execute("PRAGMA table_info(vacancies)").fetchall():
+            raise ValueError(f"В {db_path} нет таблицы vacancies")
+        migrate(conn)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(vacancies)")}
+        if source_column not in columns:
+            raise ValueError(f"В таблице vacancies нет колонки {source_column}")
+
+        pending = "" if overwrite else " AND salary_min IS NULL AND salary_max IS NULL"
+        query = (f"SELECT id, {source_column} FROM vacancies "
+                 f"WHERE id > ? AND {source_column} IS NOT NULL AND {source_column} != ''{pending} "
+                 f"ORDER BY id LIMIT ?")
+        last_id = 0
+        while True:
+            rows = conn.execute(query, (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            stats['scanned'] += len(rows)
+
+            updates = []
+            for row_id, text in rows:
+                salary = parse_salary(text)
+                if salary.min is None and salary.max is None:
+                    stats['unparsed'] += 1
+                    continue
+                updates.append((salary.min, salary.max, salary.currency, row_id))
+
+            if updates:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(
+                        "UPDATE vacancies SET salary_min = ?, salary_max = ?, "
+                        "salary_currency = COALESCE(?, salary_currency) WHERE id = ?",
+                        updates,
+                    )
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                stats['updated'] += len(updates)
+            stats['chunks'] += 1
+            logger.debug(f"Порция до id={last_id}: {len(updates)} из {len(rows)}")
+    finally:
+        conn.close()
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Проверка
+# ---------------------------------------------------------------------------
+
+EXAMPLES = [
+    ('от 100 000 до 150 000 ₽ за месяц, на руки', Salary(100000, 150000, 'RUB', 'net', 'month')),
+    ('от 150 000 ₽ до вычета налогов', Salary(150000, None, 'RUB', 'gross', None)),
+    ('до 200\xa0000 руб.', Salary(None, 200000, 'RUB', None, None)),
+    ('от 50 000 ₽', Salary(50000, None, 'RUB', None, None)),
+    ('2 500 – 3 500 $', Salary(2500, 3500, 'USD', None, None)),
+    ('от 2 500 до 3 500 $', Salary(2500, 3500, 'USD', None, None)),
+    ('120–180 тыс. руб.', Salary(120000, 180000, 'RUB', None, None)),
+    ('100к-150к', Salary(100000, 150000, None, None, None)),
+    ('150 т.р.', Salary(150000, 150000, 'RUB', None, None)),
+    ('1.5 млн ₽ в год', Salary(1500000, 1500000, 'RUB', None, 'year')),
+    ('3000 €/мес', Salary(3000, 3000, 'EUR', None, 'month')),
+    ('$50/hour', Salary(50, 50, 'USD', None, 'hour')),
+    ('300 000+ ₽', Salary(300000, None, 'RUB', None, None)),
+    ('100 000 ₽', Salary(100000, 100000, 'RUB', None, None)),
+    ('from 3,000 to 4,000 USD gross', Salary(3000, 4000, 'USD', 'gross', None)),
+    ('250 000 — 350 000 ₽/мес на руки', Salary(250000, 350000, 'RUB', 'net', 'month')),
+    ('от100 000 до 120 000руб', Salary(100000, 120000, 'RUB', None, None)),
+    ('40 т р, hh', Salary(40000, 40000, 'RUB', None, None)),
+    ('от 250 000 ₽ · 2 года опыта', Salary(250000, None, 'RUB', None, None)),
+    ('24/7 поддержка, 80 000 ₽', Salary(80000, 80000, 'RUB', None, None)),
+    ('1 000,50 USD', Salary(1000, 1000, 'USD', None, None)),
+    ('1 200,75 €', Salary(1201, 1201, 'EUR', None, None)),
+    ('от 2 000 до 3 000 Br на руки', Salary(2000, 3000, 'BYN', 'net', None)),
+    ('от 15 000 000 UZS', Salary(15000000, None, 'UZS', None, None)),
+    ('50 000 - 70 000 брутто', Salary(50000, 70000, None, 'gross', None)),
+    ('опыт 2-3 года, 120 000 ₽', Salary(120000, 120000, 'RUB', None, None)),
+    ('50 000 - 70 000', Salary(50000, 70000, None, None, None)),
+    ('120000-150000', Salary(120000, 150000, None, None, None)),
+    ('120000-150000 на руки', Salary(120000, 150000, None, 'net', None)),
+    ('опыт 3-5 лет', EMPTY_SALARY),
+    ('от 200 000 до 150 000 ₽', Salary(None, None, 'RUB', None, None)),
+    ('Не указана', EMPTY_SALARY),
+    ('з/п по договоренности', EMPTY_SALARY),
+    ('', EMPTY_SALARY),
+    (None, EMPTY_SALARY),
+]
+
+
+def check() -> int:
+    failed = 0
+    for text, expected in EXAMPLES:
+        actual = parse_salary(text)
+        if actual != expected:
+            failed += 1
+            print(f"❌ {text!r}: {actual} != {expected}")
+    if failed:
+        return 1
+
+    # Заполнение по временной БД: порции, пропуск уже заполненных строк, индекс
+    import os
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, 'vacancies.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE vacancies (id INTEGER PRIMARY KEY, salary TEXT, salary_min INTEGER)")
+        conn.executemany("INSERT INTO vacancies (salary, salary_min) VALUES (?, ?)",
+                         [(text, None) for text, _ in EXAMPLES] + [('от 10 ₽', 777)])
+        conn.commit()
+        conn.close()
+        stats = backfill_salaries(db_path, chunk_size=3)
+        assert stats['updated'] == sum(1 for _, s in EXAMPLES if s.min is not None or s.max is not None), stats
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute("SELECT salary, salary_min, salary_max, salary_currency FROM vacancies").fetchall()
+        indexes = [row[1] for row in conn.execute("PRAGMA index_list(vacancies)")]
+        conn.close()
+        assert ('от 10 ₽', 777, None, 'RUB') in rows, rows
+        assert ('2 500 – 3 500 $', 2500, 3500, 'USD') in rows, rows
+        assert 'idx_salary_range' in indexes
+
+    print(f"✅ {len(EXAMPLES)} примеров и заполнение БД")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Разбор зарплат и заполнение salary_min / salary_max')
+    subparsers = parser.add_subparsers(dest='command')
+
+    backfill = subparsers.add_parser('backfill', help='Заполнить числовые колонки зарплаты в таблице vacancies')
+    backfill.add_argument('--db', default='data/vacancies.db', help='Путь к базе данных')
+    backfill.add_argument('--chunk-size', type=int, default=1000, help='Строк в одной транзакции')
+    backfill.add_argument('--source-column', default='salary', help='Текстовая колонка зарплаты')
+    backfill.add_argument('--overwrite', action='store_true', help='Пересчитать и уже заполненные строки')
+
+    parse = subparsers.add_parser('parse', help='Разобрать строки зарплаты')
+    parse.add_argument('texts', nargs='+')
+
+    subparsers.add_parser('check', help='Проверка на примерах')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+
+    if args.command == 'backfill':
+        stats = backfill_salaries(args.db, args.chunk_size, args.source_column, args.overwrite)
+        print(f"Просмотрено: {stats['scanned']}, заполнено: {stats['updated']}, "
+              f"без суммы: {stats['unparsed']}, порций: {stats['chunks']}")
+        return 0
+    if args.command == 'parse':
+        for text in args.texts:
+            print(f"{text!r}: {parse_salary(text)}")
+        return 0
+    return check()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Каскады CSS-селекторов с предкомпиляцией и статистикой попаданий
+
+Парсеры перебирают списки селекторов-альтернатив (разные версии верстки
+сайта) для каждой карточки. Каскад:
+- компилирует каждый селектор один раз (soupsieve.compile)
+- пробует селекторы строго в порядке приоритета. Порядок не подстраивается
+  под прошлые совпадения: запасной селектор ('a[href]', '.content') совпадает
+  и там, где совпал бы точный, поэтому любое выдвижение или пропуск точного
+  селектора меняет результат на карточках, где он есть. Каскады общие для
+  процесса и живут между страницами и запросами
+- ведет статистику попаданий по селекторам (get_selector_stats): если
+  matches_per_call заметно больше 1, первым в списке стоит селектор старой
+  верстки и список стоит переупорядочить вручную
+
+Использование:
+    TITLE = get_cascade('hh', 'title', ['a[data-qa="serp-item__title"]', 'h3 a'])
+    title_elem = TITLE.select_one(card)
+    company = COMPANY.text(card, default='Компания не указана')
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import soupsieve
+
+logger = logging.getLogger(__name__)
+
+
+class SelectorCascade:
+    """Каскад селекторов одного поля источника"""
+
+    def __init__(self, source: str, field: str, selectors: Sequence[str]):
+        self.source = source
+        self.field = field
+        self.selectors: Tuple[str, ...] = tuple(selectors)
+        self._compiled = []
+        for selector in self.selectors:
+            try:
+                self._compiled.append(soupsieve.compile(selector))
+            except Exception as e:
+                # Некорректный селектор не ломает каскад - он просто никогда не срабатывает
+                logger.warning(f"Селектор {source}.{field} '{selector}' не компилируется: {e}")
+                self._compiled.append(None)
+        self._last = 0
+        self._lock = threading.Lock()
+        self.hits = [0] * len(self.selectors)
+        self.misses = 0
+        self.matches_tried = 0
+
+    def _record(self, index: Optional[int], tried: int):
+        with self._lock:
+            self.matches_tried += tried
+            if index is None:
+                self.misses += 1
+            else:
+                self.hits[index] += 1
+                self._last = index
+
+    def select_one(self, element, accept: Optional[Callable[[Any], bool]] = None):
+        """Первый элемент, найденный каскадом (и прошедший accept, если задан)"""
+        tried = 0
+        for index, compiled in enumerate(self._compiled):
+            if compiled is None:
+                continue
+            tried += 1
+            found = compiled.select_one(element)
+            if found is not None and (accept is None or accept(found)):
+                self._record(index, tried)
+                return found
+        self._record(None, tried)
+        return None
+
+    def select(self, element, accept: Optional[Callable[[List[Any]], bool]] = None) -> List[Any]:
+        """Все элементы первого сработавшего селектора"""
+        tried = 0
+        for index, compiled in enumerate(self._compiled):
+            if compiled is None:
+                continue
+            tried += 1
+            found = compiled.select(element)
+            if found and (accept is None or accept(found)):
+                self._record(index, tried)
+                return found
+        self._record(None, tried)
+        return []
+
+    def text(self, element, default: str = '') -> str:
+        """get_text(strip=True) первого найденного элемента"""
+        found = self.select_one(element)
+        return found.get_text(strip=True) if found is not None else default
+
+    @property
+    def last_selector(self) -> Optional[str]:
+        return self.selectors[self._last] if self.selectors else None
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = sum(self.hits) + self.misses
+            return {
+                'calls': calls,
+                'misses': self.misses,
+                'matches_per_call': round(self.matches_tried / calls, 2) if calls else 0.0,
+                'last': self.last_selector if calls else None,
+                'hit_rate': {
+                    selector: round(hits / calls, 3) if calls else 0.0
+                    for selector, hits in zip(self.selectors, self.hits)
+                },
+            }
+
+
+_cascades: Dict[Tuple[str, str], SelectorCascade] = {}
+_registry_lock = threading.Lock()
+
+
+def get_cascade(source: str, field: str, selectors: Sequence[str]) -> SelectorCascade:
+    """Общий каскад для (источник, поле); пересоздается, если список селекторов изменился"""
+    key = (source, field)
+    cascade = _cascades.get(key)
+    if cascade is not None and cascade.selectors == tuple(selectors):
+        return cascade
+    with _registry_lock:
+        cascade = _cascades.get(key)
+        if cascade is None or cascade.selectors != tuple(selectors):
+            cascade = SelectorCascade(source, field, selectors)
+            _cascades[key] = cascade
+        return cascade
+
+
+def get_selector_stats(source: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Статистика каскадов: {'hh.title': {...}, ...}"""
+    return {
+        f"{cascade.source}.{cascade.field}": cascade.report()
+        for cascade in list(_cascades.values())
+        if source is None or cascade.source == source
+    }
+
+
+def main():
+    """Проверка: результат каскада - всегда первый по приоритету совпавший селектор"""
+    from bs4 import BeautifulSoup
+
+    cards = ''.join(
+        f'<div class="card"><h3><a class="new-title" href="/v/{i}">Дизайнер {i}</a></h3>'
+        f'<span class="employer">Компания {i}</span></div>'
+        for i in range(500)
+    )
+    soup = BeautifulSoup(f'<div class="list">{cards}</div>', 'html.parser')
+
+    card_cascade = get_cascade('test', 'card', ['div.vacancy-serp-item', 'div.card'])
+    title = get_cascade('test', 'title', ['a.old-title', 'a.legacy', 'h3 a.new-title'])
+    company = get_cascade('test', 'company', ['.company-name', '.employer'])
+
+    found_cards = card_cascade.select(soup)
+    assert len(found_cards) == 500
+    titles = [title.select_one(card).get_text() for card in found_cards]
+    companies = [company.text(card) for card in found_cards]
+    assert titles[7] == 'Дизайнер 7' and companies[7] == 'Компания 7'
+
+    stats = get_selector_stats('test')
+    assert stats['test.title']['last'] == 'h3 a.new-title'
+    # Селекторы старой верстки в начале списка видны в статистике
+    assert stats['test.title']['matches_per_call'] == 3.0, stats['test.title']
+
+    # Карточка без точного селектора не переключает каскад на общий
+    mixed = BeautifulSoup(
+        '<div class="c"><a href="/logo"><img></a><a class="t" href="/v/1">Точный</a></div>'
+        '<div class="c"><a href="/v/2">Общий</a></div>'
+        '<div class="c"><a href="/logo"><img></a><a class="t" href="/v/3">Точный</a></div>', 'html.parser')
+    link = get_cascade('test', 'link', ['a.t', 'a[href]'])
+    assert [link.select_one(card)['href'] for card in mixed.select('div.c')] == ['/v/1', '/v/2', '/v/3']
+
+    # Первая карточка совпала только с общим селектором - точный все равно пробуется первым
+    generic_first = BeautifulSoup(
+        '<div class="c"><a href="/v/0">Общий</a></div>' + ''.join(
+            f'<div class="c"><a href="/logo"><img></a><a class="t" href="/v/{i}">Точный</a></div>'
+            for i in range(1, 30)), 'html.parser')
+    first = get_cascade('test', 'link_first', ['a.t', 'a[href]'])
+    assert [first.select_one(card)['href'] for card in generic_first.select('div.c')] == \
+        [f'/v/{i}' for i in range(30)]
+
+    # Длинная серия карточек только с общим селектором - точный не уходит назад
+    streak = get_cascade('test', 'link_streak', ['a.t', 'a[href]'])
+    generic = [f'<div class="c"><a href="/g/{i}">Общий</a></div>' for i in range(12)]
+    precise = [f'<div class="c"><a href="/logo"><img></a><a class="t" href="/v/{i}">Точный</a></div>'
+               for i in range(10)]
+    cards = BeautifulSoup(''.join(generic + precise), 'html.parser').select('div.c')
+    assert [streak.select_one(card)['href'] for card in cards] == \
+        [f'/g/{i}' for i in range(12)] + [f'/v/{i}' for i in range(10)]
+
+    fixed = get_cascade('test', 'snippet', ['.responsibility', '.requirement'])
+    both = BeautifulSoup('<div><p class="requirement">r</p><p class="responsibility">d</p></div>', 'html.parser')
+    only_req = BeautifulSoup('<div><p class="requirement">r</p></div>', 'html.parser')
+    assert fixed.text(only_req) == 'r' and fixed.text(both) == 'd'
+
+    for name, report in get_selector_stats('test').items():
+        print(f"{name}: {report}")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,11 @@
 import re
 from bs4 import BeautifulSoup, NavigableString
 from typing import Dict, List
+from smart_content_parser import BLOCK_PATTERNS, compile_block_patterns, classify_block
+
+
+# Паттерны категорий скомпилированы один раз (общие с SmartContentParser)
+_COMPILED_PATTERNS = compile_block_patterns(BLOCK_PATTERNS)
 
 
 def extract_smart_content(element) -> Dict[str, str]:
@@ -95,9 +100,10 @@ def extract_blocks_with_headers(element) -> Dict[str, str]:
         
         # Обработка абзацев
         elif tag_name in ['p', 'div']:
-            text = elem.get_text(strip=True)
-            if text and not any(child.name in ['ul', 'ol'] for child in elem.children):
-                current_content.append(text)
+            if not any(child.name in ['ul', 'ol'] for child in elem.children):
+                text = elem.get_text(strip=True)
+                if text:
+                    current_content.append(text)
         
         # Рекурсивная обработка
         else:
@@ -117,86 +123,9 @@ def extract_blocks_with_headers(element) -> Dict[str, str]:
 
 def categorize_block(title: str, content: str) -> str:
     """
-    Определяет категорию блока по заголовку и содержимому
+    Определяет категорию блока по заголовку и содержимому (заголовок проверяется первым)
     """
-    title_lower = title.lower()
-    content_lower = content.lower()
-    
-    # Паттерны для требований
-    requirements_patterns = [
-        r'требования',
-        r'пожелания\s+к\s+кандидату',
-        r'ожидания',
-        r'что\s+мы\s+ждем',
-        r'необходимые\s+навыки',
-        r'квалификация',
-        r'опыт\s+работы',
-        r'нужно',
-        r'необходимо',
-        r'кого\s+мы\s+ищем',
-        r'ты\s+нам\s+подходишь',
-        r'кандидат',
-        r'skills?',
-        r'навыки',
-        r'компетенции'
-    ]
-    
-    # Паттерны для условий
-    conditions_patterns = [
-        r'что\s+мы\s+предлагаем',
-        r'мы\s+предлагаем',
-        r'условия',
-        r'условия\s+работы',
-        r'формат\s+работы',
-        r'график\s+работы',
-        r'локация',
-        r'офис',
-        r'график',
-        r'режим\s+работы',
-        r'место\s+работы',
-        r'работаем',
-        r'трудоустройство',
-        r'льготы',
-        r'преимущества',
-        r'бонусы',
-        r'дополнительные\s+возможности',
-        r'плюсы',
-        r'benefits?',
-        r'перки',
-        r'зарплата',
-        r'компенсации',
-        r'оплата',
-        r'доход'
-    ]
-    
-    # Паттерны для задач
-    tasks_patterns = [
-        r'задачи',
-        r'обязанности',
-        r'что\s+предстоит',
-        r'работа\s+включает',
-        r'вам\s+предстоит',
-        r'функции',
-        r'ответственность'
-    ]
-    
-    # Проверяем паттерны для требований
-    for pattern in requirements_patterns:
-        if re.search(pattern, title_lower) or re.search(pattern, content_lower):
-            return 'requirements'
-    
-    # Проверяем паттерны для условий
-    for pattern in conditions_patterns:
-        if re.search(pattern, title_lower) or re.search(pattern, content_lower):
-            return 'conditions'
-    
-    # Проверяем паттерны для задач
-    for pattern in tasks_patterns:
-        if re.search(pattern, title_lower) or re.search(pattern, content_lower):
-            return 'tasks'
-    
-    # По умолчанию - описание
-    return 'full_description'
+    return classify_block(title, content, _COMPILED_PATTERNS)
 
 
 def test_simple_smart_parser():
@@ -7,9 +7,117 @@ from bs4 import BeautifulSoup, NavigableString
 from typing import Dict, List, Optional
 
 
+_TAG_RE = re.compile(r'<[^>]+>')
+_GAP_RE = re.compile(r'>\s+<')
+
+# Теги-обертки: открывающий, закрывающий и нужен ли после закрывающего перенос строки
+_WRAPPERS = {
+    'p': ('<p>', '</p>', True),
+    'strong': ('<strong>', '</strong>', False),
+    'b': ('<strong>', '</strong>', False),
+    'em': ('<em>', '</em>', False),
+    'i': ('<em>', '</em>', False),
+}
+_WRAPPERS.update({f'h{level}': (f'<h{level}>', f'</h{level}>', True) for level in range(1, 7)})
+
+
 def extract_formatted_text(element) -> str:
     """
     Извлекает отформатированный текст из HTML элемента с сохранением HTML разметки
+
+    Один проход по дереву с явным стеком (без рекурсии) и запись в общий буфер.
+    Перенос строки после закрывающего тега откладывается и не пишется, если
+    дальше идет '<' - так сразу получается результат прежней схемы
+    "собрать строку, затем re.sub('>\\s+<', '><')". Вывод совпадает с
+    extract_formatted_text_recursive байт в байт.
+    """
+    if not element:
+        return ''
+
+    out: List[str] = []
+    append = out.append
+    newline = False     # отложенный перенос после закрывающего тега
+    tagged = False      # в буфер записан хотя бы один тег
+    gaps = False        # в тексте узлов встречаются '>' и '<'
+
+    # Стек: (итератор детей, закрытие, дети - элементы списка ul/ol).
+    # Закрытие - (тег, перенос) или позиция заготовки <li> с отложенным переносом
+    stack = [(iter((element,)), None, False)]
+    while stack:
+        children, closing, items = stack[-1]
+        for node in children:
+            if isinstance(node, NavigableString):
+                text = node.strip()
+                if text:
+                    if newline:
+                        newline = False
+                        if text[0] != '<':
+                            append('\n')
+                    if not gaps and '>' in text and '<' in text:
+                        gaps = True
+                    append(text)
+                continue
+
+            if items:
+                # <li> пишется заготовкой и заполняется, только если внутри что-то есть
+                append('')
+                stack.append((iter(node.contents), (len(out) - 1, newline), False))
+                newline = False
+                break
+
+            name = node.name
+            wrapper = _WRAPPERS.get(name)
+            if wrapper is not None:
+                tagged = True
+                newline = False
+                append(wrapper[0])
+                stack.append((iter(node.contents), wrapper[1:], False))
+                break
+            if name == 'ul' or name == 'ol':
+                tagged = True
+                append(f'<{name}>')
+                newline = True
+                stack.append((iter(node.find_all('li', recursive=False)), (f'</{name}>', False), True))
+                break
+            if name == 'br':
+                tagged = True
+                newline = False
+                append('<br>')
+                continue
+            stack.append((iter(node.contents), None, False))
+            break
+        else:
+            stack.pop()
+            if closing is None:
+                continue
+            tag, line_break = closing
+            if tag.__class__ is int:
+                # Пустой элемент списка не выводится вовсе
+                if len(out) == tag + 1:
+                    del out[tag]
+                    newline = line_break
+                    continue
+                out[tag] = '<li>'
+                tag, line_break = '</li>', True
+            # Закрывающий тег начинается с '<' - отложенный перенос не нужен
+            append(tag)
+            newline = line_break
+
+    result = ''.join(out)
+    if not tagged:
+        # Только текст: прежний путь с поиском списков в тексте
+        if not _TAG_RE.search(result):
+            result = detect_lists_in_text(result)
+        return _GAP_RE.sub('><', result).strip()
+    if gaps:
+        result = _GAP_RE.sub('><', result)
+    return result.strip()
+
+
+def extract_formatted_text_recursive(element) -> str:
+    """
+    Прежняя рекурсивная реализация extract_formatted_text - эталон для сверки
+    вывода и бенчмарков (benchmarks.py, группа formatters)
     """
     if not element:
         return ''
@@ -20,10 +20,14 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Импортируем наши парсеры
 try:
-    from hh_parser import HHParser
+    from hh_api_parser import HHApiParser
     from habr_parser import HabrParser
     from getmatch_parser import GetMatchParser
     from geekjob_simple import GeekjobParser
+    from circuit_breaker import guarded_parse
+    from salary_grammar import parse_salary
+    from vacancy_schema import ensure_schema
+    import http_fixtures
 except ImportError as e:
     print(f"Ошибка импорта парсеров: {e}")
     print("Убедитесь, что все файлы парсеров находятся в той же директории")
@@ -46,75 +50,10 @@ class VacancyDatabase:
         self.init_database()
     
     def init_database(self):
-        """Инициализация базы данных и создание таблиц"""
+        """Инициализация базы данных: миграции до канонической схемы"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS vacancies (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        external_id TEXT UNIQUE NOT NULL,
-                        source TEXT NOT NULL,
-                        url TEXT NOT NULL,
-                        title TEXT NOT NULL,
-                        company TEXT NOT NULL,
-                        -- Поля для дедупликации
-                        title_hash TEXT,
-                        company_hash TEXT,
-                        url_hash TEXT,
-                        location TEXT DEFAULT '',
-                        description TEXT DEFAULT '',
-                        salary_min INTEGER,
-                        salary_max INTEGER,
-                        salary_currency TEXT DEFAULT 'RUB',
-                        published_at TEXT NOT NULL,
-                        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                        ai_specialization TEXT DEFAULT 'other',
-                        ai_employment TEXT DEFAULT '[]',
-                        ai_experience TEXT DEFAULT 'junior',
-                        ai_technologies TEXT DEFAULT '[]',
-                        ai_salary_min INTEGER,
-                        ai_salary_max INTEGER,
-                        ai_remote BOOLEAN DEFAULT 0,
-                        ai_relevance_score REAL DEFAULT 0,
-                        ai_summary TEXT DEFAULT '',
-                        is_approved BOOLEAN DEFAULT 0,
-                        is_rejected BOOLEAN DEFAULT 0,
-                        moderation_notes TEXT DEFAULT '',
-                        moderated_at TEXT,
-                        moderated_by TEXT DEFAULT '',
-                        full_description TEXT DEFAULT '',
-                        edited_description TEXT DEFAULT '',
-                        requirements TEXT DEFAULT '',
-                        tasks TEXT DEFAULT '',
-                        benefits TEXT DEFAULT '',
-                        conditions TEXT DEFAULT '',
-                        company_logo TEXT DEFAULT '',
-                        company_url TEXT DEFAULT '',
-                        employment_type TEXT DEFAULT '',
-                        experience_level TEXT DEFAULT '',
-                        remote_type TEXT DEFAULT ''
-                    )
-                """)
-
-                # Мягкая миграция недостающих колонок
-                cursor.execute("PRAGMA table_info(vacancies)")
-                existing_cols = {row[1] for row in cursor.fetchall()}
-                def ensure(col: str, ddl: str):
-                    if col not in existing_cols:
-                        cursor.execute(f"ALTER TABLE vacancies ADD COLUMN {ddl}")
-                ensure('salary_min', "salary_min INTEGER")
-                ensure('salary_max', "salary_max INTEGER")
-                ensure('salary_currency', "salary_currency TEXT DEFAULT 'RUB'")
-                
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_external_id ON vacancies(external_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_source ON vacancies(source)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON vacancies(created_at)")
-                
-                conn.commit()
-                logging.info(f"База данных инициализирована: {self.db_path}")
+            ensure_schema(self.db_path)
+            logging.info(f"База данных инициализирована: {self.db_path}")
                 
         except sqlite3.Error as e:
             logging.error(f"Ошибка инициализации базы данных: {e}")
@@ -147,9 +86,10 @@ class VacancyDatabase:
                     vacancy.get('url_hash'),
                     vacancy.get('location', ''),
                     vacancy.get('description', ''),
+                    vacancy.get('salary') or None,
                     vacancy.get('salary_min'),
                     vacancy.get('salary_max'),
-                    vacancy.get('salary_currency') or 'RUB',
+                    vacancy.get('salary_currency'),
                     vacancy.get('published_at'),
                     'other',  # ai_specialization
                     '[]',     # ai_employment
@@ -182,13 +122,13 @@ class VacancyDatabase:
                 cursor.execute("""
                     INSERT INTO vacancies (
                         external_id, source, url, title, company, title_hash, company_hash, url_hash,
-                        location, description, salary_min, salary_max, salary_currency, published_at,
+                        location, description, salary, salary_min, salary_max, salary_currency, published_at,
                         ai_specialization, ai_employment, ai_experience, ai_technologies, ai_salary_min,
                         ai_salary_max, ai_remote, ai_relevance_score, ai_summary, is_approved, is_rejected,
                         moderation_notes, moderated_at, moderated_by, full_description, edited_description,
                         requirements, tasks, benefits, conditions, company_logo, company_url,
                         employment_type, experience_level, remote_type
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, values)
                 
                 conn.commit()
@@ -236,7 +176,7 @@ class SimpleUnifiedParser:
         
         # Инициализируем парсеры
         self.parsers = {
-            'hh': HHParser(delay=delay),
+            'hh': HHApiParser(delay=delay),  # JSON API вместо HTML выдачи
             'habr': HabrParser(delay=delay),
             'getmatch': GetMatchParser(delay=delay),
             'geekjob': GeekjobParser(delay=delay)
@@ -252,26 +192,35 @@ class SimpleUnifiedParser:
             ]
         )
     
-    async def parse_source(self, source_name: str, parser, query: str, pages: int, extract_details: bool) -> List[Dict[str, Any]]:
+    async def parse_source(self, source_name: str, parser, query: str, pages: int, extract_details: bool,
+                           incremental: bool = False) -> List[Dict[str, Any]]:
         """Парсинг одного источника"""
         try:
             logging.info(f"Запуск парсинга {source_name}")
             start_time = time.time()
             
-            # Проверяем, является ли метод async
-            if asyncio.iscoroutinefunction(parser.parse_vacancies):
-                vacancies = await parser.parse_vacancies(
-                    query=query,
-                    pages=pages,
-                    extract_details=extract_details
-                )
-            else:
-                vacancies = parser.parse_vacancies(
+            # Инкрементальный режим: только новые вакансии по водяным знакам
+            options = {'incremental': True} if incremental else {}
+            
+            async def run(pages: int, extract_details: bool) -> List[Dict[str, Any]]:
+                # Проверяем, является ли метод async
+                if asyncio.iscoroutinefunction(parser.parse_vacancies):
+                    return await parser.parse_vacancies(
+                        query=query,
+                        pages=pages,
+                        extract_details=extract_details,
+                        **options
+                    )
+                return parser.parse_vacancies(
                     query=query,
                     pages=pages,
-                    extract_details=extract_details
+                    extract_details=extract_details,
+                    **options
                 )
             
+            # Открытые (недоступные) источники пропускаются сразу
+            vacancies = await guarded_parse(source_name, run, pages, extract_details)
+            
             end_time = time.time()
             duration = end_time - start_time
             
@@ -287,7 +236,8 @@ class SimpleUnifiedParser:
                          pages_per_source: int = 3, 
                          extract_details: bool = True,
                          sources: Optional[List[str]] = None,
-                         parallel: bool = True) -> Dict[str, List[Dict[str, Any]]]:
+                         parallel: bool = True,
+                         incremental: bool = False) -> Dict[str, List[Dict[str, Any]]]:
         """Парсинг всех источников"""
         
         if sources is None:
@@ -308,7 +258,7 @@ class SimpleUnifiedParser:
                 if source_name in self.parsers:
                     parser = self.parsers[source_name]
                     task = asyncio.create_task(self.parse_source(
-                        source_name, parser, query, pages_per_source, extract_details
+                        source_name, parser, query, pages_per_source, extract_details, incremental
                     ))
                     tasks.append((source_name, task))
             
@@ -326,38 +276,18 @@ class SimpleUnifiedParser:
                 if source_name in self.parsers:
                     parser = self.parsers[source_name]
                     vacancies = await self.parse_source(
-                        source_name, parser, query, pages_per_source, extract_details
+                        source_name, parser, query, pages_per_source, extract_details, incremental
                     )
                     results[source_name] = vacancies
                     
-                    # Пауза между источниками
-                    time.sleep(self.delay)
+                    # Пауза между источниками (при воспроизведении фикстур не нужна)
+                    if not http_fixtures.replaying():
+                        time.sleep(self.delay)
         
         return results
     
     def save_all_vacancies(self, results: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, int]]:
         """Сохранение всех вакансий в базу данных"""
-        def parse_salary_text(s: Optional[str]):
-            if not s:
-                return None, None, 'RUB'
-            try:
-                import re
-                text = str(s)
-                currency = 'RUB'
-                if '₽' in text or 'руб' in text.lower():
-                    currency = 'RUB'
-                if '$' in text or 'usd' in text.lower():
-                    currency = 'USD'
-                if '€' in text or 'eur' in text.lower():
-                    currency = 'EUR'
-                nums = [int(x.replace(' ', '')) for x in re.findall(r"\d[\d\s]{2,}", text)]
-                if len(nums) >= 2:
-                    return nums[0], nums[1], currency
-                if len(nums) == 1:
-                    return nums[0], None, currency
-            except Exception:
-                pass
-            return None, None, 'RUB'
         saved_counts = {}
         
         for source_name, vacancies in results.items():
@@ -373,13 +303,12 @@ class SimpleUnifiedParser:
                 
                 # Преобразуем строковую зарплату в поля min/max/currency, если нужно
                 if 'salary_min' not in vacancy and 'salary_max' not in vacancy:
-                    sal_min, sal_max, sal_cur = parse_salary_text(vacancy.get('salary'))
-                    if sal_min is not None:
-                        vacancy['salary_min'] = sal_min
-                    if sal_max is not None:
-                        vacancy['salary_max'] = sal_max
-                    if sal_cur:
-                        vacancy['salary_currency'] = sal_cur
+                    salary = parse_salary(vacancy.get('salary'))
+                    if salary.min is not None:
+                        vacancy['salary_min'] = salary.min
+                    if salary.max is not None:
+                        vacancy['salary_max'] = salary.max
+                    vacancy['salary_currency'] = salary.currency
                 logging.info(f"Попытка сохранения вакансии: {vacancy.get('title', 'Без названия')}")
                 logging.info(f"External ID: {vacancy.get('external_id')}")
                 logging.info(f"Source: {vacancy.get('source')}")
@@ -415,8 +344,15 @@ def main():
     parser.add_argument("--extract-details", action="store_true", default=True, help="Извлекать полные детали вакансий")
     parser.add_argument("--no-details", action="store_true", help="Не извлекать детали")
     parser.add_argument("--no-parallel", action="store_true", help="Отключить параллельный парсинг")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Только новые вакансии: остановка на известных, пропуск неизменившихся источников")
     parser.add_argument("--delay", type=float, default=1.0, help="Задержка между запросами")
     
+    parser.add_argument("--fixtures", metavar="MODE:DIR",
+                        help="HTTP фикстуры: record:DIR - запись ответов, replay:DIR - работа без сети")
+    parser.add_argument("--fixtures-latency", default="",
+                        help="Задержка при replay: секунды или recorded[*k] (записанная)")
+    
     args = parser.parse_args()
     
     # Настройка логирования
@@ -430,6 +366,9 @@ def main():
         ]
     )
     
+    if args.fixtures:
+        http_fixtures.activate_spec(args.fixtures, args.fixtures_latency)
+    
     try:
         # Создаём упрощенный парсер
         unified_parser = SimpleUnifiedParser(db_path=args.db, delay=args.delay)
@@ -441,7 +380,8 @@ def main():
             pages_per_source=args.pages,
             extract_details=args.extract_details or not args.no_details,
             sources=args.sources,
-            parallel=not args.no_parallel
+            parallel=not args.no_parallel,
+            incremental=args.incremental
         ))
         
         # Сохраняем результаты
@@ -3,8 +3,99 @@
 """
 
 import re
-from bs4 import BeautifulSoup, NavigableString
-from typing import Dict, List, Optional
+from bs4 import BeautifulSoup, NavigableString, CData, Tag
+from typing import Dict, List, Optional, Pattern, Tuple
+
+
+HEADER_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+
+# Строки, которые учитывает get_text() (без комментариев, скриптов и т.п.)
+_TEXT_STRING_TYPES = frozenset([NavigableString, CData])
+
+# Паттерны для определения типа блока (категории в порядке приоритета)
+BLOCK_PATTERNS = {
+    'requirements': [
+        r'требования',
+        r'пожелания\s+к\s+кандидату',
+        r'ожидания',
+        r'что\s+мы\s+ждем',
+        r'необходимые\s+навыки',
+        r'квалификация',
+        r'опыт\s+работы',
+        r'нужно',
+        r'необходимо',
+        r'кого\s+мы\s+ищем',
+        r'ты\s+нам\s+подходишь',
+        r'кандидат',
+        r'skills?',
+        r'навыки',
+        r'компетенции'
+    ],
+    'conditions': [
+        r'что\s+мы\s+предлагаем',
+        r'мы\s+предлагаем',
+        r'условия',
+        r'условия\s+работы',
+        r'формат\s+работы',
+        r'график\s+работы',
+        r'локация',
+        r'офис',
+        r'график',
+        r'режим\s+работы',
+        r'место\s+работы',
+        r'работаем',
+        r'трудоустройство',
+        r'льготы',
+        r'преимущества',
+        r'бонусы',
+        r'дополнительные\s+возможности',
+        r'плюсы',
+        r'benefits?',
+        r'перки',
+        r'зарплата',
+        r'компенсации',
+        r'оплата',
+        r'доход'
+    ],
+    'tasks': [
+        r'задачи',
+        r'обязанности',
+        r'что\s+предстоит',
+        r'работа\s+включает',
+        r'вам\s+предстоит',
+        r'функции',
+        r'ответственность'
+    ]
+}
+
+
+def compile_block_patterns(block_patterns: Dict[str, List[str]]) -> List[Tuple[str, Pattern]]:
+    """
+    Компилирует паттерны каждой категории в одну альтернативу (порядок категорий сохраняется)
+    """
+    return [
+        (category, re.compile('|'.join(f'(?:{pattern})' for pattern in patterns)))
+        for category, patterns in block_patterns.items()
+        if patterns
+    ]
+
+
+def classify_block(title: str, content: str, compiled: List[Tuple[str, Pattern]]) -> str:
+    """
+    Категория блока: сначала по заголовку, и только если он ничего не дал - по содержимому
+    """
+    title_lower = title.lower()
+    for category, pattern in compiled:
+        if pattern.search(title_lower):
+            return category
+
+    content_lower = content.lower()
+    for category, pattern in compiled:
+        if pattern.search(content_lower):
+            return category
+
+    # По умолчанию - описание
+    return 'full_description'
 
 
 class SmartContentParser:
@@ -14,60 +105,13 @@ class SmartContentParser:
     
     def __init__(self):
         # Паттерны для определения типа блока
-        self.block_patterns = {
-            'requirements': [
-                r'требования',
-                r'пожелания\s+к\s+кандидату',
-                r'ожидания',
-                r'что\s+мы\s+ждем',
-                r'необходимые\s+навыки',
-                r'квалификация',
-                r'опыт\s+работы',
-                r'нужно',
-                r'необходимо',
-                r'кого\s+мы\s+ищем',
-                r'ты\s+нам\s+подходишь',
-                r'кандидат',
-                r'skills?',
-                r'навыки',
-                r'компетенции'
-            ],
-            'conditions': [
-                r'что\s+мы\s+предлагаем',
-                r'мы\s+предлагаем',
-                r'условия',
-                r'условия\s+работы',
-                r'формат\s+работы',
-                r'график\s+работы',
-                r'локация',
-                r'офис',
-                r'график',
-                r'режим\s+работы',
-                r'место\s+работы',
-                r'работаем',
-                r'трудоустройство',
-                r'льготы',
-                r'преимущества',
-                r'бонусы',
-                r'дополнительные\s+возможности',
-                r'плюсы',
-                r'benefits?',
-                r'перки',
-                r'зарплата',
-                r'компенсации',
-                r'оплата',
-                r'доход'
-            ],
-            'tasks': [
-                r'задачи',
-                r'обязанности',
-                r'что\s+предстоит',
-                r'работа\s+включает',
-                r'вам\s+предстоит',
-                r'функции',
-                r'ответственность'
-            ]
-        }
+        self.block_patterns = {category: list(patterns) for category, patterns in BLOCK_PATTERNS.items()}
+        # Скомпилированы один раз; после изменения block_patterns вызовите compile_patterns()
+        self.compile_patterns()
+
+    def compile_patterns(self):
+        """Перекомпилирует block_patterns"""
+        self._compiled_patterns = compile_block_patterns(self.block_patterns)
     
     def parse_content(self, element) -> Dict[str, str]:
         """
@@ -117,58 +161,90 @@ class SmartContentParser:
     def _extract_blocks_with_headers(self, element) -> Dict[str, str]:
         """
         Извлекает блоки контента с заголовками
+
+        Заголовок открывает блок, в который попадают следующие за ним соседи до
+        следующего заголовка: p/div - своим текстом, ul/ol - строкой "• ..." на
+        каждый вложенный li. Дерево обходится один раз (явный стек, без рекурсии),
+        а текст узла (как get_text(strip=True)) собирается снизу вверх из текста
+        детей - и только внутри узлов, чей текст нужен
         """
-        blocks = {}
-        
-        # Находим все заголовки
-        headers = element.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-        
-        for header in headers:
-            title = header.get_text(strip=True)
-            content = []
-            
-            # Ищем следующий элемент после заголовка
-            next_elem = header.find_next_sibling()
-            while next_elem and next_elem.name not in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                if next_elem.name in ['ul', 'ol']:
-                    for li in next_elem.find_all('li'):
-                        content.append(f"• {li.get_text(strip=True)}")
-                elif next_elem.name in ['p', 'div']:
-                    text = next_elem.get_text(strip=True)
+        headers = []        # [заголовок, строки блока] в порядке заголовков в документе
+        collectors = []     # строки открытых ul/ol блоков; в них попадают все вложенные li
+
+        # Кадр: [дети, части текста (None - текст не нужен), блок для следующих
+        # соседей, действие при выходе, данные действия]
+        stack = [[iter(element.contents), None, None, None, None]]
+        while stack:
+            frame = stack[-1]
+            parts = frame[1]
+            for node in frame[0]:
+                if isinstance(node, NavigableString):
+                    if parts is not None and node.__class__ in _TEXT_STRING_TYPES:
+                        text = node.strip()
+                        if text:
+                            parts.append(text)
+                    continue
+
+                name = node.name
+                block = frame[2]
+                if name in HEADER_TAGS:
+                    header = [None, []]
+                    headers.append(header)
+                    frame[2] = header[1]
+                    action, data = 'header', header
+                elif block is not None and (name == 'ul' or name == 'ol'):
+                    items = []
+                    collectors.append(items)
+                    action, data = 'list', (items, block)
+                elif block is not None and (name == 'p' or name == 'div'):
+                    action, data = 'text', block
+                elif name == 'li' and collectors:
+                    # Место под элемент в каждом открытом списке (li - в порядке документа)
+                    slots = [(items, len(items)) for items in collectors]
+                    for items in collectors:
+                        items.append(None)
+                    action, data = 'item', slots
+                else:
+                    action = data = None
+
+                needs_text = parts is not None or (action is not None and action != 'list')
+                stack.append([iter(node.contents), [] if needs_text else None, None, action, data])
+                break
+            else:
+                stack.pop()
+                action, data = frame[3], frame[4]
+                if action == 'list':
+                    items, block = data
+                    collectors.pop()
+                    block.extend(items)
+                if parts is None:
+                    continue
+                text = ''.join(parts)
+                if text and stack and stack[-1][1] is not None:
+                    stack[-1][1].append(text)
+
+                if action == 'header':
+                    data[0] = text
+                elif action == 'text':
                     if text:
-                        content.append(text)
-                next_elem = next_elem.find_next_sibling()
-            
+                        data.append(text)
+                elif action == 'item':
+                    for items, index in data:
+                        items[index] = f"• {text}"
+
+        blocks = {}
+        for title, content in headers:
             content_text = '\n'.join(content)
             if content_text.strip():
                 blocks[title] = content_text
-        
+
         return blocks
     
     def _categorize_block(self, title: str, content: str) -> str:
         """
         Определяет категорию блока по заголовку и содержимому
         """
-        title_lower = title.lower()
-        content_lower = content.lower()
-        
-        # Проверяем паттерны для требований
-        for pattern in self.block_patterns['requirements']:
-            if re.search(pattern, title_lower) or re.search(pattern, content_lower):
-                return 'requirements'
-        
-        # Проверяем паттерны для условий
-        for pattern in self.block_patterns['conditions']:
-            if re.search(pattern, title_lower) or re.search(pattern, content_lower):
-                return 'conditions'
-        
-        # Проверяем паттерны для задач
-        for pattern in self.block_patterns['tasks']:
-            if re.search(pattern, title_lower) or re.search(pattern, content_lower):
-                return 'tasks'
-        
-        # По умолчанию - описание
-        return 'full_description'
+        return classify_block(title, content, self._compiled_patterns)
 
 
 # Глобальный экземпляр парсера
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Частичный разбор страниц вакансий: только целевые поддеревья
+
+Со страницы вакансии парсерам нужен один блок (описание), а make_soup строит
+дерево BeautifulSoup всей страницы - шапки, скриптов, рекомендаций, подвала.
+parse_subtrees только находит в исходном тексте границы нужных элементов:
+- сканер тегов (регулярное выражение; комментарии, script и style
+  пропускаются) ищет открывающие теги, подходящие под левую часть
+  селекторов описания (для 'div.a p' - элементы div.a)
+- конец элемента - закрывающий тег того же имени на той же глубине, как его
+  закрывает html.parser
+- сканирование прекращается, как только найден элемент первого по
+  приоритету простого селектора
+Найденные фрагменты исходной разметки разбираются бэкендом источника
+(make_soup), поэтому невалидная вложенность (блоки внутри <p>) дает то же
+дерево и тот же extract_formatted_text, что и полный разбор. Дерево lxml
+здесь не используется: libxml2 чинит разметку иначе, чем html.parser.
+
+Если селектор не поддерживается (псевдоклассы, соседние элементы '+', '~'),
+кодировку не удалось определить или ничего не найдено, возвращается None -
+вызывающий код разбирает страницу целиком:
+    soup = parse_subtrees(content, DESCRIPTION.selectors, 'hh') or make_soup(content, 'hh')
+
+Статистика байтов (всего / прочитано / сохранено во фрагментах) - get_stats().
+Отключение: PARSER_SUBTREE_PARSING=0.
+
+Проверка совпадения с полным разбором и экономии:
+    python subtree_parser.py                      # синтетические страницы
+    python subtree_parser.py --fixtures fixtures/http
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import os
+import re
+import sys
+import html
+import time
+import logging
+import argparse
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from bs4 import BeautifulSoup
+from bs4.dammit import EncodingDetector
+
+try:
+    from html_backend import make_soup
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    from html_backend import make_soup
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('PARSER_SUBTREE_PARSING', '1') != '0'
+
+# Разметка, которую сканер границ пропускает целиком, и теги. Содержимое
+# script/style для html.parser - текст (CDATA), теги в нем не считаются
+_MARKUP_RE = re.compile(
+    r'<!--.*?(?:-->|\Z)'
+    r'|<(?P<raw>script|style)\b[^>]*>.*?(?:</(?P=raw)\s*>|\Z)'
+    r'|</(?P<end>[a-zA-Z][^\s/>]*)[^>]*>'
+    r'|<(?P<start>[a-zA-Z][^\s/>]*)(?P<attrs>(?:"[^"]*"|\'[^\']*\'|[^>"\'])*)>'
+    r'|<[!?][^>]*>',
+    re.DOTALL | re.IGNORECASE,
+)
+_ATTR_RE = re.compile(r'([^\s=/>"\']+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+)))?')
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+             'param', 'source', 'track', 'wbr'}
+
+_PART_RE = re.compile(
+    r'\.(?P<cls>[\w-]+)'
+    r'|#(?P<id>[\w-]+)'
+    r'|\[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[*^$~|]?=)\s*'
+    r'(?:"(?P<dq>[^"]*)"|\'(?P<sq>[^\']*)\'|(?P<bare>[^\]\s]+))\s*)?\]'
+)
+_TAG_RE = re.compile(r'[a-zA-Z][\w-]*|\*')
+
+
+class _Compound:
+    """Простой селектор без комбинаторов: tag.class#id[attr op value]"""
+
+    def __init__(self, text: str):
+        self.tag = None
+        self.classes = set()
+        self.attrs: List[Tuple[str, Optional[str], Optional[str]]] = []
+        position = 0
+        match = _TAG_RE.match(text)
+        if match:
+            self.tag = None if match.group() == '*' else match.group().lower()
+            position = match.end()
+        while position < len(text):
+            part = _PART_RE.match(text, position)
+            if not part:
+                raise ValueError(f"Неподдерживаемый селектор: {text}")
+            if part.group('cls'):
+                self.classes.add(part.group('cls'))
+            elif part.group('id'):
+                self.attrs.append(('id', '=', part.group('id')))
+            else:
+                value = next((v for v in part.group('dq', 'sq', 'bare') if v is not None), None)
+                self.attrs.append((part.group('attr').lower(), part.group('op'), value))
+            position = part.end()
+
+    def matches(self, tag: str, attrib) -> bool:
+        if self.tag and tag != self.tag:
+            return False
+        if self.classes and not self.classes.issubset((attrib.get('class') or '').split()):
+            return False
+        for name, op, value in self.attrs:
+            actual = attrib.get(name)
+            if actual is None:
+                return False
+            if op is None:
+                continue
+            if op == '=':
+                ok = actual == value
+            elif op == '~=':
+                ok = value in actual.split()
+            elif op == '|=':
+                ok = actual == value or actual.startswith(value + '-')
+            elif not value:
+                ok = False  # пустое значение для *=, ^=, $= не совпадает ни с чем
+            elif op == '*=':
+                ok = value in actual
+            elif op == '^=':
+                ok = actual.startswith(value)
+            else:
+                ok = actual.endswith(value)
+            if not ok:
+                return False
+        return True
+
+
+def _split_compounds(selector: str) -> List[str]:
+    """Части селектора между комбинаторами-потомками (' ' и '>')"""
+    compounds, current, quote, depth = [], '', None, 0
+    for char in selector.strip():
+        if quote:
+            quote = None if char == quote else quote
+        elif char in '"\'':
+            quote = char
+        elif char == '[':
+            depth += 1
+        elif char == ']':
+            depth -= 1
+        elif depth == 0 and (char.isspace() or char == '>'):
+            if current:
+                compounds.append(current)
+            current = ''
+            continue
+        elif depth == 0 and char in ',+~:':
+            raise ValueError(f"Неподдерживаемый селектор: {selector}")
+        current += char
+    if current:
+        compounds.append(current)
+    if not compounds:
+        raise ValueError("Пустой селектор")
+    return compounds
+
+
+_targets_cache: Dict[Tuple[str, ...], Optional[List[Tuple[_Compound, bool]]]] = {}
+
+
+def _compile_targets(selectors: Tuple[str, ...]) -> Optional[List[Tuple[_Compound, bool]]]:
+    """(левая часть селектора, селектор простой целиком) или None, если разбор невозможен"""
+    if selectors not in _targets_cache:
+        try:
+            targets = []
+            for selector in selectors:
+                compounds = _split_compounds(selector)
+                targets.append((_Compound(compounds[0]), len(compounds) == 1))
+            _targets_cache[selectors] = targets
+        except ValueError as e:
+            logger.debug(f"Частичный разбор недоступен: {e}")
+            _targets_cache[selectors] = None
+    return _targets_cache[selectors]
+
+
+class _Stats:
+    """Байты страниц вакансий: всего, прочитано парсером, сохранено во фрагментах"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(lambda: defaultdict(float))
+
+    def add(self, source: str, **values):
+        with self._lock:
+            for name, value in values.items():
+                self.counters[source][name] += value
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for source, counters in self.counters.items():
+                total = counters['bytes_total'] or 1
+                result[source] = {
+                    'pages': int(counters['pages']),
+                    'partial': int(counters['partial']),
+                    'fallbacks': int(counters['fallbacks']),
+                    'bytes_total': int(counters['bytes_total']),
+                    'bytes_parsed': int(counters['bytes_parsed']),
+                    'bytes_kept': int(counters['bytes_kept']),
+                    'skipped_ratio': round(1 - counters['bytes_kept'] / total, 3),
+                    'seconds': round(counters['seconds'], 4),
+                }
+            return result
+
+
+stats = _Stats()
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    return stats.report()
+
+
+def _attributes(text: str) -> Dict[str, str]:
+    """Атрибуты открывающего тега, как их видит html.parser (повтор - последнее значение)"""
+    attrib = {}
+    for name, dq, sq, bare in _ATTR_RE.findall(text):
+        value = dq or sq or bare
+        attrib[name.lower()] = html.unescape(value) if value else ''
+    return attrib
+
+
+def _decode(content: Union[str, bytes]) -> Optional[str]:
+    if isinstance(content, str):
+        return content
+    encoding = EncodingDetector.find_declared_encoding(content, is_html=True) or 'utf-8'
+    try:
+        return content.decode(encoding)
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+
+def extract_subtrees(content: Union[str, bytes], selectors: Sequence[str]) -> Optional[Tuple[List[str], int]]:
+    """
+    Исходная разметка целевых элементов в порядке документа и число
+    просмотренных байт. None - частичный разбор невозможен.
+    """
+    targets = _compile_targets(tuple(selectors))
+    if targets is None:
+        return None
+    text = _decode(content)
+    if text is None:
+        return None
+
+    first_compound, first_complete = targets[0]
+    fragments: List[str] = []
+    name = None        # имя тега сохраняемого элемента
+    begin = depth = 0  # начало элемента и вложенность одноименных тегов в нем
+    scanned = len(text)
+
+    for match in _MARKUP_RE.finditer(text):
+        tag = match.group('start')
+        if tag is not None:
+            tag = tag.lower()
+            if name is None:
+                attrib = _attributes(match.group('attrs'))
+                if not any(compound.matches(tag, attrib) for compound, _ in targets):
+                    continue
+                if tag in VOID_TAGS or match.group('attrs').rstrip().endswith('/'):
+                    fragments.append(match.group())
+                    continue
+                name, begin, depth = tag, match.start(), 1
+                complete = first_complete and first_compound.matches(tag, attrib)
+            elif tag == name and not match.group('attrs').rstrip().endswith('/'):
+                depth += 1
+            continue
+        if name is not None and (match.group('end') or '').lower() == name:
+            depth -= 1
+            if depth == 0:
+                fragments.append(text[begin:match.end()])
+                name = None
+                if complete:
+                    scanned = match.end()
+                    break
+    if name is not None:
+        # Незакрытый элемент - до конца документа, как у html.parser
+        fragments.append(text[begin:])
+
+    parsed = len(text[:scanned].encode('utf-8'))
+    return fragments, parsed
+
+
+def parse_subtrees(content: Union[str, bytes, None], selectors: Sequence[str],
+                   source: str = 'unknown') -> Optional[BeautifulSoup]:
+    """
+    Дерево BeautifulSoup только из поддеревьев, подходящих под selectors.
+    None - нужен полный разбор (отключено, не поддерживается, не найдено).
+    """
+    if not ENABLED or not content:
+        return None
+    started = time.perf_counter()
+    total = len(content.encode('utf-8') if isinstance(content, str) else content)
+    try:
+        extracted = extract_subtrees(content, selectors)
+    except Exception as e:
+        logger.debug(f"Ошибка частичного разбора {source}: {e}")
+        extracted = None
+
+    if not extracted or not extracted[0]:
+        stats.add(source, pages=1, fallbacks=1, bytes_total=total, bytes_parsed=total, bytes_kept=total,
+                  seconds=time.perf_counter() - started)
+        return None
+
+    fragments, parsed = extracted
+    markup = ''.join(fragments)
+    soup = make_soup(markup, source)
+    kept = len(markup.encode('utf-8'))
+    stats.add(source, pages=1, partial=1, bytes_total=total, bytes_parsed=parsed, bytes_kept=kept,
+              seconds=time.perf_counter() - started)
+    logger.debug(f"🌿 {source}: прочитано {parsed} из {total} байт, в дерево {kept}")
+    return soup
+
+
+# ---------------------------------------------------------------------------
+# Проверка совпадения с полным разбором
+# ---------------------------------------------------------------------------
+
+def _detail_cascades() -> Dict[str, Tuple[str, ...]]:
+    """Селекторы описания парсеров, использующих частичный разбор"""
+    import hh_parser
+    import habr_parser
+    import getmatch_parser
+    import hirehi_parser
+    return {
+        'hh': hh_parser.HH_DESCRIPTION.selectors,
+        'habr': habr_parser.HABR_DESCRIPTION.selectors,
+        'getmatch': getmatch_parser.GETMATCH_DESCRIPTION.selectors,
+        'hirehi': hirehi_parser.HIREHI_DESCRIPTION.selectors,
+    }
+
+
+def _synthetic_pages(count: int = 20):
+    """Страницы вакансий: шапка, скрипты, описание, рекомендации, подвал"""
+    for index in range(count):
+        recommendations = ''.join(
+            f'<div class="vacancy-card"><a href="/vacancy/{i}">Дизайнер {i}</a>'
+            f'<div class="vacancy-card__company">Компания {i}</div><p>{"Описание карточки. " * 10}</p></div>'
+            for i in range(40)
+        )
+        page = (
+            '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Вакансия</title>'
+            '<script>window.__state = {' + '"k": "v",' * 2000 + '};</script></head>'
+            '<body><header class="header"><nav><a href="/">Главная</a></nav></header>'
+            '<main><h1>Продуктовый дизайнер</h1>'
+            f'<div data-qa="vacancy-description" class="vacancy-description g-user-content">'
+            f'<p><strong>О компании</strong></p><p>Мы&nbsp;делаем продукт №{index}.<br>Ищем дизайнера.</p>'
+            '<h3>Обязанности:</h3><ul><li>Проектировать интерфейсы</li><li>Вести дизайн-систему</li></ul>'
+            '<!-- служебный комментарий --><p>Условия: <b>удаленно</b></p></div></main>'
+            f'<aside class="recommendations">{recommendations}</aside>'
+            '<footer class="footer">© 2025</footer></body></html>'
+        )
+        yield f"https://example.com/vacancy/{index}", page.encode('utf-8')
+
+
+MALFORMED_SAMPLE = (
+    '<html><head><script>var s = "<div data-qa=\\"vacancy-description\\">";</script></head><body>'
+    '<!-- <div data-qa="vacancy-description"> --><div class="wrap">'
+    '<div data-qa="vacancy-description"><p><strong>Обязанности:</strong><ul><li>Макеты</li></ul></p>'
+    '<p>text<div>block</div>tail</p><div/><p>Условия &amp; <b>бонусы</p></div>'
+    '<div class="basic-section">хвост</div></div></body></html>'
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Проверка частичного разбора страниц вакансий')
+    parser.add_argument('--fixtures', help='Каталог корпуса http_fixtures (по умолчанию синтетические страницы)')
+    parser.add_argument('--sources', nargs='+', help='Источники (селекторы описания соответствующих парсеров)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    from html_backend import _fixture_pages, STRUCTURE_SAMPLE
+    from simple_text_formatter import extract_formatted_text
+
+    cascades = _detail_cascades()
+    sources = args.sources or list(cascades)
+    pages = list(_fixture_pages(args.fixtures) if args.fixtures else _synthetic_pages())
+    # Невалидная вложенность: фрагмент должен разбираться так же, как вся страница
+    pages.append(('structure-sample', STRUCTURE_SAMPLE.encode('utf-8')))
+    pages.append(('malformed', MALFORMED_SAMPLE.encode('utf-8')))
+    if not pages:
+        print("Нет HTML-страниц для проверки")
+        return 1
+
+    mismatches = 0
+    timings = defaultdict(float)
+    for source in sources:
+        selectors = cascades[source]
+        for url, content in pages:
+            started = time.perf_counter()
+            full = make_soup(content, source)
+            expected = [full.select_one(selector) for selector in selectors]
+            timings[(source, 'full')] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            partial = parse_subtrees(content, selectors, source) or make_soup(content, source)
+            actual = [partial.select_one(selector) for selector in selectors]
+            timings[(source, 'partial')] += time.perf_counter() - started
+
+            # Первый найденный по приоритету элемент должен совпасть по тексту
+            want = next((extract_formatted_text(e) for e in expected if e is not None), None)
+            got = next((extract_formatted_text(e) for e in actual if e is not None), None)
+            if want != got:
+                mismatches += 1
+                print(f"≠ {source}: {url}")
+
+    print(f"\nСтраниц: {len(pages)}")
+    print(f"{'источник':<10}{'полный, мс':>12}{'частичный, мс':>15}{'ускорение':>11}{'пропущено':>11}")
+    report = get_stats()
+    for source in sources:
+        full_ms = timings[(source, 'full')] / len(pages) * 1000
+        partial_ms = timings[(source, 'partial')] / len(pages) * 1000
+        skipped = report.get(source, {}).get('skipped_ratio', 0.0)
+        print(f"{source:<10}{full_ms:>12.2f}{partial_ms:>15.2f}{full_ms / partial_ms:>10.1f}x{skipped:>10.0%}")
+    print(f"Расхождений: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,10 @@
 Альтернатива ChatGPT для случаев, когда API недоступен
 """
 
-import re
 import logging
 from typing import Dict, Any, Optional
 from text_cleaner import clean_vacancy_data
+import text_rules
 
 class TextNormalizer:
     """Локальная нормализация текста вакансий"""
@@ -15,41 +15,8 @@ class TextNormalizer:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         
-        # Паттерны для нормализации
-        self.normalization_rules = {
-            # Нормализация названий должностей
-            'job_titles': {
-                r'ui/ux\s*дизайнер': 'UI/UX дизайнер',
-                r'ui\s*дизайнер': 'UI дизайнер', 
-                r'ux\s*дизайнер': 'UX дизайнер',
-                r'веб\s*дизайнер': 'Веб-дизайнер',
-                r'графический\s*дизайнер': 'Графический дизайнер',
-                r'продуктовый\s*дизайнер': 'Продуктовый дизайнер',
-                r'дизайнер\s*интерфейсов': 'Дизайнер интерфейсов',
-                r'дизайнер\s*опыта': 'Дизайнер пользовательского опыта'
-            },
-            
-            # Нормализация навыков
-            'skills': {
-                r'figma': 'Figma',
-                r'sketch': 'Sketch',
-                r'adobe\s*photoshop': 'Adobe Photoshop',
-                r'adobe\s*illustrator': 'Adobe Illustrator',
-                r'adobe\s*xd': 'Adobe XD',
-                r'principle': 'Principle',
-                r'invision': 'InVision',
-                r'zeplin': 'Zeplin'
-            },
-            
-            # Нормализация типов занятости
-            'employment': {
-                r'удаленн[а-я]*\s*работа': 'Удаленная работа',
-                r'офисн[а-я]*\s*работа': 'Офисная работа',
-                r'гибридн[а-я]*\s*формат': 'Гибридный формат',
-                r'полн[а-я]*\s*занятость': 'Полная занятость',
-                r'частичн[а-я]*\s*занятость': 'Частичная занятость'
-            }
-        }
+        # Паттерны для нормализации (скомпилированы в text_rules)
+        self.normalization_rules = text_rules.NORMALIZATION_RULES
     
     def normalize_vacancy(self, vacancy: Dict[str, Any]) -> Dict[str, Any]:
         """Нормализация вакансии"""
@@ -107,19 +74,7 @@ class TextNormalizer:
         if not text:
             return text
         
-        normalized_text = text
-        
-        for category in rule_categories:
-            if category in self.normalization_rules:
-                for pattern, replacement in self.normalization_rules[category].items():
-                    normalized_text = re.sub(
-                        pattern, 
-                        replacement, 
-                        normalized_text, 
-                        flags=re.IGNORECASE
-                    )
-        
-        return normalized_text
+        return text_rules.normalize_field(text, rule_categories)
     
     def normalize_batch(self, vacancies: list) -> list:
         """Нормализация списка вакансий"""
@@ -136,10 +91,13 @@ class TextNormalizer:
         return normalized_vacancies
 
 
+# Глобальный экземпляр: правила компилируются один раз при импорте text_rules
+text_normalizer = TextNormalizer()
+
+
 def normalize_vacancy_text(vacancy: Dict[str, Any]) -> Dict[str, Any]:
     """Функция-обертка для нормализации вакансии"""
-    normalizer = TextNormalizer()
-    return normalizer.normalize_vacancy(vacancy)
+    return text_normalizer.normalize_vacancy(vacancy)
 
 
 # Пример использования
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Скомпилированный движок правил очистки и нормализации текста вакансий
+
+Правила TextCleaner (пробелы, названия компаний, частые склейки слов) и
+TextNormalizer (должности, навыки, занятость) компилируются один раз и
+применяются по полям за минимальное число проходов:
+- семь правил "вставить пробел между символами двух классов" сведены к трем
+  проходам (вставки только добавляют пробелы и не создают новых пар,
+  поэтому результат совпадает с последовательным применением)
+- правила очистки с контекстом из нескольких символов (ООО..., веб...)
+  выполняются по порядку, но только если общий детектор нашел в тексте
+  хотя бы одно совпадение
+- правило нормализации (figma, веб дизайнер...) запускается, только если в
+  тексте есть все обязательные литералы его шаблона
+- строки, уже прошедшие очистку и не содержащие ни одного совпадения,
+  запоминаются (метки идемпотентности): повторная очистка той же строки -
+  в парсере, в save_vacancy и внутри normalize_vacancy_text - ничего не стоит
+
+Результат совпадает с прежними TextCleaner/TextNormalizer байт в байт, что
+проверяется эталонным файлом:
+    python text_rules.py --check
+    python text_rules.py --update-golden   # после намеренного изменения правил
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import sqlite3
+import argparse
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# ---------------------------------------------------------------------------
+# Таблицы правил (в порядке применения)
+# ---------------------------------------------------------------------------
+
+# TextCleaner.clean_text: пробелы между символами (шаблон, замена)
+SPACING_RULES = [
+    # Пробелы перед заглавными буквами после строчных
+    (r'([а-яё])([А-ЯЁ])', r'\1 \2'),
+    # Пробелы перед цифрами после букв
+    (r'([а-яёА-ЯЁ])(\d)', r'\1 \2'),
+    # Пробелы после цифр перед буквами
+    (r'(\d)([а-яёА-ЯЁ])', r'\1 \2'),
+    # Пробелы перед специальными символами
+    (r'([а-яёА-ЯЁ])([\/\-\(\)])', r'\1 \2'),
+    # Пробелы после специальных символов
+    (r'([\/\-\(\)])([а-яёА-ЯЁ])', r'\1 \2'),
+    # Пробелы перед слэшами в UI/UX
+    (r'([а-яё])([A-Z])', r'\1 \2'),
+    # Пробелы в названиях компаний
+    (r'(ООО|ОАО|ЗАО|ИП|ИОО|АО)([А-ЯЁ])', r'\1 \2'),
+    # Пробелы в сокращениях
+    (r'([а-яё])([A-Z][a-z])', r'\1 \2'),
+]
+
+# TextCleaner.format_company_name
+COMPANY_RULES = [
+    (r'ООО([А-ЯЁ])', r'ООО \1'),
+    (r'ОАО([А-ЯЁ])', r'ОАО \1'),
+    (r'ЗАО([А-ЯЁ])', r'ЗАО \1'),
+    (r'ИП([А-ЯЁ])', r'ИП \1'),
+    (r'ИОО([А-ЯЁ])', r'ИОО \1'),
+    (r'АО([А-ЯЁ])', r'АО \1'),
+]
+
+# TextCleaner.fix_common_spacing_issues
+FIX_RULES = [
+    # "в поискеUX/UI" -> "в поиске UX/UI"
+    (r'в поиске([A-Z])', r'в поиске \1'),
+    # "UI/UXдизайнер" -> "UI/UX дизайнер"
+    (r'UI/UX([а-яё])', r'UI/UX \1'),
+    # "UX/UIдизайнер" -> "UX/UI дизайнер"
+    (r'UX/UI([а-яё])', r'UX/UI \1'),
+    # "вебдизайнер" -> "веб дизайнер"
+    (r'веб([а-яё])', r'веб \1'),
+    # "графикдизайнер" -> "график дизайнер"
+    (r'график([а-яё])', r'график \1'),
+    # "продуктдизайнер" -> "продукт дизайнер"
+    (r'продукт([а-яё])', r'продукт \1'),
+]
+
+# TextNormalizer: категории правил (без учета регистра)
+NORMALIZATION_RULES = {
+    # Нормализация названий должностей
+    'job_titles': {
+        r'ui/ux\s*дизайнер': 'UI/UX дизайнер',
+        r'ui\s*дизайнер': 'UI дизайнер',
+        r'ux\s*дизайнер': 'UX дизайнер',
+        r'веб\s*дизайнер': 'Веб-дизайнер',
+        r'графический\s*дизайнер': 'Графический дизайнер',
+        r'продуктовый\s*дизайнер': 'Продуктовый дизайнер',
+        r'дизайнер\s*интерфейсов': 'Дизайнер интерфейсов',
+        r'дизайнер\s*опыта': 'Дизайнер пользовательского опыта'
+    },
+
+    # Нормализация навыков
+    'skills': {
+        r'figma': 'Figma',
+        r'sketch': 'Sketch',
+        r'adobe\s*photoshop': 'Adobe Photoshop',
+        r'adobe\s*illustrator': 'Adobe Illustrator',
+        r'adobe\s*xd': 'Adobe XD',
+        r'principle': 'Principle',
+        r'invision': 'InVision',
+        r'zeplin': 'Zeplin'
+    },
+
+    # Нормализация типов занятости
+    'employment': {
+        r'удаленн[а-я]*\s*работа': 'Удаленная работа',
+        r'офисн[а-я]*\s*работа': 'Офисная работа',
+        r'гибридн[а-я]*\s*формат': 'Гибридный формат',
+        r'полн[а-я]*\s*занятость': 'Полная занятость',
+        r'частичн[а-я]*\s*занятость': 'Частичная занятость'
+    }
+}
+
+# ---------------------------------------------------------------------------
+# Скомпилированные правила
+# ---------------------------------------------------------------------------
+
+# Правила 1-6 SPACING_RULES (и 8-е, подмножество 6-го) тремя проходами: правила
+# с одинаковыми классами левого или правого символа объединены. Совпадения
+# одного прохода не перекрываются (второй символ пары не может начать следующую),
+# а вставленный пробел не создает новых пар - результат как у шести проходов
+_PAIR_RES = [
+    re.compile(r'([а-яё])([А-ЯЁA-Z])'),                  # правила 1, 6
+    re.compile(r'([а-яёА-ЯЁ])([\d\/\-\(\)])'),         # правила 2, 4
+    re.compile(r'([\d\/\-\(\)])([а-яёА-ЯЁ])'),         # правила 3, 5
+]
+_LEGAL_FORM_RE = re.compile(SPACING_RULES[6][0])
+_SPACES_RE = re.compile(r'\s+')
+_COMPANY_RES = [(re.compile(pattern), replacement) for pattern, replacement in COMPANY_RULES]
+_FIX_RES = [(re.compile(pattern), replacement) for pattern, replacement in FIX_RULES]
+
+# Пробелы, которые изменит нормализация \s+ -> ' ' и strip()
+_DIRTY_SPACES = r'[^\S ]|  |\A | \Z'
+
+
+def _detector(patterns: Sequence[str], flags: int = 0) -> 're.Pattern':
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), flags)
+
+
+# Совпадение хотя бы одного правила clean_text + fix_common_spacing_issues
+_TEXT_DIRTY_RE = _detector(
+    [pattern.pattern for pattern in _PAIR_RES] + [SPACING_RULES[6][0], _DIRTY_SPACES]
+    + [pattern for pattern, _ in FIX_RULES]
+)
+_COMPANY_DIRTY_RE = _detector([pattern for pattern, _ in COMPANY_RULES] + [_DIRTY_SPACES])
+
+
+def _required_literals(pattern: str) -> Tuple[str, ...]:
+    """Литералы, без которых шаблон нормализации не совпадет (пусто - проверять всегда)"""
+    parts = tuple(part for part in re.split(r'\\s\*|\[[^\]]*\]\*', pattern) if part)
+    if any(re.search(r'[\\.^$*+?{}\[\]|()]', part) for part in parts):
+        return ()
+    return parts
+
+
+# IGNORECASE сопоставляет символ буквам шаблона только если его casefold() -
+# та же буква; исключения - турецкие İ и ı, совпадающие с 'i'
+_TURKISH_I = str.maketrans({'\u0130': 'i', '\u0131': 'i'})
+
+_NORMALIZATION_RES = {
+    category: [
+        (re.compile(pattern, re.IGNORECASE), replacement, _required_literals(pattern))
+        for pattern, replacement in rules.items()
+    ]
+    for category, rules in NORMALIZATION_RULES.items()
+}
+
+# Метки идемпотентности: строки, на которых правила очистки ничего не меняют
+_MARKS_LIMIT = 4096
+_clean_texts: Dict[str, None] = {}
+_clean_companies: Dict[str, None] = {}
+
+
+def _mark(marks: Dict[str, None], text: str):
+    if len(marks) >= _MARKS_LIMIT:
+        marks.clear()
+    marks[text] = None
+
+
+def _spacing(text: str) -> Tuple[str, int]:
+    """clean_text и число замен правила организационных форм"""
+    for pattern in _PAIR_RES:
+        text = pattern.sub(r'\1 \2', text)
+    text, count = _LEGAL_FORM_RE.subn(r'\1 \2', text)
+    # Правило 8 (строчная + [A-Z][a-z]) после проходов по парам совпасть не может
+    return _SPACES_RE.sub(' ', text).strip(), count
+
+
+def _fix(text: str) -> Tuple[str, int]:
+    """fix_common_spacing_issues и число замен"""
+    total = 0
+    for pattern, replacement in _FIX_RES:
+        text, count = pattern.subn(replacement, text)
+        total += count
+    return text, total
+
+
+def clean_spacing(text: str) -> str:
+    """TextCleaner.clean_text"""
+    if not text:
+        return text
+    return _spacing(text)[0]
+
+
+def fix_spacing_issues(text: str) -> str:
+    """TextCleaner.fix_common_spacing_issues"""
+    if not text:
+        return text
+    return _fix(text)[0]
+
+
+def clean_field(text: str) -> str:
+    """clean_text + fix_common_spacing_issues; чистая строка возвращается без изменений"""
+    if not text or text in _clean_texts:
+        return text
+    if not _TEXT_DIRTY_RE.search(text):
+        _mark(_clean_texts, text)
+        return text
+    cleaned, count = _spacing(text)
+    if cleaned:
+        cleaned, fixed = _fix(cleaned)
+        # После проходов по парам и пробелам эти правила не находят ничего, а
+        # вставки fix только разделяют слова. Повторная очистка может что-то
+        # изменить, только если сработали правила с контекстом (ООО..., веб...):
+        # "вебвебка" -> "веб вебка" -> "веб веб ка"
+        if not count and not fixed:
+            _mark(_clean_texts, cleaned)
+    return cleaned
+
+
+def clean_company(company_name: str) -> str:
+    """TextCleaner.format_company_name"""
+    if not company_name or company_name in _clean_companies:
+        return company_name
+    if not _COMPANY_DIRTY_RE.search(company_name):
+        _mark(_clean_companies, company_name)
+        return company_name
+    formatted = company_name
+    for pattern, replacement in _COMPANY_RES:
+        formatted = pattern.sub(replacement, formatted)
+    formatted = _SPACES_RE.sub(' ', formatted).strip()
+    if formatted and not _COMPANY_DIRTY_RE.search(formatted):
+        _mark(_clean_companies, formatted)
+    return formatted
+
+
+def _fold(text: str) -> str:
+    if '\u0130' in text or '\u0131' in text:
+        text = text.translate(_TURKISH_I)
+    return text.casefold()
+
+
+def normalize_field(text: str, categories: Sequence[str]) -> str:
+    """TextNormalizer._normalize_text: правила категорий по порядку"""
+    # Неизвестные категории пропускаются (как и прежде, в том числе посимвольно,
+    # если вместо списка категорий передана строка)
+    if not text:
+        return text
+    folded = None
+    for category in categories:
+        for pattern, replacement, literals in _NORMALIZATION_RES.get(category, ()):
+            if literals:
+                if folded is None:
+                    folded = _fold(text)
+                if not all(literal in folded for literal in literals):
+                    continue
+            text, count = pattern.subn(replacement, text)
+            if count:
+                folded = None
+    return text
+
+
+# ---------------------------------------------------------------------------
+# Эталонный файл
+# ---------------------------------------------------------------------------
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'golden', 'text_rules.json.gz')
+GOLDEN_FIELDS = ('title', 'company', 'description', 'full_description', 'requirements', 'conditions')
+
+EDGE_CASES = [
+    {'title': 'Мы в поискеUX/UI-дизайнера', 'company': 'ОООАлкионика', 'description': 'вебдизайнер'},
+    {'title': 'UI/UXдизайнер', 'company': 'ОАОГазпром', 'description': 'продуктдизайнер, графикдизайнер'},
+    {'title': 'вебвебка продуктпродукт', 'company': 'ЗАОРога и копыта', 'description': 'АОООБ ИООАО'},
+    {'title': '  ui/ux   дизайнер\tв команду\n', 'company': '  ИПИванов  ', 'description': 'нужен ui дизайнер'},
+    {'title': 'Дизайнер2D/3Dграфики', 'company': 'АО«Компания»', 'description': 'опыт от2лет(обязательно)'},
+    {'title': 'дизайнерUX дизайнерUi', 'company': 'ООО ООО', 'description': 'работа с figma, adobe photoshop'},
+    {'title': 'ux  дизайнер', 'company': '', 'description': '', 'full_description': None},
+    {'title': 'графический  дизайнер', 'requirements': 'Знание figma, sketch, adobe xd, invision, zeplin',
+     'conditions': 'удаленная работа, гибридный формат, полная занятость, частичная  занятость'},
+    {'title': 'Дизайнер опыта', 'description': 'дизайнер интерфейсов / дизайнер опыта — офисная работа'},
+    {'title': '<p>Продуктовый дизайнер</p>', 'full_description':
+        '<p><strong>Задачи:</strong></p>\n<ul>\n<li>Проектировать интерфейсы</li>\n</ul>\n'
+        '<p>Работа в Figma и Sketch, UX/UIдизайн, вебинары</p>'},
+    {'company': 'ИОООО «Тест»', 'description': 'ёЁ ёA ЁЯ 1ё ё1 (ё) ё/ё'},
+    {'title': 'Lead дизайнерPrincipleИнтерфейсов', 'description': 'Principle, PRINCIPLE, principle'},
+]
+
+
+def _golden_inputs(db_path: Optional[str], real_limit: int, synthetic: int) -> List[Dict[str, Any]]:
+    """Входные вакансии эталона: крайние случаи, реальные вакансии из БД, синтетика"""
+    inputs = [dict(case) for case in EDGE_CASES]
+    if db_path and os.path.exists(db_path):
+        with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f"SELECT {', '.join(GOLDEN_FIELDS)} FROM vacancies ORDER BY id LIMIT ?", (real_limit,)
+            ).fetchall()
+        for row in rows:
+            inputs.append({
+                field: (row[field][:1500] if isinstance(row[field], str) else row[field])
+                for field in GOLDEN_FIELDS
+            })
+    if synthetic:
+        from benchmarks import SyntheticCorpus
+        corpus = SyntheticCorpus(synthetic, seed=7, pool_size=synthetic)
+        for index in range(synthetic):
+            vacancy = corpus.make(index)
+            inputs.append({field: vacancy.get(field) for field in GOLDEN_FIELDS})
+    return inputs
+
+
+def _golden_outputs(vacancy: Dict[str, Any]) -> Dict[str, Any]:
+    """Результаты публичных функций, которыми пользуются парсеры и UnifiedParser"""
+    from text_cleaner import clean_vacancy_data, clean_text, format_company_name
+    from text_normalizer import normalize_vacancy_text
+    return {
+        'clean': clean_vacancy_data(vacancy),
+        'normalize': normalize_vacancy_text(vacancy),
+        # UnifiedParser.save_vacancy: очистка, затем нормализация (с повторной очисткой)
+        'save': normalize_vacancy_text(clean_vacancy_data(vacancy)),
+        'clean_text': {field: clean_text(vacancy[field]) for field in GOLDEN_FIELDS
+                       if isinstance(vacancy.get(field), str)},
+        'company': format_company_name(vacancy.get('company')),
+    }
+
+
+def update_golden(path: str = GOLDEN_PATH, db_path: Optional[str] = None,
+                  real_limit: int = 40, synthetic: int = 60) -> int:
+    cases = [{'input': vacancy, **_golden_outputs(vacancy)}
+             for vacancy in _golden_inputs(db_path, real_limit, synthetic)]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump({'version': 1, 'cases': cases}, f, ensure_ascii=False, indent=0, sort_keys=True)
+    return len(cases)
+
+
+def check_golden(path: str = GOLDEN_PATH) -> List[str]:
+    """Расхождения с эталоном: ['<номер случая>.<результат>', ...]"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        cases = json.load(f)['cases']
+    mismatches = []
+    for index, case in enumerate(cases):
+        # Дважды: второй прогон идет по строкам с метками идемпотентности
+        for _ in range(2):
+            actual = _golden_outputs(case['input'])
+            for name, value in actual.items():
+                if value != case[name]:
+                    mismatches.append(f"{index}.{name}")
+    return sorted(set(mismatches))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Эталонная проверка правил очистки и нормализации')
+    parser.add_argument('--check', action='store_true', help='Сверить с эталоном (по умолчанию)')
+    parser.add_argument('--update-golden', action='store_true', help='Пересоздать эталон текущими правилами')
+    parser.add_argument('--golden', default=GOLDEN_PATH, help='Путь к эталонному файлу')
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'vacancies.db'),
+                        help='БД с реальными вакансиями для эталона')
+    args = parser.parse_args()
+
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.update_golden:
+        count = update_golden(args.golden, args.db)
+        print(f"Эталон обновлен: {count} случаев -> {args.golden}")
+        return 0
+
+    mismatches = check_golden(args.golden)
+    if mismatches:
+        print(f"❌ Расхождения с эталоном: {', '.join(mismatches[:20])}")
+        return 1
+    print("✅ Результаты совпадают с эталоном")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
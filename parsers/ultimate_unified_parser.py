@@ -7,7 +7,6 @@ import argparse
 import json
 import time
 from datetime import datetime
-from pathlib import Path
 from typing import List, Dict, Any, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -17,6 +16,8 @@ try:
     from vacancy_filter import VacancyFilter
     from caching_system import CachingSystem, CachedParser
     from monitoring_system import MonitoringSystem, MonitoredParser
+    from circuit_breaker import guarded_parse
+    from vacancy_schema import ensure_schema
     
     # Опциональный импорт Playwright
     try:
@@ -34,6 +35,8 @@ except ImportError:
     from vacancy_filter import VacancyFilter
     from caching_system import CachingSystem, CachedParser
     from monitoring_system import MonitoringSystem, MonitoredParser
+    from circuit_breaker import guarded_parse
+    from vacancy_schema import ensure_schema
     
     # Опциональный импорт Playwright
     try:
@@ -115,115 +118,9 @@ class UltimateUnifiedParser(CachedParser, MonitoredParser):
             raise
     
     def init_database(self):
-        """Инициализация базы данных с расширенной схемой"""
+        """Инициализация базы данных с расширенной схемой (миграции vacancy_schema)"""
         try:
-            db_dir = Path(self.db_path).parent
-            db_dir.mkdir(parents=True, exist_ok=True)
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Основная таблица вакансий (расширенная)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS vacancies (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    external_id TEXT,
-                    source TEXT NOT NULL,
-                    url TEXT UNIQUE NOT NULL,
-                    title TEXT NOT NULL,
-                    company TEXT,
-                    location TEXT,
-                    description TEXT,
-                    salary_min INTEGER,
-                    salary_max INTEGER,
-                    salary_currency TEXT,
-                    published_at DATETIME,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    ai_specialization TEXT,
-                    ai_employment TEXT,
-                    ai_experience TEXT,
-                    ai_technologies TEXT,
-                    ai_salary_min INTEGER,
-                    ai_salary_max INTEGER,
-                    ai_remote TEXT,
-                    ai_relevance_score REAL,
-                    ai_summary TEXT,
-                    is_approved BOOLEAN DEFAULT 0,
-                    is_rejected BOOLEAN DEFAULT 0,
-                    moderation_notes TEXT,
-                    moderated_at DATETIME,
-                    moderated_by TEXT,
-                    full_description TEXT,
-                    requirements TEXT,
-                    tasks TEXT,
-                    benefits TEXT,
-                    conditions TEXT,
-                    company_logo TEXT,
-                    company_url TEXT,
-                    employment_type TEXT,
-                    experience_level TEXT,
-                    remote_type TEXT,
-                    
-                    -- Новые поля для аналитики
-                    parser_used TEXT,
-                    parse_time REAL,
-                    quality_score REAL,
-                    cache_hit BOOLEAN DEFAULT FALSE,
-                    retry_count INTEGER DEFAULT 0
-                )
-            """)
-            
-            # Таблица производительности парсеров
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS parser_performance (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    source TEXT NOT NULL,
-                    query TEXT,
-                    page INTEGER,
-                    response_time REAL,
-                    items_found INTEGER,
-                    success_rate REAL,
-                    cache_hit_rate REAL,
-                    error_count INTEGER DEFAULT 0
-                )
-            """)
-            
-            # Добавляем новые колонки если их нет (для обратной совместимости)
-            try:
-                cursor.execute("ALTER TABLE vacancies ADD COLUMN parser_used TEXT")
-            except sqlite3.OperationalError:
-                pass  # Колонка уже существует
-            
-            try:
-                cursor.execute("ALTER TABLE vacancies ADD COLUMN parse_time REAL")
-            except sqlite3.OperationalError:
-                pass
-                
-            try:
-                cursor.execute("ALTER TABLE vacancies ADD COLUMN quality_score REAL")
-            except sqlite3.OperationalError:
-                pass
-                
-            try:
-                cursor.execute("ALTER TABLE vacancies ADD COLUMN cache_hit BOOLEAN DEFAULT FALSE")
-            except sqlite3.OperationalError:
-                pass
-                
-            try:
-                cursor.execute("ALTER TABLE vacancies ADD COLUMN retry_count INTEGER DEFAULT 0")
-            except sqlite3.OperationalError:
-                pass
-            
-            # Создаем индексы
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_source ON vacancies(source)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON vacancies(created_at)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_quality_score ON vacancies(quality_score)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_parser_performance ON parser_performance(timestamp, source)")
-            
-            conn.commit()
-            conn.close()
+            ensure_schema(self.db_path)
             
             self.logger.info(f"Database initialized: {self.db_path}")
             
@@ -232,7 +129,18 @@ class UltimateUnifiedParser(CachedParser, MonitoredParser):
             raise
     
     async def parse_source_with_fallback(self, source: str, query: str, pages: int, extract_details: bool = True) -> List[Dict[str, Any]]:
-        """Парсинг источника с fallback на другие парсеры"""
+        """Парсинг источника с fallback на другие парсеры (через circuit breaker)"""
+        # Метрики пишет сама цепочка парсеров (MonitoredParser), breaker только решает, запускать ли ее
+        return await guarded_parse(
+            source,
+            lambda pages, extract_details: self._parse_with_parser_chain(source, query, pages, extract_details),
+            pages,
+            extract_details,
+            update_monitor=False
+        )
+    
+    async def _parse_with_parser_chain(self, source: str, query: str, pages: int, extract_details: bool) -> List[Dict[str, Any]]:
+        """Перебор парсеров источника, пока один не отработает"""
         
         # Определяем приоритет парсеров для источника
         if source == 'hh':
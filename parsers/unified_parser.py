@@ -11,12 +11,13 @@
 import os
 import sys
 import time
+import asyncio
 import json
 import sqlite3
 import logging
 import argparse
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Set
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Исправление совместимости с Python 3.13
@@ -54,6 +55,12 @@ except Exception as e:
 # Импортируем фильтр вакансий
 from vacancy_filter import filter_vacancy
 
+# Каноническая схема БД
+from vacancy_schema import ensure_schema
+
+# Разбор строк зарплат в salary_min / salary_max / salary_currency
+from salary_grammar import parse_salary
+
 # Импортируем очистку данных
 try:
     from text_cleaner import clean_vacancy_data
@@ -70,17 +77,24 @@ except ImportError:
 
 # Импортируем наши парсеры
 try:
-    from hh_parser import HHParser
+    from hh_api_parser import HHApiParser
     from hirehi_parser import HireHiParser
     from habr_parser import HabrParser
     from getmatch_parser import GetMatchParser
     from geekjob_simple import GeekjobParser
+    from circuit_breaker import guarded_parse
+    from crawl_watermarks import deferred_watermarks
+    import http_fixtures
 except ImportError as e:
     print(f"Ошибка импорта парсеров: {e}")
     print("Убедитесь, что все файлы парсеров находятся в той же директории")
     sys.exit(1)
 
 
+# Заглушка парсеров, когда страницу вакансии получить не удалось
+MISSING_DESCRIPTION = 'Описание не найдено'
+
+
 class VacancyDatabase:
     """Класс для работы с SQLite базой данных вакансий"""
     
@@ -89,45 +103,11 @@ class VacancyDatabase:
         self.init_database()
     
     def init_database(self):
-        """Инициализация базы данных и создание таблиц"""
+        """Инициализация базы данных: миграции до канонической схемы"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS vacancies (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        external_id TEXT UNIQUE NOT NULL,
-                        source TEXT NOT NULL,
-                        url TEXT NOT NULL,
-                        title TEXT NOT NULL,
-                        company TEXT,
-                        salary TEXT,
-                        location TEXT,
-                        description TEXT,
-                        full_description TEXT,
-                        requirements TEXT,
-                        tasks TEXT,
-                        benefits TEXT,
-                        conditions TEXT,
-                        employment_type TEXT,
-                        experience_level TEXT,
-                        remote_type TEXT,
-                        company_logo TEXT,
-                        company_url TEXT,
-                        published_at DATETIME,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_external_id ON vacancies(external_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_source ON vacancies(source)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON vacancies(created_at)")
-                
-                conn.commit()
-                logging.info(f"База данных инициализирована: {self.db_path}")
-                
+            ensure_schema(self.db_path)
+            logging.info(f"База данных инициализирована: {self.db_path}")
+            
         except sqlite3.Error as e:
             logging.error(f"Ошибка инициализации базы данных: {e}")
             raise
@@ -135,87 +115,122 @@ class VacancyDatabase:
     def save_vacancy(self, vacancy_data: Dict[str, Any]) -> bool:
         """Сохранение вакансии в базу данных с фильтрацией"""
         try:
-            # Очищаем и форматируем данные вакансии
-            vacancy_data = clean_vacancy_data(vacancy_data)
-            
-            # Нормализуем текст вакансии
-            vacancy_data = normalize_vacancy_text(vacancy_data)
+            return self.store_vacancy(vacancy_data) == 'saved'
+        except sqlite3.Error as e:
+            logging.error(f"Ошибка сохранения вакансии: {e}")
+            return False
+    
+    def store_vacancy(self, vacancy_data: Dict[str, Any]) -> str:
+        """
+        Сохранение вакансии с исходом: 'saved', 'filtered' или 'exists'
+        
+        Ошибки БД (sqlite3.Error) пробрасываются вызывающему.
+        """
+        # Очищаем и форматируем данные вакансии
+        vacancy_data = clean_vacancy_data(vacancy_data)
+        
+        # Нормализуем текст вакансии
+        vacancy_data = normalize_vacancy_text(vacancy_data)
+        
+        # Проверяем релевантность вакансии
+        is_relevant, reason = filter_vacancy(vacancy_data)
+        
+        if not is_relevant:
+            logging.info(f"🚫 Вакансия отфильтрована: {vacancy_data.get('title', 'Без названия')} - {reason}")
+            return 'filtered'
+        
+        logging.info(f"✅ Вакансия сохранена: {vacancy_data.get('title', 'Без названия')}")
+        
+        salary = parse_salary(vacancy_data.get('salary'))
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
             
-            # Проверяем релевантность вакансии
-            is_relevant, reason = filter_vacancy(vacancy_data)
+            cursor.execute(
+                "SELECT id FROM vacancies WHERE external_id = ?",
+                (vacancy_data['external_id'],)
+            )
             
-            if not is_relevant:
-                logging.info(f"🚫 Вакансия отфильтрована: {vacancy_data.get('title', 'Без названия')} - {reason}")
-                return False
+            if cursor.fetchone():
+                logging.debug(f"Вакансия уже существует: {vacancy_data['external_id']}")
+                return 'exists'
             
-            logging.info(f"✅ Вакансия сохранена: {vacancy_data.get('title', 'Без названия')}")
+            # Уникальный индекс по external_id: параллельный воркер мог вставить
+            # ту же вакансию между SELECT и INSERT
+            try:
+                self._insert_vacancy(cursor, vacancy_data, salary)
+            except sqlite3.IntegrityError:
+                logging.debug(f"Вакансия уже существует: {vacancy_data['external_id']}")
+                return 'exists'
             
+            conn.commit()
+            logging.info(f"Сохранена вакансия: {vacancy_data['title']} - {vacancy_data.get('company', 'N/A')}")
+            return 'saved'
+    
+    @staticmethod
+    def _insert_vacancy(cursor: sqlite3.Cursor, vacancy_data: Dict[str, Any], salary) -> None:
+        """INSERT вакансии; sqlite3.IntegrityError - такой external_id уже есть"""
+        cursor.execute("""
+            INSERT INTO vacancies (
+                external_id, source, url, title, company, location,
+                description, salary, salary_min, salary_max, salary_currency, published_at,
+                ai_specialization, ai_employment, ai_experience, ai_technologies,
+                ai_salary_min, ai_salary_max, ai_remote, ai_relevance_score, ai_summary,
+                is_approved, is_rejected, moderation_notes, moderated_by,
+                full_description, requirements, tasks, benefits, conditions,
+                company_logo, company_url, employment_type, experience_level, remote_type
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            vacancy_data['external_id'],
+            vacancy_data.get('source', ''),
+            vacancy_data['url'],
+            vacancy_data['title'],
+            vacancy_data.get('company', ''),
+            vacancy_data.get('location', ''),
+            vacancy_data.get('description', ''),
+            vacancy_data.get('salary') or None,
+            salary.min,
+            salary.max,
+            salary.currency,  # NULL, если валюта не распознана
+            vacancy_data.get('published_at'),
+            'design',  # ai_specialization
+            '[]',      # ai_employment
+            'junior',  # ai_experience
+            '[]',      # ai_technologies
+            None,      # ai_salary_min
+            None,      # ai_salary_max
+            False,     # ai_remote
+            0.8,       # ai_relevance_score
+            'Дизайнерская вакансия',  # ai_summary
+            False,     # is_approved
+            False,     # is_rejected
+            '',        # moderation_notes
+            '',        # moderated_by
+            vacancy_data.get('full_description', ''),
+            vacancy_data.get('requirements', ''),
+            vacancy_data.get('tasks', ''),
+            vacancy_data.get('benefits', ''),
+            vacancy_data.get('conditions', ''),
+            vacancy_data.get('company_logo', ''),
+            vacancy_data.get('company_url', ''),
+            vacancy_data.get('employment_type', ''),
+            vacancy_data.get('experience_level', ''),
+            vacancy_data.get('remote_type', '')
+        ))
+    
+    def record_query_matches(self, vacancy_data: Dict[str, Any]) -> None:
+        """Сохранение запросов, которые нашли вакансию (matched_queries)"""
+        queries = vacancy_data.get('matched_queries') or []
+        if not queries:
+            return
+        try:
             with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute(
-                    "SELECT id FROM vacancies WHERE external_id = ?",
-                    (vacancy_data['external_id'],)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO vacancy_queries (external_id, query) VALUES (?, ?)",
+                    [(vacancy_data['external_id'], query) for query in queries]
                 )
-                
-                if cursor.fetchone():
-                    logging.debug(f"Вакансия уже существует: {vacancy_data['external_id']}")
-                    return False
-                
-                cursor.execute("""
-                    INSERT INTO vacancies (
-                        external_id, source, url, title, company, location,
-                        description, salary_min, salary_max, salary_currency, published_at,
-                        ai_specialization, ai_employment, ai_experience, ai_technologies,
-                        ai_salary_min, ai_salary_max, ai_remote, ai_relevance_score, ai_summary,
-                        is_approved, is_rejected, moderation_notes, moderated_by,
-                        full_description, requirements, tasks, benefits, conditions,
-                        company_logo, company_url, employment_type, experience_level, remote_type
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    vacancy_data['external_id'],
-                    vacancy_data.get('source', ''),
-                    vacancy_data['url'],
-                    vacancy_data['title'],
-                    vacancy_data.get('company', ''),
-                    vacancy_data.get('location', ''),
-                    vacancy_data.get('description', ''),
-                    None,      # salary_min
-                    None,      # salary_max
-                    'RUB',     # salary_currency
-                    vacancy_data.get('published_at'),
-                    'design',  # ai_specialization
-                    '[]',      # ai_employment
-                    'junior',  # ai_experience
-                    '[]',      # ai_technologies
-                    None,      # ai_salary_min
-                    None,      # ai_salary_max
-                    False,     # ai_remote
-                    0.8,       # ai_relevance_score
-                    'Дизайнерская вакансия',  # ai_summary
-                    False,     # is_approved
-                    False,     # is_rejected
-                    '',        # moderation_notes
-                    '',        # moderated_by
-                    vacancy_data.get('full_description', ''),
-                    vacancy_data.get('requirements', ''),
-                    vacancy_data.get('tasks', ''),
-                    vacancy_data.get('benefits', ''),
-                    vacancy_data.get('conditions', ''),
-                    vacancy_data.get('company_logo', ''),
-                    vacancy_data.get('company_url', ''),
-                    vacancy_data.get('employment_type', ''),
-                    vacancy_data.get('experience_level', ''),
-                    vacancy_data.get('remote_type', '')
-                ))
-                
-                conn.commit()
-                logging.info(f"Сохранена вакансия: {vacancy_data['title']} - {vacancy_data.get('company', 'N/A')}")
-                return True
-                
         except sqlite3.Error as e:
-            logging.error(f"Ошибка сохранения вакансии: {e}")
-            return False
+            logging.error(f"Ошибка сохранения запросов вакансии: {e}")
     
     def get_statistics(self) -> Dict[str, Any]:
         """Получение статистики по базе данных"""
@@ -261,33 +276,50 @@ class UnifiedParser:
         
         # Инициализируем парсеры
         self.parsers = {
-            'hh': HHParser(delay=delay),
+            'hh': HHApiParser(delay=delay),  # JSON API вместо HTML выдачи
             'hirehi': HireHiParser(delay=delay),
             'habr': HabrParser(delay=delay),
             'getmatch': GetMatchParser(delay=delay),
             'geekjob': GeekjobParser(delay=delay)
         }
+        
+        # Инкрементальные проходы, чьи водяные знаки фиксируются только после
+        # сохранения (save_all_vacancies), и вакансии, детали которых не получены
+        self._pending_watermarks: Dict[str, List[Any]] = {}
+        self._failed_details: Set[str] = set()
     
-    async def parse_source(self, source_name: str, parser, query: str, pages: int, extract_details: bool) -> List[Dict[str, Any]]:
+    async def parse_source(self, source_name: str, parser, query: str, pages: int, extract_details: bool,
+                           incremental: bool = False) -> List[Dict[str, Any]]:
         """Парсинг одного источника"""
         try:
             logging.info(f"Запуск парсинга {source_name}")
             start_time = time.time()
             
-            # Проверяем, является ли метод async
-            if hasattr(parser.parse_vacancies, '__code__') and 'async' in str(parser.parse_vacancies.__code__.co_flags):
-                vacancies = await parser.parse_vacancies(
-                    query=query,
-                    pages=pages,
-                    extract_details=extract_details
-                )
-            else:
-                vacancies = parser.parse_vacancies(
+            # Инкрементальный режим: только новые вакансии по водяным знакам
+            options = {'incremental': True} if incremental else {}
+            
+            async def run(pages: int, extract_details: bool) -> List[Dict[str, Any]]:
+                # Проверяем, является ли метод async
+                if asyncio.iscoroutinefunction(parser.parse_vacancies):
+                    return await parser.parse_vacancies(
+                        query=query,
+                        pages=pages,
+                        extract_details=extract_details,
+                        **options
+                    )
+                return parser.parse_vacancies(
                     query=query,
                     pages=pages,
-                    extract_details=extract_details
+                    extract_details=extract_details,
+                    **options
                 )
             
+            # Открытые (недоступные) источники пропускаются сразу; водяные знаки
+            # фиксирует save_all_vacancies только для обработанных вакансий
+            with deferred_watermarks() as crawls:
+                vacancies = await guarded_parse(source_name, run, pages, extract_details)
+            self._pending_watermarks.setdefault(source_name, []).extend(crawls)
+            
             end_time = time.time()
             duration = end_time - start_time
             
@@ -298,20 +330,72 @@ class UnifiedParser:
             logging.error(f"Ошибка парсинга {source_name}: {e}")
             return []
     
+    async def parse_source_batch(self, source_name: str, parser, queries: List[str], pages: int,
+                                 extract_details: bool, incremental: bool = False) -> List[Dict[str, Any]]:
+        """
+        Пакетный парсинг источника по нескольким запросам.
+        
+        Сначала собираются карточки по всем запросам без деталей, дубли по
+        external_id объединяются, и только затем детали запрашиваются по
+        одному разу на уникальную вакансию. В matched_queries - запросы,
+        которые нашли вакансию.
+        """
+        import asyncio
+        
+        cards: Dict[str, Dict[str, Any]] = {}
+        total_cards = 0
+        
+        for query in queries:
+            vacancies = await self.parse_source(source_name, parser, query, pages, False, incremental)
+            total_cards += len(vacancies)
+            
+            for vacancy in vacancies:
+                card = cards.setdefault(vacancy['external_id'], vacancy)
+                matched = card.setdefault('matched_queries', [])
+                if query not in matched:
+                    matched.append(query)
+        
+        logging.info(f"{source_name}: {total_cards} карточек по {len(queries)} запросам, уникальных {len(cards)}")
+        
+        extract = getattr(parser, 'extract_full_vacancy_details', None)
+        if extract_details and extract:
+            for card in cards.values():
+                try:
+                    details = extract(card['url'])
+                    if asyncio.iscoroutine(details):
+                        details = await details
+                    card.update(details)
+                except Exception as e:
+                    logging.error(f"Ошибка извлечения деталей {card['url']}: {e}")
+                    self._failed_details.add(str(card['external_id']))
+        
+        return list(cards.values())
+    
     async def parse_all_sources(self, 
                          query: str = 'дизайнер', 
                          pages_per_source: int = 3, 
                          extract_details: bool = True,
                          sources: Optional[List[str]] = None,
-                         parallel: bool = True) -> Dict[str, List[Dict[str, Any]]]:
-        """Парсинг всех источников"""
+                         parallel: bool = True,
+                         incremental: bool = False,
+                         queries: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Парсинг всех источников (queries - пакетный режим по нескольким запросам)"""
         
         if sources is None:
             sources = list(self.parsers.keys())
         
+        def source_task(source_name: str, parser):
+            if queries:
+                return self.parse_source_batch(
+                    source_name, parser, queries, pages_per_source, extract_details, incremental
+                )
+            return self.parse_source(
+                source_name, parser, query, pages_per_source, extract_details, incremental
+            )
+        
         logging.info(f"Начинаем парсинг всех источников")
         logging.info(f"Источники: {', '.join(sources)}")
-        logging.info(f"Запрос: '{query}', страниц на источник: {pages_per_source}")
+        logging.info(f"Запрос: '{', '.join(queries) if queries else query}', страниц на источник: {pages_per_source}")
         logging.info(f"Извлечение деталей: {extract_details}, параллельно: {parallel}")
         
         results = {}
@@ -324,9 +408,7 @@ class UnifiedParser:
             for source_name in sources:
                 if source_name in self.parsers:
                     parser = self.parsers[source_name]
-                    task = self.parse_source(
-                        source_name, parser, query, pages_per_source, extract_details
-                    )
+                    task = source_task(source_name, parser)
                     tasks.append((source_name, task))
             
             # Выполняем все задачи параллельно
@@ -342,13 +424,12 @@ class UnifiedParser:
             for source_name in sources:
                 if source_name in self.parsers:
                     parser = self.parsers[source_name]
-                    vacancies = await self.parse_source(
-                        source_name, parser, query, pages_per_source, extract_details
-                    )
+                    vacancies = await source_task(source_name, parser)
                     results[source_name] = vacancies
                     
-                    # Пауза между источниками
-                    time.sleep(self.delay)
+                    # Пауза между источниками (при воспроизведении фикстур не нужна)
+                    if not http_fixtures.replaying():
+                        time.sleep(self.delay)
         
         return results
     
@@ -361,9 +442,31 @@ class UnifiedParser:
             filtered_count = 0
             error_count = 0
             
+            processed = set()
+            crawls = self._pending_watermarks.pop(source_name, [])
+            failed = {str(v.get('external_id')) for v in vacancies
+                      if str(v.get('external_id')) in self._failed_details
+                      or v.get('full_description') == MISSING_DESCRIPTION}
+            # После max_detail_attempts неудач вакансия сохраняется без деталей
+            given_up = crawls[0].store.record_detail_failures(source_name, failed) if crawls else set()
+            
             for vacancy in vacancies:
+                external_id = str(vacancy.get('external_id'))
+                details_failed = external_id in failed and external_id not in given_up
+                if crawls and details_failed:
+                    # Инкрементальный прогон: без деталей не сохраняем - вакансия
+                    # останется новой и будет получена целиком в следующий раз
+                    logging.info(f"⏭️ {external_id}: детали не получены, отложено до следующего прогона")
+                    continue
+                if external_id in given_up:
+                    logging.warning(f"⚠️ {external_id}: детали не получены за "
+                                    f"{crawls[0].store.max_detail_attempts} прогона, сохранено без них")
+                
                 try:
-                    if self.db.save_vacancy(vacancy):
+                    # Запросы записываются и для уже сохраненных ранее вакансий
+                    self.db.record_query_matches(vacancy)
+                    
+                    if self.db.store_vacancy(vacancy) == 'saved':
                         saved_count += 1
                     else:
                         # Вакансия была отфильтрована или уже существует
@@ -371,6 +474,17 @@ class UnifiedParser:
                 except Exception as e:
                     logging.error(f"Ошибка сохранения вакансии из {source_name}: {e}")
                     error_count += 1
+                    continue
+                
+                if not details_failed:
+                    processed.add(external_id)
+            
+            # Вакансии без деталей или с ошибкой сохранения остаются новыми для следующего прогона
+            for crawl in crawls:
+                crawl.commit(processed)
+            if crawls:
+                crawls[0].store.clear_detail_failures(source_name, processed)
+            self._failed_details.difference_update(str(v.get('external_id')) for v in vacancies)
             
             detailed_stats[source_name] = {
                 'found': len(vacancies),
@@ -415,6 +529,8 @@ def main():
     
     parser.add_argument('--db', default='database.db', help='Путь к базе данных')
     parser.add_argument('--query', default='дизайнер', help='Поисковый запрос')
+    parser.add_argument('--queries', nargs='+',
+                        help='Пакетный режим: несколько запросов, общие карточки и детали без повторов')
     parser.add_argument('--pages', type=int, default=3, help='Количество страниц на источник')
     parser.add_argument('--delay', type=float, default=1.0, help='Задержка между запросами')
     parser.add_argument('--sources', nargs='+', 
@@ -423,10 +539,17 @@ def main():
     parser.add_argument('--no-details', action='store_true', help='Не извлекать полные детали')
     parser.add_argument('--extract-details', action='store_true', help='Извлекать полные детали (по умолчанию)')
     parser.add_argument('--no-parallel', action='store_true', help='Последовательный парсинг')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Только новые вакансии: остановка на известных, пропуск неизменившихся источников')
     parser.add_argument('--export', choices=['json'], help='Экспорт результатов')
     parser.add_argument('--verbose', action='store_true', help='Подробный вывод')
     parser.add_argument('--quiet', action='store_true', help='Минимальный вывод')
     
+    parser.add_argument('--fixtures', metavar='MODE:DIR',
+                        help='HTTP фикстуры: record:DIR - запись ответов, replay:DIR - работа без сети')
+    parser.add_argument('--fixtures-latency', default='',
+                        help='Задержка при replay: секунды или recorded[*k] (записанная)')
+    
     args = parser.parse_args()
     
     # Настройка логирования
@@ -440,6 +563,9 @@ def main():
         ]
     )
     
+    if args.fixtures:
+        http_fixtures.activate_spec(args.fixtures, args.fixtures_latency)
+    
     try:
         # Создаём единый парсер
         unified_parser = UnifiedParser(db_path=args.db, delay=args.delay)
@@ -451,7 +577,9 @@ def main():
             pages_per_source=args.pages,
             extract_details=args.extract_details or not args.no_details,
             sources=args.sources,
-            parallel=not args.no_parallel
+            parallel=not args.no_parallel,
+            incremental=args.incremental,
+            queries=args.queries
         ))
         
         # Сохраняем результаты
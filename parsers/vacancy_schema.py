@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Каноническая схема БД вакансий с версионными миграциями
+
+Все парсеры (UnifiedParser, SimpleUnifiedParser, EnhancedUnifiedParser,
+UltimateUnifiedParser, geekjob) создают и обновляют таблицу vacancies только
+через ensure_schema(). Версия схемы хранится в PRAGMA user_version; каждая
+миграция выполняется один раз, в своей транзакции BEGIN IMMEDIATE, так что
+несколько процессов могут стартовать одновременно. Миграции идемпотентны и
+доводят до канонической схемы и старые БД: недостающие колонки добавляются,
+существующие данные и ограничения не трогаются. Полнотекстовый индекс
+vacancies_fts (миграция 3) пополняет vacancy_search.sync_search_index.
+Миграция 4 оставляет одну строку на external_id (последнюю вставленную) и
+создает уникальный индекс: на нем держатся INSERT OR REPLACE админки
+(src/lib/database/sqlite-service.ts) и параллельные воркеры work_queue,
+которым одной проверки SELECT перед INSERT недостаточно.
+
+Индексы подобраны под реальные запросы парсеров и админки (HOT_QUERIES);
+проверка планов падает, если горячий запрос читает таблицу целиком или
+сортирует во временном B-дереве:
+    python vacancy_schema.py migrate --db data/vacancies.db
+    python vacancy_schema.py status --db data/vacancies.db
+    python vacancy_schema.py check-plans [--db data/vacancies.db]
+    python vacancy_schema.py check
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import os
+import re
+import sys
+import sqlite3
+import logging
+import argparse
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Колонки vacancies в каноническом порядке (объединение схем всех парсеров)
+VACANCY_COLUMNS: List[Tuple[str, str]] = [
+    ('id', 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    ('external_id', 'TEXT'),
+    ('source', 'TEXT NOT NULL'),
+    ('url', 'TEXT NOT NULL'),
+    ('title', 'TEXT NOT NULL'),
+    ('company', "TEXT DEFAULT ''"),
+    ('salary', 'TEXT'),
+    ('location', "TEXT DEFAULT ''"),
+    ('description', "TEXT DEFAULT ''"),
+    ('salary_min', 'INTEGER'),
+    ('salary_max', 'INTEGER'),
+    ('salary_currency', "TEXT DEFAULT 'RUB'"),
+    ('published_at', 'DATETIME'),
+    ('created_at', 'DATETIME DEFAULT CURRENT_TIMESTAMP'),
+    ('updated_at', 'DATETIME DEFAULT CURRENT_TIMESTAMP'),
+    ('ai_specialization', "TEXT DEFAULT 'other'"),
+    ('ai_employment', "TEXT DEFAULT '[]'"),
+    ('ai_experience', "TEXT DEFAULT 'junior'"),
+    ('ai_technologies', "TEXT DEFAULT '[]'"),
+    ('ai_salary_min', 'INTEGER'),
+    ('ai_salary_max', 'INTEGER'),
+    ('ai_remote', 'BOOLEAN DEFAULT 0'),
+    ('ai_relevance_score', 'REAL DEFAULT 0'),
+    ('ai_summary', "TEXT DEFAULT ''"),
+    ('is_approved', 'BOOLEAN DEFAULT 0'),
+    ('is_rejected', 'BOOLEAN DEFAULT 0'),
+    ('moderation_notes', "TEXT DEFAULT ''"),
+    ('moderated_at', 'DATETIME'),
+    ('moderated_by', "TEXT DEFAULT ''"),
+    ('full_description', "TEXT DEFAULT ''"),
+    ('edited_description', "TEXT DEFAULT ''"),
+    ('requirements', "TEXT DEFAULT ''"),
+    ('tasks', "TEXT DEFAULT ''"),
+    ('benefits', "TEXT DEFAULT ''"),
+    ('conditions', "TEXT DEFAULT ''"),
+    ('company_logo', "TEXT DEFAULT ''"),
+    ('company_url', "TEXT DEFAULT ''"),
+    ('employment_type', "TEXT DEFAULT ''"),
+    ('experience_level', "TEXT DEFAULT ''"),
+    ('remote_type', "TEXT DEFAULT ''"),
+    # Дедупликация админки
+    ('title_hash', 'TEXT'),
+    ('company_hash', 'TEXT'),
+    ('url_hash', 'TEXT'),
+    # Статус geekjob
+    ('status', "TEXT DEFAULT 'pending'"),
+    # Метаданные парсинга
+    ('parser_used', 'TEXT'),
+    ('parse_time', 'REAL'),
+    ('quality_score', 'REAL'),
+    ('cache_hit', 'BOOLEAN DEFAULT 0'),
+    ('retry_count', 'INTEGER DEFAULT 0'),
+]
+
+AUXILIARY_TABLES = {
+    # Какие поисковые запросы нашли вакансию (пакетный режим UnifiedParser)
+    'vacancy_queries': """
+        CREATE TABLE IF NOT EXISTS vacancy_queries (
+            external_id TEXT NOT NULL,
+            query TEXT NOT NULL,
+            matched_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (external_id, query)
+        )
+    """,
+    # Производительность парсеров (UltimateUnifiedParser)
+    'parser_performance': """
+        CREATE TABLE IF NOT EXISTS parser_performance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            source TEXT NOT NULL,
+            query TEXT,
+            page INTEGER,
+            response_time REAL,
+            items_found INTEGER,
+            success_rate REAL,
+            cache_hit_rate REAL,
+            error_count INTEGER DEFAULT 0
+        )
+    """,
+}
+
+# Индексы: имя -> (таблица, колонки); под какие запросы - см. HOT_QUERIES
+VACANCY_INDEXES: Dict[str, Tuple[str, str]] = {
+    # Дедупликация EnhancedUnifiedParser / UltimateUnifiedParser: url = ?
+    'idx_url': ('vacancies', 'url'),
+    # Статистика и удаление по источнику
+    'idx_source': ('vacancies', 'source, created_at'),
+    # "За последние сутки"
+    'idx_created_at': ('vacancies', 'created_at'),
+    # Очередь модерации: is_approved = 0 AND is_rejected = 0 ORDER BY created_at DESC
+    'idx_moderation': ('vacancies', 'is_approved, is_rejected, created_at'),
+    # Лента одобренных: is_approved = 1 ORDER BY ai_relevance_score DESC, published_at DESC
+    'idx_approved_ranking': ('vacancies', 'is_approved, ai_relevance_score, published_at'),
+    # Фильтр по диапазону зарплат (salary_grammar.py backfill)
+    'idx_salary_range': ('vacancies', 'salary_min, salary_max'),
+    'idx_parser_performance': ('parser_performance', 'timestamp, source'),
+}
+
+# Уникальные индексы (миграция 4): имя -> (таблица, колонки)
+UNIQUE_INDEXES: Dict[str, Tuple[str, str]] = {
+    # Дедупликация парсеров (external_id = ? [AND source = ?]) и INSERT OR REPLACE админки
+    'idx_external_id_unique': ('vacancies', 'external_id'),
+}
+
+# Индексы прежних схем: idx_external_id и idx_external_id_source покрываются
+# idx_external_id_unique, по quality_score запросов нет (индекс только замедлял вставку)
+REDUNDANT_INDEXES = ['idx_external_id', 'idx_quality_score', 'idx_external_id_source']
+
+
+def _column_names(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _migration_columns(conn: sqlite3.Connection):
+    """Таблица vacancies в канонической схеме, вспомогательные таблицы"""
+    columns = ',\n'.join(f"    {name} {ddl}" for name, ddl in VACANCY_COLUMNS)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS vacancies (\n{columns}\n)")
+
+    existing = set(_column_names(conn, 'vacancies'))
+    added = []
+    for name, ddl in VACANCY_COLUMNS:
+        if name in existing:
+            continue
+        # ALTER TABLE не принимает NOT NULL без значения по умолчанию и
+        # непостоянные значения по умолчанию (CURRENT_TIMESTAMP)
+        ddl = ddl.replace(' NOT NULL', '').replace(' DEFAULT CURRENT_TIMESTAMP', '')
+        conn.execute(f"ALTER TABLE vacancies ADD COLUMN {name} {ddl}")
+        added.append(name)
+    if added:
+        logger.info(f"Добавлены колонки vacancies: {', '.join(added)}")
+
+    for ddl in AUXILIARY_TABLES.values():
+        conn.execute(ddl)
+
+
+def _migration_indexes(conn: sqlite3.Connection):
+    """Составные индексы под запросы парсеров и админки"""
+    for name in REDUNDANT_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    for name, (table, columns) in VACANCY_INDEXES.items():
+        existing = [row[2] for row in conn.execute(f"PRAGMA index_info({name})")]
+        if existing and existing != [column.strip() for column in columns.split(',')]:
+            # Одноименный индекс прежней схемы с другими колонками
+            conn.execute(f"DROP INDEX {name}")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})")
+
+
+# Решение модератора по вакансии: при слиянии дубликатов переносится целиком
+MODERATION_COLUMNS = ['is_approved', 'is_rejected', 'moderation_notes', 'moderated_at',
+                      'moderated_by', 'edited_description']
+_MODERATED = ("(COALESCE({t}.is_approved, 0) != 0 OR COALESCE({t}.is_rejected, 0) != 0 "
+              "OR {t}.moderated_at IS NOT NULL OR COALESCE({t}.moderated_by, '') != '' "
+              "OR COALESCE({t}.edited_description, '') != '')")
+
+
+def _migration_unique_external_id(conn: sqlite3.Connection):
+    """
+    Одна строка на external_id и уникальный индекс по нему
+
+    Остается последняя строка (свежие данные парсера); если модерировали
+    только более старый дубликат, его решение переносится в оставшуюся строку.
+    """
+    columns = ', '.join(MODERATION_COLUMNS)
+    moderated = ', '.join(f'd.{column}' for column in MODERATION_COLUMNS)
+    merged = conn.execute(
+        f"UPDATE vacancies AS v SET ({columns}) = ("
+        f"  SELECT {moderated} FROM vacancies AS d"
+        f"  WHERE d.external_id = v.external_id AND d.id != v.id AND {_MODERATED.format(t='d')}"
+        f"  ORDER BY COALESCE(d.moderated_at, '') DESC, d.id DESC LIMIT 1) "
+        f"WHERE v.id IN (SELECT MAX(id) FROM vacancies WHERE external_id IS NOT NULL "
+        f"               GROUP BY external_id HAVING COUNT(*) > 1) "
+        f"AND NOT {_MODERATED.format(t='v')} "
+        f"AND EXISTS (SELECT 1 FROM vacancies AS d WHERE d.external_id = v.external_id "
+        f"            AND d.id != v.id AND {_MODERATED.format(t='d')})"
+    ).rowcount
+    if merged:
+        logger.warning(f"Перенесена модерация дубликатов vacancies по external_id: {merged}")
+    removed = conn.execute(
+        "DELETE FROM vacancies WHERE external_id IS NOT NULL AND id NOT IN "
+        "(SELECT MAX(id) FROM vacancies WHERE external_id IS NOT NULL GROUP BY external_id)"
+    ).rowcount
+    if removed:
+        logger.warning(f"Удалено дубликатов vacancies по external_id: {removed}")
+    for name, (table, columns) in UNIQUE_INDEXES.items():
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+        conn.execute(f"CREATE UNIQUE INDEX {name} ON {table}({columns})")
+    for name in REDUNDANT_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+# Полнотекстовый поиск: FTS5 с внешним содержимым (исходные тексты хранятся
+# только в vacancies, snippet() берет их оттуда). В индекс пишутся основы слов,
+# которые считает Python (vacancy_search.sync_search_index): каждое слово
+# заменяется своей основой, позиции слов не меняются, поэтому подсветка по
+# исходному тексту совпадает. Триггеры только ставят id в очередь
+# vacancies_fts_pending - это работает для любого писателя (парсеры, админка
+# на Node). vacancies_fts_terms хранит проиндексированные основы: команде
+# 'delete' FTS5 нужны ровно те значения, что были вставлены ('rebuild' и
+# 'integrity-check' по vacancies для этого индекса неприменимы)
+SEARCH_TABLE = 'vacancies_fts'
+SEARCH_TERMS_TABLE = 'vacancies_fts_terms'
+SEARCH_PENDING_TABLE = 'vacancies_fts_pending'
+SEARCH_COLUMNS = ['title', 'company', 'description', 'requirements', 'tasks']
+# Веса bm25 в порядке SEARCH_COLUMNS
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0, 2.0, 2.0)
+SEARCH_TOKENIZER = 'unicode61 remove_diacritics 2'
+
+
+def _migration_search_index(conn: sqlite3.Connection):
+    """FTS5-индекс по vacancies, таблица основ и очередь индексации"""
+    columns = ', '.join(SEARCH_COLUMNS)
+    conn.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+    conn.execute(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5({columns}, content='vacancies', "
+        f"content_rowid='id', tokenize='{SEARCH_TOKENIZER}')"
+    )
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    conn.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25({weights})')")
+    conn.execute(f"DROP TABLE IF EXISTS {SEARCH_TERMS_TABLE}")
+    conn.execute(f"CREATE TABLE {SEARCH_TERMS_TABLE} (id INTEGER PRIMARY KEY, {columns})")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {SEARCH_PENDING_TABLE} (id INTEGER PRIMARY KEY)")
+    # Весь текущий корпус - в очередь (vacancy_search.py sync)
+    conn.execute(f"INSERT OR IGNORE INTO {SEARCH_PENDING_TABLE} (id) SELECT id FROM vacancies")
+
+    enqueue = f"INSERT OR IGNORE INTO {SEARCH_PENDING_TABLE} (id) VALUES"
+    triggers = {
+        'vacancies_fts_insert': f"AFTER INSERT ON vacancies BEGIN {enqueue} (new.id); END",
+        'vacancies_fts_delete': f"AFTER DELETE ON vacancies BEGIN {enqueue} (old.id); END",
+        # Модерация, зарплаты и прочие колонки индекс не трогают
+        'vacancies_fts_update': f"AFTER UPDATE OF {columns} ON vacancies BEGIN {enqueue} (new.id); END",
+    }
+    for name, body in triggers.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+
+
+# (версия, описание, функция); новые миграции только добавляются в конец
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, 'каноническая схема vacancies', _migration_columns),
+    (2, 'индексы под горячие запросы', _migration_indexes),
+    (3, 'полнотекстовый поиск FTS5', _migration_search_index),
+    (4, 'уникальный external_id', _migration_unique_external_id),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def ensure_schema(db_path: str, busy_timeout: float = 30.0) -> int:
+    """
+    Применяет недостающие миграции к БД и возвращает версию схемы
+
+    Каждая миграция - отдельная транзакция BEGIN IMMEDIATE; версия
+    перечитывается под блокировкой, поэтому параллельный запуск безопасен.
+    """
+    directory = os.path.dirname(db_path)
+    if directory and db_path != ':memory:':
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=busy_timeout, isolation_level=None)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Миграции по открытому соединению (в режиме autocommit)"""
+    version = schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+    for target, description, apply in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = schema_version(conn)
+            if target <= version:
+                conn.execute("COMMIT")
+                continue
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        version = target
+        logger.info(f"Схема БД вакансий: миграция {target} ({description})")
+    return version
+
+
+# ---------------------------------------------------------------------------
+# Горячие запросы и проверка планов
+# ---------------------------------------------------------------------------
+
+# (имя, запрос, параметры) - запросы парсеров и админки (src/lib/database/sqlite-service.ts)
+HOT_QUERIES: List[Tuple[str, str, tuple]] = [
+    ('dedup.source_external_id', "SELECT id FROM vacancies WHERE external_id = ? AND source = ?", ('1', 'hh')),
+    ('dedup.external_id', "SELECT id FROM vacancies WHERE external_id = ?", ('1',)),
+    ('dedup.url', "SELECT id FROM vacancies WHERE url = ?", ('https://hh.ru/vacancy/1',)),
+    ('admin.by_external_id', "SELECT * FROM vacancies WHERE external_id = ?", ('1',)),
+    ('admin.moderation_queue',
+     "SELECT * FROM vacancies WHERE is_approved = 0 AND is_rejected = 0 ORDER BY created_at DESC", ()),
+    ('admin.approved_feed',
+     "SELECT * FROM vacancies WHERE is_approved = 1 ORDER BY ai_relevance_score DESC, published_at DESC", ()),
+    ('admin.exact_duplicates',
+     "SELECT * FROM vacancies WHERE LOWER(title) = LOWER(?) AND LOWER(company) = LOWER(?) AND source = ? "
+     "ORDER BY created_at DESC", ('Дизайнер', 'Компания', 'hh')),
+    ('admin.delete_source', "DELETE FROM vacancies WHERE source = ?", ('hh',)),
+    ('stats.by_source', "SELECT COUNT(*) FROM vacancies WHERE source = ?", ('geekjob',)),
+    ('stats.last_24h', "SELECT COUNT(*) FROM vacancies WHERE created_at > datetime('now', '-1 day')", ()),
+    ('stats.source_last_24h',
+     "SELECT COUNT(*) FROM vacancies WHERE source = ? AND created_at > datetime('now', '-1 day')", ('geekjob',)),
+    ('filter.salary_from', "SELECT id FROM vacancies WHERE salary_min >= ?", (100000,)),
+    ('search.fts',
+     f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ? ORDER BY rank LIMIT 20", ('"дизайнер"',)),
+    ('search.fts_filtered',
+     f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ? AND EXISTS (SELECT 1 FROM vacancies "
+     f"WHERE vacancies.id = {SEARCH_TABLE}.rowid AND source IN (?)) ORDER BY rank LIMIT 20", ('"дизайнер"', 'hh')),
+]
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check_query_plans(conn: sqlite3.Connection,
+                      queries: Optional[List[Tuple[str, str, tuple]]] = None) -> Dict[str, List[str]]:
+    """
+    Проблемы планов горячих запросов: {имя: [строки плана]}
+
+    Проблема - полный проход по vacancies (SCAN, в том числе по покрывающему
+    индексу) или сортировка во временном B-дереве.
+    """
+    problems = {}
+    for name, sql, params in queries or HOT_QUERIES:
+        plan = explain(conn, sql, params)
+        bad = [detail for detail in plan
+               if re.match(r'SCAN vacancies\b', detail) or detail.startswith('USE TEMP B-TREE')]
+        if bad:
+            problems[name] = plan
+    return problems
+
+
+def schema_status(conn: sqlite3.Connection) -> Dict[str, object]:
+    columns = set(_column_names(conn, 'vacancies'))
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(vacancies)")}
+    return {
+        'version': schema_version(conn),
+        'target_version': SCHEMA_VERSION,
+        'missing_columns': [name for name, _ in VACANCY_COLUMNS if name not in columns],
+        'missing_indexes': [name for name, (table, _) in {**VACANCY_INDEXES, **UNIQUE_INDEXES}.items()
+                            if table == 'vacancies' and name not in indexes],
+        'search_index': bool(conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (SEARCH_TABLE,)).fetchone()),
+        'search_pending': (conn.execute(f"SELECT COUNT(*) FROM {SEARCH_PENDING_TABLE}").fetchone()[0]
+                           if schema_version(conn) >= 3 else None),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Проверка
+# ---------------------------------------------------------------------------
+
+# Схемы, которые создавали парсеры до канонической (сокращенно)
+LEGACY_SCHEMAS = {
+    'unified': """
+        CREATE TABLE vacancies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, external_id TEXT UNIQUE NOT NULL, source TEXT NOT NULL,
+            url TEXT NOT NULL, title TEXT NOT NULL, company TEXT, salary TEXT, location TEXT, description TEXT,
+            published_at DATETIME, created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX idx_external_id ON vacancies(external_id);
+        CREATE INDEX idx_source ON vacancies(source);
+    """,
+    'enhanced': """
+        CREATE TABLE vacancies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, external_id TEXT, source TEXT NOT NULL, url TEXT UNIQUE NOT NULL,
+            title TEXT NOT NULL, company TEXT, salary_min INTEGER, salary_max INTEGER, salary_currency TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP, is_approved BOOLEAN DEFAULT 0,
+            is_rejected BOOLEAN DEFAULT 0, quality_score REAL
+        );
+        CREATE INDEX idx_url ON vacancies(url);
+        CREATE INDEX idx_quality_score ON vacancies(quality_score);
+    """,
+}
+
+
+def check() -> int:
+    import tempfile
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, ddl in [('fresh', '')] + list(LEGACY_SCHEMAS.items()):
+            db_path = os.path.join(tmpdir, f'{name}.db')
+            if ddl:
+                with sqlite3.connect(db_path) as conn:
+                    conn.executescript(ddl)
+                    conn.execute("INSERT INTO vacancies (external_id, source, url, title) VALUES ('1', 'hh', 'u', 't')")
+            version = ensure_schema(db_path)
+            # Повторный запуск ничего не делает
+            version_again = ensure_schema(db_path)
+            with sqlite3.connect(db_path) as conn:
+                status = schema_status(conn)
+                problems = check_query_plans(conn)
+                # Вставка всех канонических колонок (как в UnifiedParser.save_vacancy)
+                names = [column for column, _ in VACANCY_COLUMNS if column != 'id']
+                conn.execute(
+                    f"INSERT INTO vacancies ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                    ['x'] * len(names),
+                )
+                rows = conn.execute("SELECT COUNT(*) FROM vacancies").fetchone()[0]
+                # Старые строки попали в очередь поиска при миграции, новые - через триггер
+                queued = conn.execute(f"SELECT COUNT(*) FROM {SEARCH_PENDING_TABLE}").fetchone()[0]
+            if version != SCHEMA_VERSION or version_again != SCHEMA_VERSION:
+                failures.append(f"{name}: версия {version}/{version_again}")
+            if status['missing_columns'] or status['missing_indexes'] or not status['search_index']:
+                failures.append(f"{name}: {status}")
+            if problems:
+                failures.append(f"{name}: планы {problems}")
+            if rows != (2 if ddl else 1) or queued != rows:
+                failures.append(f"{name}: строк {rows}, в очереди поиска {queued}")
+
+        # Дубликаты external_id прежней схемы: остается последняя строка с решением
+        # модератора из старой, строки без external_id не трогаются; INSERT OR
+        # REPLACE админки заменяет строку
+        db_path = os.path.join(tmpdir, 'duplicates.db')
+        with sqlite3.connect(db_path) as conn:
+            conn.executescript(LEGACY_SCHEMAS['enhanced'])
+            conn.executemany("INSERT INTO vacancies (external_id, source, url, title, is_approved) "
+                             "VALUES (?, 'hh', ?, 't', ?)",
+                             [('7', 'u1', 1), ('7', 'u2', 0), (None, 'u3', 0), (None, 'u4', 0),
+                              ('9', 'u7', 0), ('9', 'u8', 0)])
+        ensure_schema(db_path)
+        with sqlite3.connect(db_path) as conn:
+            for url in ('u5', 'u6'):
+                conn.execute("INSERT OR REPLACE INTO vacancies (external_id, source, url, title) "
+                             "VALUES ('8', 'hh', ?, 't')", (url,))
+            rows = conn.execute("SELECT external_id, url, is_approved FROM vacancies ORDER BY url").fetchall()
+        if rows != [('7', 'u2', 1), (None, 'u3', 0), (None, 'u4', 0), ('8', 'u6', 0), ('9', 'u8', 0)]:
+            failures.append(f"duplicates: {rows}")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print(f"✅ Схема v{SCHEMA_VERSION}: новая БД, {len(LEGACY_SCHEMAS)} прежние схемы и дубликаты external_id, "
+          f"{len(HOT_QUERIES)} горячих запросов без полного прохода")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Схема БД вакансий: миграции и проверка планов запросов')
+    subparsers = parser.add_subparsers(dest='command')
+
+    for command, help_text in (('migrate', 'Применить миграции'), ('status', 'Версия схемы и чего не хватает')):
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument('--db', default='data/vacancies.db', help='Путь к базе данных')
+
+    plans = subparsers.add_parser('check-plans', help='EXPLAIN QUERY PLAN горячих запросов')
+    plans.add_argument('--db', help='Проверить существующую БД (по умолчанию - новая БД в памяти)')
+
+    subparsers.add_parser('check', help='Миграции на новой и прежних схемах')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.command == 'migrate' else logging.WARNING,
+                        format='%(levelname)s %(message)s')
+
+    if args.command == 'migrate':
+        print(f"Схема {args.db}: версия {ensure_schema(args.db)}")
+        return 0
+    if args.command == 'status':
+        with sqlite3.connect(f"file:{args.db}?mode=ro", uri=True) as conn:
+            print(schema_status(conn))
+        return 0
+    if args.command == 'check-plans':
+        if args.db:
+            conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+        else:
+            conn = sqlite3.connect(':memory:', isolation_level=None)
+            migrate(conn)
+        with conn:
+            version = schema_version(conn)
+            if version < SCHEMA_VERSION:
+                print(f"⚠️ Схема {args.db}: версия {version} из {SCHEMA_VERSION}, "
+                      f"запросы к отсутствующим таблицам и колонкам пропущены "
+                      f"(python vacancy_schema.py migrate --db {args.db})")
+            plans = {}
+            for name, sql, params in HOT_QUERIES:
+                try:
+                    plans[name] = explain(conn, sql, params)
+                except sqlite3.OperationalError as e:
+                    print(f"⏭ {name}: {e}")
+            problems = check_query_plans(conn, [query for query in HOT_QUERIES if query[0] in plans])
+            for name, plan in plans.items():
+                mark = '❌' if name in problems else '✅'
+                print(f"{mark} {name}: {' | '.join(plan)}")
+        conn.close()
+        return 1 if problems or version < SCHEMA_VERSION else 0
+    return check()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
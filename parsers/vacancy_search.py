@@ -0,0 +1,654 @@
+#!/usr/bin/env python3
+"""
+Полнотекстовый поиск вакансий (SQLite FTS5)
+
+Индекс vacancies_fts (title, company, description, requirements, tasks)
+создает миграция vacancy_schema. Триггеры на vacancies только ставят id
+измененной строки в очередь vacancies_fts_pending, так что ни один писатель
+(парсеры, админка, Node-парсер) индекс не пропустит; сам индекс пополняет
+sync_search_index - перед каждым поиском порцией и командой sync целиком.
+Результаты ранжируются bm25 с весами колонок (SEARCH_WEIGHTS), снабжаются
+сниппетами и отдаются страницами. total - всегда полное число совпадений;
+предел ранжирования max_candidates включается явно (MAX_CANDIDATES) там, где
+задержка важнее полноты.
+
+Русская морфология: в индекс и в запрос идут основы слов стеммера Snowball
+("дизайнеров" и "дизайнером" -> "дизайнер"), ё приравнивается к е. Число и
+порядок слов сохраняются, поэтому snippet() подсвечивает исходный текст из
+vacancies. Запрос - точные основы, без префиксных "слово"*: на 1M строк
+префикс FTS5 собирает список документов заново на каждом запросе (десятки мс).
+pymorphy2 не используется: в окружении парсеров его нет, а стеммер дает
+одинаковую основу для запроса и индекса без словаря.
+
+Примеры:
+    python vacancy_search.py search "продуктовый дизайнер" --db data/vacancies.db
+    python vacancy_search.py sync --db data/vacancies.db
+    python vacancy_search.py bench --rows 1000000
+    python vacancy_search.py check
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import re
+import sys
+import html
+import time
+import sqlite3
+import logging
+import argparse
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+try:
+    from vacancy_schema import (ensure_schema, SEARCH_TABLE, SEARCH_TERMS_TABLE, SEARCH_PENDING_TABLE,
+                                SEARCH_COLUMNS, SEARCH_TOKENIZER, SEARCH_WEIGHTS)
+except ImportError:
+    import os
+    sys.path.append(os.path.dirname(__file__))
+    from vacancy_schema import (ensure_schema, SEARCH_TABLE, SEARCH_TERMS_TABLE, SEARCH_PENDING_TABLE,
+                                SEARCH_COLUMNS, SEARCH_TOKENIZER, SEARCH_WEIGHTS)
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Стеммер Snowball для русского языка
+# ---------------------------------------------------------------------------
+
+_VOWELS = set('аеиоуыэюя')
+
+# Группы окончаний: (окончания, только после а/я)
+_PERFECTIVE_GERUND = [(('в', 'вши', 'вшись'), True),
+                      (('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'), False)]
+_REFLEXIVE = [(('ся', 'сь'), False)]
+_ADJECTIVE = [(('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+                'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею'), False)]
+_PARTICIPLE = [(('ем', 'нн', 'вш', 'ющ', 'щ'), True),
+               (('ивш', 'ывш', 'ующ'), False)]
+_VERB = [(('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'ешь',
+           'нно'), True),
+         (('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен',
+           'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'), False)]
+_NOUN = [(('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'ей', 'ой', 'ий',
+           'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю',
+           'ия', 'ья', 'я'), False)]
+_DERIVATIONAL = [(('ост', 'ость'), False)]
+_SUPERLATIVE = [(('ейш', 'ейше'), False)]
+
+
+def _strip_ending(word: str, limit: int, groups) -> Optional[str]:
+    """Снимает самое длинное окончание из групп, лежащее правее limit (among в Snowball)"""
+    best, after_a = '', False
+    for endings, needs_a in groups:
+        for ending in endings:
+            if len(ending) > len(best) and word.endswith(ending) and len(word) - len(ending) >= limit:
+                best, after_a = ending, needs_a
+    if not best:
+        return None
+    stem = word[:-len(best)]
+    if after_a and not (len(stem) - 1 >= limit and stem[-1] in 'ая'):
+        return None
+    return stem
+
+
+def _regions(word: str):
+    """RV - после первой гласной, R2 - после второго сочетания гласная+согласная"""
+    positions = []
+    previous_vowel = False
+    for index, char in enumerate(word):
+        vowel = char in _VOWELS
+        if previous_vowel and not vowel:
+            positions.append(index + 1)
+        previous_vowel = vowel
+    rv = next((index + 1 for index, char in enumerate(word) if char in _VOWELS), len(word))
+    r2 = positions[1] if len(positions) > 1 else len(word)
+    return rv, r2
+
+
+def stem_russian(word: str) -> str:
+    """Основа русского слова (алгоритм Snowball); слово ожидается в нижнем регистре"""
+    word = word.replace('ё', 'е')
+    rv, r2 = _regions(word)
+
+    stem = _strip_ending(word, rv, _PERFECTIVE_GERUND)
+    if stem is None:
+        reflexive = _strip_ending(word, rv, _REFLEXIVE)
+        if reflexive is not None:
+            word = reflexive
+        stem = _strip_ending(word, rv, _ADJECTIVE)
+        if stem is not None:
+            participle = _strip_ending(stem, rv, _PARTICIPLE)
+            if participle is not None:
+                stem = participle
+        else:
+            stem = _strip_ending(word, rv, _VERB)
+            if stem is None:
+                stem = _strip_ending(word, rv, _NOUN)
+    if stem is not None:
+        word = stem
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    derivational = _strip_ending(word, r2, _DERIVATIONAL)
+    if derivational is not None:
+        word = derivational
+
+    superlative = _strip_ending(word, rv, _SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    elif superlative is None and word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+# ---------------------------------------------------------------------------
+# Индексируемый текст и запрос
+# ---------------------------------------------------------------------------
+
+# Слова так, как их режет токенизатор unicode61 (подчеркивание - разделитель).
+# Индекс совпадает с текстом vacancies пословно, только если границы слов
+# здесь и в SQLite одни и те же. Для ASCII, латиницы-1, кириллицы и
+# типографской пунктуации правила совпадают; про остальные символы спрашиваем
+# сам SQLite: его таблицы Unicode старее (₽ и новые эмодзи для него - буквы),
+# а диакритика (ударение, й из и + бреве) - часть слова
+_WORD = r'[^\W_]'
+_WORD_RE = re.compile(_WORD + '+')
+_UNCHECKED_RE = re.compile(r'[^\x00-\xff\u0400-\u0482\u048a-\u04ff\u2010-\u2027\u2030-\u205e]')
+_CYRILLIC_RE = re.compile(r'[а-я]')
+_token_chars: Dict[str, bool] = {}
+
+
+def _learn_token_chars(chars: set):
+    """Узнает у SQLite, какие символы unicode61 считает частью слова, и обновляет _WORD_RE"""
+    global _WORD_RE
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute(f"CREATE VIRTUAL TABLE probe USING fts5(x, tokenize='{SEARCH_TOKENIZER}')")
+        conn.executemany("INSERT INTO probe (rowid, x) VALUES (?, ?)", [(ord(ch), f'a{ch}b') for ch in chars])
+        # Если символ - разделитель, 'a' остается отдельным словом
+        separators = {rowid for (rowid,) in conn.execute("SELECT rowid FROM probe WHERE probe MATCH 'a'")}
+    finally:
+        conn.close()
+    for ch in chars:
+        _token_chars[ch] = ord(ch) not in separators
+
+    def char_class(differs):
+        return ''.join(f'\\U{ord(ch):08x}' for ch, is_token in _token_chars.items() if differs(ch, is_token))
+
+    extra = char_class(lambda ch, is_token: is_token and not re.match(_WORD, ch))
+    missing = char_class(lambda ch, is_token: not is_token and re.match(_WORD, ch))
+    word = f'(?![{missing}]){_WORD}' if missing else _WORD
+    _WORD_RE = re.compile(f'(?:{word}|[{extra}])+' if extra else f'(?:{word})+')
+
+
+def _words(text: str) -> List[str]:
+    unknown = set(_UNCHECKED_RE.findall(text)).difference(_token_chars)
+    if unknown:
+        _learn_token_chars(unknown)
+    return _WORD_RE.findall(text)
+
+
+@lru_cache(maxsize=65536)
+def index_token(word: str) -> str:
+    """Слово в индексе и в запросе: нижний регистр, ё -> е, без диакритики, основа для кириллицы"""
+    word = word.lower().replace('ё', 'е')
+    if not word.isalnum():
+        # Ударения и прочие комбинируемые знаки (й и ё уже собраны NFC)
+        plain = ''.join(ch for ch in unicodedata.normalize('NFC', word) if not unicodedata.combining(ch))
+        word = plain.replace('ё', 'е') or word
+    return stem_russian(word) if _CYRILLIC_RE.search(word) else word
+
+
+def index_text(text: Optional[str]) -> Optional[str]:
+    """Текст колонки для индекса: каждое слово заменено основой, число слов то же"""
+    if not text:
+        return text
+    return ' '.join(index_token(word) for word in _words(text))
+
+
+def build_match_query(text: str) -> str:
+    """
+    Строка MATCH для FTS5 по пользовательскому запросу
+
+    Все слова обязательны и сравниваются по основе ("дизайнеров" найдет
+    "дизайнером"). Каждое слово берется в кавычки, поэтому синтаксис FTS5 во
+    вводе (кавычки, OR, NEAR, *) не интерпретируется.
+    """
+    terms = dict.fromkeys(index_token(word) for word in _words(text or ''))
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+# ---------------------------------------------------------------------------
+# Синхронизация индекса
+# ---------------------------------------------------------------------------
+
+SYNC_CHUNK_SIZE = 1000
+
+
+def sync_search_index(conn: sqlite3.Connection, limit: Optional[int] = None,
+                      chunk_size: int = SYNC_CHUNK_SIZE) -> int:
+    """
+    Индексирует вакансии из очереди vacancies_fts_pending, возвращает их число
+
+    Соединение - в режиме autocommit; каждая порция - своя транзакция BEGIN
+    IMMEDIATE, так что строки не меняются между чтением и записью индекса.
+    Прежние основы строки удаляются из индекса по vacancies_fts_terms.
+    """
+    columns = ', '.join(SEARCH_COLUMNS)
+    values = ', '.join('?' * len(SEARCH_COLUMNS))
+    done = 0
+    while limit is None or done < limit:
+        if conn.execute(f"SELECT 1 FROM {SEARCH_PENDING_TABLE} LIMIT 1").fetchone() is None:
+            break
+        size = chunk_size if limit is None else min(chunk_size, limit - done)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [row[0] for row in conn.execute(
+                f"SELECT id FROM {SEARCH_PENDING_TABLE} ORDER BY id LIMIT ?", (size,))]
+            if not ids:
+                # Очередь разобрал другой процесс
+                conn.execute("COMMIT")
+                break
+            placeholders = ', '.join('?' * len(ids))
+            indexed = conn.execute(
+                f"SELECT id, {columns} FROM {SEARCH_TERMS_TABLE} WHERE id IN ({placeholders})", ids).fetchall()
+            current = conn.execute(
+                f"SELECT id, {columns} FROM vacancies WHERE id IN ({placeholders})", ids).fetchall()
+
+            conn.executemany(
+                f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', ?, {values})",
+                indexed,
+            )
+            terms = [(row[0],) + tuple(index_text(text) for text in row[1:]) for row in current]
+            conn.executemany(f"INSERT INTO {SEARCH_TABLE}(rowid, {columns}) VALUES (?, {values})", terms)
+            conn.executemany(f"INSERT OR REPLACE INTO {SEARCH_TERMS_TABLE} (id, {columns}) VALUES (?, {values})",
+                             terms)
+            removed = set(ids) - {row[0] for row in current}
+            conn.executemany(f"DELETE FROM {SEARCH_TERMS_TABLE} WHERE id = ?", [(row_id,) for row_id in removed])
+            conn.execute(f"DELETE FROM {SEARCH_PENDING_TABLE} WHERE id IN ({placeholders})", ids)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        done += len(ids)
+    return done
+
+
+# ---------------------------------------------------------------------------
+# Поиск
+# ---------------------------------------------------------------------------
+
+RESULT_COLUMNS = ['id', 'external_id', 'source', 'url', 'title', 'company', 'location',
+                  'salary_min', 'salary_max', 'salary_currency', 'published_at', 'is_approved']
+# Управляющие символы как маркеры сниппета: текст экранируется, потом маркеры меняются на <mark>
+_MARK_START, _MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 24
+# Рекомендуемый предел ранжирования (VacancySearch(max_candidates=...), по
+# умолчанию выключен): bm25 считается для каждого кандидата, и слово из
+# половины вакансий на 1M строк ранжируется сотни миллисекунд. С пределом
+# ранжируются только самые свежие совпадения - более старые, но релевантные
+# в выдачу не попадут
+MAX_CANDIDATES = 2000
+# Сколько строк из очереди индексирует поиск перед запросом (остальное - sync)
+SEARCH_SYNC_LIMIT = 1000
+
+
+class VacancySearch:
+    """Поиск по БД вакансий; схема доводится до текущей версии при открытии"""
+
+    def __init__(self, db_path: str = "data/vacancies.db", max_candidates: Optional[int] = None,
+                 busy_timeout: float = 1.0):
+        self.db_path = db_path
+        self.max_candidates = max_candidates
+        ensure_schema(db_path)
+        self.conn = sqlite3.connect(db_path, timeout=busy_timeout, isolation_level=None,
+                                    check_same_thread=False)
+
+    def close(self):
+        self.conn.close()
+
+    def sync(self, limit: Optional[int] = SEARCH_SYNC_LIMIT) -> int:
+        """Догоняет очередь индексации; если БД занята писателем - ищем по текущему индексу"""
+        try:
+            return sync_search_index(self.conn, limit)
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            logger.debug(f"Индекс поиска не обновлен, БД занята: {e}")
+            return 0
+
+    def _filters(self, sources: Optional[List[str]], approved_only: bool):
+        # Фильтры - подзапросом по первичному ключу: в запросе остается одна
+        # таблица FTS5, и ограничения MATCH и rowid >= ? уходят в сам индекс
+        conditions, params = [], []
+        if sources:
+            conditions.append(f"source IN ({', '.join('?' * len(sources))})")
+            params.extend(sources)
+        if approved_only:
+            conditions.append("is_approved = 1")
+        if not conditions:
+            return "", []
+        return (f" AND EXISTS (SELECT 1 FROM vacancies WHERE vacancies.id = {SEARCH_TABLE}.rowid"
+                f" AND {' AND '.join(conditions)})"), params
+
+    def search(self, query: str, limit: int = 20, offset: int = 0, sources: Optional[List[str]] = None,
+               approved_only: bool = False) -> Dict[str, Any]:
+        """
+        Страница результатов: {'query', 'match', 'total', 'ranked', 'capped', 'limit', 'offset', 'items'}
+
+        items упорядочены по bm25 (score - чем больше, тем релевантнее), у
+        каждого snippet - фрагмент лучшей колонки с <mark> вокруг совпадений
+        (HTML-экранирован). total - число всех совпадений. Если задан
+        max_candidates и совпадений больше, ранжируются только самые свежие из
+        них: ranked = max_candidates, capped = True (страницы дальше ranked пусты).
+        """
+        match = build_match_query(query)
+        page = {'query': query, 'match': match, 'total': 0, 'ranked': 0, 'capped': False,
+                'limit': limit, 'offset': offset, 'items': []}
+        if not match:
+            return page
+        self.sync()
+
+        where, params = self._filters(sources, approved_only)
+        base = f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?{where}"
+        params = [match] + params
+
+        page['total'] = page['ranked'] = self.conn.execute(f"SELECT COUNT(*) {base}", params).fetchone()[0]
+        if not page['total']:
+            return page
+        if self.max_candidates and page['total'] > self.max_candidates:
+            # Порог по rowid: id растет со временем вставки, ORDER BY rowid DESC идет по индексу FTS
+            row = self.conn.execute(f"SELECT rowid {base} ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                                    params + [self.max_candidates - 1]).fetchone()
+            base += " AND rowid >= ?"
+            params = params + [row[0]]
+            page['ranked'], page['capped'] = self.max_candidates, True
+
+        # bm25() вместо колонки rank: FTS5 пересчитывает rank при каждом чтении
+        # колонки, а IDF - это проход по всему списку документов слова (~16 мс
+        # на слово из всех вакансий при 1M строк). Здесь IDF считается один раз,
+        # а сортирует кандидатов SQLite
+        weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+        ranked = self.conn.execute(
+            f"SELECT rowid, bm25({SEARCH_TABLE}, {weights}) AS score {base} ORDER BY score LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        if not ranked:
+            return page
+
+        # Сниппеты - только для строк страницы, поиском строки по rowid в индексе
+        snippets = {
+            rowid: self.conn.execute(
+                f"SELECT snippet({SEARCH_TABLE}, -1, '{_MARK_START}', '{_MARK_END}', '…', {SNIPPET_TOKENS}) "
+                f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ? AND rowid = ?", (match, rowid),
+            ).fetchone()[0]
+            for rowid, _ in ranked
+        }
+        rows = {
+            row[0]: row for row in self.conn.execute(
+                f"SELECT {', '.join(RESULT_COLUMNS)} FROM vacancies WHERE id IN ({', '.join('?' * len(ranked))})",
+                [rowid for rowid, _ in ranked],
+            )
+        }
+        for rowid, score in ranked:
+            row = rows.get(rowid)
+            if row is None:
+                continue
+            item = dict(zip(RESULT_COLUMNS, row))
+            item['score'] = round(-score, 6)
+            item['snippet'] = (html.escape(snippets[rowid] or '')
+                               .replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+            page['items'].append(item)
+        return page
+
+
+def search_vacancies(db_path: str, query: str, max_candidates: Optional[int] = None,
+                     **kwargs) -> Dict[str, Any]:
+    """Разовый поиск (для повторных запросов держите VacancySearch)"""
+    searcher = VacancySearch(db_path, max_candidates=max_candidates)
+    try:
+        return searcher.search(query, **kwargs)
+    finally:
+        searcher.close()
+
+
+# ---------------------------------------------------------------------------
+# Проверка и замер
+# ---------------------------------------------------------------------------
+
+STEM_EXAMPLES = {
+    'дизайнера': 'дизайнер', 'дизайнеров': 'дизайнер', 'продуктовый': 'продуктов',
+    'продуктовая': 'продуктов', 'удаленная': 'удален', 'вакансии': 'ваканс', 'интерфейсов': 'интерфейс',
+    'аналитика': 'аналитик', 'работающий': 'работа', 'ёлка': 'елк', 'крупнейший': 'крупн',
+    'возможность': 'возможн', 'проектировать': 'проектирова', 'занимавшись': 'занима',
+}
+
+SEARCH_EXAMPLES = [
+    # (запрос, ожидаемые id в порядке выдачи)
+    # Короткий заголовок весомее (нормализация bm25 по длине), совпадение в заголовке - в описании
+    ('дизайнеров', [3, 1, 2]),
+    ('Продуктовая дизайнеру', [1]),
+    ('ёлки', [2]),
+    ('FIGMA', [3, 1]),
+    # Синтаксис FTS5 во вводе - просто слова
+    ('(дизайнер* "ui', [1]),
+    ('ui OR менеджер', []),
+    ('бухгалтер', []),
+    ('', []),
+]
+
+
+# Тексты, где границы слов в Python и unicode61 расходятся без _learn_token_chars
+ALIGNMENT_EXAMPLES = [
+    'Зарплата от 150 000 ₽ на руки',
+    'Ва\u0301жная ваканси\u0301я, и\u0306од',
+    'Команда мечты 🥳🫶 и офис ❤️',
+    'Cafe\u0301 · naïve — №1 ² ᦰ',
+]
+
+
+def _fill(conn: sqlite3.Connection, rows):
+    conn.executemany(
+        "INSERT INTO vacancies (id, external_id, source, url, title, company, description, requirements, tasks) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows,
+    )
+    conn.commit()
+
+
+def check() -> int:
+    import os
+    import tempfile
+
+    failed = 0
+    for word, expected in STEM_EXAMPLES.items():
+        if stem_russian(word) != expected:
+            failed += 1
+            print(f"❌ stem({word!r}) = {stem_russian(word)!r}, ожидалось {expected!r}")
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute(f"CREATE VIRTUAL TABLE probe USING fts5(x, tokenize='{SEARCH_TOKENIZER}')")
+    conn.execute("CREATE VIRTUAL TABLE probe_words USING fts5vocab(probe, 'instance')")
+    for text in ALIGNMENT_EXAMPLES:
+        conn.executemany("INSERT INTO probe (rowid, x) VALUES (?, ?)", [(1, text), (2, index_text(text))])
+        counts = conn.execute("SELECT COUNT(*) FROM probe_words GROUP BY doc ORDER BY doc").fetchall()
+        if counts[0] != counts[1]:
+            failed += 1
+            print(f"❌ слова {text!r} -> {index_text(text)!r}: {counts}")
+        conn.execute("DELETE FROM probe")
+    conn.close()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, 'vacancies.db')
+        ensure_schema(db_path)
+        with sqlite3.connect(db_path) as conn:
+            _fill(conn, [
+                (1, '1', 'hh', 'u1', 'Продуктовый UI/UX дизайнер', 'Ромашка',
+                 'Ищем дизайнера в продуктовую команду', 'Figma <script>', ''),
+                (2, '2', 'habr', 'u2', 'Менеджер проекта', 'Ромашка', 'Работа с дизайнерами', '', ''),
+                (3, '3', 'hh', 'u3', 'Графический дизайнер', 'Ромашка', '', 'Figma, Photoshop', ''),
+                (4, '4', 'hh', 'u4', 'Удалю', 'Удалю', 'дизайнер', '', ''),
+            ])
+
+        searcher = VacancySearch(db_path)
+        searcher.search('дизайнер')
+        # Очередь: удаление и правка текста после индексации, модерация индекс не трогает
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DELETE FROM vacancies WHERE id = 4")
+            conn.execute("UPDATE vacancies SET company = 'Ёлка' WHERE id = 2")
+            conn.execute("UPDATE vacancies SET is_approved = 1 WHERE id = 3")
+            pending = conn.execute(f"SELECT id FROM {SEARCH_PENDING_TABLE} ORDER BY id").fetchall()
+        if pending != [(2,), (4,)]:
+            failed += 1
+            print(f"❌ очередь: {pending}")
+
+        for query, expected in SEARCH_EXAMPLES:
+            ids = [item['id'] for item in searcher.search(query)['items']]
+            if ids != expected:
+                failed += 1
+                print(f"❌ {query!r} ({build_match_query(query)}): {ids}, ожидалось {expected}")
+
+        page = searcher.search('дизайнер', limit=1, offset=1, sources=['hh'])
+        if page['total'] != 2 or [item['id'] for item in page['items']] != [1]:
+            failed += 1
+            print(f"❌ страница с фильтром: {page}")
+        if [item['id'] for item in searcher.search('дизайнер', approved_only=True)['items']] != [3]:
+            failed += 1
+            print("❌ approved_only")
+        items = searcher.search('figma')['items']
+        if '<mark>Figma</mark>' not in items[1]['snippet'] or '&lt;script&gt;' not in items[1]['snippet']:
+            failed += 1
+            print(f"❌ сниппет: {items[1]['snippet']!r}")
+        # Подсветка по исходному тексту: слово целиком, в исходном регистре и с ё
+        snippet = searcher.search('ёлкой')['items'][0]['snippet']
+        if snippet != '<mark>Ёлка</mark>':
+            failed += 1
+            print(f"❌ сниппет с ё: {snippet!r}")
+        # Без предела ранжируются все совпадения; с пределом total остается полным
+        full = searcher.search('дизайнер')
+        if full['capped'] or full['ranked'] != full['total'] or len(full['items']) != full['total']:
+            failed += 1
+            print(f"❌ без max_candidates: {full}")
+        searcher.max_candidates = 2
+        page = searcher.search('дизайнер')
+        if (not page['capped'] or page['total'] != full['total'] or page['ranked'] != 2
+                or [item['id'] for item in page['items']] != [3, 2]):
+            failed += 1
+            print(f"❌ max_candidates: {page}")
+        searcher.close()
+
+    if failed:
+        return 1
+    print(f"✅ {len(STEM_EXAMPLES)} основ, {len(ALIGNMENT_EXAMPLES)} текстов, {len(SEARCH_EXAMPLES)} запросов, очередь, фильтры, сниппеты")
+    return 0
+
+
+BENCH_QUERIES = ['дизайнер', 'продуктовый дизайнер', 'figma', 'дизайн-систем', 'веб-дизайнера удаленно',
+                 'Ромашка', 'моушн', 'бухгалтер', 'сеньор продуктовый дизайнер figma', 'код 4242']
+
+
+def bench(rows: int, db_path: Optional[str] = None, seed: int = 42,
+          max_candidates: Optional[int] = None) -> int:
+    """Задержка поиска на синтетическом корпусе benchmarks.py"""
+    import os
+    import random
+    import tempfile
+    import benchmarks
+
+    tmpdir = None
+    if db_path is None:
+        tmpdir = tempfile.TemporaryDirectory(prefix='search_bench_')
+        db_path = os.path.join(tmpdir.name, 'vacancies.db')
+    try:
+        ensure_schema(db_path)
+        with sqlite3.connect(db_path) as conn:
+            existing = conn.execute("SELECT COUNT(*) FROM vacancies").fetchone()[0]
+            if existing < rows:
+                corpus = benchmarks.SyntheticCorpus(rows, seed=seed)
+                started = time.perf_counter()
+                for chunk in corpus.chunks():
+                    chunk = [vacancy for vacancy in chunk if vacancy['id'] > existing]
+                    rng = random.Random(seed + chunk[0]['id']) if chunk else None
+                    _fill(conn, [
+                        (v['id'], v['external_id'], v['source'], v['url'], v['title'].strip(), v['company'],
+                         f"{v['description']} Вакансия №{v['id']}, код {rng.randint(1000, 9999)}.",
+                         ' '.join(rng.sample(benchmarks.REQUIREMENTS, 3)),
+                         ' '.join(rng.sample(benchmarks.DUTIES, 3)))
+                        for v in chunk
+                    ])
+                print(f"Заполнено {rows - existing} строк за {time.perf_counter() - started:.1f}с")
+
+        searcher = VacancySearch(db_path, max_candidates=max_candidates)
+        started = time.perf_counter()
+        indexed = searcher.sync(limit=None)
+        if indexed:
+            print(f"Проиндексировано {indexed} строк за {time.perf_counter() - started:.1f}с")
+        print(f"{'запрос':<40} {'всего':>8} {'ранж.':>8} {'мс p50':>8} {'мс max':>8}")
+        for query in BENCH_QUERIES:
+            timings = []
+            for offset in (0, 20, 0, 40, 0):
+                started = time.perf_counter()
+                page = searcher.search(query, offset=offset)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            print(f"{query:<40} {page['total']:>8} {page['ranked']:>8} "
+                  f"{timings[len(timings) // 2]:>8.2f} {timings[-1]:>8.2f}")
+        searcher.close()
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Полнотекстовый поиск вакансий (FTS5)')
+    subparsers = parser.add_subparsers(dest='command')
+
+    search = subparsers.add_parser('search', help='Найти вакансии')
+    search.add_argument('query')
+    search.add_argument('--db', default='data/vacancies.db', help='Путь к базе данных')
+    search.add_argument('--limit', type=int, default=20)
+    search.add_argument('--offset', type=int, default=0)
+    search.add_argument('--source', action='append', help='Только источник (можно несколько раз)')
+    search.add_argument('--approved', action='store_true', help='Только одобренные')
+    search.add_argument('--max-candidates', type=int, help=f'Ранжировать только N самых свежих (например {MAX_CANDIDATES})')
+
+    sync = subparsers.add_parser('sync', help='Проиндексировать всю очередь (после миграции и массовых загрузок)')
+    sync.add_argument('--db', default='data/vacancies.db', help='Путь к базе данных')
+
+    bench_parser = subparsers.add_parser('bench', help='Задержка поиска на синтетическом корпусе')
+    bench_parser.add_argument('--rows', type=int, default=100_000)
+    bench_parser.add_argument('--db', help='БД для корпуса (сохраняется между запусками)')
+    bench_parser.add_argument('--max-candidates', type=int, help='Предел ранжирования')
+
+    subparsers.add_parser('check', help='Проверка стеммера и поиска')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(message)s')
+
+    if args.command == 'search':
+        page = search_vacancies(args.db, args.query, max_candidates=args.max_candidates, limit=args.limit,
+                                offset=args.offset, sources=args.source, approved_only=args.approved)
+        ranked = f" (ранжированы {page['ranked']} самых свежих)" if page['capped'] else ''
+        print(f"{page['match']}: {page['total']}{ranked}")
+        for item in page['items']:
+            print(f"{item['score']:>8.2f}  [{item['source']}] {item['title']} - {item['company']}")
+            print(f"          {item['snippet']}")
+        return 0
+    if args.command == 'sync':
+        searcher = VacancySearch(args.db, busy_timeout=30.0)
+        started = time.perf_counter()
+        indexed = searcher.sync(limit=None)
+        searcher.close()
+        print(f"Проиндексировано {indexed} вакансий за {time.perf_counter() - started:.1f}с")
+        return 0
+    if args.command == 'bench':
+        return bench(args.rows, args.db, max_candidates=args.max_candidates)
+    return check()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
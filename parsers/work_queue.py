@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+"""
+Очередь задач парсинга с арендой (lease)
+
+Задачи двух видов:
+- list   - страница выдачи (source, query, page); порождает задачи detail
+           и задачу следующей страницы (до max_pages), пока выдача не кончится
+- detail - страница вакансии; результат сохраняется в БД вакансий
+
+Воркер берет задачи в аренду на visibility_timeout. Если воркер упал и не
+подтвердил задачу, после истечения аренды ее заберет другой воркер.
+Неудачные задачи повторяются с экспоненциальной задержкой, после
+max_attempts попыток попадают в dead letter (status='dead').
+
+Хранилище подключаемое (QueueBackend); по умолчанию SQLite в режиме WAL -
+его могут разбирать любые процессы на одной машине. Для нескольких машин
+регистрируется серверный бэкенд через register_backend.
+
+Запуск:
+    python work_queue.py enqueue --query дизайнер --pages 3
+    python work_queue.py work --processes 4 --exit-when-empty
+    python work_queue.py stats
+
+Автор: AI Assistant
+Версия: 1.0.0
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import inspect
+import logging
+import argparse
+import multiprocessing
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TASK_LIST = 'list'
+TASK_DETAIL = 'detail'
+
+STATUS_PENDING = 'pending'
+STATUS_LEASED = 'leased'
+STATUS_DONE = 'done'
+STATUS_DEAD = 'dead'
+
+
+class TaskFailed(Exception):
+    """Парсер вернул пустой результат вместо исключения (блокировка, заглушка)"""
+
+
+@dataclass
+class Task:
+    """Задача очереди"""
+    kind: str
+    source: str
+    payload: Dict[str, Any]
+    dedup_key: Optional[str] = None
+    priority: int = 0
+    max_attempts: int = 5
+    id: Optional[int] = None
+    status: str = STATUS_PENDING
+    attempts: int = 0
+    lease_owner: Optional[str] = None
+    lease_expires: Optional[float] = None
+    available_at: float = 0.0
+    last_error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+
+
+class QueueBackend(ABC):
+    """Интерфейс хранилища очереди"""
+
+    @abstractmethod
+    def enqueue(self, tasks: List[Task]) -> int:
+        """Добавление задач; задачи с уже существующим dedup_key пропускаются"""
+
+    @abstractmethod
+    def lease(self, worker_id: str, limit: int = 1, visibility_timeout: float = 300.0,
+              kinds: Optional[List[str]] = None) -> List[Task]:
+        """Аренда готовых задач (включая задачи с истекшей арендой)"""
+
+    @abstractmethod
+    def complete(self, task_id: int, worker_id: str) -> bool:
+        """Подтверждение выполнения; False - аренда уже потеряна"""
+
+    @abstractmethod
+    def fail(self, task_id: int, worker_id: str, error: str, retry_delay: float = 0.0) -> str:
+        """Неудача: повтор после retry_delay или dead letter; возвращает новый статус"""
+
+    @abstractmethod
+    def release(self, task_id: int, worker_id: str, delay: float = 0.0) -> None:
+        """Возврат задачи в очередь без расхода попытки"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Число задач по видам и статусам"""
+
+    @abstractmethod
+    def dead_letters(self, limit: int = 100) -> List[Task]:
+        """Задачи, исчерпавшие попытки"""
+
+    @abstractmethod
+    def requeue_dead(self) -> int:
+        """Вернуть dead letter задачи в очередь с обнулением попыток"""
+
+
+class SQLiteQueueBackend(QueueBackend):
+    """
+    Очередь в SQLite.
+
+    Аренда выполняется в транзакции BEGIN IMMEDIATE, поэтому два процесса
+    не получат одну задачу. WAL позволяет читать во время записи.
+    """
+
+    def __init__(self, db_path: str = "data/work_queue.db", busy_timeout: float = 30.0):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    dedup_key TEXT UNIQUE,
+                    priority INTEGER DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    max_attempts INTEGER DEFAULT 5,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    available_at REAL DEFAULT 0,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_ready ON tasks(status, available_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks(status, lease_expires)")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _task(row: sqlite3.Row) -> Task:
+        return Task(
+            id=row['id'], kind=row['kind'], source=row['source'],
+            payload=json.loads(row['payload']), dedup_key=row['dedup_key'],
+            priority=row['priority'], status=row['status'], attempts=row['attempts'],
+            max_attempts=row['max_attempts'], lease_owner=row['lease_owner'],
+            lease_expires=row['lease_expires'], available_at=row['available_at'],
+            last_error=row['last_error'], created_at=row['created_at'],
+        )
+
+    def enqueue(self, tasks: List[Task]) -> int:
+        now = time.time()
+        conn = self._connect()
+        try:
+            before = conn.total_changes
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("""
+                INSERT OR IGNORE INTO tasks
+                    (kind, source, payload, dedup_key, priority, status, max_attempts,
+                     available_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?)
+            """, [
+                (t.kind, t.source, json.dumps(t.payload, ensure_ascii=False, default=str),
+                 t.dedup_key, t.priority, t.max_attempts, t.available_at, now, now)
+                for t in tasks
+            ])
+            conn.execute("COMMIT")
+            return conn.total_changes - before
+        finally:
+            conn.close()
+
+    def lease(self, worker_id: str, limit: int = 1, visibility_timeout: float = 300.0,
+              kinds: Optional[List[str]] = None) -> List[Task]:
+        now = time.time()
+        kind_filter = ''
+        params: List[Any] = [now, now]
+        if kinds:
+            kind_filter = f"AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+
+            # Аренда истекла на последней попытке - воркер падает на этой задаче
+            conn.execute("""
+                UPDATE tasks SET status = 'dead', last_error = COALESCE(last_error, 'lease expired'),
+                       lease_owner = NULL, updated_at = ?
+                WHERE status = 'leased' AND lease_expires <= ? AND attempts >= max_attempts
+            """, (now, now))
+
+            rows = conn.execute(f"""
+                SELECT * FROM tasks
+                WHERE ((status = 'pending' AND available_at <= ?)
+                       OR (status = 'leased' AND lease_expires <= ?))
+                      {kind_filter}
+                ORDER BY priority DESC, id
+                LIMIT ?
+            """, (*params, limit)).fetchall()
+
+            tasks = []
+            for row in rows:
+                if row['status'] == STATUS_LEASED:
+                    logger.info(f"♻️ Задача {row['id']}: аренда {row['lease_owner']} истекла, выдаем повторно")
+                conn.execute("""
+                    UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?,
+                           attempts = attempts + 1, updated_at = ?
+                    WHERE id = ?
+                """, (worker_id, now + visibility_timeout, now, row['id']))
+                task = self._task(row)
+                task.status = STATUS_LEASED
+                task.lease_owner = worker_id
+                task.lease_expires = now + visibility_timeout
+                task.attempts += 1
+                tasks.append(task)
+
+            conn.execute("COMMIT")
+            return tasks
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def complete(self, task_id: int, worker_id: str) -> bool:
+        conn = self._connect()
+        try:
+            cursor = conn.execute("""
+                UPDATE tasks SET status = 'done', lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+            """, (time.time(), task_id, worker_id))
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def fail(self, task_id: int, worker_id: str, error: str, retry_delay: float = 0.0) -> str:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM tasks WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (task_id, worker_id)
+            ).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return STATUS_LEASED
+
+            status = STATUS_DEAD if row['attempts'] >= row['max_attempts'] else STATUS_PENDING
+            conn.execute("""
+                UPDATE tasks SET status = ?, last_error = ?, lease_owner = NULL, lease_expires = NULL,
+                       available_at = ?, updated_at = ?
+                WHERE id = ?
+            """, (status, error[:1000], now + retry_delay, now, task_id))
+            conn.execute("COMMIT")
+            return status
+        finally:
+            conn.close()
+
+    def release(self, task_id: int, worker_id: str, delay: float = 0.0) -> None:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("""
+                UPDATE tasks SET status = 'pending', attempts = MAX(attempts - 1, 0),
+                       lease_owner = NULL, lease_expires = NULL, available_at = ?, updated_at = ?
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+            """, (now + delay, now, task_id, worker_id))
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT kind, status, COUNT(*) AS n FROM tasks GROUP BY kind, status").fetchall()
+        finally:
+            conn.close()
+        result: Dict[str, Dict[str, int]] = {}
+        for row in rows:
+            result.setdefault(row['kind'], {})[row['status']] = row['n']
+        return result
+
+    def dead_letters(self, limit: int = 100) -> List[Task]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM tasks WHERE status = 'dead' ORDER BY updated_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._task(row) for row in rows]
+
+    def requeue_dead(self) -> int:
+        conn = self._connect()
+        try:
+            cursor = conn.execute("""
+                UPDATE tasks SET status = 'pending', attempts = 0, available_at = 0, updated_at = ?
+                WHERE status = 'dead'
+            """, (time.time(),))
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+
+# Фабрики бэкендов по схеме URL: sqlite:///data/work_queue.db
+BACKENDS: Dict[str, Callable[[str], QueueBackend]] = {
+    'sqlite': lambda location: SQLiteQueueBackend(location or "data/work_queue.db"),
+}
+
+
+def register_backend(scheme: str, factory: Callable[[str], QueueBackend]):
+    """Подключение своего бэкенда (например, серверной БД для нескольких машин)"""
+    BACKENDS[scheme] = factory
+
+
+def create_backend(url: str = "sqlite:///data/work_queue.db") -> QueueBackend:
+    """Бэкенд по URL вида <схема>://<адрес>; путь без схемы - файл SQLite"""
+    if '://' not in url:
+        return SQLiteQueueBackend(url)
+    scheme, location = url.split('://', 1)
+    if scheme not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд очереди: {scheme} (доступны: {', '.join(BACKENDS)})")
+    if scheme == 'sqlite':
+        location = location[1:] if location.startswith('/') else location
+    return BACKENDS[scheme](location)
+
+
+def list_task(source: str, query: str, page: int, extract_details: bool = True,
+              max_pages: Optional[int] = None) -> Task:
+    return Task(
+        kind=TASK_LIST, source=source,
+        payload={'query': query, 'page': page, 'extract_details': extract_details,
+                 'max_pages': max_pages or page},
+        dedup_key=f"list:{source}:{query.strip().lower()}:{page}:{int(time.time() // 3600)}",
+    )
+
+
+def detail_task(source: str, card: Dict[str, Any]) -> Task:
+    # Детали важнее новых страниц выдачи: очередь разбирается в глубину
+    return Task(
+        kind=TASK_DETAIL, source=source, payload={'card': card},
+        dedup_key=f"detail:{card['external_id']}", priority=1,
+    )
+
+
+async def _call(method, *args):
+    """Вызов метода парсера, синхронного или async"""
+    result = method(*args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+class QueueWorker:
+    """
+    Воркер очереди: выполняет задачи парсерами UnifiedParser и сохраняет
+    вакансии в его БД. Можно запускать сколько угодно процессов.
+    """
+
+    def __init__(self, backend: QueueBackend, db_path: str = "data/vacancies.db",
+                 delay: float = 1.0, worker_id: Optional[str] = None,
+                 visibility_timeout: float = 300.0, batch_size: int = 1,
+                 retry_base_delay: float = 30.0, poll_interval: float = 2.0):
+        try:
+            from unified_parser import UnifiedParser, MISSING_DESCRIPTION
+            from circuit_breaker import circuit_breaker, CircuitState
+        except ImportError:
+            sys.path.append(os.path.dirname(__file__))
+            from unified_parser import UnifiedParser, MISSING_DESCRIPTION
+            from circuit_breaker import circuit_breaker, CircuitState
+
+        self.backend = backend
+        self.unified = UnifiedParser(db_path=db_path, delay=delay)
+        self.breaker = circuit_breaker
+        self.circuit_open = CircuitState.OPEN
+        self.missing_description = MISSING_DESCRIPTION
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.visibility_timeout = visibility_timeout
+        self.batch_size = batch_size
+        self.retry_base_delay = retry_base_delay
+        self.poll_interval = poll_interval
+        self.stats = {'done': 0, 'failed': 0, 'dead': 0, 'postponed': 0, 'saved': 0}
+
+    def _first_page(self, parser) -> int:
+        """Номер первой страницы выдачи парсера (HH считает с 0)"""
+        default = inspect.signature(parser.parse_vacancy_list_page).parameters['page'].default
+        return default if isinstance(default, int) else 1
+
+    async def _run_list(self, task: Task, parser):
+        payload = task.payload
+        page = self._first_page(parser) + payload['page'] - 1
+        started = datetime.now()
+        cards = await _call(parser.parse_vacancy_list_page, payload['query'], page) or []
+        if not cards:
+            # Парсеры не бросают исключений при блокировке, а возвращают пустую
+            # страницу: пустая первая страница или отмеченная блокировка - неудача
+            # задачи (повтор, затем dead letter), пустая следующая - конец выдачи
+            if payload['page'] == 1 or self.breaker.blocked_since(task.source, started):
+                raise TaskFailed(f"страница {payload['page']} без карточек вакансий")
+            logger.info(f"[{self.worker_id}] {task.source} '{payload['query']}' стр. {payload['page']}: "
+                        f"конец выдачи")
+            return
+
+        has_details = hasattr(parser, 'extract_full_vacancy_details')
+        if payload.get('extract_details', True) and has_details:
+            added = self.backend.enqueue([detail_task(task.source, card) for card in cards])
+            logger.info(f"[{self.worker_id}] {task.source} '{payload['query']}' стр. {payload['page']}: "
+                        f"{len(cards)} карточек, новых задач деталей {added}")
+        else:
+            for card in cards:
+                self._save(card)
+
+        # Следующая страница ставится только после непустой текущей
+        if payload['page'] < payload.get('max_pages', payload['page']):
+            self.backend.enqueue([list_task(task.source, payload['query'], payload['page'] + 1,
+                                            payload.get('extract_details', True), payload['max_pages'])])
+
+    async def _run_detail(self, task: Task, parser):
+        card = dict(task.payload['card'])
+        details = await _call(parser.extract_full_vacancy_details, card['url']) or {}
+        # Заглушка вместо описания - страницу вакансии получить не удалось
+        if not details.get('full_description') or details['full_description'] == self.missing_description:
+            raise TaskFailed(f"детали не получены: {card['url']}")
+        card.update(details)
+        self._save(card)
+
+    def _save(self, vacancy: Dict[str, Any]):
+        vacancy.setdefault('status', 'pending')
+        if self.unified.db.save_vacancy(vacancy):
+            self.stats['saved'] += 1
+
+    async def process(self, task: Task):
+        parser = self.unified.parsers.get(task.source)
+        if parser is None:
+            self.backend.fail(task.id, self.worker_id, f"unknown source {task.source}", 0)
+            self.stats['dead'] += 1
+            return
+
+        # Недоступный источник - откладываем задачу, не расходуя попытку
+        if self.breaker.state(task.source) == self.circuit_open:
+            self.backend.release(task.id, self.worker_id, self.breaker.open_timeout.total_seconds())
+            self.stats['postponed'] += 1
+            return
+
+        try:
+            if task.kind == TASK_LIST:
+                await self._run_list(task, parser)
+            else:
+                await self._run_detail(task, parser)
+        except Exception as e:
+            delay = self.retry_base_delay * 2 ** (task.attempts - 1)
+            status = self.backend.fail(task.id, self.worker_id, str(e), delay)
+            self.stats['dead' if status == STATUS_DEAD else 'failed'] += 1
+            logger.error(f"[{self.worker_id}] задача {task.id} ({task.kind} {task.source}): {e} -> {status}")
+            return
+
+        self.backend.complete(task.id, self.worker_id)
+        self.stats['done'] += 1
+
+    async def run(self, exit_when_empty: bool = False, max_tasks: Optional[int] = None):
+        """Цикл разбора очереди"""
+        logger.info(f"Воркер {self.worker_id} запущен")
+        processed = 0
+        while max_tasks is None or processed < max_tasks:
+            tasks = self.backend.lease(self.worker_id, self.batch_size, self.visibility_timeout)
+            if not tasks:
+                if exit_when_empty and not self._has_pending():
+                    break
+                await asyncio.sleep(self.poll_interval)
+                continue
+            for task in tasks:
+                await self.process(task)
+                processed += 1
+        logger.info(f"Воркер {self.worker_id} завершен: {self.stats}")
+        return self.stats
+
+    def _has_pending(self) -> bool:
+        """Есть ли задачи, которые еще могут стать доступными (отложенные или в аренде)"""
+        return any(
+            counts.get(STATUS_PENDING, 0) or counts.get(STATUS_LEASED, 0)
+            for counts in self.backend.stats().values()
+        )
+
+
+def enqueue_crawl(backend: QueueBackend, queries: List[str], pages: int,
+                  sources: List[str], extract_details: bool = True) -> int:
+    """
+    Постановка выдачи в очередь: первая страница каждого запроса, остальные
+    (до pages) воркеры ставят по мере разбора
+    """
+    tasks = [
+        list_task(source, query, 1, extract_details, pages)
+        for source in sources
+        for query in queries
+    ]
+    return backend.enqueue(tasks)
+
+
+def _worker_process(queue_url: str, db_path: str, delay: float, exit_when_empty: bool,
+                    visibility_timeout: float, verbose: bool):
+    logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO,
+                        format='%(asctime)s - %(process)d - %(levelname)s - %(message)s')
+    worker = QueueWorker(create_backend(queue_url), db_path=db_path, delay=delay,
+                         visibility_timeout=visibility_timeout)
+    asyncio.run(worker.run(exit_when_empty=exit_when_empty))
+
+
+def main():
+    """CLI очереди"""
+    parser = argparse.ArgumentParser(description='Очередь задач парсинга с арендой')
+    parser.add_argument('--queue', default='sqlite:///data/work_queue.db', help='URL бэкенда очереди')
+    parser.add_argument('--verbose', action='store_true', help='Подробный вывод')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help='Поставить выдачу в очередь')
+    enqueue.add_argument('--query', nargs='+', default=['дизайнер'], help='Поисковые запросы')
+    enqueue.add_argument('--pages', type=int, default=3, help='Максимум страниц на запрос и источник')
+    enqueue.add_argument('--sources', nargs='+', default=['hh', 'hirehi', 'habr', 'getmatch', 'geekjob'])
+    enqueue.add_argument('--no-details', action='store_true', help='Не извлекать полные детали')
+
+    work = commands.add_parser('work', help='Разбирать очередь')
+    work.add_argument('--db', default='data/vacancies.db', help='Путь к базе данных вакансий')
+    work.add_argument('--delay', type=float, default=1.0, help='Задержка между запросами')
+    work.add_argument('--processes', type=int, default=1, help='Количество процессов-воркеров')
+    work.add_argument('--visibility-timeout', type=float, default=300.0, help='Длительность аренды, сек')
+    work.add_argument('--exit-when-empty', action='store_true', help='Завершиться, когда очередь пуста')
+
+    commands.add_parser('stats', help='Статистика очереди')
+    dead = commands.add_parser('dead', help='Dead letter задачи')
+    dead.add_argument('--requeue', action='store_true', help='Вернуть их в очередь')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    backend = create_backend(args.queue)
+
+    if args.command == 'enqueue':
+        added = enqueue_crawl(backend, args.query, args.pages, args.sources, not args.no_details)
+        print(f"Добавлено задач: {added}")
+
+    elif args.command == 'work':
+        worker_args = (args.queue, args.db, args.delay, args.exit_when_empty,
+                       args.visibility_timeout, args.verbose)
+        if args.processes <= 1:
+            _worker_process(*worker_args)
+        else:
+            processes = [multiprocessing.Process(target=_worker_process, args=worker_args)
+                         for _ in range(args.processes)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+
+    elif args.command == 'stats':
+        print(json.dumps(backend.stats(), ensure_ascii=False, indent=2))
+
+    elif args.command == 'dead':
+        if args.requeue:
+            print(f"Возвращено в очередь: {backend.requeue_dead()}")
+        for task in backend.dead_letters():
+            print(f"{task.id} {task.kind} {task.source} попыток {task.attempts}: {task.last_error}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -68,6 +68,48 @@ def run_unified_parser(db_path: str = "data/job_filter.db",
         return False
 
 
+def run_queue_workers(db_path: str = "data/job_filter.db",
+                      query: str = "дизайнер",
+                      pages: int = 3,
+                      sources: list = None,
+                      workers: int = 2,
+                      extract_details: bool = True) -> bool:
+    """Постановка задач в очередь и запуск нескольких процессов-воркеров"""
+    
+    queue_path = Path(__file__).parent / "parsers" / "work_queue.py"
+    if not queue_path.exists():
+        print(f"Ошибка: Очередь не найдена: {queue_path}")
+        return False
+    
+    enqueue_cmd = [sys.executable, str(queue_path), "enqueue", "--query", query, "--pages", str(pages)]
+    if sources:
+        enqueue_cmd.extend(["--sources"] + sources)
+    if not extract_details:
+        enqueue_cmd.append("--no-details")
+    
+    work_cmd = [
+        sys.executable, str(queue_path), "work",
+        "--db", db_path,
+        "--processes", str(workers),
+        "--exit-when-empty"
+    ]
+    
+    print("Запуск Python парсера через очередь задач...")
+    print(f"  База данных: {db_path}")
+    print(f"  Запрос: {query}")
+    print(f"  Воркеров: {workers}")
+    print()
+    
+    try:
+        if subprocess.run(enqueue_cmd, cwd=Path(__file__).parent).returncode != 0:
+            return False
+        result = subprocess.run(work_cmd, cwd=Path(__file__).parent)
+        return result.returncode == 0
+    except Exception as e:
+        print(f"Ошибка запуска воркеров: {e}")
+        return False
+
+
 def main():
     """Главная функция"""
     parser = argparse.ArgumentParser(description="Запуск всех Python парсеров")
@@ -80,17 +122,29 @@ def main():
                        help="Источники для парсинга")
     parser.add_argument("--verbose", "-v", action="store_true", help="Подробный вывод")
     parser.add_argument("--extract-details", action="store_true", default=True, help="Извлекать полные детали вакансий")
+    parser.add_argument("--workers", type=int, default=0,
+                       help="Разбирать очередь задач указанным числом процессов (0 - один процесс без очереди)")
     
     args = parser.parse_args()
     
-    success = run_unified_parser(
-        db_path=args.db,
-        query=args.query,
-        pages=args.pages,
-        sources=args.sources,
-        verbose=args.verbose,
-        extract_details=args.extract_details
-    )
+    if args.workers > 0:
+        success = run_queue_workers(
+            db_path=args.db,
+            query=args.query,
+            pages=args.pages,
+            sources=args.sources,
+            workers=args.workers,
+            extract_details=args.extract_details
+        )
+    else:
+        success = run_unified_parser(
+            db_path=args.db,
+            query=args.query,
+            pages=args.pages,
+            sources=args.sources,
+            verbose=args.verbose,
+            extract_details=args.extract_details
+        )
     
     if success:
         print("Парсинг завершён успешно!")